@@ -0,0 +1,32 @@
+"""
+Verify a directory of avrdude .hex dumps of machine eeproms, and print a
+json report of every dump.
+"""
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import json
+import multiprocessing
+import optparse
+
+parser = optparse.OptionParser()
+parser.add_option("-d", "--directory", dest="directory",
+                  help="directory of .hex dumps", default=".")
+parser.add_option("-v", "--version", dest="version",
+                  help="eeprom map version the dumps were made with",
+                  default=makerbot_driver.EEPROM.constants.default_version)
+parser.add_option("-s", "--software_variant", dest="software_variant",
+                  help="software variant of the firmware",
+                  default=makerbot_driver.EEPROM.constants.default_software_variant)
+parser.add_option("-p", "--processes", dest="processes", type="int",
+                  help="worker processes", default=multiprocessing.cpu_count())
+(options, args) = parser.parse_args()
+
+map_name = makerbot_driver.EEPROM.constants.eeprom_map_name % (
+    options.version, options.software_variant)
+report = makerbot_driver.EEPROM.verify_eeprom_dumps(
+    options.directory, map_name, processes=options.processes)
+# Strings read off a bad eeprom need not be utf8
+print json.dumps(report, indent=2, sort_keys=True, encoding='latin-1')
@@ -0,0 +1,84 @@
+"""
+Measure the per-command cost of encoding s3g payloads with struct.pack and a
+format string against the precompiled command codecs, and of decoding a file
+of them field by field against one unpack per command, and against
+iter_payloads unpacking them straight out of a buffer.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import optparse
+import StringIO
+import struct
+import time
+
+codecs = sys.modules['makerbot_driver.Encoder.CommandCodec']
+
+parser = optparse.OptionParser()
+parser.add_option("-n", "--iterations", dest="iterations", type="int",
+                  help="encodes per command", default=100000)
+(options, args) = parser.parse_args()
+
+commands = [
+    ('QUEUE_EXTENDED_POINT_ACCELERATED',
+     [1, 2, 3, 4, 5, 1000, 0x18, 1.5, 640]),
+    ('QUEUE_EXTENDED_POINT_NEW', [1, 2, 3, 4, 5, 1000, 0x18]),
+    ('SET_EXTENDED_POSITION', [1, 2, 3, 4, 5]),
+    ('TOOL_ACTION_COMMAND', [0, 3, 2]),
+    ('SET_BUILD_PERCENT', [50, 0]),
+]
+
+
+def timed(function, args):
+    start = time.time()
+    for i in xrange(options.iterations):
+        function(*args)
+    return (time.time() - start) / options.iterations * 1e6
+
+print '%-34s %12s %12s' % ('encode', 'format us', 'codec us')
+for name, args in commands:
+    codec = codecs.host_action_codecs[name]
+    format = '<B' + codec.format
+
+    def legacy(*args):
+        return struct.pack(
+            format, makerbot_driver.host_action_command_dict[name], *args)
+    print '%-34s %12.3f %12.3f' % (
+        name, timed(legacy, args),
+        timed(lambda *args: codecs.host_action_codecs[name].pack(*args), args))
+
+tool_payload = codecs.slave_action_codecs['SET_TOOLHEAD_TARGET_TEMP'].pack_parameters(220)
+data = ''.join(codecs.host_action_codecs[name].pack(*args) +
+               (tool_payload if name == 'TOOL_ACTION_COMMAND' else '')
+               for name, args in commands for i in range(2000))
+count = len(commands) * 2000
+
+
+class LegacyReader(makerbot_driver.FileReader.FileReader):
+    def ParseHostAction(self, cmd):
+        return self.ParseOutParameters(makerbot_driver.FileReader.hostFormats[cmd])
+
+    def ParseToolAction(self, cmd):
+        data = self.ParseOutParameters(makerbot_driver.FileReader.hostFormats[cmd])
+        return data + self.ParseOutParameters(
+            makerbot_driver.FileReader.slaveFormats[data[1]])
+
+print
+print '%-34s %12s' % ('decode', 'us/command')
+for label, reader_class in [('per field', LegacyReader),
+                            ('codec', makerbot_driver.FileReader.FileReader)]:
+    reader = reader_class()
+    reader.file = StringIO.StringIO(data)
+    start = time.time()
+    reader.ReadFile()
+    print '%-34s %12.3f' % (label, (time.time() - start) / count * 1e6)
+
+reader = makerbot_driver.FileReader.FileReader()
+reader.file = StringIO.StringIO(data)
+start = time.time()
+for payload in reader.iter_payloads():
+    pass
+print '%-34s %12.3f' % ('iter_payloads', (time.time() - start) / count * 1e6)
@@ -0,0 +1,81 @@
+"""
+Compare converting a gcode file to s3g/x3g with a GcodeParser and FileWriter
+against makerbot_driver.compile_gcode, and check both give the same bytes.
+The input is wrapped in the machine's start and end sequences, like
+convert_gcode_to_s3g.py does.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import itertools
+import optparse
+import tempfile
+import threading
+import time
+
+parser = optparse.OptionParser()
+parser.add_option("-i", "--inputfile", dest="input_file",
+                  help="gcode file to read in",
+                  default="../doc/gcode_samples/miracle_grue_single_extrusion_20_mm_box.gcode")
+parser.add_option("-m", "--machine_type", dest="machine",
+                  help="machine type", default="ReplicatorDual")
+parser.add_option("-t", "--type", dest="print_to_file_type",
+                  help="s3g or x3g", default="x3g")
+(options, args) = parser.parse_args()
+
+profile = makerbot_driver.Profile(options.machine)
+ga = makerbot_driver.GcodeAssembler(profile)
+start, end, variables = ga.assemble_recipe()
+start_gcode = ga.assemble_start_sequence(start)
+end_gcode = ga.assemble_end_sequence(end)
+start_position = profile.values['print_start_sequence']['start_position']
+variables.update({
+    'START_X': start_position['start_x'],
+    'START_Y': start_position['start_y'],
+    'START_Z': start_position['start_z'],
+})
+
+with open(options.input_file) as f:
+    lines = list(itertools.chain(start_gcode, f, end_gcode))
+
+with tempfile.NamedTemporaryFile(suffix='.s3g', delete=False) as f:
+    parser_output = f.name
+with tempfile.NamedTemporaryFile(suffix='.s3g', delete=False) as f:
+    compiler_output = f.name
+
+gcode_parser = makerbot_driver.Gcode.GcodeParser()
+gcode_parser.state.profile = profile
+gcode_parser.state.values['build_name'] = 'benchmark'
+gcode_parser.environment.update(variables)
+gcode_parser.s3g = makerbot_driver.s3g()
+gcode_parser.s3g.set_print_to_file_type(options.print_to_file_type)
+gcode_parser.s3g.writer = makerbot_driver.Writer.FileWriter(
+    open(parser_output, 'wb'), threading.Condition())
+start_time = time.time()
+for line in lines:
+    gcode_parser.execute_line(line)
+gcode_parser.s3g.writer.close()
+parser_time = time.time() - start_time
+
+start_time = time.time()
+makerbot_driver.compile_gcode(lines, compiler_output, profile,
+                              options.print_to_file_type, variables,
+                              'benchmark')
+compiler_time = time.time() - start_time
+
+with open(parser_output, 'rb') as f:
+    expected = f.read()
+with open(compiler_output, 'rb') as f:
+    identical = expected == f.read()
+os.unlink(parser_output)
+os.unlink(compiler_output)
+
+print '%i lines, %i bytes of %s' % (len(lines), len(expected),
+                                    options.print_to_file_type)
+print 'GcodeParser    %8.3fs' % (parser_time)
+print 'compile_gcode  %8.3fs  %.1fx' % (compiler_time,
+                                        parser_time / compiler_time)
+print 'identical output: %s' % (identical)
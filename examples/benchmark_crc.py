@@ -0,0 +1,55 @@
+"""
+Measure the per-packet cost of computing s3g CRCs: the original CalculateCRC,
+which rebuilt its table on every call, against the module level table, the
+incremental Crc8 and the CalculateCRCs batch path.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import optparse
+import random
+import time
+
+parser = optparse.OptionParser()
+parser.add_option("-n", "--payloads", dest="payloads", type="int",
+                  help="number of payloads", default=20000)
+(options, args) = parser.parse_args()
+
+
+def original_crc(data):
+    crctab = list(makerbot_driver.Encoder.crctab)
+    data_bytes = bytearray(data)
+    val = 0
+    for x in data_bytes:
+        val = crctab[val ^ x]
+    return val
+
+
+def incremental_crc(data):
+    crc = makerbot_driver.Encoder.Crc8()
+    crc.update(data)
+    return crc.value
+
+random.seed(0)
+payloads = []
+for i in range(options.payloads):
+    size = random.randint(1, makerbot_driver.maximum_payload_length)
+    payloads.append(bytearray(random.getrandbits(8) for j in range(size)))
+
+expected = None
+print "method, seconds, us/packet"
+for name, calculate in [
+        ('original', lambda: [original_crc(p) for p in payloads]),
+        ('module_table', lambda: [makerbot_driver.Encoder.CalculateCRC(p) for p in payloads]),
+        ('Crc8', lambda: [incremental_crc(p) for p in payloads]),
+        ('batch', lambda: makerbot_driver.Encoder.CalculateCRCs(payloads))]:
+    start_time = time.time()
+    crcs = calculate()
+    elapsed = time.time() - start_time
+    if expected is None:
+        expected = crcs
+    assert crcs == expected
+    print "%s, %.3f, %.2f" % (name, elapsed, elapsed * 1e6 / len(payloads))
@@ -0,0 +1,96 @@
+"""
+Measure the throughput of a BundleProcessor of every bundleable line
+transform processor, matching each line against the combined code_map
+regex, against trying each regex in turn, on a large synthetic file of
+slicer output, and check both give the same lines.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import optparse
+import re
+import time
+
+parser = optparse.OptionParser()
+parser.add_option("-n", "--lines", dest="lines", type="int",
+                  help="lines in the synthetic file", default=2000000)
+(options, args) = parser.parse_args()
+
+sample = [
+    'G1 X10.5 Y-3.25 Z0.27 F1500.0 E1.2\n',
+    'G1 X11.25 Y-3.5 E1.25\n',
+    'G1 X12 Y-4 A1.3\n',
+    '(<layer> 0.27 )\n',
+    'M101\n',
+    'G1 X12 Y-4.5 F3000\n',
+    'M108 R2.5\n',
+    'G1 X13 Y-4.5 A1.4\n',
+    'M103\n',
+    'M104 S220 T0\n',
+    'G92 E0\n',
+    'G1 X14 Y-5 E1.5\n',
+]
+
+
+def synthetic_gcode():
+    for i in xrange(options.lines):
+        yield sample[i % len(sample)]
+
+
+class LegacyBundleProcessor(makerbot_driver.GcodeProcessors.BundleProcessor):
+    def _transform_line(self, code):
+        tcode = code
+        for key in self.code_map:
+            match = re.match(key, code)
+            if match is not None:
+                tcode = self.code_map[key](match)
+                break
+        tcode = [tcode] if not isinstance(tcode, list) else tcode
+        tcode = [code for code in tcode if code is not ""]
+        return tcode
+
+
+def bundle(bundle_class):
+    processor = bundle_class()
+    processor.do_progress = False
+    processor.processors = [
+        makerbot_driver.GcodeProcessors.AbpProcessor(),
+        makerbot_driver.GcodeProcessors.CoordinateRemovalProcessor(),
+        makerbot_driver.GcodeProcessors.RemoveProgressProcessor(),
+        makerbot_driver.GcodeProcessors.RpmProcessor(),
+        makerbot_driver.GcodeProcessors.SingletonTProcessor(),
+        makerbot_driver.GcodeProcessors.SetTemperatureProcessor(),
+        makerbot_driver.GcodeProcessors.GetTemperatureProcessor(),
+        makerbot_driver.GcodeProcessors.ToolSwapProcessor(),
+        makerbot_driver.GcodeProcessors.SkeinforgeVersionChecker('12.03.14'),
+    ]
+    return processor
+
+
+def run(bundle_class):
+    processor = bundle(bundle_class)
+    count = 0
+    checksum = 0
+    start = time.time()
+    for line in processor.iter_process_gcode(synthetic_gcode()):
+        count += 1
+        checksum = hash((checksum, line))
+    return time.time() - start, count, checksum
+
+legacy_time, legacy_count, legacy_checksum = run(LegacyBundleProcessor)
+bundle_time, bundle_count, bundle_checksum = run(
+    makerbot_driver.GcodeProcessors.BundleProcessor)
+
+processor = bundle(makerbot_driver.GcodeProcessors.BundleProcessor)
+processor.collate_codemaps()
+print '%i lines in, %i lines out, %i regexes' % (
+    options.lines, bundle_count, len(processor.code_map))
+print 'regex per key    %8.3fs  %8.0f lines/s' % (
+    legacy_time, options.lines / legacy_time)
+print 'combined regex   %8.3fs  %8.0f lines/s  %.1fx' % (
+    bundle_time, options.lines / bundle_time, legacy_time / bundle_time)
+print 'identical output: %s' % (
+    (legacy_count, legacy_checksum) == (bundle_count, bundle_checksum))
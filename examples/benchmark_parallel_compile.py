@@ -0,0 +1,80 @@
+"""
+Compare compiling a large synthetic gcode file serially with compile_gcode
+against compiling it in parallel with compile_gcode_parallel, and check both
+give the same bytes.  The file is made of layers of short extruding moves,
+like a slicer's output.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import multiprocessing
+import optparse
+import tempfile
+import time
+
+parser = optparse.OptionParser()
+parser.add_option("-l", "--layers", dest="layers", type="int",
+                  help="layers in the synthetic file", default=200)
+parser.add_option("-n", "--moves", dest="moves", type="int",
+                  help="moves per layer", default=2000)
+parser.add_option("-p", "--processes", dest="processes", type="int",
+                  help="worker processes", default=multiprocessing.cpu_count())
+parser.add_option("-c", "--chunk_size", dest="chunk_size", type="int",
+                  help="minimum lines per chunk", default=10000)
+parser.add_option("-m", "--machine_type", dest="machine",
+                  help="machine type", default="ReplicatorDual")
+parser.add_option("-t", "--type", dest="print_to_file_type",
+                  help="s3g or x3g", default="x3g")
+(options, args) = parser.parse_args()
+
+lines = ['G92 X0 Y0 Z0 A0 B0\n', 'M135 T0\n', 'G1 F3000\n']
+e = 0.0
+for layer in range(options.layers):
+    lines.append('G1 Z%.2f F1200\n' % (0.2 * (layer + 1)))
+    lines.append('M73 P%i\n' % (layer * 100 / options.layers))
+    for move in range(options.moves):
+        e += 0.05
+        lines.append('G1 X%.3f Y%.3f A%.4f F%i\n' % (
+            (move * 7 % 100) * 0.5, (move * 13 % 100) * 0.5, e,
+            1800 + move % 5 * 300))
+lines.append('M137\n')
+
+with tempfile.NamedTemporaryFile(suffix='.s3g', delete=False) as f:
+    serial_output = f.name
+with tempfile.NamedTemporaryFile(suffix='.s3g', delete=False) as f:
+    parallel_output = f.name
+
+start_time = time.time()
+makerbot_driver.compile_gcode(lines, serial_output, options.machine,
+                              options.print_to_file_type)
+serial_time = time.time() - start_time
+
+start_time = time.time()
+makerbot_driver.Gcode.find_checkpoints(
+    lines, makerbot_driver.Profile(options.machine),
+    options.print_to_file_type, chunk_size=options.chunk_size)
+scan_time = time.time() - start_time
+
+start_time = time.time()
+makerbot_driver.Gcode.compile_gcode_parallel(
+    lines, parallel_output, options.machine, options.print_to_file_type,
+    processes=options.processes, chunk_size=options.chunk_size)
+parallel_time = time.time() - start_time
+
+with open(serial_output, 'rb') as f:
+    expected = f.read()
+with open(parallel_output, 'rb') as f:
+    identical = expected == f.read()
+os.unlink(serial_output)
+os.unlink(parallel_output)
+
+print '%i lines, %i bytes of %s, %i processes' % (
+    len(lines), len(expected), options.print_to_file_type, options.processes)
+print 'compile_gcode           %8.3fs' % (serial_time)
+print '  checkpoint scan       %8.3fs' % (scan_time)
+print 'compile_gcode_parallel  %8.3fs  %.1fx' % (
+    parallel_time, serial_time / parallel_time)
+print 'identical output: %s' % (identical)
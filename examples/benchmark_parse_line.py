@@ -0,0 +1,94 @@
+"""
+Measure gcode parse throughput of makerbot_driver.Gcode.parse_line and
+check_for_extraneous_codes, against the previous implementation that
+looked up repeats in codes.keys(), parsed values by trying int() before
+float() and built two sets per check.  Both must give the same results.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import exceptions
+import optparse
+import time
+
+parser = optparse.OptionParser()
+parser.add_option("-i", "--inputfile", dest="input_file",
+                  help="gcode file to read in", default="benchmark.gcode")
+parser.add_option("-n", "--iterations", dest="iterations", type="int",
+                  help="times to parse the file", default=20000)
+(options, args) = parser.parse_args()
+
+
+def legacy_parse_command(command):
+    codes = {}
+    flags = []
+    for pair in command.split():
+        code = pair[0]
+        if not code.isalpha():
+            raise makerbot_driver.Gcode.InvalidCodeError()
+        code = code.upper()
+        if code in codes.keys():
+            raise makerbot_driver.Gcode.RepeatCodeError()
+        if (code == 'G' and 'M' in codes.keys()) or \
+           (code == 'M' and 'G' in codes.keys()):
+            raise makerbot_driver.Gcode.MultipleCommandCodeError()
+        if len(pair) == 1:
+            flags.append(code)
+        else:
+            try:
+                codes[code] = int(pair[1:])
+            except exceptions.ValueError:
+                codes[code] = float(pair[1:])
+    return codes, flags
+
+
+def legacy_parse_line(line):
+    command, comment = makerbot_driver.Gcode.extract_comments(line)
+    codes, flags = legacy_parse_command(command)
+    return codes, flags, comment
+
+
+def legacy_check_for_extraneous_codes(codes, allowed_codes):
+    allowed_codes += "GM"
+    difference = set(codes) - set(allowed_codes)
+    if len(difference) > 0:
+        raise makerbot_driver.Gcode.InvalidCodeError()
+
+gcode_parser = makerbot_driver.Gcode.GcodeParser()
+instructions = {'G': gcode_parser.GCODE_INSTRUCTIONS,
+                'M': gcode_parser.MCODE_INSTRUCTIONS}
+
+with open(options.input_file) as f:
+    lines = list(f)
+
+
+def run(parse_line, check_for_extraneous_codes, keys):
+    results = []
+    start = time.time()
+    for i in xrange(options.iterations):
+        for line in lines:
+            codes, flags, comment = parse_line(line)
+            for command in 'GM':
+                if command in codes:
+                    allowed = instructions[command][codes[command]]
+                    check_for_extraneous_codes(keys(codes), allowed[1])
+                    check_for_extraneous_codes(flags, allowed[2])
+            if i == 0:
+                results.append((codes, flags, comment))
+    return time.time() - start, results
+
+legacy_time, legacy_results = run(
+    legacy_parse_line, legacy_check_for_extraneous_codes, dict.keys)
+parse_time, results = run(
+    makerbot_driver.Gcode.parse_line,
+    makerbot_driver.Gcode.check_for_extraneous_codes, lambda codes: codes)
+
+count = options.iterations * len(lines)
+print '%i lines parsed' % (count)
+print 'previous parser  %8.3f us/line' % (legacy_time / count * 1e6)
+print 'parse_line       %8.3f us/line  %.1fx' % (
+    parse_time / count * 1e6, legacy_time / parse_time)
+print 'identical results: %s' % (legacy_results == results)
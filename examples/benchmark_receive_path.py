@@ -0,0 +1,64 @@
+"""
+Measure the cost of reading replies from a serial stream: one read(1) per
+byte, as the StreamWriter used to do, against its buffered receive path.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import optparse
+import threading
+import time
+
+from loopback_serial import LoopbackSerial
+
+parser = optparse.OptionParser()
+parser.add_option("-n", "--replies", dest="replies", type="int",
+                  help="number of replies to read", default=20000)
+parser.add_option("-s", "--size", dest="size", type="int",
+                  help="reply payload size in bytes", default=20)
+(options, args) = parser.parse_args()
+
+response_payload = bytearray(
+    [makerbot_driver.response_code_dict['SUCCESS']] * options.size)
+request = makerbot_driver.Encoder.encode_payload(bytearray([0]))
+
+
+def make_port():
+    port = LoopbackSerial(latency=0, response_payload=response_payload)
+    for i in range(options.replies):
+        port.write(request)
+    port.read_calls = 0
+    return port
+
+
+def read_byte_at_a_time(port):
+    for i in range(options.replies):
+        decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+        start_time = time.time()
+        while decoder.state != 'PAYLOAD_READY':
+            data = ''
+            while data == '':
+                if time.time() > start_time + makerbot_driver.timeout_length:
+                    raise makerbot_driver.TimeoutError(0, decoder.state)
+                data = port.read(1)
+            decoder.parse_byte(ord(data))
+
+
+def read_buffered(port):
+    writer = makerbot_driver.Writer.StreamWriter(port, threading.Condition())
+    for i in range(options.replies):
+        writer.read_response()
+
+print "path, seconds, us/reply, read calls"
+for name, reader in [('byte_at_a_time', read_byte_at_a_time),
+                     ('buffered', read_buffered)]:
+    port = make_port()
+    start_time = time.time()
+    reader(port)
+    elapsed = time.time() - start_time
+    print "%s, %.3f, %.1f, %i" % (
+        name, elapsed, elapsed * 1e6 / options.replies,
+        port.read_calls)
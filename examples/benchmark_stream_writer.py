@@ -0,0 +1,42 @@
+"""
+Compare stop-and-wait and pipelined transmission in the StreamWriter by
+streaming move commands to a loopback serial port.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import makerbot_driver
+import optparse
+import threading
+import time
+
+from loopback_serial import LoopbackSerial
+
+parser = optparse.OptionParser()
+parser.add_option("-n", "--packets", dest="packets", type="int",
+                  help="number of move commands to send", default=2000)
+parser.add_option("-l", "--latency", dest="latency", type="float",
+                  help="simulated round trip time in ms", default=1.0)
+parser.add_option("-w", "--windows", dest="windows",
+                  help="comma separated window sizes to compare", default="1,2,4,8")
+(options, args) = parser.parse_args()
+
+
+def run(window_size):
+    port = LoopbackSerial(latency=options.latency / 1000.0)
+    writer = makerbot_driver.Writer.StreamWriter(
+        port, threading.Condition(), window_size=window_size)
+    s = makerbot_driver.s3g(writer)
+    start_time = time.time()
+    for i in range(options.packets):
+        s.queue_extended_point_classic([i, i, 0, 0, 0], 1000)
+    writer.drain()
+    return time.time() - start_time, port.packets_received
+
+print "window, seconds, packets/sec"
+for window_size in [int(w) for w in options.windows.split(',')]:
+    elapsed, received = run(window_size)
+    assert received == options.packets
+    print "%i, %.3f, %.1f" % (window_size, elapsed, received / elapsed)
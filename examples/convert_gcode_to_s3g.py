@@ -9,9 +9,8 @@ lib_path = os.path.abspath('../')
 sys.path.append(lib_path)
 
 import makerbot_driver
+import itertools
 import optparse
-import tempfile
-import threading
 
 parser = optparse.OptionParser()
 parser.add_option("-i", "--inputfile", dest="input_file",
@@ -23,41 +22,29 @@ parser.add_option("-m", "--machine_type", dest="machine",
 parser.add_option("-s", "--sequences", dest="sequences",
                   help="Flag to not use makerbot_driver's start/end sequences",
                   default=True, action="store_false")
+parser.add_option("-p", "--processes", dest="processes", type="int",
+                  help="number of processes to convert with, 0 for one per cpu",
+                  default=1)
 (options, args) = parser.parse_args()
 
-condition = threading.Condition()
-s = makerbot_driver.s3g()
-s.writer = makerbot_driver.Writer.FileWriter(open(options.output_file, 'wb'), condition)
-
 profile = makerbot_driver.Profile(options.machine)
 
 filename = os.path.basename(options.input_file)
 filename = os.path.splitext(filename)[0]
 
-parser = makerbot_driver.Gcode.GcodeParser()
-parser.state.values["build_name"] = filename
-parser.state.profile = profile
-parser.s3g = s
-
 ga = makerbot_driver.GcodeAssembler(profile)
 start, end, variables = ga.assemble_recipe(tool_0=True, tool_1=True, material='PLA')
 start_gcode = ga.assemble_start_sequence(start)
 end_gcode = ga.assemble_end_sequence(end)
-parser.environment.update(variables)
-
-if options.sequences:
-  for line in start_gcode:
-    parser.execute_line(line)
 
 with open(options.input_file) as f:
-  for line in f:
-    parser.execute_line(line)
-
-if options.sequences:
-  for line in end_gcode:
-    parser.execute_line(line)
-
-s.writer.file.close()
+  if options.sequences:
+    lines = itertools.chain(start_gcode, f, end_gcode)
+  else:
+    lines = f
+  makerbot_driver.compile_gcode(lines, options.output_file, profile,
+                                environment=variables, build_name=filename,
+                                processes=options.processes or None)
 
 finito = makerbot_driver.Gcode.FileComplete()
 finito.finish(options.output_file)
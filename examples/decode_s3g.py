@@ -14,6 +14,8 @@ parser.add_option("-i", "--input_file", dest="input_file",
                   help="input file to parse")
 parser.add_option("-o", "--output_file", dest="output_file",
                   help="output file with decoded information")
+parser.add_option("-p", "--start_percent", dest="start_percent", type="int",
+                  help="decode from where the build reaches this percent, using the input file's index")
 (options, args) = parser.parse_args()
 
 reader = makerbot_driver.FileReader.FileReader()
@@ -21,7 +23,13 @@ reader = makerbot_driver.FileReader.FileReader()
 def callback(percent):
     print percent
 with open(options.input_file, 'rb') as reader.file:
-    payloads = reader.ReadFile(callback)
-with open(options.output_file, 'w') as f:
-  for payload in payloads:
-    f.write(str(payload) + '\n')
+  if options.start_percent is None:
+    payloads = reader.iter_payloads(callback)
+  else:
+    index = makerbot_driver.FileReader.S3gIndex.for_file(options.input_file)
+    command_index, position, payloads = index.seek_percent(
+        reader, options.start_percent)
+    print 'starting at command %i, position %r' % (command_index, position)
+  with open(options.output_file, 'w') as f:
+    for payload in payloads:
+      f.write(str(payload) + '\n')
@@ -0,0 +1,97 @@
+"""
+A fake serial port with a very small s3g firmware on the other end, used by
+the benchmark scripts to measure host side throughput without a machine.
+
+Every packet written to the port is answered with a SUCCESS response, which
+becomes readable `latency` seconds after the packet was written.  Replies to
+packets written back to back are therefore in flight at the same time, just
+like they are over USB.  GET_AVAILABLE_BUFFER_SIZE is answered as if the
+buffer were always empty.
+"""
+
+import os, sys
+lib_path = os.path.abspath('../')
+sys.path.append(lib_path)
+
+import collections
+import struct
+import time
+
+import makerbot_driver
+
+
+class LoopbackSerial(object):
+
+    def __init__(self, latency=.001, timeout=.2, response_payload=None):
+        """
+        @param float latency: Round trip time, in seconds
+        @param float timeout: Read timeout, in seconds, like serial.Serial
+        @param bytearray response_payload: Payload to answer every packet with
+        """
+        self.latency = latency
+        self.timeout = timeout
+        if response_payload is None:
+            response_payload = bytearray(
+                [makerbot_driver.response_code_dict['SUCCESS']])
+        self.response = makerbot_driver.Encoder.encode_payload(
+            response_payload)
+        self.buffer_size_response = makerbot_driver.Encoder.encode_payload(
+            bytearray([makerbot_driver.response_code_dict['SUCCESS']]) +
+            struct.pack('<I', 512))
+        self.port = 'loopback'
+        self.packets_received = 0
+        self.buffer_polls = 0
+        self.read_calls = 0
+        self._open = True
+        self._decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+        # (ready time, reply bytes), oldest first
+        self._scheduled = collections.deque()
+        self._readable = bytearray()
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def isOpen(self):
+        return self._open
+
+    def flush(self):
+        pass
+
+    def write(self, data):
+        for payload in self._decoder.feed(bytearray(data)):
+            response = self.response
+            if ord(payload[0]) == makerbot_driver.host_query_command_dict['GET_AVAILABLE_BUFFER_SIZE']:
+                self.buffer_polls += 1
+                response = self.buffer_size_response
+            else:
+                self.packets_received += 1
+            self._scheduled.append(
+                (time.time() + self.latency, response))
+        return len(data)
+
+    def _deliver(self):
+        now = time.time()
+        while self._scheduled and self._scheduled[0][0] <= now:
+            self._readable.extend(self._scheduled.popleft()[1])
+
+    def inWaiting(self):
+        self._deliver()
+        return len(self._readable)
+
+    def read(self, size=1):
+        self.read_calls += 1
+        deadline = time.time() + self.timeout
+        self._deliver()
+        while not self._readable and self._scheduled:
+            ready_time = self._scheduled[0][0]
+            if ready_time > deadline:
+                time.sleep(max(0, deadline - time.time()))
+                return ''
+            time.sleep(max(0, ready_time - time.time()))
+            self._deliver()
+        data = self._readable[:size]
+        del self._readable[:size]
+        return str(data)
@@ -19,6 +19,15 @@ parser.add_option("-p", "--port", dest="port",
 parser.add_option("-s", "--sequences", dest="sequences",
                   help="Flag to not use makerbot_driver's start/end sequences",
                   default=True, action="store_false")
+parser.add_option("-r", "--resume_line", dest="resume_line", type="int",
+                  help="line of the gcode file to resume the print at",
+                  default=None)
+parser.add_option("-o", "--resume_offset", dest="resume_offset", type="int",
+                  help="byte offset in the gcode file to resume the print at",
+                  default=None)
+parser.add_option("-c", "--flow_control", dest="flow_control",
+                  help="only send commands the machine's buffer has room for",
+                  default=False, action="store_true")
 (options, args) = parser.parse_args()
 
 if options.port is None:
@@ -42,6 +51,10 @@ filename = os.path.basename(options.filename)
 filename = os.path.splitext(filename)[0]
 
 parser = getattr(obj, 'gcodeparser')
+if options.flow_control:
+    writer = parser.s3g.writer
+    parser.s3g.writer = makerbot_driver.Writer.FlowControlWriter(
+        writer.file, writer._condition)
 parser.environment.update(variables)
 parser.state.values["build_name"] = filename[:15]
 
@@ -56,9 +69,19 @@ def exec_line(line):
 if options.sequences:
     for line in start_gcode:
         exec_line(line)
-with open(options.filename) as f:
-    for line in f:
+if options.resume_line is None and options.resume_offset is None:
+    with open(options.filename) as f:
+        for line in f:
+            exec_line(line)
+else:
+    resume_point = makerbot_driver.Gcode.find_resume_point(
+        options.filename, parser.state.profile, options.resume_line,
+        options.resume_offset, variables, parser.state.values["build_name"])
+    print "Resuming at line %i" % (resume_point.line_number)
+    for line in resume_point.resume_gcode(parser, options.filename):
         exec_line(line)
 if options.sequences:
     for line in end_gcode:
         exec_line(line)
+if options.flow_control:
+    print parser.s3g.writer.get_flow_control_stats()
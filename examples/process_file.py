@@ -27,7 +27,8 @@ if options.list:
   sys.exit(0)
 prepro = prepro_fact.create_processor_from_name(options.processor)
 
-output = prepro.process_gcode(list(open(options.input_file)))
+gcodes = makerbot_driver.GcodeProcessors.GcodeStream.from_file(options.input_file)
+output = prepro.iter_process_gcode(gcodes)
 with open(options.output_file, 'w') as f:
   for o in output:
     f.write(o)
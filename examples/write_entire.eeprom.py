@@ -40,4 +40,6 @@ writer = makerbot_driver.EEPROM.EepromWriter.factory(
 with open(options.input_file) as f:
     eeprom_map = json.load(f)
 
-writer.write_entire_map(eeprom_map)
+# Only write the bytes that differ from what is on the eeprom now
+r.init_eeprom_reader(options.version)
+writer.write_entire_map(eeprom_map, r.take_eeprom_snapshot())
@@ -0,0 +1,156 @@
+"""
+An asynchronous interface to an s3g driven bot, for driving many machines
+from one asyncore event loop.
+
+AsyncS3g has the same methods as s3g, but each one returns an AsyncResult
+straight away instead of blocking until the machine has replied.  The s3g
+methods themselves are reused unchanged: a call runs the method on an s3g
+whose writer is a _ReplayWriter.  The first payload the method sends that
+hasn't been replied to yet suspends the call and goes out on the
+AsyncStreamWriter.  Once its reply has arrived the method is run again from
+the start, the writer handing it the replies received so far in order, until
+it returns.  This relies on every s3g method building its payloads only from
+its arguments and the replies to its earlier payloads, which they all do.
+"""
+from __future__ import absolute_import
+
+import copy
+
+import serial
+
+import makerbot_driver
+
+
+class _Suspended(BaseException):
+    """
+    Raised through an s3g method when it sends a payload that hasn't been
+    replied to.  It isn't an Exception, so the method can't catch it.
+    """
+
+    def __init__(self, payload):
+        BaseException.__init__(self)
+        self.payload = payload
+
+
+class _ReplayWriter(object):
+    """ Stands in for an s3g's writer, answering the payloads it is sent
+    with replies that have already been received
+    """
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.sent = 0
+
+    def send_payload(self, payload):
+        if self.sent == len(self.replies):
+            raise _Suspended(payload)
+        self.sent += 1
+        return self.replies[self.sent - 1]
+
+    send_action_payload = send_payload
+    send_query_payload = send_payload
+
+
+class AsyncS3g(object):
+    """ Represents an interface to an s3g driven bot, reached through an
+    AsyncStreamWriter.  Calls to the machine return AsyncResults, whose
+    results are filled in as the event loop runs.
+    """
+
+    # s3g methods that don't send a payload to the machine, or that need
+    # a blocking writer
+    local_methods = frozenset([
+        'from_filename', 'set_print_to_file_type', 'init_eeprom_reader',
+        'eeprom_reader', 'close', 'is_open', 'open', 'get_vid_pid',
+        'get_vid_pid_iface', 'get_verified_status',
+    ])
+
+    @classmethod
+    def from_filename(cls, port, map=None, baudrate=115200):
+        """Constructs and returns an AsyncS3g object connected to the
+        passed file endpoint passed as a string @port (ie '/dev/tty9')
+
+        @param port target Serial port name
+        @param dict map asyncore map the connection is polled in
+        @param baudrate baudrate 115200 assumed
+        @return AsyncS3g object, equipped with an AsyncStreamWriter
+            directed at port.
+        """
+        s = serial.Serial(port, baudrate=baudrate, timeout=0)
+        # Same baud rate hack as s3g.from_filename
+        s.baudrate = 9600
+        s.baudrate = baudrate
+        return cls(makerbot_driver.Writer.AsyncStreamWriter(s, map))
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        # Holds the settings, ie print_to_file_type, copied into the s3g
+        # each call is run on
+        self.s3g = makerbot_driver.s3g()
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+    def is_open(self):
+        if self.writer:
+            return self.writer.is_open()
+        return False
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name in self.local_methods or \
+                not callable(getattr(makerbot_driver.s3g, name, None)):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        method.__name__ = name
+        method.__doc__ = getattr(makerbot_driver.s3g, name).__doc__
+        return method
+
+    def call(self, name, *args, **kwargs):
+        """
+        Call an s3g method without blocking
+        @param str name Name of the s3g method
+        @return AsyncResult holding the method's return value once every
+            payload it sends has been replied to
+        """
+        result = makerbot_driver.Writer.AsyncResult()
+        self._run(result, name, args, kwargs, [])
+        return result
+
+    def _replay_s3g(self, replies):
+        machine = copy.copy(self.s3g)
+        machine.writer = _ReplayWriter(replies)
+        if machine._eeprom_reader is not None:
+            machine._eeprom_reader = copy.copy(machine._eeprom_reader)
+            machine._eeprom_reader.s3g = machine
+        return machine
+
+    def _run(self, result, name, args, kwargs, replies):
+        machine = self._replay_s3g(replies)
+        try:
+            value = getattr(machine, name)(*args, **kwargs)
+        except _Suspended as suspended:
+            reply = self.writer.send_payload(suspended.payload)
+            reply.add_done_callback(
+                lambda reply: self._resume(result, name, args, kwargs,
+                                           replies, reply))
+        except Exception as e:
+            result.set_exception(e)
+        else:
+            result.set_result(value)
+        finally:
+            # Keep the eeprom map the method loaded, and any eeprom snapshot
+            # it took or cleared, for the next calls
+            if self.s3g._eeprom_reader is None:
+                self.s3g._eeprom_reader = machine._eeprom_reader
+            elif machine._eeprom_reader is not None:
+                self.s3g._eeprom_reader.snapshot = \
+                    machine._eeprom_reader.snapshot
+
+    def _resume(self, result, name, args, kwargs, replies, reply):
+        if reply.exception() is not None:
+            result.set_exception(reply.exception())
+        else:
+            self._run(result, name, args, kwargs, replies + [reply.result()])
@@ -0,0 +1,246 @@
+"""
+Verification of many eeprom dumps at a time.
+
+EepromVerifier decodes a dump from a dict of hex strings, one byte and one
+value at a time.  An EepromImageVerifier instead works on the dump as a
+single byte string: the checks of every constrained entry are worked out
+once from the map's EepromLayout, and applied with struct.unpack_from.  The
+bytes no check reads make up a few gaps, which are searched for bytes other
+than 0xFF with one regular expression per gap.
+
+verify_eeprom_dumps verifies a directory of dumps in a pool of worker
+processes, and returns a report of every dump.
+"""
+from __future__ import absolute_import
+
+import binascii
+import glob
+import logging
+import multiprocessing
+import os
+import re
+import struct
+
+import makerbot_driver
+
+# Matches runs of bytes that aren't 0xFF
+_unmapped_run = re.compile('[^\xff]+')
+
+
+def parse_hex_image(hex_filepath):
+    """
+    Reads an intel flavored .hex file of an eeprom, as dumped by avrdude
+
+    @param str hex_filepath: Path to the hex file
+    @return str: The bytes of the eeprom
+    """
+    regex = re.compile(
+        ":[0-9A-Fa-f]{2}([0-9A-Fa-f]{4})[0-9A-Fa-f]{2}([0-9A-Fa-f]*?)[0-9A-Fa-f]{2}$")
+    chunks = []
+    size = 0
+    with open(hex_filepath) as f:
+        for line in f:
+            match = regex.match(line.strip())
+            if match is None:
+                raise ValueError('Bad hex line: %r' % (line))
+            # A second group of 0 means theres no more info to read
+            if len(match.group(2)) == 0:
+                break
+            if int(match.group(1), 16) != size:
+                raise ValueError('Hex line out of order: %r' % (line))
+            chunk = binascii.unhexlify(match.group(2))
+            chunks.append(chunk)
+            size += len(chunk)
+    return ''.join(chunks)
+
+
+class EepromImageVerifier(object):
+    """ Checks eeprom images against the constraints of an eeprom map, the
+    same way EepromVerifier.validate_eeprom does
+    """
+
+    def __init__(self, map_name=None, working_directory=None):
+        self._log = logging.getLogger(self.__class__.__name__)
+        self.working_directory = working_directory if working_directory else os.path.abspath(os.path.dirname(__file__))
+        self.map_name = map_name if map_name else makerbot_driver.EEPROM.constants.eeprom_map_name % (
+            makerbot_driver.EEPROM.constants.default_version,
+            makerbot_driver.EEPROM.constants.default_software_variant
+        )
+        path = os.path.join(self.working_directory, self.map_name)
+        try:
+            eeprom_map, self.layout = makerbot_driver.EEPROM.load_eeprom_map(path)
+        except makerbot_driver.EEPROM.MissingEepromMapError:
+            self._log.error("Could not find %s", path)
+            raise
+        if self.layout is None:
+            self.layout = makerbot_driver.EEPROM.EepromLayout(eeprom_map)
+        self.checks, self.read_regions = self._compile_checks()
+
+    def _compile_checks(self):
+        """
+        @return list: (offset, type, size, struct, entry) for each value
+          checked, where struct unpacks the value, or is None for strings
+        @return list: Sorted, merged [start, stop) regions the checks read
+        """
+        checks = []
+        regions = []
+        for entry in self.layout.value_entries():
+            if entry.constraints is None:
+                continue
+            offset = entry.offset
+            for char in entry.format:
+                if 's' == char:
+                    size = entry.size
+                    unpacker = None
+                else:
+                    size = struct.calcsize(char)
+                    if entry.floating_point:
+                        unpacker = struct.Struct('<BB')
+                    else:
+                        unpacker = struct.Struct('<%s' % (char))
+                checks.append((offset, char, size, unpacker, entry))
+                regions.append([offset, offset + size])
+                offset += size
+        regions.sort()
+        merged = []
+        for start, stop in regions:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], stop)
+            else:
+                merged.append([start, stop])
+        return checks, merged
+
+    def validate_image(self, image):
+        """
+        Checks every constrained entry of the map, and that every byte no
+        entry was read from is 0xFF
+
+        @param str image: The bytes of the eeprom, from offset 0
+        @return bool: True if the eeprom is acceptable, false otherwise
+        @return dict: The bad mapped entries, as EepromVerifier.validate_eeprom
+          lists them, the offsets of bad unmapped bytes, and the bad unmapped
+          bytes as [offset, length] runs
+        """
+        if self.read_regions and len(image) < self.read_regions[-1][1]:
+            raise ValueError('Image of %i bytes is shorter than the map' % (len(image)))
+        bad_entries = {'mapped_entries': []}
+        for offset, char, size, unpacker, entry in self.checks:
+            if unpacker is None:
+                value = image[offset:offset + size]
+            elif entry.floating_point:
+                high, low = unpacker.unpack_from(image, offset)
+                value = high + low / 255.0
+            else:
+                value = unpacker.unpack_from(image, offset)[0]
+            if not _check_value(value, entry.constraints):
+                bad_entries['mapped_entries'].append({
+                    'offset': offset,
+                    'type': char,
+                    'constraints': entry.entry['constraints'],
+                    'value': value,
+                    'context': entry.context,
+                })
+        runs = self.find_unmapped_runs(image)
+        bad_entries['unmapped_runs'] = runs
+        bad_entries['unmapped_entries'] = [
+            offset for start, length in runs
+            for offset in range(start, start + length)]
+        good_eeprom = not bad_entries['mapped_entries'] and not runs
+        return good_eeprom, bad_entries
+
+    def find_unmapped_runs(self, image):
+        """
+        @param str image: The bytes of the eeprom, from offset 0
+        @return list: [offset, length] of each run of bytes, outside of the
+          regions read by the checks, that aren't 0xFF
+        """
+        runs = []
+        start = 0
+        # Search the gap before each region read by the checks, and the
+        # gap after the last one
+        for region_start, region_stop in self.read_regions + [[len(image), len(image)]]:
+            for match in _unmapped_run.finditer(image, start, min(region_start, len(image))):
+                runs.append([match.start(), match.end() - match.start()])
+            start = region_stop
+        return runs
+
+    def validate_hex_file(self, hex_filepath):
+        """
+        @param str hex_filepath: Path to an avrdude hex dump of the eeprom
+        @return See validate_image
+        """
+        return self.validate_image(parse_hex_image(hex_filepath))
+
+
+def _check_value(value, constraints):
+    if constraints[0] == 'l':
+        return value in constraints[1:]
+    elif constraints[0] == 'm':
+        return constraints[1] <= value <= constraints[2]
+    elif constraints[0] == 'a':
+        return True
+
+
+# The verifier of each worker process
+_worker_verifier = None
+
+
+def _init_worker(map_name, working_directory):
+    global _worker_verifier
+    _worker_verifier = EepromImageVerifier(map_name, working_directory)
+
+
+def _verify_worker(path):
+    return _verify_dump(_worker_verifier, path)
+
+
+def _verify_dump(verifier, path):
+    report = {'path': path, 'valid': False, 'error': None}
+    try:
+        valid, bad_entries = verifier.validate_hex_file(path)
+    except Exception as e:
+        report['error'] = str(e)
+    else:
+        report['valid'] = valid
+        report['mapped_entries'] = bad_entries['mapped_entries']
+        report['unmapped_runs'] = bad_entries['unmapped_runs']
+    return report
+
+
+def verify_eeprom_dumps(paths, map_name=None, working_directory=None,
+                        processes=None):
+    """
+    Verifies many eeprom dumps, spread across several processes
+
+    @param paths: A directory of .hex dumps, or a list of paths to dumps
+    @param str map_name: Name of the eeprom map to verify against
+    @param str working_directory: Directory the map is in
+    @param int processes: Number of worker processes, the number of CPUs
+      by default.  With 1, the dumps are verified in this process.
+    @return dict: 'dumps', a list of a report dict for each dump, in the
+      order given, and a 'summary' counting the valid, invalid and
+      unreadable dumps
+    """
+    if isinstance(paths, basestring):
+        paths = sorted(glob.glob(os.path.join(paths, '*.hex')))
+    # Check the map can be loaded before starting any workers
+    verifier = EepromImageVerifier(map_name, working_directory)
+    if processes == 1 or len(paths) < 2:
+        dumps = [_verify_dump(verifier, path) for path in paths]
+    else:
+        pool = multiprocessing.Pool(
+            processes, _init_worker, (map_name, working_directory))
+        try:
+            dumps = pool.map(_verify_worker, paths,
+                             max(1, len(paths) // (4 * (processes or multiprocessing.cpu_count()))))
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    summary = {
+        'dumps': len(dumps),
+        'valid': len([dump for dump in dumps if dump['valid']]),
+        'errors': len([dump for dump in dumps if dump['error']]),
+    }
+    summary['invalid'] = summary['dumps'] - summary['valid'] - summary['errors']
+    return {'dumps': dumps, 'summary': summary}
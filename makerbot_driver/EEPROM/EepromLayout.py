@@ -0,0 +1,191 @@
+"""
+Compiled layouts of eeprom maps.
+
+An eeprom map is a nested json dict, where each entry's offset is a hex
+string relative to the sub_map it is in.  An EepromLayout walks the map
+once and keeps a flat table of EepromEntries, keyed by the tuple of names
+leading to each entry (i.e. ('T0_DATA_BASE', 'EXTRUDER_PID_BASE',
+'D_TERM_OFFSET')), that hold the entry's absolute offset, struct format,
+length and parsed constraints.
+
+load_eeprom_map loads each map file once per process.  If a cache
+directory is given (or set in constants.eeprom_map_cache_directory), the
+parsed map and its layout are also pickled there, so other processes can
+skip parsing the json.
+"""
+from __future__ import absolute_import
+
+import cPickle as pickle
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+
+import makerbot_driver
+
+# Maps loaded in this process, by path
+_loaded_maps = {}
+
+
+class EepromEntry(object):
+    """ An entry of an eeprom map, with everything needed to read or write
+    it worked out up front
+    """
+
+    def __init__(self, path, offset, entry):
+        """
+        @param tuple path: Names of the sub_maps leading to the entry, and
+          the entry's own name
+        @param int offset: Absolute offset of the entry
+        @param dict entry: The entry's dict in the eeprom map
+        """
+        self.path = path
+        self.offset = offset
+        self.entry = entry
+        self.is_sub_map = 'sub_map' in entry
+        self.floating_point = 'floating_point' in entry
+        if 'type' in entry:
+            self.format = str(entry['type'] * int(entry.get('mult', 1)))
+        else:
+            self.format = None
+        if 'length' in entry:
+            self.size = int(entry['length'])
+        elif self.format and not self.is_sub_map:
+            self.size = struct.calcsize('<%s' % (self.format))
+        else:
+            self.size = 0
+        if 'constraints' in entry:
+            self.constraints = makerbot_driver.EEPROM.parse_out_constraints(
+                entry['constraints'])
+        else:
+            self.constraints = None
+
+    @property
+    def context(self):
+        """
+        @return list: The entry's context as EepromUtilities names it, with
+          'sub_map' between each name
+        """
+        context = []
+        for name in self.path[:-1]:
+            context.extend([name, 'sub_map'])
+        context.append(self.path[-1])
+        return context
+
+
+class EepromLayout(object):
+    """ A flat table of the entries of an eeprom map """
+
+    def __init__(self, input_map):
+        """
+        @param dict input_map: The main map of an eeprom map
+        """
+        self.entries = {}
+        self._compile(input_map, (), 0)
+        self.extent = max([entry.offset + entry.size
+                           for entry in self.entries.values()] + [0])
+
+    def _compile(self, input_map, path, base):
+        for name, value in input_map.items():
+            entry_path = path + (name,)
+            offset = base + int(value['offset'], 16)
+            self.entries[entry_path] = EepromEntry(entry_path, offset, value)
+            if 'sub_map' in value:
+                self._compile(value['sub_map'], entry_path, offset)
+
+    def __getitem__(self, path):
+        return self.entries[tuple(path)]
+
+    def __contains__(self, path):
+        return tuple(path) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_entry(self, name, context=None):
+        """
+        @param str name: The name of the entry
+        @param list context: The sub_map names leading to the entry
+        @return EepromEntry: The entry
+        """
+        return self.entries[tuple(context or ()) + (name,)]
+
+    def value_entries(self):
+        """
+        @return list: Every entry that isn't a sub_map, in the order
+          EepromUtilities.get_eeprom_map_contexts lists their contexts
+        """
+        entries = [entry for entry in self.entries.values()
+                   if not entry.is_sub_map]
+        entries.sort(key=lambda entry: entry.context)
+        return entries
+
+
+def load_eeprom_map(path, cache_directory=None):
+    """
+    Loads an eeprom map file, and compiles the layout of its main map.
+    Each file is only parsed once per process, so callers must not modify
+    the map they are given.
+
+    @param str path: Path to the json eeprom map
+    @param str cache_directory: Directory to keep pickled maps in,
+      constants.eeprom_map_cache_directory by default
+    @return dict: The eeprom map
+    @return EepromLayout: Layout of the map's 'eeprom_map' entry, None if it
+      has none
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise makerbot_driver.EEPROM.MissingEepromMapError(path)
+    version = (stat.st_mtime, stat.st_size)
+    loaded = _loaded_maps.get(path)
+    if loaded is None or loaded[0] != version:
+        if cache_directory is None:
+            cache_directory = makerbot_driver.EEPROM.constants.eeprom_map_cache_directory
+        if cache_directory is None:
+            loaded = (version,) + _compile_eeprom_map(path)
+        else:
+            loaded = _load_cached_eeprom_map(path, version, cache_directory)
+        _loaded_maps[path] = loaded
+    return loaded[1], loaded[2]
+
+
+def _compile_eeprom_map(path):
+    try:
+        with open(path) as f:
+            eeprom_map = json.load(f)
+    except IOError:
+        raise makerbot_driver.EEPROM.MissingEepromMapError(path)
+    layout = None
+    if isinstance(eeprom_map, dict) and 'eeprom_map' in eeprom_map:
+        layout = EepromLayout(eeprom_map['eeprom_map'])
+    return eeprom_map, layout
+
+
+def _load_cached_eeprom_map(path, version, cache_directory):
+    log = logging.getLogger('EepromLayout')
+    cache_path = os.path.join(cache_directory, '%s.%s.pickle' % (
+        os.path.basename(path), hashlib.md5(path).hexdigest()[:8]))
+    try:
+        with open(cache_path, 'rb') as f:
+            loaded = pickle.load(f)
+        if loaded[0] == version:
+            return loaded
+    except IOError:
+        pass
+    except Exception as e:
+        log.warning('{"event":"bad_eeprom_map_cache", "path":"%s", "error":"%s"}', cache_path, str(e))
+    loaded = (version,) + _compile_eeprom_map(path)
+    try:
+        # Write then rename, so another process never reads half a cache
+        fd, temp_path = tempfile.mkstemp(dir=cache_directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(loaded, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError) as e:
+        log.warning('{"event":"eeprom_map_cache_not_written", "path":"%s", "error":"%s"}', cache_path, str(e))
+    return loaded
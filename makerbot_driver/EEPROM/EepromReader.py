@@ -5,7 +5,7 @@ An eeprom reader!
 from __future__ import (absolute_import)
 
 import array
-import json
+import copy
 import struct
 import os
 import logging
@@ -41,24 +41,60 @@ class EepromReader(object):
         #Load the eeprom map
         path = os.path.join(self.working_directory, self.map_name)
         try:
-            with open(path) as f:
-                self.eeprom_map = json.load(f)
-        except IOError as e:
+            eeprom_map, layout = makerbot_driver.EEPROM.load_eeprom_map(path)
+        except makerbot_driver.EEPROM.MissingEepromMapError:
             self._log.error("Could not find %s", path)
-            raise makerbot_driver.EEPROM.MissingEepromMapError(path)
+            raise
+        self.eeprom_map = eeprom_map
+        self._layout = layout
         #We always start with the main map
         self.main_map = 'eeprom_map'
+        #Image of the eeprom, from offset 0, once take_snapshot is called
+        self.snapshot = None
+
+    @property
+    def eeprom_map(self):
+        return self._eeprom_map
+
+    @eeprom_map.setter
+    def eeprom_map(self, eeprom_map):
+        self._eeprom_map = eeprom_map
+        self._layout = None
+
+    @property
+    def layout(self):
+        """
+        @return EepromLayout: The compiled layout of the main map
+        """
+        if self._layout is None:
+            self._layout = makerbot_driver.EEPROM.EepromLayout(
+                self.eeprom_map[self.main_map])
+        return self._layout
 
     #TODO: Test me
-    def read_entire_map(self):
+    def read_entire_map(self, snapshot=True):
         """
         Reads all entries on a mapped eeprom using an eeprom_map as
         a guide.
 
+        @param bool snapshot: If True, the eeprom is read in one snapshot
+          and every entry is decoded from it, instead of reading each
+          entry off the machine.  A snapshot taken for this read is
+          dropped afterwards; one taken beforehand with take_snapshot is
+          kept and used.
         @return dict: The read eeprom map
         """
-        input_map = self.eeprom_map[self.main_map]
-        self._read_map(input_map)
+        previous_snapshot = self.snapshot
+        if snapshot and previous_snapshot is None:
+            self.take_snapshot()
+        try:
+            # The map may be shared with other readers, so fill in a copy
+            input_map = copy.deepcopy(self.eeprom_map[self.main_map])
+            self._read_map(input_map)
+        finally:
+            # Nothing keeps a snapshot up to date once the machine changes
+            # its own eeprom, so only the caller's own snapshot outlives this
+            self.snapshot = previous_snapshot
         return {self.main_map: input_map}
 
     def _read_map(self, input_map, context=[]):
@@ -69,6 +105,75 @@ class EepromReader(object):
             else:
                 input_map[value]['value'] = self.read_data(value, context)
 
+    def map_extent(self, input_map=None, base=0):
+        """
+        Finds the end of the eeprom area covered by the map
+
+        @param dict input_map: The (sub_)map to look through, the main
+          map by default
+        @param int base: Offset the map's offsets are relative to
+        @return int: Offset just past the last byte of any map entry
+        """
+        if input_map is None:
+            return self.layout.extent
+        extent = base
+        for value in input_map.values():
+            offset = base + int(value['offset'], 16)
+            if 'sub_map' in value:
+                end = self.map_extent(value['sub_map'], offset)
+            elif 'length' in value:
+                end = offset + int(value['length'])
+            elif 'type' in value:
+                unpack_code = str(value['type'] * int(value.get('mult', 1)))
+                end = offset + struct.calcsize('<%s' % (unpack_code))
+            else:
+                continue
+            extent = max(extent, end)
+        return extent
+
+    def take_snapshot(self, size=None):
+        """
+        Reads an image of the eeprom off the machine, in as few reads as
+        possible.  Once taken, every value covered by the snapshot is read
+        from it instead of from the machine.
+
+        @param int size: Number of bytes to read, by default enough to
+          cover every entry of the map
+        @return bytearray: The eeprom image
+        """
+        if size is None:
+            size = self.map_extent()
+        chunk_size = makerbot_driver.maximum_payload_length - 1
+        snapshot = bytearray()
+        for offset in range(0, size, chunk_size):
+            snapshot.extend(self.s3g.read_from_EEPROM(
+                offset, min(chunk_size, size - offset)))
+        self.snapshot = snapshot
+        return snapshot
+
+    def update_snapshot(self, offset, data):
+        """
+        Keeps the snapshot in step with data written to the eeprom
+
+        @param int offset: The offset the data was written to
+        @param bytearray data: The data written
+        """
+        if self.snapshot is not None and offset < len(self.snapshot):
+            end = min(offset + len(data), len(self.snapshot))
+            self.snapshot[offset:end] = data[:end - offset]
+
+    def read_bytes(self, offset, length):
+        """
+        Reads bytes off the eeprom, from the snapshot if it covers them
+
+        @param int offset: The offset to read from
+        @param int length: The number of bytes to read
+        @return bytearray: The bytes read
+        """
+        if self.snapshot is not None and offset + length <= len(self.snapshot):
+            return self.snapshot[offset:offset + length]
+        return self.s3g.read_from_EEPROM(offset, length)
+
     def read_data(self, name, context=None):
         the_dict, offset = self.get_dict_by_context(name, context)
         return self.read_from_eeprom(the_dict, offset)
@@ -86,15 +191,8 @@ class EepromReader(object):
         @param args: The sub_map names of the eeprom_map
         @return value: The value we read from the eeprom
         """
-        the_dict = self.eeprom_map.get(self.main_map)
-        offset = 0
-        if context:
-            for c in context:
-                offset += int(the_dict[c]['offset'], 16)
-                the_dict = the_dict.get(c)['sub_map']
-        the_dict = the_dict[name]
-        offset += int(the_dict['offset'], 16)
-        return the_dict, offset
+        entry = self.layout.get_entry(name, context)
+        return entry.entry, entry.offset
 
     def read_from_eeprom(self, input_dict, offset):
         """
@@ -127,7 +225,7 @@ class EepromReader(object):
         @return str: The read string
         """
         #add one for the null terminator
-        val = self.s3g.read_from_EEPROM(offset, int(input_dict['length']))
+        val = self.read_bytes(offset, int(input_dict['length']))
         return [self.decode_string(val,)]
 
     def read_eeprom_sub_map(self, input_dict, offset):
@@ -172,9 +270,9 @@ class EepromReader(object):
         @param int offset: The offset to read from
         @return int: The floating point number.
         """
-        high_bit = self.s3g.read_from_EEPROM(offset, 1)
+        high_bit = self.read_bytes(offset, 1)
         high_bit = self.unpack_value(high_bit, 'B')[0]
-        low_bit = self.s3g.read_from_EEPROM(offset + 1, 1)
+        low_bit = self.read_bytes(offset + 1, 1)
         low_bit = self.unpack_value(low_bit, 'B')[0]
         return self.decode_floating_point(high_bit, low_bit)
 
@@ -198,7 +296,7 @@ class EepromReader(object):
         for char in unpack_code:
             size = struct.calcsize(char)
             #Get the value to unpack
-            val = self.s3g.read_from_EEPROM(offset, size)
+            val = self.read_bytes(offset, size)
             data.extend(self.unpack_value(val, char))
             offset += size
         return data
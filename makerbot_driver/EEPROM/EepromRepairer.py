@@ -1,7 +1,7 @@
 from __future__ import absolute_import
 
+import itertools
 import os
-import json
 import struct
 import logging
 
@@ -18,19 +18,15 @@ class EepromRepairer(object):
         self.working_directory = working_directory if working_directory else os.path.abspath(os.path.dirname(__file__))
         path = os.path.join(self.working_directory, self.map_name)
         try:
-            with open(path) as f:
-                self.eeprom_map = json.load(f)
-            if 'eeprom_map' in self.eeprom_map:
-                self.eeprom_map = self.eeprom_map['eeprom_map']
-        except IOError as e:
+            self.eeprom_map, layout = makerbot_driver.EEPROM.load_eeprom_map(path)
+        except makerbot_driver.EEPROM.MissingEepromMapError:
             self._log.error("Could not find %s", path)
-            raise makerbot_driver.EEPROM.MissingEepromMapError(path)
+            raise
+        if 'eeprom_map' in self.eeprom_map:
+            self.eeprom_map = self.eeprom_map['eeprom_map']
 
     def build_packed_data(self, length):
-        packed_data = ''
-        for i in range(length):
-            packed_data += struct.pack('<B', 0xFF)
-        return packed_data
+        return '\xff' * length
 
     def repair_mapped_region_simple(self):
         self.s3g.reset_to_factory()
@@ -79,6 +75,16 @@ class EepromRepairer(object):
             data = self.build_packed_data(length)
             self._flush_out_data(offset, data)
 
+    def repair_unmapped_runs(self, runs):
+        """
+        Writes 0xFF over runs of bad unmapped bytes, as found by
+        EepromImageVerifier
+
+        @param list runs: [offset, length] of each run
+        """
+        for offset, length in runs:
+            self._flush_out_data(offset, self.build_packed_data(length))
+
     def _flush_out_data(self, offset, data):
         try:
             self.s3g.write_to_EEPROM(offset, data)
@@ -94,18 +100,8 @@ class EepromRepairer(object):
         return a, b
 
     def build_sequences(self, bad_offsets):
-        offsets = bad_offsets[:]
-        sequences = []
-        while len(offsets) > 0:
-            sequence = []
-            for i in offsets:
-                if len(sequence) == 0:
-                    sequence.append(i)
-                else:
-                    if i - 1 == sequence[-1]:
-                        sequence.append(i)
-                    else:
-                        break
-            offsets = offsets[len(sequence):]
-            sequences.append(sequence)
-        return sequences
+        # Offsets in a run of consecutive offsets all have the same
+        # difference to their index
+        return [[offset for index, offset in group] for key, group in
+                itertools.groupby(enumerate(bad_offsets),
+                                  lambda pair: pair[1] - pair[0])]
@@ -1,7 +1,6 @@
 """
 A utility to read and eeprom and discern its "goodness"
 """
-import json
 import os
 import re
 import struct
@@ -21,13 +20,14 @@ class EepromVerifier(object):
         )
         path = os.path.join(self.working_directory, self.map_name)
         try:
-            with open(path) as f:
-                self.eeprom_map = json.load(f)
-            if 'eeprom_map' in self.eeprom_map:
-                self.eeprom_map = self.eeprom_map['eeprom_map']
-        except IOError as e:
+            self.eeprom_map, self.layout = makerbot_driver.EEPROM.load_eeprom_map(path)
+        except makerbot_driver.EEPROM.MissingEepromMapError:
             self._log.error("Could not find %s", path)
-            raise makerbot_driver.EEPROM.MissingEepromMapError(path)
+            raise
+        if 'eeprom_map' in self.eeprom_map:
+            self.eeprom_map = self.eeprom_map['eeprom_map']
+        else:
+            self.layout = makerbot_driver.EEPROM.EepromLayout(self.eeprom_map)
 
         self.hex_map, self.hex_flags = self.parse_hex_file(self.hex_path)
 
@@ -47,40 +47,32 @@ class EepromVerifier(object):
         """
         good_eeprom = True 
         bad_entries = {'mapped_entries': []}
-        contexts = makerbot_driver.EEPROM.get_eeprom_map_contexts(self.eeprom_map)
-        for context in contexts:
-            sub_dct = makerbot_driver.EEPROM.get_dict_by_context(self.eeprom_map, context)
-            if 'constraints' not in sub_dct:
-                pass
-            else:
-                offset = makerbot_driver.EEPROM.get_offset_by_context(self.eeprom_map, context)
-                all_types = sub_dct['type']
-                if 'mult' in sub_dct:
-                    all_types *= int(sub_dct['mult'])
-                for char in all_types:
-                    char = str(char) # Convert from unicode
-                    if 's' == char:
-                        # The String needs an explicit length
-                        type_length = int(sub_dct['length'])
-                        value = self.get_string(offset, type_length)
-                        char_offset = type_length
+        for entry in self.layout.value_entries():
+            if entry.constraints is None:
+                continue
+            offset = entry.offset
+            for char in entry.format:
+                if 's' == char:
+                    # The String needs an explicit length
+                    type_length = entry.size
+                    value = self.get_string(offset, type_length)
+                    char_offset = type_length
+                else:
+                    if entry.floating_point:
+                        value = self.get_float(offset, char)
                     else:
-                        if 'floating_point' in sub_dct:
-                            value = self.get_float(offset, char)
-                        else:
-                            value = self.get_number(offset, char)
-                        char_offset = struct.calcsize(char)
-                    constraints = sub_dct['constraints']
-                    if not self.check_value_validity(value, constraints):
-                        good_eeprom = False
-                        bad_entries['mapped_entries'].append({
-                            'offset': offset,
-                            'type': char,
-                            'constraints': sub_dct['constraints'],
-                            'value': value,
-                            'context': context,
-                        })
-                    offset += char_offset
+                        value = self.get_number(offset, char)
+                    char_offset = struct.calcsize(char)
+                if not self.check_parsed_value_validity(value, entry.constraints):
+                    good_eeprom = False
+                    bad_entries['mapped_entries'].append({
+                        'offset': offset,
+                        'type': char,
+                        'constraints': entry.entry['constraints'],
+                        'value': value,
+                        'context': entry.context,
+                    })
+                offset += char_offset
         unmapped_validity, unmapped_errors = self.check_unread_values()
         bad_entries.update(unmapped_errors)
         return unmapped_validity and good_eeprom, bad_entries
@@ -130,6 +122,17 @@ class EepromVerifier(object):
         @retrun bool: True if value is valid, false otherwise
         """
         constraints = makerbot_driver.EEPROM.parse_out_constraints(constraints)
+        return self.check_parsed_value_validity(value, constraints)
+
+    def check_parsed_value_validity(self, value, constraints):
+        """
+        Checks a value's validity against constraints already parsed by
+        parse_out_constraints
+
+        @param value: Value to check.  Can be of varied type
+        @param list constraints: The parsed constraints
+        @retrun bool: True if value is valid, false otherwise
+        """
         if constraints[0] == 'l':
             return self.check_value_validity_list(value, constraints)
         elif constraints[0] == 'm':
@@ -3,13 +3,14 @@ An eeprom writer!
 """
 from __future__ import (absolute_import)
 
-import json
 import struct
 import os
 import logging
 
 import makerbot_driver
 
+from makerbot_driver.Encoder.CommandCodec import host_query_codecs
+
 
 class EepromWriter(object):
 
@@ -35,16 +36,36 @@ class EepromWriter(object):
         #Load the eeprom map
         path = os.path.join(self.working_directory, self.map_name)
         try:
-            with open(path) as f:
-                self.eeprom_map = json.load(f)
-        except IOError as e:
+            eeprom_map, layout = makerbot_driver.EEPROM.load_eeprom_map(path)
+        except makerbot_driver.EEPROM.MissingEepromMapError:
             self._log.error("Could not find %s", path)
-            raise makerbot_driver.EEPROM.MissingEepromMapError(path)
+            raise
+        self.eeprom_map = eeprom_map
+        self._layout = layout
         #We always start with the main map
         self.main_map = 'eeprom_map'
         self.data_map = 'eeprom_data'
         self.data_buffer = []
 
+    @property
+    def eeprom_map(self):
+        return self._eeprom_map
+
+    @eeprom_map.setter
+    def eeprom_map(self, eeprom_map):
+        self._eeprom_map = eeprom_map
+        self._layout = None
+
+    @property
+    def layout(self):
+        """
+        @return EepromLayout: The compiled layout of the main map
+        """
+        if self._layout is None:
+            self._layout = makerbot_driver.EEPROM.EepromLayout(
+                self.eeprom_map[self.main_map])
+        return self._layout
+
     def reset_eeprom_completely(self):
         """
         Using the size of the eeprom in the eeprom map, writes "0xFF" to each
@@ -55,7 +76,7 @@ class EepromWriter(object):
         for i in range(size):
             self.s3g.write_to_EEPROM(offset + i, struct.pack('<B', 255))
 
-    def write_entire_map(self, input_map):
+    def write_entire_map(self, input_map, snapshot=None):
         """
         Writes all values defined in input_map to the
         eeprom.  Assumes the map is nested inside an
@@ -63,10 +84,12 @@ class EepromWriter(object):
 
         @param dict input_map: The input map iterated
           on to write data
+        @param bytearray snapshot: Image of the eeprom as it is now, see
+          flush_data
         """
         input_values = input_map[self.main_map]
         self._write_map(input_values)
-        self.flush_data()
+        self.flush_data(snapshot)
 
     #TODO: Test me
     def _write_map(self, input_map, context=[]):
@@ -95,15 +118,8 @@ class EepromWriter(object):
         @param args: The sub_map names of the eeprom_map
         @return value: The value we read from the eeprom
         """
-        the_dict = self.eeprom_map.get(self.main_map)
-        offset = 0
-        if context:
-            for c in context:
-                offset += int(the_dict[c]['offset'], 16)
-                the_dict = the_dict.get(c)['sub_map']
-        the_dict = the_dict[name]
-        offset += int(the_dict['offset'], 16)
-        return the_dict, offset
+        entry = self.layout.get_entry(name, context)
+        return entry.entry, entry.offset
 
     def write_data(self, name, data, context=None, flush=False):
         if not isinstance(data, list):
@@ -114,9 +130,69 @@ class EepromWriter(object):
         if flush:
             self.flush_data()
 
-    def flush_data(self):
-        for data in self.data_buffer:
-            self._flush_out_data(data[0], data[1])
+    def flush_data(self, snapshot=None):
+        """
+        Writes the buffered data to the eeprom, in as few packets as
+        possible (see plan_writes)
+
+        @param bytearray snapshot: Image of the eeprom from offset 0, ie
+          from EepromReader.take_snapshot.  Bytes that already hold the
+          buffered value aren't written again.
+        """
+        for offset, data in self.plan_writes(snapshot=snapshot):
+            self._flush_out_data(offset, data)
+
+    def plan_writes(self, data_buffer=None, snapshot=None):
+        """
+        Merges buffered writes into the fewest writes that each fit in one
+        WRITE_TO_EEPROM packet.  Adjacent writes are joined, and where
+        writes overlap the one buffered last wins.
+
+        @param list data_buffer: [offset, data] entries to write, the
+          buffered data by default
+        @param bytearray snapshot: Image of the eeprom from offset 0.
+          Unchanged bytes are dropped, and short runs of unchanged bytes
+          between two changed ones are written anyway if that saves a
+          packet.
+        @return list: [offset, data] writes, in offset order
+        """
+        if data_buffer is None:
+            data_buffer = self.data_buffer
+        image = {}
+        for offset, data in data_buffer:
+            for i, byte in enumerate(bytearray(data)):
+                image[offset + i] = byte
+        if snapshot is not None:
+            for offset in list(image):
+                if offset < len(snapshot) and snapshot[offset] == image[offset]:
+                    del image[offset]
+
+        max_length = makerbot_driver.maximum_payload_length - \
+            host_query_codecs['WRITE_TO_EEPROM'].size
+        writes = []
+        run_offset = None
+        run = bytearray()
+        for offset in sorted(image):
+            if run and offset != run_offset + len(run):
+                end = run_offset + len(run)
+                # Only bridge a gap that fits in the packet being filled
+                room = -len(run) % max_length
+                if snapshot is not None and offset <= len(snapshot) and \
+                        offset - end < room:
+                    run.extend(snapshot[end:offset])
+                else:
+                    writes.extend(self._split_data(run_offset, run, max_length))
+                    run = bytearray()
+            if not run:
+                run_offset = offset
+            run.append(image[offset])
+        if run:
+            writes.extend(self._split_data(run_offset, run, max_length))
+        return writes
+
+    def _split_data(self, offset, data, max_length):
+        return [[offset + i, str(data[i:i + max_length])]
+                for i in range(0, len(data), max_length)]
 
     def _flush_out_data(self, offset, data):
         try:
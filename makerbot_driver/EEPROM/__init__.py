@@ -1,10 +1,12 @@
-all = ['EepromAnalyzer', 'EepromReader', 'EepromWriter', 'errors']
+all = ['EepromAnalyzer', 'EepromImageVerifier', 'EepromLayout', 'EepromReader', 'EepromWriter', 'errors']
 
 from errors import *
 from constants import *
 from EepromAnalyzer import *
+from EepromLayout import *
 from EepromReader import *
 from EepromWriter import *
 from EepromVerifier import *
+from EepromImageVerifier import *
 from EepromRepairer import *
 from EepromUtilities import *
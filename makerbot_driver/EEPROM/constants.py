@@ -2,3 +2,5 @@ eeprom_map_name = 'eeprom_map_%s_%s.json'
 default_version = '6.0'
 default_software_variant = '0x00'
 total_eeprom_size = 4000
+# Directory pickled eeprom maps are kept in, see load_eeprom_map
+eeprom_map_cache_directory = None
@@ -0,0 +1,217 @@
+"""
+Precompiled payload layouts for every s3g command.
+
+Each command's parameter format is compiled into a struct.Struct once, when
+this module is imported, together with its resolved opcode.  Packing a
+command is then a single call into struct, without parsing a format string
+or looking the opcode up by name.  s3g uses these codecs to build payloads,
+and the FileReader uses the same ones to decode them.
+
+A trailing 's' in a format is a null terminated string, which isn't part of
+the compiled struct and is appended or read separately.
+"""
+from __future__ import absolute_import
+
+import functools
+import struct
+
+import makerbot_driver
+from makerbot_driver import constants
+
+# Request parameters and response format of each host query
+host_query_formats = {
+    'GET_VERSION': ('H', 'BH'),
+    'INIT': ('', None),
+    'GET_AVAILABLE_BUFFER_SIZE': ('', 'BI'),
+    'CLEAR_BUFFER': ('', None),
+    'ABORT_IMMEDIATELY': ('', None),
+    'PAUSE': ('', None),
+    'TOOL_QUERY': ('bb', None),
+    'IS_FINISHED': ('', 'B?'),
+    'READ_FROM_EEPROM': ('Hb', None),
+    'WRITE_TO_EEPROM': ('hb', None),
+    'CAPTURE_TO_FILE': ('s', 'BB'),
+    'END_CAPTURE': ('', 'BI'),
+    'PLAYBACK_CAPTURE': ('s', 'BB'),
+    'RESET': ('', None),
+    'GET_NEXT_FILENAME': ('b', 'BBs'),
+    'GET_BUILD_NAME': ('', 'Bs'),
+    'GET_EXTENDED_POSITION': ('', 'BiiiiiH'),
+    'EXTENDED_STOP': ('b', 'BB'),
+    'GET_MOTHERBOARD_STATUS': ('', 'BB'),
+    'GET_BUILD_STATS': ('', 'BBBBLL'),
+    'GET_COMMUNICATION_STATS': ('', 'BLLLLL'),
+    'GET_ADVANCED_VERSION': ('H', 'BHHBBH'),
+}
+
+# Parameters of each host action
+host_action_formats = {
+    'FIND_AXES_MINIMUMS': 'BIH',
+    'FIND_AXES_MAXIMUMS': 'BIH',
+    'DELAY': 'I',
+    'CHANGE_TOOL': 'B',
+    'WAIT_FOR_TOOL_READY': 'BHH',
+    'TOOL_ACTION_COMMAND': 'BBB',
+    'ENABLE_AXES': 'B',
+    'QUEUE_EXTENDED_POINT': 'iiiiiI',
+    'SET_EXTENDED_POSITION': 'iiiii',
+    'WAIT_FOR_PLATFORM_READY': 'BHH',
+    'QUEUE_EXTENDED_POINT_NEW': 'iiiiiIB',
+    'STORE_HOME_POSITIONS': 'B',
+    'RECALL_HOME_POSITIONS': 'B',
+    'SET_POT_VALUE': 'BB',
+    'SET_RGB_LED': 'BBBBB',
+    'SET_BEEP': 'HHB',
+    'WAIT_FOR_BUTTON': 'BHB',
+    'DISPLAY_MESSAGE': 'BBBBs',
+    'SET_BUILD_PERCENT': 'BB',
+    'QUEUE_SONG': 'B',
+    'RESET_TO_FACTORY': 'B',
+    'BUILD_START_NOTIFICATION': 'Is',
+    'BUILD_END_NOTIFICATION': 'B',
+    'QUEUE_EXTENDED_POINT_ACCELERATED': 'iiiiiIBfh',
+    'X3G_VERSION': 'BBBIHBBBBBBBBBBB',
+}
+
+# Request parameters and response format of each tool query
+slave_query_formats = {
+    'GET_VERSION': ('H', 'BH'),
+    'GET_TOOLHEAD_TEMP': ('', 'BH'),
+    'GET_MOTOR_1_SPEED_RPM': ('', 'BI'),
+    'IS_TOOL_READY': ('', 'BB'),
+    'READ_FROM_EEPROM': ('HB', None),
+    'WRITE_TO_EEPROM': ('HB', None),
+    'GET_PLATFORM_TEMP': ('', 'BH'),
+    'GET_TOOLHEAD_TARGET_TEMP': ('', 'BH'),
+    'GET_PLATFORM_TARGET_TEMP': ('', 'BH'),
+    'IS_PLATFORM_READY': ('', 'BB'),
+    'GET_TOOL_STATUS': ('', 'BB'),
+    'GET_PID_STATE': ('', 'Bhhhhhh'),
+}
+
+# Parameters of each tool action
+slave_action_formats = {
+    'INIT': '',
+    'SET_TOOLHEAD_TARGET_TEMP': 'H',
+    'SET_MOTOR_1_SPEED_PWM': 'B',
+    'SET_MOTOR_1_SPEED_RPM': 'I',
+    'SET_MOTOR_1_DIRECTION': 'B',
+    'TOGGLE_MOTOR_1': 'B',
+    'TOGGLE_FAN': 'B',
+    'TOGGLE_EXTRA_OUTPUT': 'B',
+    'SET_SERVO_1_POSITION': 'B',
+    'SET_SERVO_2_POSITION': 'B',
+    'PAUSE': '',
+    'ABORT': '',
+    'TOGGLE_ABP': 'B',
+    'SET_PLATFORM_TEMP': 'H',
+}
+
+
+class CommandCodec(object):
+    """
+    The compiled layout of a single s3g command.
+
+    pack(*parameters) returns the payload of the command, opcode first.
+    Tool commands carry their opcode in the tool command header instead, so
+    their parameters are packed on their own with pack_parameters.
+    """
+
+    def __init__(self, name, opcode, format, response_format=None):
+        """
+        @param str name: Name of the command, ie 'QUEUE_EXTENDED_POINT'
+        @param int opcode: Command number
+        @param str format: struct format of the parameters, without the
+            opcode or byte order
+        @param str response_format: struct format of the response, or None
+            if the response isn't unpacked with a fixed layout
+        """
+        self.name = name
+        self.opcode = opcode
+        self.format = format
+        self.has_string = format.endswith('s')
+        if self.has_string:
+            format = format[:-1]
+        self.struct = struct.Struct('<B' + format)
+        self.parameters = struct.Struct('<' + format)
+        self.size = self.struct.size
+        self.pack = functools.partial(self.struct.pack, opcode)
+        self.pack_parameters = self.parameters.pack
+
+        self.response_format = response_format
+        self.response_has_string = False
+        self.response = None
+        if response_format is not None:
+            self.response_has_string = response_format.endswith('s')
+            if self.response_has_string:
+                response_format = response_format[:-1]
+            self.response = struct.Struct('<' + response_format)
+
+    def __repr__(self):
+        return '<CommandCodec %s %i %r>' % (self.name, self.opcode, self.format)
+
+    def unpack_parameters(self, data, offset=0):
+        """
+        Unpack the fixed size parameters of this command
+        @param data Data containing the parameters
+        @param int offset: Index of the first parameter byte in data
+        @return tuple of parameters
+        """
+        return self.parameters.unpack_from(data, offset)
+
+    def unpack_response(self, data):
+        """
+        Unpack a response to this command, raising a ProtocolError if it
+        doesn't match the response format.  Same as Encoder.unpack_response
+        and Encoder.unpack_response_with_string.
+        @param data Response payload, including the response code
+        @return list of values unpacked
+        """
+        if self.response_has_string:
+            return makerbot_driver.Encoder.unpack_response_with_string(
+                self.response.format, data)
+        try:
+            return self.response.unpack(buffer(data))
+        except struct.error as e:
+            raise makerbot_driver.errors.ProtocolError("Unexpected data returned from machine. Expected length=%i, got=%i, error=%s" %
+                                       (self.response.size, len(data), str(e)))
+
+
+def compile_codecs(command_dict, formats):
+    """
+    Compile a table of command formats into codecs, resolving each
+    command's opcode.
+    @param dict command_dict: Opcodes keyed by command name
+    @param dict formats: Formats, or (format, response_format) tuples,
+        keyed by command name
+    @return dict of CommandCodecs keyed by command name
+    """
+    codecs = {}
+    for name, format in formats.items():
+        if isinstance(format, tuple):
+            format, response_format = format
+        else:
+            response_format = None
+        codecs[name] = CommandCodec(
+            name, command_dict[name], format, response_format)
+    return codecs
+
+
+def by_opcode(codecs):
+    """
+    @param dict codecs: CommandCodecs keyed by command name
+    @return dict of the same CommandCodecs keyed by opcode
+    """
+    return dict((codec.opcode, codec) for codec in codecs.values())
+
+host_query_codecs = compile_codecs(
+    constants.host_query_command_dict, host_query_formats)
+host_action_codecs = compile_codecs(
+    constants.host_action_command_dict, host_action_formats)
+slave_query_codecs = compile_codecs(
+    constants.slave_query_command_dict, slave_query_formats)
+slave_action_codecs = compile_codecs(
+    constants.slave_action_command_dict, slave_action_formats)
+
+host_action_codecs_by_opcode = by_opcode(host_action_codecs)
+slave_action_codecs_by_opcode = by_opcode(slave_action_codecs)
@@ -1,32 +1,100 @@
-def CalculateCRC(data):
+# CRC table from http://forum.sparkfun.com/viewtopic.php?p=51145
+crctab = (
+    0, 94, 188, 226, 97, 63, 221, 131, 194, 156, 126, 32, 163, 253, 31, 65,
+    157, 195, 33, 127, 252, 162, 64, 30, 95, 1, 227, 189, 62, 96, 130, 220,
+    35, 125, 159, 193, 66, 28, 254, 160, 225, 191, 93, 3, 128, 222, 60, 98,
+    190, 224, 2, 92, 223, 129, 99, 61, 124, 34, 192, 158, 29, 67, 161, 255,
+    70, 24, 250, 164, 39, 121, 155, 197, 132, 218, 56, 102, 229, 187, 89, 7,
+    219, 133, 103, 57, 186, 228, 6, 88, 25, 71, 165, 251, 120, 38, 196, 154,
+    101, 59, 217, 135, 4, 90, 184, 230, 167, 249, 27, 69, 198, 152, 122, 36,
+    248, 166, 68, 26, 153, 199, 37, 123, 58, 100, 134, 216, 91, 5, 231, 185,
+    140, 210, 48, 110, 237, 179, 81, 15, 78, 16, 242, 172, 47, 113, 147, 205,
+    17, 79, 173, 243, 112, 46, 204, 146, 211, 141, 111, 49, 178, 236, 14, 80,
+    175, 241, 19, 77, 206, 144, 114, 44, 109, 51, 209, 143, 12, 82, 176, 238,
+    50, 108, 142, 208, 83, 13, 239, 177, 240, 174, 76, 18, 145, 207, 45, 115,
+    202, 148, 118, 40, 171, 245, 23, 73, 8, 86, 180, 234, 105, 55, 213, 139,
+    87, 9, 235, 181, 54, 104, 138, 212, 149, 203, 41, 119, 244, 170, 72, 22,
+    233, 183, 85, 11, 136, 214, 52, 106, 43, 117, 151, 201, 74, 20, 246, 168,
+    116, 42, 200, 150, 21, 75, 169, 247, 182, 232, 10, 84, 215, 137, 107, 53
+)
+
+
+def CalculateCRC(data, crc=0):
     """
     Calculate the iButton/Maxim crc for a give bytearray
     @param data bytearray of data to calculate a CRC for
+    @param crc CRC of the data preceding this data, if any
     @return Single byte CRC calculated from the data.
     """
-    # CRC table from http://forum.sparkfun.com/viewtopic.php?p=51145
-    crctab = [
-        0, 94, 188, 226, 97, 63, 221, 131, 194, 156, 126, 32, 163, 253, 31, 65,
-        157, 195, 33, 127, 252, 162, 64, 30, 95, 1, 227, 189, 62, 96, 130, 220,
-        35, 125, 159, 193, 66, 28, 254, 160, 225, 191, 93, 3, 128, 222, 60, 98,
-        190, 224, 2, 92, 223, 129, 99, 61, 124, 34, 192, 158, 29, 67, 161, 255,
-        70, 24, 250, 164, 39, 121, 155, 197, 132, 218, 56, 102, 229, 187, 89, 7,
-        219, 133, 103, 57, 186, 228, 6, 88, 25, 71, 165, 251, 120, 38, 196, 154,
-        101, 59, 217, 135, 4, 90, 184, 230, 167, 249, 27, 69, 198, 152, 122, 36,
-        248, 166, 68, 26, 153, 199, 37, 123, 58, 100, 134, 216, 91, 5, 231, 185,
-        140, 210, 48, 110, 237, 179, 81, 15, 78, 16, 242, 172, 47, 113, 147, 205,
-        17, 79, 173, 243, 112, 46, 204, 146, 211, 141, 111, 49, 178, 236, 14, 80,
-        175, 241, 19, 77, 206, 144, 114, 44, 109, 51, 209, 143, 12, 82, 176, 238,
-        50, 108, 142, 208, 83, 13, 239, 177, 240, 174, 76, 18, 145, 207, 45, 115,
-        202, 148, 118, 40, 171, 245, 23, 73, 8, 86, 180, 234, 105, 55, 213, 139,
-        87, 9, 235, 181, 54, 104, 138, 212, 149, 203, 41, 119, 244, 170, 72, 22,
-        233, 183, 85, 11, 136, 214, 52, 106, 43, 117, 151, 201, 74, 20, 246, 168,
-        116, 42, 200, 150, 21, 75, 169, 247, 182, 232, 10, 84, 215, 137, 107, 53
-    ]
-
-    data_bytes = bytearray(data)
-
-    val = 0
-    for x in data_bytes:
-        val = crctab[val ^ x]
-    return val
+    # Iterating a bytearray yields ints, so only other types need converting
+    if not isinstance(data, bytearray):
+        data = bytearray(data)
+
+    table = crctab
+    for x in data:
+        crc = table[crc ^ x]
+    return crc
+
+
+class Crc8(object):
+    """
+    An incremental iButton/Maxim crc, for data that arrives a piece at a time.
+    Feeding the pieces to update gives the same value as calling CalculateCRC
+    on all of them joined together.
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def reset(self):
+        self.value = 0
+
+    def update(self, data):
+        """
+        @param data bytearray of data to add to the CRC
+        @return The CRC of all data added so far
+        """
+        self.value = CalculateCRC(data, self.value)
+        return self.value
+
+    def update_byte(self, byte):
+        """
+        @param int byte Single byte to add to the CRC
+        @return The CRC of all data added so far
+        """
+        self.value = crctab[self.value ^ byte]
+        return self.value
+
+
+def CalculateCRCs(payloads):
+    """
+    Calculate the crc of many payloads at once, ie when packing a whole file.
+    If numpy is available every payload is advanced one byte per step, so the
+    work done in python only depends on the length of the longest payload.
+    @param payloads list of bytearrays to calculate CRCs for
+    @return list of single byte CRCs, one per payload
+    """
+    # numpy is slow to import and only needed here, so it isn't imported
+    # along with the rest of the driver
+    try:
+        import numpy
+    except ImportError:
+        # Batch CRCs fall back to a plain python loop
+        numpy = None
+    if numpy is None or not payloads:
+        return [CalculateCRC(payload) for payload in payloads]
+
+    # A leading zero byte leaves a zero CRC at zero, so shorter payloads can
+    # be padded at the front to line them all up at the end.
+    width = max(len(payload) for payload in payloads)
+    padded = b''.join([b'\x00' * (width - len(payload)) + bytes(payload)
+                       for payload in payloads])
+    rows = numpy.frombuffer(
+        padded, dtype=numpy.uint8).reshape(len(payloads), width)
+    columns = numpy.ascontiguousarray(rows.T)
+
+    table = numpy.array(crctab, dtype=numpy.uint8)
+    crcs = numpy.zeros(len(payloads), dtype=numpy.uint8)
+    for i in range(width):
+        crcs = table[crcs ^ columns[i]]
+    return crcs.tolist()
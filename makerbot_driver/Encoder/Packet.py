@@ -88,44 +88,217 @@ class PacketStreamDecoder(object):
     """
     A state machine that accepts bytes from an s3g packet stream, checks the validity of
     each packet, then extracts and returns the payload.
+
+    Bytes can be handed over one at a time with parse_byte, or a whole
+    buffer at a time with feed, which decodes every packet in the buffer.
+    States are kept as integers and each one has its own byte handler, so
+    no string comparisons happen per byte.
     """
+    WAIT_FOR_HEADER = 0
+    WAIT_FOR_LENGTH = 1
+    WAIT_FOR_DATA = 2
+    WAIT_FOR_CRC = 3
+    PAYLOAD_READY = 4
+
+    state_names = (
+        'WAIT_FOR_HEADER',
+        'WAIT_FOR_LENGTH',
+        'WAIT_FOR_DATA',
+        'WAIT_FOR_CRC',
+        'PAYLOAD_READY',
+    )
+
     def __init__(self):
         """
         Initialize the packet decoder
         """
-        self.state = 'WAIT_FOR_HEADER'
-        self.payload = bytearray()
-        self.expected_length = 0
+        self.reset()
+        # Index of the next byte to parse in the last buffer given to feed
+        self.position = 0
 
-    def parse_byte(self, byte):
+    def reset(self):
         """
-        Entry point, call for each byte added to the stream.
-        @param byte Byte to add to the stream
+        Forget any partially decoded packet and wait for a new header.
         """
+        self.state_code = self.WAIT_FOR_HEADER
+        self.payload = bytearray()
+        self.expected_length = 0
+        self.crc = makerbot_driver.Encoder.Crc8()
+
+    @property
+    def state(self):
+        """ Name of the current state, ie 'WAIT_FOR_HEADER' """
+        return self.state_names[self.state_code]
 
-        if self.state == 'WAIT_FOR_HEADER':
-            if byte != makerbot_driver.constants.header:
-                raise makerbot_driver.errors.PacketHeaderError(byte, makerbot_driver.constants.header)
+    def _parse_header(self, byte):
+        if byte != makerbot_driver.constants.header:
+            raise makerbot_driver.errors.PacketHeaderError(byte, makerbot_driver.constants.header)
 
-            self.state = 'WAIT_FOR_LENGTH'
+        self.state_code = self.WAIT_FOR_LENGTH
 
-        elif self.state == 'WAIT_FOR_LENGTH':
-            if byte > makerbot_driver.constants.maximum_payload_length:
-                raise makerbot_driver.errors.PacketLengthFieldError(byte, makerbot_driver.constants.maximum_payload_length)
+    def _parse_length(self, byte):
+        if byte > makerbot_driver.constants.maximum_payload_length:
+            raise makerbot_driver.errors.PacketLengthFieldError(byte, makerbot_driver.constants.maximum_payload_length)
 
-            self.expected_length = byte
-            self.state = 'WAIT_FOR_DATA'
+        self.expected_length = byte
+        if byte == 0:
+            self.state_code = self.WAIT_FOR_CRC
+        else:
+            self.state_code = self.WAIT_FOR_DATA
 
-        elif self.state == 'WAIT_FOR_DATA':
-            self.payload.append(byte)
-            if len(self.payload) == self.expected_length:
-                self.state = 'WAIT_FOR_CRC'
+    def _parse_data(self, byte):
+        self.payload.append(byte)
+        self.crc.update_byte(self.payload[-1])
+        if len(self.payload) == self.expected_length:
+            self.state_code = self.WAIT_FOR_CRC
 
-        elif self.state == 'WAIT_FOR_CRC':
-            if makerbot_driver.Encoder.CalculateCRC(self.payload) != byte:
-                raise makerbot_driver.errors.PacketCRCError(byte, makerbot_driver.Encoder.CalculateCRC(self.payload))
+    def _parse_crc(self, byte):
+        crc = self.crc.value
+        if crc != byte:
+            raise makerbot_driver.errors.PacketCRCError(byte, crc)
 
-            self.state = 'PAYLOAD_READY'
+        self.state_code = self.PAYLOAD_READY
 
-        else:
-            raise Exception('Parser in bad state: too much data provided?')
+    def _parse_extra(self, byte):
+        raise Exception('Parser in bad state: too much data provided?')
+
+    # Byte handlers, indexed by state
+    _handlers = (
+        _parse_header,
+        _parse_length,
+        _parse_data,
+        _parse_crc,
+        _parse_extra,
+    )
+
+    def parse_byte(self, byte):
+        """
+        Entry point, call for each byte added to the stream.  The decoder is
+        reset if the byte is rejected.
+        @param byte Byte to add to the stream
+        """
+        try:
+            self._handlers[self.state_code](self, byte)
+        except makerbot_driver.errors.PacketDecodeError:
+            self.reset()
+            raise
+
+    def _scan(self, buffer):
+        """
+        Run the state machine over a bytearray, starting at self.position,
+        until a packet is complete or the buffer runs out.  self.position is
+        left after the last parsed byte, including a byte that was rejected.
+
+        @param bytearray buffer Bytes received from the stream
+        @return (source, start, stop) locating the payload of a completed
+            packet, or None if no packet was completed
+        """
+        position = self.position
+        end = len(buffer)
+        try:
+            while position < end:
+                state = self.state_code
+                if state == self.WAIT_FOR_HEADER and position + 2 < end:
+                    # Fast path: if the whole packet is in the buffer, check it
+                    # in place instead of running it through the byte handlers
+                    length = buffer[position + 1]
+                    crc_index = position + 2 + length
+                    if crc_index < end:
+                        position += 1
+                        self._parse_header(buffer[position - 1])
+                        position += 1
+                        self._parse_length(length)
+                        data_start = position
+                        position = crc_index + 1
+                        crc = makerbot_driver.Encoder.CalculateCRC(
+                            buffer[data_start:crc_index])
+                        if crc != buffer[crc_index]:
+                            raise makerbot_driver.errors.PacketCRCError(buffer[crc_index], crc)
+                        self.expected_length = length
+                        self.state_code = self.PAYLOAD_READY
+                        return buffer, data_start, crc_index
+
+                if state == self.WAIT_FOR_DATA:
+                    # Copy as much of the payload as is available in one go
+                    count = min(self.expected_length - len(self.payload),
+                                end - position)
+                    data = buffer[position:position + count]
+                    self.payload.extend(data)
+                    self.crc.update(data)
+                    position += count
+                    if len(self.payload) == self.expected_length:
+                        self.state_code = self.WAIT_FOR_CRC
+                    continue
+
+                position += 1
+                self._handlers[state](self, buffer[position - 1])
+                if self.state_code == self.PAYLOAD_READY:
+                    return self.payload, 0, len(self.payload)
+
+        except makerbot_driver.errors.PacketDecodeError:
+            self.reset()
+            raise
+
+        finally:
+            self.position = position
+
+        return None
+
+    def feed(self, buffer):
+        """
+        Decode every packet in a buffer.  This is a generator that yields
+        the payload of each packet as a memoryview.  The payload of a packet
+        that lies entirely in the buffer is a view into the buffer itself,
+        so no bytes are copied; the buffer must not be resized while such a
+        view is alive.  A packet that is cut off at the end of the buffer is
+        finished by the next call to feed.
+
+        If a bad packet is found, the decoder is reset and the error is
+        raised; self.position is then the index of the first byte that was
+        not parsed, so decoding can carry on with feed(buffer[position:]).
+
+        @param bytearray buffer Bytes received from the stream
+        """
+        if not isinstance(buffer, bytearray):
+            buffer = bytearray(buffer)
+        self.position = 0
+        while self.position < len(buffer):
+            found = self._scan(buffer)
+            if found is None:
+                break
+            source, start, stop = found
+            self.reset()
+            yield memoryview(source)[start:stop]
+
+    def parse_bytes(self, buffer):
+        """
+        Parse bytes from the front of a buffer until a payload is ready or the
+        buffer runs out.  Parsed bytes are removed from the buffer, including
+        the offending byte if an error is raised, so that any leftover bytes
+        can be handed to the next decoder.
+        @param bytearray buffer Bytes received from the stream
+        """
+        self.position = 0
+        try:
+            found = self._scan(buffer)
+            if found is not None:
+                source, start, stop = found
+                self.payload = source[start:stop]
+        finally:
+            del buffer[:self.position]
+
+    def bytes_needed(self):
+        """
+        @return The least number of bytes that still have to be parsed before
+        a payload can be ready.  Reading this many bytes from a stream never
+        reads past the end of the current packet.
+        """
+        if self.state_code == self.WAIT_FOR_HEADER:
+            return 3
+        elif self.state_code == self.WAIT_FOR_LENGTH:
+            return 2
+        elif self.state_code == self.WAIT_FOR_DATA:
+            return self.expected_length - len(self.payload) + 1
+        elif self.state_code == self.WAIT_FOR_CRC:
+            return 1
+        return 0
@@ -1,5 +1,6 @@
-__all__ = ['Coding', 'Crc', 'Packet']
+__all__ = ['Coding', 'CommandCodec', 'Crc', 'Packet']
 
 from Coding import *
+from CommandCodec import *
 from Crc import *
 from Packet import *
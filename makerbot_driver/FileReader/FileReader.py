@@ -76,9 +76,12 @@ class FileReader(object):
         """Reads and decodes a certain number of bytes using a specific format string
         from the input s3g file
 
-        @param string formatString: The format string we will unpack from the file
+        @param string formatString: The format string we will unpack from the
+          file, or the CommandCodec of the command being parsed
         @return list objects unpacked from the input s3g file
         """
+        if isinstance(formatString, makerbot_driver.Encoder.CommandCodec):
+            return self.ParseOutCodecParameters(formatString)
         returnParams = []
         for formatter in formatString:
             if formatter == 's':
@@ -90,6 +93,20 @@ class FileReader(object):
             returnParams.append(self.ParseParameter(formatString, b))
         return returnParams
 
+    def ParseOutCodecParameters(self, codec):
+        """Reads and decodes the parameters of a command using its precompiled
+        layout, reading all fixed size parameters at once
+
+        @param CommandCodec codec: Layout of the command's parameters
+        @return list objects unpacked from the input s3g file
+        """
+        returnParams = list(codec.parameters.unpack(
+            self.ReadBytes(codec.parameters.size)))
+        if codec.has_string:
+            b = self.GetStringBytes()
+            returnParams.append(self.ParseParameter('<' + str(len(b)) + 's', b))
+        return returnParams
+
     def ParseParameter(self, formatString, bytes):
         """Given a format string and a set of bytes, unpacks the bytes into the given format
 
@@ -105,7 +122,7 @@ class FileReader(object):
 
     def ParseHostAction(self, cmd):
         try:
-            return self.ParseOutParameters(makerbot_driver.FileReader.hostFormats[cmd])
+            return self.ParseOutParameters(makerbot_driver.FileReader.hostCodecs[cmd])
         except KeyError:
             self._log.debug(
                 '{"event":"bad_host_command", "bad_command":%s}', cmd)
@@ -117,10 +134,10 @@ class FileReader(object):
                 '{"event":"cmd_is_not_tool_action_cmd", "bad_cmd":%s}', cmd)
             raise makerbot_driver.FileReader.NotToolActionCmdError
         data = []
-        data.extend(self.ParseOutParameters(makerbot_driver.FileReader.hostFormats[cmd]))
+        data.extend(self.ParseOutParameters(makerbot_driver.FileReader.hostCodecs[cmd]))
         slaveCmd = data[1]
         try:
-            data.extend(self.ParseOutParameters(makerbot_driver.FileReader.slaveFormats[slaveCmd]))
+            data.extend(self.ParseOutParameters(makerbot_driver.FileReader.slaveCodecs[slaveCmd]))
         except KeyError:
             self._log.debug(
                 '{"event":"bad_slave_cmd", "bad_cmd":%s}', slaveCmd)
@@ -167,3 +184,140 @@ class FileReader(object):
         except makerbot_driver.FileReader.EndOfFileError:
             self._log.debug('{"event":"done_reading_file"}')
             return payloads
+
+    def iter_payloads(self, callback=None, buffer_size=1 << 20):
+        """Lazily decodes the payloads of the file, giving the same payloads
+        as ReadFile.  The file is read buffer_size bytes at a time and each
+        command's fixed size parameters are unpacked straight from the
+        buffer with its precompiled layout, so a file of any size is decoded
+        in constant memory.  Decoding starts at the file's current position,
+        which must be the start of a command.
+
+        @param callback: Called with the percent of the file read each time
+          it changes
+        @param int buffer_size: Number of bytes read from the file at once
+        @return generator of payloads, raising the same errors as ReadFile
+          for bad or truncated data
+        """
+        try:
+            self.totalsize = float(os.stat(self.file.name).st_size)
+        except AttributeError as e:
+            self.totalsize = 1
+        hostLayouts = makerbot_driver.FileReader.hostLayouts
+        toolAction = makerbot_driver.host_action_command_dict['TOOL_ACTION_COMMAND']
+        # Bytes of the file before the buffer, so bytesread is an offset into
+        # the file even when decoding starts part way through it
+        try:
+            buffer_start = self.file.tell()
+        except (AttributeError, IOError):
+            buffer_start = 0
+        self.bytesread = buffer_start
+        data = ''
+        pos = 0
+        percent = None
+        self._log.debug('{"event":"reading_bytes_from_file", "file":%s}',
+                        str(self.file))
+        while True:
+            if pos == len(data):
+                buffer_start += pos
+                data = self.file.read(buffer_size)
+                pos = 0
+                if data == '':
+                    self._log.debug('{"event":"done_reading_file"}')
+                    return
+            cmd = ord(data[pos])
+            layout = hostLayouts.get(cmd)
+            if layout is None:
+                self._raise_bad_command(cmd)
+            unpack_from, size, has_string = layout
+            pos += 1
+            if pos + size > len(data):
+                buffer_start, data, pos = self._refill(
+                    buffer_start, data, pos, size, buffer_size)
+            payload = [cmd]
+            payload.extend(unpack_from(data, pos))
+            pos += size
+            if has_string:
+                buffer_start, data, pos, string = self._unpack_string(
+                    buffer_start, data, pos, buffer_size)
+                payload.append(string)
+            if cmd == toolAction:
+                buffer_start, data, pos = self._unpack_tool_parameters(
+                    payload, buffer_start, data, pos, buffer_size)
+            self.bytesread = buffer_start + pos
+            if callback and int(self.bytesread / self.totalsize * 100) != percent:
+                percent = int(self.bytesread / self.totalsize * 100)
+                callback(percent)
+            yield payload
+
+    def _raise_bad_command(self, cmd):
+        """Raises the error GetNextCommand or ParseHostAction would for a
+        command with no host action layout
+        """
+        if (not cmd in makerbot_driver.slave_action_command_dict.values()) and \
+           (not cmd in makerbot_driver.host_action_command_dict.values()):
+            self._log.debug('{"event":"bad_read_command", "command":%s}', cmd)
+            raise makerbot_driver.FileReader.BadCommandError(cmd)
+        self._log.debug(
+            '{"event":"bad_host_command", "bad_command":%s}', cmd)
+        raise makerbot_driver.FileReader.BadHostCommandError(cmd)
+
+    def _unpack_tool_parameters(self, payload, buffer_start, data, pos,
+                                buffer_size):
+        """Appends the parameters of a tool action's tool command to its
+        payload, as ParseToolAction would
+
+        @return (buffer_start, data, pos) of the buffer after the parameters
+        """
+        slaveCmd = payload[2]
+        try:
+            unpack_from, size, has_string = \
+                makerbot_driver.FileReader.slaveLayouts[slaveCmd]
+        except KeyError:
+            self._log.debug(
+                '{"event":"bad_slave_cmd", "bad_cmd":%s}', slaveCmd)
+            raise makerbot_driver.FileReader.BadSlaveCommandError(slaveCmd)
+        if pos + size > len(data):
+            buffer_start, data, pos = self._refill(
+                buffer_start, data, pos, size, buffer_size)
+        payload.extend(unpack_from(data, pos))
+        pos += size
+        if has_string:
+            buffer_start, data, pos, string = self._unpack_string(
+                buffer_start, data, pos, buffer_size)
+            payload.append(string)
+        return buffer_start, data, pos
+
+    def _refill(self, buffer_start, data, pos, count, buffer_size):
+        """Reads more of the file into the buffer, until at least count bytes
+        from pos are in it
+
+        @return (buffer_start, data, pos) of the new buffer
+        """
+        buffer_start += pos
+        data = data[pos:]
+        while len(data) < count:
+            more = self.file.read(max(buffer_size, count - len(data)))
+            if more == '':
+                self._log.debug('{"event":"insufficient_data"}')
+                raise makerbot_driver.FileReader.InsufficientDataError
+            data += more
+        return buffer_start, data, 0
+
+    def _unpack_string(self, buffer_start, data, pos, buffer_size):
+        """Finds the null terminated string at pos in the buffer, as
+        GetStringBytes would read it
+
+        @return (buffer_start, data, pos, string) with pos after the
+          string's null terminator, and the string without it
+        """
+        limit = makerbot_driver.maximum_payload_length
+        while True:
+            end = data.find('\x00', pos, pos + limit)
+            if end != -1:
+                return buffer_start, data, end + 1, data[pos:end]
+            if len(data) - pos > limit:
+                self._log.debug('{"event":"string_too_long"}')
+                raise makerbot_driver.FileReader.StringTooLongError
+            buffer_start, data, pos = self._refill(
+                buffer_start, data, pos, len(data) - pos + 1, buffer_size)
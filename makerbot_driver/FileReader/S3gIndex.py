@@ -0,0 +1,249 @@
+"""
+A random access index of an s3g/x3g file.
+
+A file can only be decoded from the start of a command, and the position of
+the machine at any command depends on every move before it.  S3gIndex
+records, for every interval'th command, its byte offset and the machine
+position before it, along with every SET_BUILD_PERCENT command.  Decoding
+can then start part way through a file from the nearest checkpoint, after
+a binary search, instead of from the start.
+
+The index of a file can be saved next to it, as a json sidecar file.
+"""
+
+from __future__ import absolute_import
+
+import array
+import bisect
+import json
+import os
+
+import makerbot_driver
+
+from .FileReader import FileReader
+
+__all__ = ['S3gIndex', 'update_position']
+
+_commands = makerbot_driver.host_action_command_dict
+
+
+def update_position(position, payload):
+    """Updates a machine position with a decoded command's effect on it
+
+    @param list position: Axes positions, in steps, in XYZAB order, None
+      for axes whose position isn't known
+    @param list payload: A payload, as decoded by FileReader
+    """
+    cmd = payload[0]
+    if cmd == _commands['QUEUE_EXTENDED_POINT'] or \
+            cmd == _commands['SET_EXTENDED_POSITION']:
+        position[:] = payload[1:6]
+    elif cmd == _commands['QUEUE_EXTENDED_POINT_NEW'] or \
+            cmd == _commands['QUEUE_EXTENDED_POINT_ACCELERATED']:
+        relative_axes = payload[7]
+        for i in range(5):
+            if not relative_axes & (1 << i):
+                position[i] = payload[1 + i]
+            elif position[i] is not None:
+                position[i] += payload[1 + i]
+    elif cmd == _commands['FIND_AXES_MINIMUMS'] or \
+            cmd == _commands['FIND_AXES_MAXIMUMS'] or \
+            cmd == _commands['RECALL_HOME_POSITIONS']:
+        # The axes end up wherever their endstops or home positions are
+        axes = payload[1]
+        for i in range(5):
+            if axes & (1 << i):
+                position[i] = None
+
+
+class S3gIndex(object):
+
+    # Version of the sidecar file format
+    version = 2
+
+    def __init__(self, interval=1000):
+        """
+        @param int interval: Number of commands between checkpoints
+        """
+        self.interval = interval
+        # Number of commands in the file
+        self.command_count = 0
+        # Size and modification time of the indexed file, if known
+        self.size = None
+        self.mtime = None
+        # Checkpoints: the command index, byte offset and position before
+        # every interval'th command
+        self.commands = array.array('L')
+        self.offsets = array.array('L')
+        self.positions = []
+        # SET_BUILD_PERCENT markers: each one's percent, command index and
+        # byte offset
+        self.percents = []
+        self.percent_commands = array.array('L')
+        self.percent_offsets = array.array('L')
+
+    @classmethod
+    def build(cls, s3g_file, interval=1000):
+        """Decodes a whole file to index it
+
+        @param s3g_file: Path of the file, or a file object opened in binary
+          mode, which is indexed from its start
+        @param int interval: Number of commands between checkpoints
+        @return S3gIndex of the file
+        """
+        index = cls(interval)
+        close_file = isinstance(s3g_file, basestring)
+        if close_file:
+            s3g_file = open(s3g_file, 'rb')
+        try:
+            try:
+                stat = os.fstat(s3g_file.fileno())
+                index.size = stat.st_size
+                index.mtime = stat.st_mtime
+            except (AttributeError, IOError):
+                pass
+            s3g_file.seek(0)
+            reader = FileReader()
+            reader.file = s3g_file
+            position = [None] * 5
+            offset = 0
+            set_build_percent = _commands['SET_BUILD_PERCENT']
+            # The checkpoint before command 0 is kept even for an empty file
+            index.commands.append(0)
+            index.offsets.append(offset)
+            index.positions.append(list(position))
+            command_index = -1
+            for command_index, payload in enumerate(reader.iter_payloads()):
+                if command_index and command_index % interval == 0:
+                    index.commands.append(command_index)
+                    index.offsets.append(offset)
+                    index.positions.append(list(position))
+                if payload[0] == set_build_percent:
+                    index.percents.append(payload[1])
+                    index.percent_commands.append(command_index)
+                    index.percent_offsets.append(offset)
+                update_position(position, payload)
+                offset = reader.bytesread
+            index.command_count = command_index + 1
+        finally:
+            if close_file:
+                s3g_file.close()
+        return index
+
+    @staticmethod
+    def sidecar_path(s3g_path):
+        """@return Path of the sidecar index of an s3g file"""
+        return s3g_path + '.index'
+
+    @classmethod
+    def for_file(cls, s3g_path, interval=1000):
+        """Loads the sidecar index of a file, building and saving it if it
+        is missing or out of date
+
+        @param str s3g_path: Path of the s3g/x3g file
+        @param int interval: Number of commands between checkpoints of a
+          newly built index
+        @return S3gIndex of the file
+        """
+        stat = os.stat(s3g_path)
+        sidecar_path = cls.sidecar_path(s3g_path)
+        try:
+            index = cls.load(sidecar_path)
+            if index.size == stat.st_size and index.mtime == stat.st_mtime:
+                return index
+        except (IOError, ValueError, KeyError, TypeError):
+            pass
+        index = cls.build(s3g_path, interval)
+        try:
+            index.save(sidecar_path)
+        except IOError:
+            # The index still works without its sidecar, ie in a read only
+            # directory
+            pass
+        return index
+
+    def save(self, path):
+        """Writes the index to a json file"""
+        with open(path, 'w') as f:
+            json.dump({
+                'version': self.version,
+                'interval': self.interval,
+                'command_count': self.command_count,
+                'size': self.size,
+                'mtime': self.mtime,
+                'checkpoints': zip(self.commands, self.offsets, self.positions),
+                'percents': zip(self.percents, self.percent_commands,
+                                self.percent_offsets),
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        """Reads an index written by save
+
+        @return S3gIndex read
+        """
+        with open(path) as f:
+            values = json.load(f)
+        if values['version'] != cls.version:
+            raise ValueError('Unsupported index version %r' % (values['version']))
+        index = cls(values['interval'])
+        index.command_count = values['command_count']
+        index.size = values['size']
+        index.mtime = values['mtime']
+        for command_index, offset, position in values['checkpoints']:
+            index.commands.append(command_index)
+            index.offsets.append(offset)
+            index.positions.append(position)
+        for percent, command_index, offset in values['percents']:
+            index.percents.append(percent)
+            index.percent_commands.append(command_index)
+            index.percent_offsets.append(offset)
+        return index
+
+    def checkpoint(self, command_index):
+        """Finds the last checkpoint at or before a command
+
+        @param int command_index: Index of the command
+        @return (command index, byte offset, position) of the checkpoint
+        """
+        i = bisect.bisect_right(self.commands, command_index) - 1
+        return self.commands[i], self.offsets[i], list(self.positions[i])
+
+    def command_at_percent(self, percent):
+        """Finds where the build reaches a percent, assuming the percents
+        set by the file never go down
+
+        @param int percent: Build percent
+        @return Index of the first SET_BUILD_PERCENT command setting percent
+          or more, or the number of commands if there isn't one
+        """
+        i = bisect.bisect_left(self.percents, percent)
+        if i == len(self.percents):
+            return self.command_count
+        return self.percent_commands[i]
+
+    def seek(self, reader, command_index):
+        """Starts decoding a file at a command, from the nearest checkpoint
+        before it
+
+        @param FileReader reader: Reader of the indexed file
+        @param int command_index: Index of the first command to decode
+        @return (position, payloads): the machine position before the
+          command, and a generator of the payloads from the command on
+        """
+        if not 0 <= command_index <= self.command_count:
+            raise IndexError('Command %i is not in the file' % (command_index))
+        start, offset, position = self.checkpoint(command_index)
+        reader.file.seek(offset)
+        payloads = reader.iter_payloads()
+        for i in xrange(command_index - start):
+            update_position(position, payloads.next())
+        return position, payloads
+
+    def seek_percent(self, reader, percent):
+        """Starts decoding a file where the build reaches a percent, as seek
+        @return (command_index, position, payloads)
+        """
+        command_index = self.command_at_percent(percent)
+        position, payloads = self.seek(reader, command_index)
+        return command_index, position, payloads
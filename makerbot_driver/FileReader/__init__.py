@@ -1,5 +1,6 @@
-__all__ = ['FileReader', 'constants', 'errors']
+__all__ = ['FileReader', 'S3gIndex', 'constants', 'errors']
 
 from FileReader import *
+from S3gIndex import *
 from constants import *
 from errors import *
@@ -1,3 +1,5 @@
+from makerbot_driver.Encoder.CommandCodec import CommandCodec, host_action_codecs_by_opcode, slave_action_codecs_by_opcode
+
 hostFormats = {
     131: ['B', 'I', 'H'],  # "FIND AXES MINIMUMS",
     132: ['B', 'I', 'H'],  # "FIND AXES MAXIMUMS",
@@ -39,6 +41,36 @@ slaveFormats = {
     31: ['h'],  # "SET PLATFORM TEMP",
 }
 
+
+def _compile_formats(formats, codecs_by_opcode):
+    """
+    Compile the formats above into codecs.  s3g packs the temperatures
+    unsigned, and knows some tool commands these tables don't, but files
+    are still decoded as they always were; the s3g codecs are only shared
+    where they agree.
+    """
+    codecs = {}
+    for opcode, format in formats.items():
+        format = ''.join(format)
+        codec = codecs_by_opcode[opcode]
+        if codec.format != format:
+            codec = CommandCodec(codec.name, opcode, format)
+        codecs[opcode] = codec
+    return codecs
+
+# Compiled parameter layouts, keyed by opcode
+hostCodecs = _compile_formats(hostFormats, host_action_codecs_by_opcode)
+slaveCodecs = _compile_formats(slaveFormats, slave_action_codecs_by_opcode)
+
+# Layout of each command's parameters, keyed by opcode, for unpacking them
+# straight out of a buffer: (unpack_from, size, has_string)
+hostLayouts = dict((opcode, (codec.parameters.unpack_from,
+                             codec.parameters.size, codec.has_string))
+                   for opcode, codec in hostCodecs.items())
+slaveLayouts = dict((opcode, (codec.parameters.unpack_from,
+                              codec.parameters.size, codec.has_string))
+                    for opcode, codec in slaveCodecs.items())
+
 structFormats = {
     'c': 1,
     'b': 1,  # Signed
@@ -0,0 +1,267 @@
+"""
+A batch gcode to s3g/x3g compiler.
+
+GcodeCompiler is a GcodeParser whose linear moves (G1), by far the most
+common lines in a print, are handled without going through the generic
+parse/dispatch path or building any intermediate lists.  Every other line,
+and any G1 line the fast path can't handle exactly, is passed to
+GcodeParser.execute_line, so the output is byte for byte the same as
+running the file through a GcodeParser.
+"""
+from __future__ import absolute_import
+
+import math
+import threading
+
+import makerbot_driver
+
+from makerbot_driver.Encoder.CommandCodec import host_action_codecs
+from .Parser import GcodeParser
+
+
+class GcodeCompiler(GcodeParser):
+    """
+    Compiles gcode lines into s3g payloads, written to a BufferedFileWriter
+
+    In a dry run, linear moves only update the state, without calculating
+    or packing their payloads.  This is enough to find the state at any line
+    of a file much faster than compiling it.
+    """
+
+    # Codes a G1 line may have on the fast path
+    MOVE_CODES = frozenset('GXYZABEF')
+
+    def __init__(self, dry_run=False):
+        super(GcodeCompiler, self).__init__()
+        self.dry_run = dry_run
+        self._axes_profile = None
+
+    def _load_axes_values(self):
+        """
+        Cache the profile's per axis values used by every move.  The profile
+        can't change during a compile, so they are only looked up once.
+        """
+        if self._axes_profile is not self.state.profile:
+            self._max_feedrates = self.state.get_axes_values('max_feedrate')
+            self._steps_per_mm = self.state.get_axes_values('steps_per_mm')
+            self._axes_profile = self.state.profile
+
+    def compile(self, lines):
+        """
+        Execute every line of gcode, in order
+        @param iterable lines: Lines of gcode, ie a file object
+        """
+        execute_line = self.execute_line
+        for line in lines:
+            execute_line(line)
+        self.s3g.writer.flush()
+
+    def execute_line(self, command):
+        """
+        Execute a line of gcode, taking the fast path for plain linear moves
+        @param string command Gcode command to execute
+        """
+        if type(command) is str and '#' not in command and \
+                self._execute_move(command):
+            self.line_number += 1
+        else:
+            super(GcodeCompiler, self).execute_line(command)
+
+    def _parse_move(self, command):
+        """
+        Parse a G1 line with only numeric axis and feedrate codes.
+        @return dict codes, or None if the line isn't such a move
+        """
+        words = command.partition(';')[0].partition('(')[0].split()
+        if not words or words[0][0] not in 'Gg':
+            return None
+        codes = {}
+        for word in words:
+            code = word[0].upper()
+            if code not in self.MOVE_CODES or code in codes or len(word) == 1:
+                return None
+            value = word[1:]
+            try:
+                # Failing int() is slow, and can't succeed with a '.'
+                if '.' in value:
+                    codes[code] = float(value)
+                else:
+                    try:
+                        codes[code] = int(value)
+                    except ValueError:
+                        codes[code] = float(value)
+            except ValueError:
+                return None
+        if codes['G'] != 1:
+            return None
+        return codes
+
+    def _execute_move(self, command):
+        """
+        Execute a G1 line with the same arithmetic, in the same order, as
+        GcodeParser.linear_interpolation and the Utils functions it calls.
+        No state is changed until the move's payload has been packed.
+        @return True if the line was executed, False if it should go
+            through the generic path instead
+        """
+        codes = self._parse_move(command)
+        if codes is None:
+            return False
+
+        state = self.state
+        values = state.values
+        if 'E' in codes:
+            if 'A' in codes or 'B' in codes or 'tool_index' not in values:
+                return False
+        if 'F' in codes:
+            new_feedrate = codes['F']
+        elif 'feedrate' in values:
+            new_feedrate = values['feedrate']
+        else:
+            return False
+
+        # Besides G and F, any code means the machine has to move
+        if len(codes) - ('F' in codes) > 1:
+            self._load_axes_values()
+            if state.position.known != makerbot_driver.Gcode.Point.all_known:
+                return False
+            current = state.position.ToList()
+            new = [codes.get(axis, value)
+                   for axis, value in zip('XYZAB', current)]
+
+            try:
+                payload = self._pack_move(current, new, new_feedrate)
+            except Exception:
+                # Let the generic path raise, or log, the same error
+                return False
+            if payload is None:
+                # A zero length move is skipped, leaving the state untouched
+                return True
+            self.s3g.writer.send_action_payload(payload)
+
+        values['feedrate'] = new_feedrate
+        state.set_position(codes)
+        return True
+
+    def _pack_move(self, current, new, target_feedrate):
+        """
+        @return The move's payload, or None for a zero length move.  In a
+            dry run the payload is empty.
+        """
+        x0, y0, z0, a0, b0 = current
+        x1, y1, z1, a1, b1 = new
+        dx, dy, dz, da, db = displacement = (
+            x1 - x0, y1 - y0, z1 - z0, a1 - a0, b1 - b0)
+        # Squares are shared by every distance, as a - b == -(b - a)
+        px, py, pz, pa, pb = (
+            pow(dx, 2), pow(dy, 2), pow(dz, 2), pow(da, 2), pow(db, 2))
+        magnitude = pow(0 + px + py + pz + pa + pb, .5)
+        if magnitude == 0:
+            return None
+        if target_feedrate <= 0:
+            raise makerbot_driver.Gcode.InvalidFeedrateError()
+        if self.dry_run:
+            return ''
+
+        actual_feedrate = target_feedrate
+        feedrate_per_mm = float(target_feedrate) / magnitude
+        for d, max_feedrate in zip(displacement, self._max_feedrates):
+            if feedrate_per_mm * abs(d) > max_feedrate:
+                actual_feedrate = float(max_feedrate) / abs(d) * magnitude
+
+        steps_per_mm = self._steps_per_mm
+        longest_axis = 0
+        longest_steps = abs(dx * steps_per_mm[0])
+        for i in (1, 2, 3, 4):
+            steps = abs(displacement[i] * steps_per_mm[i])
+            if steps > longest_steps:
+                longest_axis = i
+                longest_steps = steps
+        fastest_feedrate = float(abs(displacement[longest_axis])) / \
+            magnitude * actual_feedrate
+        dda_speed = 60000000 / \
+            (fastest_feedrate * abs(steps_per_mm[longest_axis]))
+
+        stepped_point = (x1 * steps_per_mm[0], y1 * steps_per_mm[1],
+                         z1 * steps_per_mm[2], a1 * steps_per_mm[3],
+                         b1 * steps_per_mm[4])
+
+        e_distance = math.sqrt(0.0 + px + py + pz)
+        if e_distance == 0:
+            e_distance = max(math.sqrt(0.0 + pa), math.sqrt(0.0 + pb))
+        # Unused, but GcodeParser fails here on a zero feedrate as well
+        move_minutes = e_distance / actual_feedrate
+        feedrate_mm_sec = actual_feedrate / 60.0
+
+        if self.s3g.print_to_file_type == 'x3g':
+            payload = host_action_codecs['QUEUE_EXTENDED_POINT_ACCELERATED'].pack(
+                stepped_point[0], stepped_point[1], stepped_point[2],
+                stepped_point[3], stepped_point[4],
+                1000000.0 / float(dda_speed),
+                0,
+                float(e_distance),
+                int(feedrate_mm_sec * 64.0),
+            )
+        else:
+            payload = host_action_codecs['QUEUE_EXTENDED_POINT'].pack(
+                stepped_point[0], stepped_point[1], stepped_point[2],
+                stepped_point[3], stepped_point[4],
+                dda_speed,
+            )
+        return payload
+
+
+def compile_gcode(infile, outfile, profile, print_to_file_type='s3g',
+                  environment=None, build_name=None, processes=1):
+    """
+    Compile a gcode file into an s3g or x3g file.  The output is identical
+    to executing every line with a GcodeParser whose s3g writes to a
+    FileWriter.  With more than one process, the file is compiled in
+    parallel by compile_gcode_parallel.
+
+    @param infile: Path of the gcode file, or an iterable of gcode lines
+    @param outfile: Path of the s3g file to write, or a file object opened
+        in binary mode, or an in memory file without a mode, ie io.BytesIO
+    @param profile: Profile of the machine, or the name of one
+    @param str print_to_file_type: 's3g' or 'x3g'
+    @param dict environment: Variables substituted into the gcode
+    @param str build_name: Name sent in build start notifications
+    @param int processes: Number of processes to compile with, or None for
+        one per cpu
+    @return GcodeCompiler used, holding the state at the end of the file
+    """
+    if processes != 1:
+        return makerbot_driver.Gcode.compile_gcode_parallel(
+            infile, outfile, profile, print_to_file_type, environment,
+            build_name, processes)
+
+    if isinstance(profile, basestring):
+        profile = makerbot_driver.Profile(profile)
+
+    compiler = GcodeCompiler()
+    compiler.state.profile = profile
+    if build_name is not None:
+        compiler.state.values['build_name'] = build_name
+    if environment:
+        compiler.environment.update(environment)
+
+    close_outfile = isinstance(outfile, basestring)
+    if close_outfile:
+        outfile = open(outfile, 'wb')
+    compiler.s3g = makerbot_driver.s3g()
+    compiler.s3g.set_print_to_file_type(print_to_file_type)
+    compiler.s3g.writer = makerbot_driver.Writer.BufferedFileWriter(
+        outfile, threading.Condition())
+
+    try:
+        if isinstance(infile, basestring):
+            with open(infile) as f:
+                compiler.compile(f)
+        else:
+            compiler.compile(infile)
+    finally:
+        if close_outfile:
+            compiler.s3g.writer.close()
+        else:
+            compiler.s3g.writer.flush()
+    return compiler
@@ -0,0 +1,202 @@
+"""
+Gcode to s3g/x3g compilation spread across several processes.
+
+A GcodeParser's output for a line depends on the state left by every line
+before it, so a file can't simply be cut into pieces and compiled
+independently.  Instead a dry run of the whole file records a
+GcodeCheckpoint, a copy of the parser's state, at layer boundaries.  Each
+chunk between two checkpoints is then compiled in a worker process starting
+from its checkpoint, and the chunks' outputs are concatenated in order,
+giving the same bytes as compiling the file serially.
+"""
+from __future__ import absolute_import
+
+import itertools
+import multiprocessing
+import tempfile
+import threading
+
+import makerbot_driver
+
+from .Compiler import GcodeCompiler
+
+
+class GcodeCheckpoint(object):
+    """
+    A picklable copy of the state of a GcodeParser between two lines
+    """
+
+    def __init__(self, parser):
+        """
+        @param GcodeParser parser: Parser to copy the state of
+        """
+        self.position = parser.state.position.ToList()
+        self.values = dict(parser.state.values)
+        self.percentage = parser.state.percentage
+        self.line_number = parser.line_number
+
+    def restore(self, parser):
+        """
+        Set a parser's state to the state copied in this checkpoint
+        @param GcodeParser parser: Parser to restore the state of
+        """
+        parser.state.position.SetList(self.position)
+        parser.state.values = dict(self.values)
+        parser.state.percentage = self.percentage
+        parser.line_number = self.line_number
+
+
+def _create_compiler(profile, print_to_file_type, environment, output,
+                     dry_run=False):
+    compiler = GcodeCompiler(dry_run)
+    compiler.state.profile = profile
+    if environment:
+        compiler.environment.update(environment)
+    compiler.s3g = makerbot_driver.s3g()
+    compiler.s3g.set_print_to_file_type(print_to_file_type)
+    if output is None:
+        compiler.s3g.writer = makerbot_driver.Writer.NullWriter()
+    else:
+        compiler.s3g.writer = makerbot_driver.Writer.BufferedFileWriter(
+            output, threading.Condition())
+    return compiler
+
+
+def find_checkpoints(lines, profile, print_to_file_type='s3g',
+                     environment=None, build_name=None, chunk_size=10000):
+    """
+    Dry run a list of gcode lines, recording a checkpoint at the start of
+    the first layer after every chunk_size lines.  Raises the same errors
+    compiling the lines would, except for a few only found when packing
+    a move.
+
+    @param list lines: Lines of gcode
+    @param int chunk_size: Minimum number of lines between checkpoints
+    @return (checkpoints, compiler): a list of (line index, GcodeCheckpoint)
+        tuples, starting with line 0, and the compiler used, holding the
+        state at the end of the file
+    """
+    compiler = _create_compiler(
+        profile, print_to_file_type, environment, None, dry_run=True)
+    if build_name is not None:
+        compiler.state.values['build_name'] = build_name
+    checkpoints = [(0, GcodeCheckpoint(compiler))]
+    next_checkpoint = chunk_size
+    position = compiler.state.position
+    execute_line = compiler.execute_line
+    for index, line in enumerate(lines):
+        z = position.Z
+        execute_line(line)
+        # A new layer starts once the Z axis has moved
+        if index + 1 >= next_checkpoint and position.Z != z and \
+                index + 1 < len(lines):
+            checkpoints.append((index + 1, GcodeCheckpoint(compiler)))
+            next_checkpoint = index + 1 + chunk_size
+    return checkpoints, compiler
+
+
+def compile_chunk(lines, checkpoint, profile, print_to_file_type='s3g',
+                  environment=None):
+    """
+    Compile a chunk of gcode lines, starting from a checkpoint
+    @param list lines: Lines of gcode, starting at the checkpoint
+    @param GcodeCheckpoint checkpoint: State before the first line
+    @return str s3g payloads of the chunk
+    """
+    output = tempfile.TemporaryFile('w+b')
+    try:
+        compiler = _create_compiler(
+            profile, print_to_file_type, environment, output)
+        checkpoint.restore(compiler)
+        compiler.compile(lines)
+        output.seek(0)
+        return output.read()
+    finally:
+        output.close()
+
+
+# Set in each worker process by _init_worker
+_worker_args = None
+
+
+def _init_worker(lines, profile, print_to_file_type, environment):
+    global _worker_args
+    _worker_args = (lines, profile, print_to_file_type, environment)
+
+
+def _compile_worker_chunk(chunk):
+    """
+    @return s3g payloads of the chunk, or None if compiling it failed.  The
+        chunk is then compiled again by the parent process, to raise the
+        error there with all of its details.
+    """
+    start, stop, checkpoint = chunk
+    lines, profile, print_to_file_type, environment = _worker_args
+    try:
+        return compile_chunk(lines[start:stop], checkpoint, profile,
+                             print_to_file_type, environment)
+    except Exception:
+        return None
+
+
+def compile_gcode_parallel(infile, outfile, profile, print_to_file_type='s3g',
+                           environment=None, build_name=None, processes=None,
+                           chunk_size=10000):
+    """
+    Compile a gcode file into an s3g or x3g file using several processes.
+    The output is identical to compile_gcode's.
+
+    The lines are handed to the worker processes when they start, which
+    relies on them being forked, as they are on posix systems.
+
+    @param infile: Path of the gcode file, or an iterable of gcode lines
+    @param outfile: Path of the s3g file to write, or a file object opened
+        in binary mode, or an in memory file without a mode, ie io.BytesIO
+    @param profile: Profile of the machine, or the name of one
+    @param str print_to_file_type: 's3g' or 'x3g'
+    @param dict environment: Variables substituted into the gcode
+    @param str build_name: Name sent in build start notifications
+    @param int processes: Number of worker processes, by default one per cpu
+    @param int chunk_size: Minimum number of lines compiled by each worker
+        at a time
+    @return GcodeCompiler used for the dry run, holding the state at the
+        end of the file
+    """
+    if isinstance(profile, basestring):
+        profile = makerbot_driver.Profile(profile)
+    if isinstance(infile, basestring):
+        with open(infile) as f:
+            lines = list(f)
+    else:
+        lines = list(infile)
+
+    checkpoints, compiler = find_checkpoints(
+        lines, profile, print_to_file_type, environment, build_name,
+        chunk_size)
+    stops = [index for index, checkpoint in checkpoints[1:]] + [len(lines)]
+    chunks = [(start, stop, checkpoint) for (start, checkpoint), stop
+              in zip(checkpoints, stops)]
+
+    close_outfile = isinstance(outfile, basestring)
+    if close_outfile:
+        outfile = open(outfile, 'wb')
+    pool = multiprocessing.Pool(
+        processes, _init_worker,
+        (lines, profile, print_to_file_type, environment))
+    try:
+        for chunk, data in itertools.izip(
+                chunks, pool.imap(_compile_worker_chunk, chunks)):
+            if data is None:
+                start, stop, checkpoint = chunk
+                data = compile_chunk(lines[start:stop], checkpoint, profile,
+                                     print_to_file_type, environment)
+            outfile.write(data)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        if close_outfile:
+            outfile.close()
+        else:
+            outfile.flush()
+    return compiler
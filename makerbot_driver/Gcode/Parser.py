@@ -71,7 +71,7 @@ class GcodeParser(object):
             if 'G' in codes:
                 if codes['G'] in self.GCODE_INSTRUCTIONS:
                     makerbot_driver.Gcode.check_for_extraneous_codes(
-                        codes.keys(), self.GCODE_INSTRUCTIONS[codes['G']][1])
+                        codes, self.GCODE_INSTRUCTIONS[codes['G']][1])
                     makerbot_driver.Gcode.check_for_extraneous_codes(
                         flags, self.GCODE_INSTRUCTIONS[codes['G']][2])
                     self.GCODE_INSTRUCTIONS[codes['G']
@@ -86,7 +86,7 @@ class GcodeParser(object):
             elif 'M' in codes:
                 if codes['M'] in self.MCODE_INSTRUCTIONS:
                     makerbot_driver.Gcode.check_for_extraneous_codes(
-                        codes.keys(), self.MCODE_INSTRUCTIONS[codes['M']][1])
+                        codes, self.MCODE_INSTRUCTIONS[codes['M']][1])
                     makerbot_driver.Gcode.check_for_extraneous_codes(
                         flags, self.MCODE_INSTRUCTIONS[codes['M']][2])
                     self.MCODE_INSTRUCTIONS[codes['M']
@@ -308,9 +308,9 @@ class GcodeParser(object):
                 raise makerbot_driver.Gcode.NoFeedrateSpecifiedError
             if len(makerbot_driver.Gcode.parse_out_axes(codes)) > 0 or 'E' in codes:
                 current_position = self.state.get_position()
-                new_position = self.state.position.copy() 
-                new_position.SetPoint(codes)
-                new_position = new_position.ToList()
+                new_point = self.state.position.copy()
+                new_point.SetPoint(codes)
+                new_position = new_point.ToList()
                 dda_speed = makerbot_driver.Gcode.calculate_DDA_speed(
                     current_position,
                     new_position,
@@ -330,10 +330,7 @@ class GcodeParser(object):
                         makerbot_driver.Gcode.Utils.calculate_euclidean_distance([current_position[3]], [new_position[3]]),
                         makerbot_driver.Gcode.Utils.calculate_euclidean_distance([current_position[4]], [new_position[4]]),
                     )
-                displacement_vector = makerbot_driver.Gcode.calculate_vector_difference(
-                    new_position,
-                    current_position,
-                )
+                displacement_vector = new_point.Difference(self.state.position)
                 safe_feedrate_mm_min = makerbot_driver.Gcode.get_safe_feedrate(
                     displacement_vector,
                     self.state.get_axes_values('max_feedrate'),
@@ -4,20 +4,74 @@ contained within GcodeState.  Since it is intended to only
 be used with the Gcode Module, it assumes that its axes values
 will only be set to integer values.  Gcode parser should only
 be settings these values to ints anyway.
+
+The axes values are kept in one list, in XYZAB order, so the whole point
+can be copied or compared at once, along with a bitmask of the axes whose
+positions are known (not None).  Values are stored as given, rather than
+in an array('d'), since an axis can be None and ints have to stay ints
+for the s3g payloads to come out the same.
 """
 
 
+def _axis_property(index):
+    bit = 1 << index
+
+    def get_axis(self):
+        return self._values[index]
+
+    def set_axis(self, value):
+        self._values[index] = value
+        if value is None:
+            self.known &= ~bit
+        else:
+            self.known |= bit
+
+    return property(get_axis, set_axis)
+
+
 class Point(object):
 
+    __slots__ = ['_values', 'known']
+
+    axes = ['X', 'Y', 'Z', 'A', 'B']
+    # Value of known when every axis is known
+    all_known = (1 << len(axes)) - 1
+
+    X = _axis_property(0)
+    Y = _axis_property(1)
+    Z = _axis_property(2)
+    A = _axis_property(3)
+    B = _axis_property(4)
+
     def __init__(self):
-        self.X = None
-        self.Y = None
-        self.Z = None
-        self.A = None
-        self.B = None
+        self._values = [None, None, None, None, None]
+        # Bit i is set when the position of axes[i] is known
+        self.known = 0
+
+    def __getstate__(self):
+        return self._values
+
+    def __setstate__(self, values):
+        self._values = []
+        self.known = 0
+        self.SetList(values)
 
     def ToList(self):
-        return [self.X, self.Y, self.Z, self.A, self.B]
+        return list(self._values)
+
+    def SetList(self, values):
+        """Sets all five axes at once
+
+        @param list values: Axes values in XYZAB order, None for unknown axes
+        """
+        self._values[:] = values
+        known = 0
+        bit = 1
+        for value in self._values:
+            if value is not None:
+                known |= bit
+            bit <<= 1
+        self.known = known
 
     def SetPoint(self, codes):
         """Given a set of codes with defined values, sets this point's
@@ -25,12 +79,29 @@ class Point(object):
 
         @param dict codes: The codes that may or may not contain axes values
         """
-        for axis in ['X', 'Y', 'Z', 'A', 'B']:
+        values = self._values
+        known = self.known
+        bit = 1
+        for index, axis in enumerate(self.axes):
             if axis in codes:
-                setattr(self, axis, codes[axis])
+                value = values[index] = codes[axis]
+                if value is None:
+                    known &= ~bit
+                else:
+                    known |= bit
+            bit <<= 1
+        self.known = known
+
+    def Difference(self, other):
+        """Calculates the displacement from another point to this one
+
+        @param Point other: Point to subtract from this one
+        @return list difference: self - other, for each axis
+        """
+        return [m - s for m, s in zip(self._values, other._values)]
 
     def copy(self):
         copy_point = Point()
-        for axis in ['X', 'Y', 'Z', 'A', 'B']:
-            setattr(copy_point, axis, getattr(self, axis))
+        copy_point._values[:] = self._values
+        copy_point.known = self.known
         return copy_point
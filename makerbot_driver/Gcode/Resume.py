@@ -0,0 +1,215 @@
+"""
+Resuming a print part way through its gcode.
+
+When a print streamed to a machine dies, find_resume_point runs the gcode
+before the line it should carry on from through a dry run GcodeCompiler,
+whose payloads are thrown away by a NullWriter, to find the state the
+machine was in at that line: the position of each axis, the feedrate, the
+tool in use and the temperature each heater was last set to.  The
+GcodeResumePoint it returns holds that state, and the gcode that brings a
+homed machine back into it, after which the rest of the file is streamed
+as usual.
+"""
+from __future__ import absolute_import
+
+import itertools
+
+import makerbot_driver
+
+from .Compiler import GcodeCompiler
+from .ParallelCompiler import GcodeCheckpoint
+
+
+class ResumeScanner(GcodeCompiler):
+    """
+    A dry run GcodeCompiler that also records the temperatures and extra
+    outputs the gcode sets, which aren't part of a GcodeParser's state
+    """
+
+    def __init__(self):
+        super(ResumeScanner, self).__init__(dry_run=True)
+        self.toolhead_temperatures = {}
+        self.platform_temperatures = {}
+        self.extra_outputs = {}
+
+    def set_toolhead_temperature(self, codes, flags, comment):
+        super(ResumeScanner, self).set_toolhead_temperature(
+            codes, flags, comment)
+        index = self.state.values['last_toolhead_index']
+        self.toolhead_temperatures[index] = codes['S']
+
+    def set_platform_temperature(self, codes, flags, comment):
+        super(ResumeScanner, self).set_platform_temperature(
+            codes, flags, comment)
+        index = self.state.values['last_platform_index']
+        self.platform_temperatures[index] = codes['S']
+
+    def enable_extra_output(self, codes, flags, comment):
+        super(ResumeScanner, self).enable_extra_output(codes, flags, comment)
+        self.extra_outputs[self.state.values['last_extra_index']] = True
+
+    def disable_extra_output(self, codes, flags, comment):
+        super(ResumeScanner, self).disable_extra_output(codes, flags, comment)
+        self.extra_outputs[self.state.values['last_extra_index']] = False
+
+
+class GcodeResumePoint(GcodeCheckpoint):
+    """
+    The state of a GcodeParser before some line of a gcode file, with the
+    heater and extra output settings made by the lines before it
+    """
+
+    def __init__(self, scanner, offset):
+        """
+        @param ResumeScanner scanner: Scanner that has run every line before
+            the resume point
+        @param int offset: Byte offset of the line to resume at
+        """
+        super(GcodeResumePoint, self).__init__(scanner)
+        self.offset = offset
+        self.toolhead_temperatures = dict(scanner.toolhead_temperatures)
+        self.platform_temperatures = dict(scanner.platform_temperatures)
+        self.extra_outputs = dict(scanner.extra_outputs)
+
+    def preamble(self, lift=5.0, feedrate=3000, z_feedrate=1000):
+        """
+        Gcode that brings a machine, once it has been homed and its position
+        is known, into the state at the resume point.  The heaters are set
+        and waited for, the tool is changed, the extruder axes are set with a
+        G92, and the toolhead is moved to the resume position from above it,
+        so it doesn't drag across the part.  Axes whose position isn't known
+        at the resume point are left where they are; the gcode after it has
+        to find them anyway.
+
+        @param float lift: Distance above the resume position, in mm, the
+            toolhead travels at
+        @param feedrate: Feedrate of the X and Y travel move, in mm/min
+        @param z_feedrate: Feedrate of the Z moves, in mm/min
+        @return list lines: Lines of gcode
+        """
+        lines = []
+        for index, temperature in sorted(self.platform_temperatures.items()):
+            lines.append('M109 S%r T%i\n' % (temperature, index))
+        for index, temperature in sorted(self.toolhead_temperatures.items()):
+            lines.append('M104 S%r T%i\n' % (temperature, index))
+        for index, temperature in sorted(self.platform_temperatures.items()):
+            if temperature > 0:
+                lines.append('M134 T%i\n' % (index))
+        for index, temperature in sorted(self.toolhead_temperatures.items()):
+            if temperature > 0:
+                lines.append('M133 T%i\n' % (index))
+        if 'tool_index' in self.values:
+            lines.append('M135 T%i\n' % (self.values['tool_index']))
+        for index, enabled in sorted(self.extra_outputs.items()):
+            if enabled:
+                lines.append('M126 T%i\n' % (index))
+
+        x, y, z, a, b = self.position
+        extruder_axes = ''.join(
+            ' %s%r' % (axis, value) for axis, value in (('A', a), ('B', b))
+            if value is not None)
+        if extruder_axes:
+            lines.append('G92%s\n' % (extruder_axes))
+        if z is not None:
+            lines.append('G1 Z%r F%r\n' % (z + lift, z_feedrate))
+        if x is not None and y is not None:
+            lines.append('G1 X%r Y%r F%r\n' % (x, y, feedrate))
+        if z is not None:
+            lines.append('G1 Z%r F%r\n' % (z, z_feedrate))
+        if 'feedrate' in self.values:
+            lines.append('G1 F%r\n' % (self.values['feedrate']))
+        return lines
+
+    def remaining_lines(self, gcode_file):
+        """
+        Iterate over the lines of a gcode file from the resume point on
+        @param gcode_file: Path of the gcode file, a file object opened on
+            it, or the same lines of gcode the resume point was found in
+        """
+        if isinstance(gcode_file, basestring):
+            with open(gcode_file) as f:
+                f.seek(self.offset)
+                for line in f:
+                    yield line
+        elif hasattr(gcode_file, 'seek'):
+            gcode_file.seek(self.offset)
+            for line in gcode_file:
+                yield line
+        else:
+            for line in itertools.islice(
+                    gcode_file, self.line_number - 1, None):
+                yield line
+
+    def resume_gcode(self, parser, gcode_file, **preamble_args):
+        """
+        Iterate over the preamble, followed by the lines of a gcode file from
+        the resume point on, to be executed one by one by a parser.  Once
+        the preamble has been executed, ie when the first line after it is
+        asked for, the parser's state is restored to the resume point's, so
+        line numbers and build percentages carry on from where the print
+        stopped.
+
+        @param GcodeParser parser: Parser the lines are executed by
+        @param gcode_file: Gcode, as taken by remaining_lines
+        @param preamble_args: Keyword arguments passed to preamble
+        """
+        for line in self.preamble(**preamble_args):
+            yield line
+        self.restore(parser)
+        for line in self.remaining_lines(gcode_file):
+            yield line
+
+
+def find_resume_point(gcode_file, profile, line_number=None, offset=None,
+                      environment=None, build_name=None):
+    """
+    Fast forward through a gcode file, without sending anything anywhere, to
+    find the state at the line a print should resume from.  Exactly one of
+    line_number and offset has to be given.
+
+    @param gcode_file: Path of the gcode file, or an iterable of gcode lines
+    @param profile: Profile of the machine, or the name of one
+    @param int line_number: Number of the line to resume at, the first line
+        being line 1, as in GcodeParser.line_number
+    @param int offset: Byte offset in the file to resume at.  The print
+        resumes at the start of the line the offset is in.
+    @param dict environment: Variables substituted into the gcode
+    @param str build_name: Name sent in build start notifications
+    @return GcodeResumePoint resume_point: State before the resumed line.  If
+        the file ends before it, the state at the end of the file.
+    """
+    if (line_number is None) == (offset is None):
+        raise ValueError('Exactly one of line_number and offset is needed')
+    if isinstance(profile, basestring):
+        profile = makerbot_driver.Profile(profile)
+
+    scanner = ResumeScanner()
+    scanner.state.profile = profile
+    if build_name is not None:
+        scanner.state.values['build_name'] = build_name
+    if environment:
+        scanner.environment.update(environment)
+    scanner.s3g = makerbot_driver.s3g()
+    scanner.s3g.writer = makerbot_driver.Writer.NullWriter()
+
+    close_file = isinstance(gcode_file, basestring)
+    if close_file:
+        gcode_file = open(gcode_file)
+    try:
+        execute_line = scanner.execute_line
+        position = 0
+        if line_number is not None:
+            for line in itertools.islice(gcode_file, max(line_number - 1, 0)):
+                execute_line(line)
+                position += len(line)
+        else:
+            for line in gcode_file:
+                end = position + len(line)
+                if end > offset:
+                    break
+                execute_line(line)
+                position = end
+    finally:
+        if close_file:
+            gcode_file.close()
+    return GcodeResumePoint(scanner, position)
@@ -24,6 +24,16 @@ class GcodeStates(object):
         self.wait_for_ready_timeout = 600  # seconds
         self.percentage = 0
 
+    @property
+    def profile(self):
+        return self._profile
+
+    @profile.setter
+    def profile(self, profile):
+        self._profile = profile
+        # Per axis values, by key, cached for this profile
+        self._axes_values = {}
+
     def lose_position(self, axes):
         """Given a set of axes, loses the position of
         those axes.
@@ -38,12 +48,13 @@ class GcodeStates(object):
         """Gets a usable position in steps to send to the machine
         @return list position: The current position of the machine in steps
         """
-        #Check each axis first, since we need to report a bad axis if needed
-        for axis in ['X', 'Y', 'Z', 'A', 'B']:
-            if getattr(self.position, axis) is None:
-                gcode_error = makerbot_driver.Gcode.UnspecifiedAxisLocationError()
-                gcode_error.values['UnspecifiedAxis'] = axis
-                raise gcode_error
+        #Check the axes first, since we need to report a bad axis if needed
+        if self.position.known != makerbot_driver.Gcode.Point.all_known:
+            for index, axis in enumerate(makerbot_driver.Gcode.Point.axes):
+                if not self.position.known & 1 << index:
+                    gcode_error = makerbot_driver.Gcode.UnspecifiedAxisLocationError()
+                    gcode_error.values['UnspecifiedAxis'] = axis
+                    raise gcode_error
 
         return_position = self.position.ToList()
 
@@ -93,18 +104,25 @@ class GcodeStates(object):
         X, Y, Z, A, B.  For compatability issues, if one of these axes is
         not present in the profile, we add a 0 for that value.
 
+        The values are looked up once per key and cached until a new
+        profile is assigned, so changes made to the profile's values in
+        place aren't seen until it is assigned again.
+
         @param string key: The information we want to get from each axis
         @return list: List of information retrieved from each axis attached to
             a profile.
         """
-        axes = ['X', 'Y', 'Z', 'A', 'B']
-        values = []
-        for axis in axes:
-            if axis in self.profile.values['axes']:
-                values.append(self.profile.values['axes'][axis][key])
-            else:
-                values.append(0)
-        return values
+        values = self._axes_values.get(key)
+        if values is None:
+            axes = ['X', 'Y', 'Z', 'A', 'B']
+            values = []
+            for axis in axes:
+                if axis in self.profile.values['axes']:
+                    values.append(self.profile.values['axes'][axis][key])
+                else:
+                    values.append(0)
+            self._axes_values[key] = values
+        return list(values)
 
     def get_axes_feedrate_and_SPM(self, axes):
         """
@@ -1,6 +1,6 @@
 from __future__ import absolute_import
-import exceptions
 import math
+import string
 
 import makerbot_driver
 
@@ -22,6 +22,21 @@ def extract_comments(line):
     return command, unified_comment
 
 
+# Gcode letters, in either case, and their uppercase codes
+_code_letters = dict(
+    [(letter, letter) for letter in string.ascii_uppercase] +
+    [(letter, letter.upper()) for letter in string.ascii_lowercase])
+
+# A bit for each code letter, used to check codes against allowed codes
+_code_bits = dict(
+    (letter, 1 << i) for i, letter in enumerate(string.ascii_uppercase))
+# Set for any code that isn't an uppercase letter, which no mask allows
+_unknown_code_bit = 1 << len(_code_bits)
+
+# Masks of allowed codes, by the allowed codes string
+_allowed_code_masks = {}
+
+
 def parse_command(command):
     """
     Parse the command portion of a gcode line, and return a dictionary of found codes and their respective values, and a list of found flags. Codes with integer values will have an integer type, while codes with float values will have a float type
@@ -31,28 +46,27 @@ def parse_command(command):
     codes = {}
     flags = []
 
-    pairs = command.split()
-    for pair in pairs:
-        code = pair[0]
-
-        # If the code is not a letter, this is an error.
-        if not code.isalpha():
-            gcode_error = makerbot_driver.Gcode.InvalidCodeError()
-            gcode_error.values['InvalidCode'] = code
-            raise gcode_error
-
+    for pair in command.split():
         # Force the code to be uppercase.
-        code = code.upper()
+        code = _code_letters.get(pair[0])
+        if code is None:
+            code = pair[0]
+            # If the code is not a letter, this is an error.
+            if not code.isalpha():
+                gcode_error = makerbot_driver.Gcode.InvalidCodeError()
+                gcode_error.values['InvalidCode'] = code
+                raise gcode_error
+            code = code.upper()
 
         # If the code already exists, this is an error.
-        if code in codes.keys():
+        if code in codes:
             gcode_error = makerbot_driver.Gcode.RepeatCodeError()
             gcode_error.values['RepeatedCode'] = code
             raise gcode_error
 
         # Don't allow both G and M codes in the same line
-        if (code == 'G' and 'M' in codes.keys()) or \
-           (code == 'M' and 'G' in codes.keys()):
+        if (code == 'G' and 'M' in codes) or \
+           (code == 'M' and 'G' in codes):
             raise makerbot_driver.Gcode.MultipleCommandCodeError()
 
         # If the code doesn't have a value, we consider it a flag, and set it to true.
@@ -60,10 +74,14 @@ def parse_command(command):
             flags.append(code)
 
         else:
-            try:
-                codes[code] = int(pair[1:])
-            except exceptions.ValueError:
-                codes[code] = float(pair[1:])
+            # Values int() accepts are parsed as ints, anything else as a
+            # float, which raises a ValueError for garbage.
+            value = pair[1:]
+            if value.isdigit() or \
+                    (value[0] in '+-' and value[1:].isdigit()):
+                codes[code] = int(value)
+            else:
+                codes[code] = float(value)
 
     return codes, flags
 
@@ -81,24 +99,39 @@ def parse_line(line):
     return codes, flags, comment
 
 
+def code_mask(codes):
+    """
+    Given some gcode letters, returns an int with a bit set for each one.
+    Anything other than an uppercase letter sets the same extra bit.
+
+    @param iterable codes: Code letters, ie a dict of parsed codes or a str
+    @return int mask
+    """
+    mask = 0
+    for code in codes:
+        mask |= _code_bits.get(code, _unknown_code_bit)
+    return mask
+
+
 def check_for_extraneous_codes(codes, allowed_codes):
     """ Check that all of the codes are expected for this command.
 
     Throws an InvalidCodeError if an unexpected code was found
     @param list codes: list of codes to check
-    @param list allowed_codes: list of allowed codes
+    @param str allowed_codes: allowed codes, besides G and M
     """
-    #TODO Change the way we add in G and M commands.  Its kinda...bad?
-    allowed_codes += "GM"
-    difference = set(codes) - set(allowed_codes)
-
-    if len(difference) > 0:
-        badCodes = ''  # TODO: can this be stringified in a more straightforward manner?
-        for code in difference:
-            badCodes += code
-        gcode_error = makerbot_driver.Gcode.InvalidCodeError()
-        gcode_error.values['InvalidCodes'] = code
-        raise gcode_error
+    allowed_mask = _allowed_code_masks.get(allowed_codes)
+    if allowed_mask is None:
+        allowed_mask = code_mask(allowed_codes + 'GM') & ~_unknown_code_bit
+        _allowed_code_masks[allowed_codes] = allowed_mask
+
+    if code_mask(codes) & ~allowed_mask:
+        # Anything besides uppercase letters is compared exactly
+        difference = set(codes) - set(allowed_codes + 'GM')
+        if len(difference) > 0:
+            gcode_error = makerbot_driver.Gcode.InvalidCodeError()
+            gcode_error.values['InvalidCodes'] = ''.join(sorted(difference))
+            raise gcode_error
 
 
 def parse_out_axes(codes):
@@ -1,4 +1,4 @@
-__all__ = ['Parser', 'State', 'LegacyStates', 'Utils', 'Point', 'errors', 'FileComplete']
+__all__ = ['Parser', 'State', 'LegacyStates', 'Utils', 'Point', 'errors', 'FileComplete', 'Compiler', 'ParallelCompiler', 'Resume']
 
 from Parser import *
 from States import *
@@ -7,3 +7,6 @@ from Utils import *
 from Point import *
 from errors import *
 from FileComplete import *
+from Compiler import *
+from ParallelCompiler import *
+from Resume import *
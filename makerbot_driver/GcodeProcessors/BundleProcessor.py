@@ -1,6 +1,7 @@
 import re
 import inspect
 
+from .Processor import GcodeStream
 from .LineTransformProcessor import LineTransformProcessor
 from .ProgressProcessor import ProgressProcessor
 
@@ -13,8 +14,6 @@ class BundleProcessor(LineTransformProcessor):
         self.code_map = {}
         self.progress_processor = ProgressProcessor()
         self.do_progress = True
-        # Held here for testing purposes
-        self._super_process_gcode = super(BundleProcessor, self).process_gcode
 
     def collate_codemaps(self):
         transform_code = "_transform_"
@@ -23,36 +22,67 @@ class BundleProcessor(LineTransformProcessor):
                 self.code_map.update(processor.code_map)
 
     def process_gcode(self, gcodes, callback=None):
+        """ Runs the bundled processors' transforms over a list of gcode
+        and, if do_progress is set, inserts a progress update after each
+        line that moves the percent of input lines processed up
+        @param gcodes A gcode file
+        @param callback for progress, expects 0-100 as percent 'done'
+        @return A new gcode list
+        """
+        return list(self.iter_process_gcode(
+            GcodeStream.from_list(gcodes), callback))
+
+    def iter_process_gcode(self, gcodes, callback=None):
+        """ Lazily runs the bundled processors' transforms and, if
+        do_progress is set, inserts progress updates in the same pass,
+        by the percent of the input read
+        @param gcodes GcodeStream, or an iterable of gcode lines, whose
+            size must be known to insert progress updates
+        @param callback for progress, expects 0-100 as percent 'done'
+        @return GcodeStream of processed lines
+        """
+        stream = GcodeStream.wrap(gcodes)
+        if self.do_progress and stream.progress_source().size is None:
+            raise ValueError(
+                "Progress can't be calculated for gcode of unknown size")
         self.collate_codemaps()
-        new_callback = None
-        progress_callback = None
-        if self.do_progress is False:
-            new_callback = callback
-        elif callback is not None:
-            self.callback = callback
-            new_callback = self.new_callback
-            progress_callback = self.progress_callback
-        output = self._super_process_gcode(gcodes, new_callback)
-        if self.do_progress:
-            output = self.progress_processor.process_gcode(
-                output, progress_callback)
-        return output
+        return stream.derive(self._iter_bundle(stream, callback))
+
+    def _iter_bundle(self, stream, callback):
+        self._compile_code_map()
+        transform_line = self._transform_line
+        create_progress_msg = self.progress_processor.create_progress_msg
+        current_percent = 0
+        progress_percent = 0
+        # The last update, held back until another line is kept, so that
+        # removed lines never leave two updates in a row
+        held = None
+        for code in stream:
+            tcode = transform_line(code)
+            if tcode and held is not None:
+                yield held
+                held = None
+            for line in tcode:
+                yield line
+            # Reading the flag is atomic; only lock once it's set
+            if self._external_stop:
+                self.test_for_external_stop()
+            percent = stream.percent()
+            if percent > current_percent:
+                current_percent = percent
+                if callback is not None:
+                    callback(percent)
+            # Updates only follow lines that are kept
+            if self.do_progress and tcode and \
+                    current_percent > progress_percent:
+                progress_percent = current_percent
+                held = create_progress_msg(progress_percent)
+        # The final update takes the place of one still held back
+        if self.do_progress and (held is not None or
+                                 current_percent > progress_percent):
+            yield create_progress_msg(current_percent)
 
     def set_external_stop(self, value=True):
         super(BundleProcessor, self).set_external_stop(value)
         with self._condition:
             self.progress_processor.set_external_stop(value)
-
-    def new_callback(self, percent):
-        """
-        Since we do two passes with percent, we only want the
-        first percent to go up to 50.
-        """
-        self.callback(percent / 2)
-
-    def progress_callback(self, percent):
-        """
-        Since we do two passes with percent, we want the
-        second percent to go up to 100
-        """
-        self.callback(50 + percent / 2)
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import re
 
 from . import Processor
+from .Processor import MappedGcodeFile
 import makerbot_driver
 
 class EmptyLayerProcessor(Processor):
@@ -15,6 +16,7 @@ class EmptyLayerProcessor(Processor):
         self.move_gcode = re.compile("^G1 .*")
         self.SF_layer_end = re.compile("^\(</layer>\)")
         self.empty_line = re.compile("^\\n")
+        self.output_buffer_size = 1 << 16
 
 
     def process_gcode(self, gcode_in, outfile = None):
@@ -25,76 +27,70 @@ class EmptyLayerProcessor(Processor):
 
 
     def process_gcode_file(self, gcode_file_path, output_file_path,callback=None): 
-    #process gcode from a file, and output to a file     
-        self.code_index = 0
-        self.gcodes = self.index_file(gcode_file_path)
+    #process gcode from a file, and output to a file
+        with MappedGcodeFile(gcode_file_path) as gcode_file:
+            with open(output_file_path, 'w', self.output_buffer_size) as output_fp:
+                self._remove_empty_layers(gcode_file, output_fp.write)
+        return True
 
-        self.max_index = (len(self.gcodes)-1) 
 
-        self.gcode_fp = open(gcode_file_path, 'r')
-        self.output_fp = open(output_file_path, 'w')
-        print(str(self.output_fp))
+    def process_gcode_list(self, gcodes, callback=None):
+    #This processes gcode in the form of a list of gcodes, and the processed gcode is returned
+        self.output = []
+        self._remove_empty_layers(gcodes, self.output.append)
+        return self.output
 
-        while(self.code_index <= self.max_index):
 
-            self.gcode_fp.seek(self.gcodes[self.code_index])
-            current_code = self.gcode_fp.readline()
-            self.match = re.match(self.layer_start, current_code)
+    def _remove_empty_layers(self, gcodes, write):
+    #Passes every line of gcodes, a list or MappedGcodeFile, that isn't part of an empty layer to write
+        self.gcodes = gcodes
+        self.max_index = (len(self.gcodes)-1)
+        self.code_index = 0
+
+        while(self.code_index <= self.max_index):
+            #lines up to the next layer start are always kept
+            layer_index = self._next_layer_start(self.code_index)
+            self._copy_lines(self.code_index, layer_index, write)
+            self.code_index = layer_index
+            if(self.code_index > self.max_index):
+                break
+            current_code = self.gcodes[self.code_index]
+            self.match = self.layer_start.match(current_code)
             if self.match is not None:
-                print self.match.group()
                 if self.match.group(1) == '<layer>':
                     self.is_empty, new_code_index = self._layer_test_if_empty(slicer='SF')
                 elif self.match.group(1) == 'Slice':
                     self.is_empty, new_code_index = self._layer_test_if_empty(slicer='MG')
-                #layer_test_if_empty alters the seeked location so reseek current offset
-                self.gcode_fp.seek(self.gcodes[self.code_index])
                 if(self.is_empty ==  True):
                     self.code_index = new_code_index
                     continue #skip appending
                 elif((self.is_empty == -1) and (new_code_index == 'MG')):
                 #Hacky way to remove final empty slice for Miracle Grue 
                     self.code_index += 7
+                    if(self.code_index > self.max_index):
+                        break
+                    current_code = self.gcodes[self.code_index]
 
-            if(self.code_index <= self.max_index):
-                self.gcode_fp.seek(self.gcodes[self.code_index])
-                current_code = self.gcode_fp.readline()
-                self.output_fp.write(current_code)
-                self.code_index += 1
-            else:
-                print ("CODE_INDEX GREATER THAN MAX_INDEX")
-                break
-        return True
+            write(current_code)
+            self.code_index += 1
 
 
-    def process_gcode_list(self, gcodes, callback=None):
-    #This processes gcode in the form of a list of gcodes, and the processed gcode is returned
-        self.gcodes = gcodes  
-        self.max_index = (len(self.gcodes)-1)      
-        self.output = []
-        self.code_index = 0
+    def _next_layer_start(self, code_index):
+        if isinstance(self.gcodes, MappedGcodeFile):
+            return self.gcodes.find_line(self.layer_start, code_index)
+        while(code_index <= self.max_index):
+            if self.layer_start.match(self.gcodes[code_index]):
+                break
+            code_index += 1
+        return code_index
 
-        while(self.code_index <= self.max_index):
-            self.match = re.match(self.layer_start, self.gcodes[self.code_index])
-            if self.match is not None:
-                if self.match.group(1) == '<layer>':
-                    self.is_empty, self.new_code_index = self._layer_test_if_empty(slicer='SF')
-                elif self.match.group(1) == 'Slice':
-                    self.is_empty, self.new_code_index = self._layer_test_if_empty(slicer='MG')
-                if(self.is_empty ==  True):
-                    self.code_index = self.new_code_index
-                    continue #skip appending
-                print(str(self.new_code_index))
-                if((self.is_empty == -1) and (self.new_code_index == 'MG')):
-                #Hacky way to remove final empty slice for Miracle Grue 
-                    self.code_index += 7
 
-            if(self.code_index <= self.max_index):
-                self.output.append(self.gcodes[self.code_index])
-                self.code_index += 1
-            else:
-                print ("CODE_INDEX GREATER THAN MAX_INDEX")
-                break
-        return self.output
+    def _copy_lines(self, start, stop, write):
+        if isinstance(self.gcodes, MappedGcodeFile):
+            write(self.gcodes.read_lines(start, stop))
+        else:
+            for current_code in self.gcodes[start:stop]:
+                write(current_code)
                 
       
     def _layer_test_if_empty(self, slicer):
@@ -102,26 +98,26 @@ class EmptyLayerProcessor(Processor):
         moves_in_layer = 0
         comments_in_layer = 0
 
-        self.gcode_fp.seek(self.gcodes[code_index])
-        current_code = self.gcode_fp.readline()
         while(code_index <= self.max_index):
+            current_code = self.gcodes[code_index]
+            if(self.layer_start.match(current_code)):
+            #A layer that runs into the next one without ending is kept, rather than scanning on to the end of the file
+                return (False, None)
             #Checks for a specific comment or G1 commands
             if(slicer == 'MG'):
-                if(re.match(self.empty_line, current_code)):
+                if(self.empty_line.match(current_code)):
                     break
-                if(re.match(self.move_gcode, current_code)):
+                if(self.move_gcode.match(current_code)):
                     moves_in_layer += 1
-                if(re.match(self.MG_nominal_comment, current_code)):
+                if(self.MG_nominal_comment.match(current_code)):
                     comments_in_layer += 1
             elif(slicer == 'SF'):
-                if(re.match(self.SF_layer_end, current_code)):
+                if(self.SF_layer_end.match(current_code)):
                     break
-                if(re.match(self.move_gcode, current_code)):
+                if(self.move_gcode.match(current_code)):
                     moves_in_layer += 1
  
             code_index += 1
-            self.gcode_fp.seek(self.gcodes[code_index])
-            current_code = self.gcode_fp.readline()
 
         if(slicer == 'MG'):
             if((moves_in_layer <= 2) and (comments_in_layer >= 1)):
@@ -136,13 +132,5 @@ class EmptyLayerProcessor(Processor):
 
 
     def index_file(self, filename):
-
-        line_indexes = []
-        offset = 0
-        with open(filename, 'r') as f:
-            for line in f:
-                line_indexes.append(offset)    
-                offset += len(line)
-        return line_indexes
-
-        
+        with MappedGcodeFile(filename) as gcode_file:
+            return gcode_file.offsets
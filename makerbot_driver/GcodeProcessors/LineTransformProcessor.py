@@ -7,7 +7,7 @@ from __future__ import absolute_import
 import re
 
 import makerbot_driver
-from . import Processor
+from .Processor import Processor, GcodeStream
 
 
 class LineTransformProcessor(Processor):
@@ -20,6 +20,9 @@ class LineTransformProcessor(Processor):
     def __init__(self):
         super(LineTransformProcessor, self).__init__()
         self.code_map = {}  # map {compiled_regex:replace-funcion, }
+        self._code_map_keys = None
+        self._code_map_regexes = []
+        self._code_map_regex = None
 
     def process_gcode(self, gcodes, callback=None):
         """ main line by line processing, inherited from Processor
@@ -29,20 +32,63 @@ class LineTransformProcessor(Processor):
         @param callback for progress, expects 0-100 as percent 'done'
         @return A new gcode list post application of code_map transforms
         """
-        output = []
-        expected_len = len(gcodes)
-        output_len = len(output)
-        for code in gcodes:
-            tcode = self._transform_code(code)
-            expected_len += len(tcode) - 1
-            with self._condition:
-                self.test_for_external_stop(prelocked=True)
-                output.extend(tcode)
-                output_len += len(tcode)
+        return list(self._iter_transform(GcodeStream.from_list(gcodes), callback))
+
+    def iter_process_gcode(self, gcodes, callback=None):
+        """ Lazily runs all code_map regex's on each line, as the
+        transformed lines are consumed
+        @param gcodes GcodeStream, or an iterable of gcode lines
+        @param callback for progress, expects 0-100 as percent of the
+            input read
+        @return GcodeStream of transformed lines
+        """
+        stream = GcodeStream.wrap(gcodes)
+        return stream.derive(self._iter_transform(stream, callback))
+
+    def _iter_transform(self, stream, callback):
+        self._compile_code_map()
+        current_percent = None
+        for code in stream:
+            tcode = self._transform_line(code)
+            # Reading the flag is atomic; only lock once it's set
+            if self._external_stop:
+                self.test_for_external_stop()
+            for line in tcode:
+                yield line
             if callback is not None:
-                percent = int(100.0 * output_len / expected_len)
-                callback(percent)
-        return output
+                percent = stream.percent()
+                if percent != current_percent:
+                    current_percent = percent
+                    callback(percent)
+
+    def _compile_code_map(self):
+        """ Combines the code_map regexes into one alternation, in the order
+        they are tried, so a line is matched against all of them in a
+        single call.  Alternatives are tried in order, so the alternative
+        that matches is the first regex that would match on its own.  The
+        regexes are only combined again once code_map's keys change.
+        """
+        keys = self.code_map.keys()
+        if keys == self._code_map_keys:
+            return
+        self._code_map_keys = keys
+        self._code_map_regexes = [re.compile(key) for key in keys]
+        self._code_map_regex = None
+        flags = set(regex.flags for regex in self._code_map_regexes)
+        # Group numbers change once combined, breaking numbered references,
+        # and inline flags would apply to every alternative
+        unsafe = re.compile(r'\\[1-9]|\(\?\(|\(\?[iLmsux]+\)')
+        if len(flags) != 1 or any(unsafe.search(regex.pattern)
+                                  for regex in self._code_map_regexes):
+            return
+        alternation = '|'.join(
+            '(?P<_code_map_%i>%s)' % (i, regex.pattern)
+            for i, regex in enumerate(self._code_map_regexes))
+        try:
+            self._code_map_regex = re.compile(alternation, flags.pop())
+        except (re.error, AssertionError):
+            # ie a repeated group name, or too many groups
+            pass
 
     def _transform_code(self, code):
         """ takes a single gcode, runs all transforms in code_map
@@ -50,12 +96,26 @@ class LineTransformProcessor(Processor):
         fewer) lines of gcode
         @param code: a single gcode line
         @return a list of output tcodes. """
+        self._compile_code_map()
+        return self._transform_line(code)
+
+    def _transform_line(self, code):
+        """ _transform_code, once the code_map has been compiled """
         tcode = code
-        for key in self.code_map:
-            match = re.match(key, code)
+        if self._code_map_regex is not None:
+            match = self._code_map_regex.match(code)
             if match is not None:
-                tcode = self.code_map[key](match)
-                break
+                index = int(match.lastgroup[len('_code_map_'):])
+                # Match again for the transform's own groups
+                match = self._code_map_regexes[index].match(code)
+                tcode = self.code_map[self._code_map_keys[index]](match)
+        else:
+            for key, regex in zip(self._code_map_keys,
+                                  self._code_map_regexes):
+                match = regex.match(code)
+                if match is not None:
+                    tcode = self.code_map[key](match)
+                    break
         #Always return a list, remove '' strings
         tcode = [tcode] if not isinstance(tcode, list) else tcode
         tcode = [code for code in tcode if code is not ""]
@@ -1,6 +1,9 @@
 """
 An interface that all future preprocessors should inherit from
 """
+import array
+import bisect
+import mmap
 import os
 import re
 import threading
@@ -8,6 +11,189 @@ import threading
 import makerbot_driver
 
 
+class GcodeStream(object):
+    """ An iterator over lines of gcode that keeps track of how much of its
+    input has been read, so processors chained together with
+    iter_process_gcode can report progress without holding the whole file.
+    Progress is measured in bytes read, or in lines for a list of lines.
+    """
+
+    def __init__(self, lines, size=None, count_lines=False, source=None):
+        """
+        @param lines iterable of gcode lines
+        @param size total bytes (or lines) in lines, None if unknown
+        @param count_lines measure progress in lines instead of bytes
+        @param source GcodeStream whose progress this stream reports,
+            for streams of processed lines
+        """
+        self._lines = iter(lines)
+        self.size = size
+        self.count_lines = count_lines
+        self.source = source
+        self.read = 0
+
+    @classmethod
+    def from_list(cls, gcodes):
+        return cls(gcodes, len(gcodes), count_lines=True)
+
+    @classmethod
+    def from_file(cls, gcode_file):
+        """ Stream the lines of a gcode file, opened for reading.  A file
+        opened from a path is closed once its lines run out, or the stream
+        is closed.
+        @param gcode_file file object, or the path of a file
+        """
+        if isinstance(gcode_file, basestring):
+            return cls(_read_lines(gcode_file), os.path.getsize(gcode_file))
+        return cls(gcode_file, os.fstat(gcode_file.fileno()).st_size)
+
+    @classmethod
+    def wrap(cls, gcodes):
+        """ @return gcodes as a GcodeStream, of unknown size unless gcodes
+        is a list or file
+        """
+        if isinstance(gcodes, GcodeStream):
+            return gcodes
+        elif isinstance(gcodes, list):
+            return cls.from_list(gcodes)
+        elif isinstance(gcodes, file):
+            return cls.from_file(gcodes)
+        else:
+            return cls(gcodes)
+
+    def derive(self, lines):
+        """ @return a GcodeStream of lines made from this stream's lines,
+        reporting this stream's progress
+        """
+        return GcodeStream(lines, source=self.progress_source())
+
+    def progress_source(self):
+        stream = self
+        while stream.source is not None:
+            stream = stream.source
+        return stream
+
+    def percent(self):
+        """ @return int percent of the input read, or None if its size is
+        unknown
+        """
+        stream = self.progress_source()
+        if stream.size is None:
+            return None
+        elif stream.size == 0:
+            # Nothing to read, so no progress to report
+            return 0
+        return int(100.0 * stream.read / stream.size)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        line = self._lines.next()
+        if self.count_lines:
+            self.read += 1
+        else:
+            self.read += len(line)
+        return line
+
+    def close(self):
+        """ Stop reading lines early, closing the file of a stream
+        made from a path
+        """
+        close = getattr(self._lines, 'close', None)
+        if close is not None and not isinstance(self._lines, file):
+            close()
+
+
+def _read_lines(path):
+    with open(path) as gcode_file:
+        for line in gcode_file:
+            yield line
+
+
+def index_lines(data):
+    """ Find where each line of a buffer of gcode starts, in one pass.
+    Lines end with a newline, except maybe the last one.
+    @param data str or mmap of gcode
+    @return array('L') of the offset of each line
+    """
+    offsets = array.array('L')
+    find = data.find
+    size = len(data)
+    pos = 0
+    while pos < size:
+        offsets.append(pos)
+        end = find('\n', pos)
+        if end == -1:
+            break
+        pos = end + 1
+    return offsets
+
+
+class MappedGcodeFile(object):
+    """ Random access to the lines of a gcode file, without reading it into
+    memory.  The file is memory mapped and indexed by index_lines, so
+    getting a line is a slice of the map instead of a seek and readline.
+    """
+
+    def __init__(self, gcode_file_path):
+        self._file = open(gcode_file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size:
+            self.data = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        else:
+            # Empty files can't be mapped
+            self.data = ''
+        self.offsets = index_lines(self.data)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        """ @return the line at index, with its newline """
+        start = self.offsets[index]
+        end = self.data.find('\n', start)
+        if end == -1:
+            return self.data[start:]
+        return self.data[start:end + 1]
+
+    def read_lines(self, start, stop):
+        """ @return lines start to stop, not including stop, as one string """
+        if start >= stop:
+            return ''
+        elif stop >= len(self.offsets):
+            return self.data[self.offsets[start]:]
+        return self.data[self.offsets[start]:self.offsets[stop]]
+
+    def find_line(self, pattern, index):
+        """ Search the file for a line, without looking at each line in turn
+        @param pattern compiled regex to match lines with, starting with ^
+        @param index first line to search from
+        @return index of the first line from index on matching pattern, or
+            the number of lines if there isn't one
+        """
+        if index >= len(self.offsets):
+            return len(self.offsets)
+        # With MULTILINE, ^ matches at the start of every line
+        pattern = re.compile(pattern.pattern, pattern.flags | re.MULTILINE)
+        match = pattern.search(self.data, self.offsets[index])
+        if match is None:
+            return len(self.offsets)
+        return bisect.bisect_left(self.offsets, match.start())
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 class Processor(object):
     """ Base class for all Gcode Processors."""
     def __init__(self):
@@ -27,6 +213,22 @@ class Processor(object):
         self.test_for_external_stop()
         raise NotImplementedError("Unmplemented abstract method")
 
+    def iter_process_gcode(self, gcodes, callback=None):
+        """ Lazily process gcode, reading lines as processed lines are
+        consumed.  Processors that can work a line at a time override
+        this; by default all of the lines are read and passed to
+        process_gcode.
+        @param gcodes GcodeStream, or an iterable of gcode lines
+        @param callback is expected to be a callback that takes a int value
+        0 to 100 of percent of the input processed
+        @return GcodeStream of processed lines
+        """
+        stream = GcodeStream.wrap(gcodes)
+        output = self.process_gcode(list(stream))
+        if callback is not None:
+            callback(100)
+        return stream.derive(output)
+
     @classmethod
     def remove_variables(cls, gcode, newvalue='0'):
         """
@@ -3,6 +3,8 @@ Inserts progress commands in skeinforge gcode
 """
 from __future__ import absolute_import
 
+import itertools
+
 from .Processor import *
 
 
@@ -18,23 +20,37 @@ class ProgressProcessor(Processor):
         return progressmsg
 
     def process_gcode(self, gcodes, callback=None):
-        output = []
-        count_total = len(gcodes)
-        count_current = 0
+        return list(self._iter_progress(GcodeStream.from_list(gcodes), callback))
+
+    def iter_process_gcode(self, gcodes, callback=None):
+        """ Lazily inserts a progress update after each line that moves
+        the percent of the input read up
+        @param gcodes GcodeStream, or an iterable of gcode lines, whose
+            size is known
+        @param callback for progress, expects 0-100 as percent 'done'
+        @return GcodeStream of lines, with progress updates
+        """
+        stream = GcodeStream.wrap(gcodes)
+        if stream.progress_source().size is None:
+            raise ValueError(
+                "Progress can't be calculated for gcode of unknown size")
+        return stream.derive(self._iter_progress(stream, callback))
+
+    def _iter_progress(self, stream, callback):
         current_percent = 0
-        for code in gcodes:
-            count_current += 1
-            output.append(code)
-            new_percent = int(100.0 * count_current / count_total)
+        # The None marks the end of the lines, where the input may have
+        # been read to the end without a line since the last update
+        for code in itertools.chain(stream, [None]):
+            if code is not None:
+                yield code
+            new_percent = stream.percent()
             if new_percent > current_percent:
                 progressmsg = self.create_progress_msg(new_percent)
-                with self._condition:
-                    self.test_for_external_stop(prelocked=True)
-                    output.append(progressmsg)
+                self.test_for_external_stop()
+                yield progressmsg
                 current_percent = new_percent
                 if callback is not None:
                     callback(current_percent)
-        return output
 
 
 def main():
@@ -5,8 +5,111 @@ from __future__ import absolute_import
 import re
 
 from . import Processor
+from .Processor import MappedGcodeFile
 import makerbot_driver
 
+
+class OverwritableGcodeFile(object):
+    """
+    A copy of a MappedGcodeFile, written to an output file from start to end,
+    whose lines can be overwritten in place until they are flushed.  Bytes
+    from window_start on are kept in a bytearray once one of them has been
+    overwritten; bytes past the window are still the input's.  Reading a
+    line gives the same result as a seek and readline on a copy of the
+    input edited in place.
+    """
+
+    def __init__(self, gcode_file, output_fp, flush_size=1 << 20):
+        """
+        @param MappedGcodeFile gcode_file: Input to copy
+        @param file output_fp: File the copy is written to
+        @param int flush_size: Bytes to collect before writing them out
+        """
+        self.gcode_file = gcode_file
+        self.data = gcode_file.data
+        self.offsets = gcode_file.offsets
+        self.output_fp = output_fp
+        self.flush_size = flush_size
+        self.window_start = 0
+        self.window = bytearray()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        start = self.offsets[index]
+        window_end = self.window_start + len(self.window)
+        if start >= window_end:
+            end = self.data.find('\n', start)
+            if end == -1:
+                return self.data[start:]
+            return self.data[start:end + 1]
+        if start < self.window_start:
+            raise IndexError('Line %i has already been flushed' % (index))
+        start -= self.window_start
+        end = self.window.find('\n', start)
+        if end != -1:
+            return str(self.window[start:end + 1])
+        # The line carries on past the window
+        end = self.data.find('\n', window_end)
+        if end == -1:
+            return str(self.window[start:]) + self.data[window_end:]
+        return str(self.window[start:]) + self.data[window_end:end + 1]
+
+    def find_line(self, pattern, index):
+        """
+        @return index of the first line from index on matching pattern, as
+            MappedGcodeFile.find_line, taking overwritten lines into account
+        """
+        window_end = self.window_start + len(self.window)
+        while(index < len(self.offsets) and self.offsets[index] < window_end):
+            if pattern.match(self[index]):
+                return index
+            index += 1
+        return self.gcode_file.find_line(pattern, index)
+
+    def overwrite_line(self, index, line):
+        """
+        Write over the bytes starting at a line, like a seek and write on an
+        edited copy of the input.  A line longer than the one it replaces
+        carries on over the next one.
+        """
+        start = self.offsets[index] - self.window_start
+        if start < 0:
+            raise IndexError('Line %i has already been flushed' % (index))
+        end = start + len(line)
+        if end > len(self.window):
+            window_end = self.window_start + len(self.window)
+            self.window += self.data[window_end:self.window_start + end]
+        self.window[start:end] = line
+
+    def flush_before(self, index):
+        """
+        Write out everything before a line once there is enough of it.
+        Lines before index can no longer be read or overwritten.
+        """
+        if index > 0 and \
+                self.offsets[index] - self.window_start >= self.flush_size:
+            self.flush(self.offsets[index])
+
+    def flush(self, offset=None):
+        """
+        Write out everything before offset, by default the whole copy
+        """
+        window_end = self.window_start + len(self.window)
+        if offset is None:
+            offset = max(window_end, len(self.data))
+        if offset >= window_end:
+            self.output_fp.write(self.window)
+            self.output_fp.write(self.data[window_end:offset])
+            self.window = bytearray()
+        else:
+            count = offset - self.window_start
+            self.output_fp.write(self.window[:count])
+            del self.window[:count]
+        self.window_start = offset
+
+
 class Rep2XDualstrusionProcessor(Processor):
 
     def __init__(self):
@@ -20,6 +123,8 @@ class Rep2XDualstrusionProcessor(Processor):
         self.SF_layer_end = re.compile("^\(</layer>\)")
         self.retract_distance_mm = None
         self.return_distance_mm = None
+        #number of lines searched back from a toolchange for its snort
+        self.max_snort_lookbehind = 10000
 
     def process_gcode(self, gcode_in, outfile = None, profile = None):
         self.retract_distance_mm = makerbot_driver.profile.Profile(profile).values[
@@ -55,7 +160,7 @@ class Rep2XDualstrusionProcessor(Processor):
 
         while(self.code_index <= self.max_index):
             self.output.append(self.gcodes[self.code_index])
-            self.match = re.match(self.toolchange, self.gcodes[self.code_index])
+            self.match = self.toolchange.match(self.gcodes[self.code_index])
             if self.match is not None:
                 if(self.last_tool == -1):
                     self.last_tool = self.match.group(1)
@@ -83,26 +188,28 @@ class Rep2XDualstrusionProcessor(Processor):
         self.code_index = 0
         self.slicer = None
 
-        self.gcodes = self.index_file(gcode_file_path)
-        self.max_index = (len(self.gcodes)-1)
-        self.gcode_fp = open(gcode_file_path, 'r')
-        self.output_fp = open(output_file_path, 'w+')
-
-        for line in self.gcode_fp:
-            self.output_fp.write(line)
-        self.output_fp.flush()
-        self.output_fp.seek(0)
-        self.gcode_fp.close()
+        with MappedGcodeFile(gcode_file_path) as gcode_file:
+            with open(output_file_path, 'w') as output_fp:
+                #The output is a copy of the input, with snorts and squirts overwritten in place
+                self.gcodes = OverwritableGcodeFile(gcode_file, output_fp)
+                self.max_index = (len(self.gcodes)-1)
+                if self.retract_distance_mm != 'NULL':
+                    self._modify_snortsquirts()
+                self.gcodes.flush()
+        return True
 
-        if self.retract_distance_mm == 'NULL':
-            return True
 
+    def _modify_snortsquirts(self):
         while(self.code_index <= self.max_index):
+            #skip ahead to the next toolchange
+            self.code_index = self.gcodes.find_line(self.toolchange, self.code_index)
+            if(self.code_index > self.max_index):
+                break
+            #snorts can be overwritten as far back as the line before the look-behind window
+            self.gcodes.flush_before(self.code_index-self.max_snort_lookbehind-1)
+            current_code = self.gcodes[self.code_index]
 
-            self.output_fp.seek(self.gcodes[self.code_index])
-            current_code = self.output_fp.readline()
-
-            self.match = re.match(self.toolchange, current_code)
+            self.match = self.toolchange.match(current_code)
             if self.match is not None:
                 if(self.last_tool == -1):
                     self.last_tool = self.match.group(1)
@@ -142,8 +249,6 @@ class Rep2XDualstrusionProcessor(Processor):
                         self.insert_snortsquirt(formatted_snort, snort_index)
 
             self.code_index += 1
-        self.output_fp.close()
-        return True
 
 
     def squirt_search(self, is_GcodeFile):
@@ -151,39 +256,31 @@ class Rep2XDualstrusionProcessor(Processor):
         feedrate = None
         position = None
 
-        if(is_GcodeFile):
-            self.output_fp.seek(self.gcodes[squirt_index])
-
         while(True):
-            if(is_GcodeFile):
-                self.output_fp.seek(self.gcodes[squirt_index])
-                current_code = self.output_fp.readline()
-            elif(not is_GcodeFile):
-                current_code = self.gcodes[squirt_index]
-            squirt_match = re.match(self.MG_squirt, current_code)
+            current_code = self.gcodes[squirt_index]
+            squirt_match = self.MG_squirt.match(current_code)
             if squirt_match is not None:
                 self.slicer = 'MG'
                 feedrate = float(squirt_match.group(1))
                 extruder = squirt_match.group(2)
                 position = float(squirt_match.group(3))
                 break
-            squirt_match = re.match(self.SF_snortsquirt, current_code)
+            squirt_match = self.SF_snortsquirt.match(current_code)
             if squirt_match is not None:
                 self.slicer = 'SF'
                 position = float(squirt_match.group(1))
-                self.output_fp.seek(self.gcodes[squirt_index-1])
-                current_code = self.output_fp.readline()
+                current_code = self.gcodes[squirt_index-1]
                 feedrate = float(current_code.split('F')[1])
                 extruder = None
                 break
 
             squirt_index += 1
             if(self.slicer == 'MG'):
-                squirt_match = re.match(self.layer_start, current_code)
+                squirt_match = self.layer_start.match(current_code)
                 if((squirt_index > self.max_index) or (squirt_match is not None)):
                     return None, None, None, None, None
             if(self.slicer == 'SF'):
-                squirt_match = re.match(self.SF_layer_end, current_code)
+                squirt_match = self.SF_layer_end.match(current_code)
                 if((squirt_index > self.max_index) or (squirt_match is not None)):
                     return None, None, None, None, None
         return (squirt_index, extruder, feedrate, position, len(squirt_match.group()))
@@ -201,8 +298,7 @@ class Rep2XDualstrusionProcessor(Processor):
                 return formatted_squirt
 
             elif(self.slicer == 'SF'):
-                self.output_fp.seek(self.gcodes[line_index-1])
-                feedrate_line_len = len(self.output_fp.readline())
+                feedrate_line_len = len(self.gcodes[line_index-1])
                 total_len = current_line_len + feedrate_line_len
                 new_squirt = "G1 F%.1f\nG1 E%.2f\n"%(squirt_feedrate, squirt_position)
                 formatted_squirt = self.pad_line(new_squirt, total_len)
@@ -213,28 +309,27 @@ class Rep2XDualstrusionProcessor(Processor):
 
     def reverse_snort_search(self, is_GcodeFile):
         snort_index = self.code_index-2
+        #only search back through the look-behind window
+        first_index = max(0, self.code_index-self.max_snort_lookbehind)
         feedrate = None
         position = None
 
+        if(snort_index < first_index):
+            return (None, None, None, None, None)
         while(True):
-            if(is_GcodeFile):
-                self.output_fp.seek(self.gcodes[snort_index])
-                current_code = self.output_fp.readline()
-            elif(not is_GcodeFile):
-                current_code = self.gcodes[snort_index]
+            current_code = self.gcodes[snort_index]
 
-            snort_match = re.match(self.MG_snort, current_code)
+            snort_match = self.MG_snort.match(current_code)
             if snort_match is not None:
                 self.slicer = 'MG'
                 feedrate = float(snort_match.group(1))
                 extruder = snort_match.group(2)
                 position = float(snort_match.group(3))
                 break
-            snort_match = re.match(self.SF_snortsquirt, current_code)
+            snort_match = self.SF_snortsquirt.match(current_code)
             if snort_match is not None:
                 self.slicer = 'SF'
-                self.output_fp.seek(self.gcodes[snort_index-1])
-                current_code = self.output_fp.readline()
+                current_code = self.gcodes[snort_index-1]
                 #This is based on the assumption that the feedrate for the snort is set the line before
                 feedrate = float(current_code.split('F')[1])     
                 position = float(snort_match.group(1))
@@ -242,8 +337,8 @@ class Rep2XDualstrusionProcessor(Processor):
                 break
 
             snort_index -= 1
-            snort_match = re.match(self.layer_start, current_code)
-            if((snort_index < 0) or (snort_match is not None)):
+            snort_match = self.layer_start.match(current_code)
+            if((snort_index < first_index) or (snort_match is not None)):
                 return (None, None, None, None, None)
 
         return (snort_index, extruder, feedrate, position, len(snort_match.group()))
@@ -252,15 +347,13 @@ class Rep2XDualstrusionProcessor(Processor):
     def format_snort(self, new_feedrate, new_extruder_pos, extruder, old_line_len, line_index):
         formatted_move_line = None
         if(self.slicer == 'MG'):
-            self.output_fp.seek(self.gcodes[line_index])
             new_move_line = "G1 F%.3f %s%.3f (snort)\n"%(new_feedrate,extruder,new_extruder_pos)
             formatted_move_line = self.pad_line(new_move_line, old_line_len)
             while(formatted_move_line[-1] == '\n'):
                 formatted_move_line = formatted_move_line[:-1]
 
         elif(self.slicer == 'SF'):
-            self.output_fp.seek(self.gcodes[line_index-1])
-            feedrate_line_len = len(self.output_fp.readline())
+            feedrate_line_len = len(self.gcodes[line_index-1])
             total_len = old_line_len + feedrate_line_len
             new_move_line = "G1 F%.1f\nG1 E%.2f\n"%(new_feedrate, new_extruder_pos)
             formatted_move_line = self.pad_line(new_move_line, total_len)
@@ -271,12 +364,10 @@ class Rep2XDualstrusionProcessor(Processor):
 
     def insert_snortsquirt(self, snortsquirt_line, snortsquirt_index):
         if(self.slicer == 'MG'):
-            self.output_fp.seek(self.gcodes[snortsquirt_index])
-            self.output_fp.write(snortsquirt_line)
+            self.gcodes.overwrite_line(snortsquirt_index, snortsquirt_line)
         if(self.slicer == 'SF'):
-            self.output_fp.seek(self.gcodes[snortsquirt_index-1])
-            #seek to index-1 because SF puts feedrate and extruder position on two lines
-            self.output_fp.write(snortsquirt_line)
+            #write from index-1 because SF puts feedrate and extruder position on two lines
+            self.gcodes.overwrite_line(snortsquirt_index-1, snortsquirt_line)
 
 
     def pad_line(self, line, old_line_len):
@@ -287,12 +378,5 @@ class Rep2XDualstrusionProcessor(Processor):
         
 
     def index_file(self, filename):
-
-        line_indexes = []
-        offset = 0
-        with open(filename, 'r') as f:
-            for line in f:
-                line_indexes.append(offset)    
-                offset += len(line)
-        return line_indexes
-                
+        with MappedGcodeFile(filename) as gcode_file:
+            return gcode_file.offsets
@@ -1,7 +1,11 @@
 from __future__ import absolute_import, print_function
 
+import json
+import logging
 import os
+import tempfile
 import threading
+import time
 
 import makerbot_driver
 
@@ -11,18 +15,106 @@ class ReturnObject(object):
         pass
 
 
+class MachineIdentityCache(object):
+    """ Remembers what MachineFactory learned about each machine it built,
+    keyed by port and USB serial number, so a machine that is reconnected
+    doesn't have to be interrogated again.  If given a path, the cache is
+    kept in that json file across runs.
+    """
+
+    def __init__(self, path=None):
+        """
+        @param str path: json file the cache is loaded from and saved to
+        """
+        self._log = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.entries = {}
+        # Machines may be built from several threads at once
+        self._lock = threading.Lock()
+        if path is not None:
+            self.load()
+
+    def key(self, portname, serial):
+        return '%s|%s' % (portname, serial)
+
+    def get(self, portname, serial):
+        """
+        @return dict entry stored for the machine, or None
+        """
+        with self._lock:
+            return self.entries.get(self.key(portname, serial))
+
+    def put(self, portname, serial, profile, firmware_version, settings):
+        """
+        Store what was learned about a machine
+        @param str portname: The machine's port
+        @param str serial: The machine's USB serial number
+        @param str profile: Name of the machine's profile
+        @param int firmware_version: Firmware version the machine reported
+        @param dict settings: Settings found by MachineInquisitor.query
+        """
+        with self._lock:
+            self.entries[self.key(portname, serial)] = {
+                'profile': profile,
+                'firmware_version': firmware_version,
+                'settings': dict(settings),
+                'time': time.time(),
+            }
+            self._save()
+
+    def invalidate(self, portname, serial):
+        """ Forget a machine """
+        with self._lock:
+            if self.entries.pop(self.key(portname, serial), None) is not None:
+                self._save()
+
+    def load(self):
+        with self._lock:
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (IOError, ValueError) as e:
+                self._log.debug('{"event":"identity_cache_not_loaded", "path":"%s", "error":"%s"}', self.path, str(e))
+                self.entries = {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            # Write then rename, so the file is never left half written
+            fd, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(self.path)))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.entries, f)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError) as e:
+            self._log.warning('{"event":"identity_cache_not_saved", "path":"%s", "error":"%s"}', self.path, str(e))
+
+
 class MachineFactory(object):
     """This class is a factory for building machine drivers from
     a port connection. This class will take a connection, query it
     to verify it is a geunine 3d printer (or other device we can control)
     and build the appropritae machine type/version/etc from that.
     """
-    def __init__(self, profile_dir=None):
+    def __init__(self, profile_dir=None, identity_cache=None, detector=None):
+        """
+        @param str profile_dir: Directory of machine profiles
+        @param identity_cache: MachineIdentityCache, or the path of a json
+          file to keep one in.  Machines are interrogated in full every
+          time if not given.
+        @param MachineDetector detector: Detector ports' USB serial numbers
+          are looked up in, the global one by default
+        """
         if profile_dir:
             self.profile_dir = profile_dir
         else:
             self.profile_dir = os.path.join(
                 os.path.abspath(os.path.dirname(__file__)), 'profiles',)
+        if isinstance(identity_cache, basestring):
+            identity_cache = MachineIdentityCache(identity_cache)
+        self.identity_cache = identity_cache
+        self.detector = detector
 
     def create_inquisitor(self, portname):
         """
@@ -40,12 +132,34 @@ class MachineFactory(object):
         machineInquisitor = self.create_inquisitor(portname)
         if None is condition:
             condition = threading.Condition()
-        s3gBot, machine_setup_dict = machineInquisitor.query(condition, leaveOpen)
+        serial = None
+        cached = None
+        if self.identity_cache is not None:
+            serial = self.get_port_serial(portname)
+            if serial is not None:
+                cached = self.identity_cache.get(portname, serial)
+        if cached is not None:
+            s3gBot, machine_setup_dict = machineInquisitor.query(
+                condition, leaveOpen, cached['settings'],
+                cached['firmware_version'])
+        else:
+            s3gBot, machine_setup_dict = machineInquisitor.query(condition, leaveOpen)
 
-        profile_regex = self.get_profile_regex(machine_setup_dict)
-        matches = makerbot_driver.search_profiles_with_regex(
-            profile_regex, self.profile_dir)
-        matches = list(matches)
+        if cached is not None and machineInquisitor.validated:
+            # Same machine and firmware as last time
+            matches = [cached['profile']]
+        else:
+            profile_regex = self.get_profile_regex(machine_setup_dict)
+            matches = makerbot_driver.search_profiles_with_regex(
+                profile_regex, self.profile_dir)
+            matches = list(matches)
+            if serial is not None:
+                if len(matches) > 0:
+                    self.identity_cache.put(
+                        portname, serial, matches[0],
+                        machineInquisitor.firmware_version, machine_setup_dict)
+                elif cached is not None:
+                    self.identity_cache.invalidate(portname, serial)
         return_object = ReturnObject()
         attrs = ['s3g', 'profile', 'gcodeparser']
         for a in attrs:
@@ -64,6 +178,20 @@ class MachineFactory(object):
             setattr(return_object, 'gcodeparser', parser)
         return return_object
 
+    def get_port_serial(self, portname):
+        """
+        @return USB serial number of the machine at portname, as last seen
+            by the detector, or None if it isn't known
+        """
+        detector = self.detector
+        if detector is None:
+            detector = makerbot_driver.get_gMachineDetector()
+        for port in detector.get_tty_and_cu(portname):
+            port_data = detector.machines_recently_seen.get(port)
+            if port_data is not None and port_data.get('iSerial'):
+                return port_data['iSerial']
+        return None
+
     def create_s3g(self, portname):
         """
         This is made to ameliorate testing.  Otherwise we would
@@ -114,6 +242,10 @@ class MachineInquisitor(object):
     def __init__(self, portname):
         """ build a machine Inqusitor for an exact port"""
         self._portname = portname
+        # Firmware version found by the last query
+        self.firmware_version = None
+        # True if the last query confirmed the known settings
+        self.validated = False
 
     def create_s3g(self, condition):
         """
@@ -123,20 +255,39 @@ class MachineInquisitor(object):
         """
         return makerbot_driver.s3g.from_filename(self._portname, condition)
 
-    def query(self, condition, leaveOpen=True):
+    def query(self, condition, leaveOpen=True, known_settings=None,
+              known_version=None):
         """
         open a connection to a machine and  query a machine for
         key settings needed to construct a machine from a profile
 
         @param leaveOpen IF true, serial connection to the machine is left open.
+        @param dict known_settings: Settings a previous query found for the
+            machine on this port.  If the machine still reports
+            known_version, they are used instead of querying it in full.
+        @param int known_version: Firmware version the previous query found
         @return a tuple of an (s3gObj, dictOfSettings
         """
         import makerbot_driver.s3g as s3g
         settings = {}
         s3gDriver = self.create_s3g(condition)
-        settings['vid'], settings['pid'] = s3gDriver.get_vid_pid()
         firmware_version = s3gDriver.get_version()
-        
+        self.firmware_version = firmware_version
+        self.validated = known_settings is not None and \
+            firmware_version == known_version
+        if self.validated:
+            settings = dict(known_settings)
+            try:
+                s3gDriver.init_eeprom_reader(firmware_version)
+            except makerbot_driver.EEPROM.MissingEepromMapError:
+                pass
+            s3gDriver.set_print_to_file_type(settings['print_to_file_type'])
+            if not leaveOpen:
+                s3gDriver.close()
+            return s3gDriver, settings
+
+        settings['vid'], settings['pid'] = s3gDriver.get_vid_pid()
+
         try:   
             s3gDriver.init_eeprom_reader(firmware_version) 
         except  makerbot_driver.EEPROM.MissingEepromMapError:
@@ -0,0 +1,226 @@
+"""
+A MachineFleet keeps connections open to every machine attached to a
+computer, ie the bots of a print farm.
+
+Building a machine means several serial round trips (see
+MachineInquisitor.query), and most of that time is spent waiting on the
+machine.  The fleet builds its machines in a pool of worker threads, one
+port per thread, so connecting to all of them takes about as long as
+connecting to the slowest one.  Each machine gets its own condition, so
+machines can be streamed to from different threads without waiting on
+each other.
+"""
+from __future__ import absolute_import
+
+import logging
+import multiprocessing.pool
+import threading
+import time
+
+import makerbot_driver
+
+
+class FleetMachine(object):
+    """ A machine of a MachineFleet, holding what MachineFactory built for
+    its port: the s3g, profile and gcodeparser.  These are None if the
+    machine couldn't be built, in which case error holds the reason.
+    """
+
+    def __init__(self, port, port_data=None):
+        """
+        @param str port Name of the machine's port
+        @param dict port_data Port data dict found by a MachineDetector
+        """
+        self.port = port
+        self.port_data = port_data
+        self.s3g = None
+        self.profile = None
+        self.gcodeparser = None
+        self.error = None
+        self.condition = threading.Condition()
+        self.connect_time = None
+
+    def build(self, factory):
+        """
+        Build the machine with factory, leaving its connection open.
+        Errors are kept in self.error instead of being raised, so one bad
+        port doesn't stop the rest of the fleet from connecting.
+        @param MachineFactory factory Factory to build the machine with
+        """
+        start_time = time.time()
+        try:
+            machine = factory.build_from_port(self.port, True, self.condition)
+        except Exception as e:
+            self.error = e
+        else:
+            self.s3g = machine.s3g
+            self.profile = machine.profile
+            self.gcodeparser = machine.gcodeparser
+            if self.profile is None:
+                self.error = makerbot_driver.UnknownMachineError(self.port)
+                if self.s3g is not None:
+                    self.s3g.close()
+                self.s3g = None
+            else:
+                self.error = None
+        self.connect_time = time.time() - start_time
+        return self
+
+    def is_connected(self):
+        return self.s3g is not None and self.s3g.is_open()
+
+    def close(self):
+        if self.s3g is not None:
+            self.s3g.close()
+
+    def status(self):
+        """
+        @return dict status: The machine's connection state and, if it is
+            connected, its motherboard status and build statistics
+        """
+        status = {
+            'port': self.port,
+            'connected': self.is_connected(),
+            'profile': self.profile.values['type'] if self.profile else None,
+            'error': str(self.error) if self.error else None,
+        }
+        if status['connected']:
+            status['motherboard_status'] = self.s3g.get_motherboard_status()
+            status['build_stats'] = self.s3g.get_build_stats()
+        return status
+
+    def execute_line(self, line, delay=.2):
+        """
+        Stream a line of gcode to the machine, waiting for room in its buffer
+        if it is full
+        @param str line Line of gcode
+        @param float delay Time to wait before retrying a line the machine
+            had no room for
+        """
+        while True:
+            try:
+                self.gcodeparser.execute_line(line)
+                break
+            except makerbot_driver.BufferOverflowError:
+                with self.condition:
+                    self.condition.wait(delay)
+
+
+def _build_machine(args):
+    machine, factory = args
+    return machine.build(factory)
+
+
+def _machine_status(machine):
+    try:
+        return machine.status()
+    except Exception as e:
+        return {'port': machine.port, 'connected': machine.is_connected(),
+                'error': str(e)}
+
+
+class MachineFleet(object):
+    """ Discovers, connects to and keeps open every machine attached to
+    this computer
+    """
+
+    def __init__(self, factory=None, detector=None, max_workers=32):
+        """
+        @param MachineFactory factory Factory machines are built with
+        @param MachineDetector detector Detector ports are discovered with
+        @param int max_workers Most machines built at the same time
+        """
+        self._log = logging.getLogger(self.__class__.__name__)
+        self.detector = detector if detector else makerbot_driver.MachineDetector()
+        # Let the factory find the USB serial numbers of the ports found
+        self.factory = factory if factory else makerbot_driver.MachineFactory(
+            detector=self.detector)
+        self.max_workers = max_workers
+        # FleetMachines by port name
+        self.machines = {}
+
+    def __len__(self):
+        return len(self.machines)
+
+    def __iter__(self):
+        return iter(sorted(self.machines.values(), key=lambda m: m.port))
+
+    def __getitem__(self, port):
+        return self.machines[port]
+
+    def discover(self, machineTypes=None):
+        """
+        Scan for attached machines
+        @param machineTypes Machine class name, or list of them, to scan for
+        @return dict of {portname: port_data_dict} for ports that aren't in
+            the fleet yet
+        """
+        available = self.detector.get_available_machines(machineTypes)
+        return dict((port, data) for port, data in available.items()
+                    if port not in self.machines)
+
+    def connect(self, ports=None, machineTypes=None):
+        """
+        Build a machine for each port concurrently, and add the ones that
+        could be built to the fleet
+        @param ports List of port names, or a dict of {portname:
+            port_data_dict}.  By default, the ports found by discover.
+        @param machineTypes Machine class names to discover, if no ports
+            are given
+        @return list of FleetMachines, one per port, including any that
+            failed to connect
+        """
+        if ports is None:
+            ports = self.discover(machineTypes)
+        if isinstance(ports, dict):
+            machines = [FleetMachine(port, data) for port, data
+                        in sorted(ports.items())]
+        else:
+            machines = [FleetMachine(port) for port in ports]
+        if not machines:
+            return []
+
+        pool = multiprocessing.pool.ThreadPool(
+            min(len(machines), self.max_workers))
+        try:
+            built = pool.map(_build_machine,
+                             [(machine, self.factory) for machine in machines])
+        finally:
+            pool.close()
+            pool.join()
+
+        for machine in built:
+            if machine.error is None:
+                self.machines[machine.port] = machine
+                self._log.info('{"event":"machine_connected", "port":"%s", "seconds":%f}', machine.port, machine.connect_time)
+            else:
+                self._log.error('{"event":"machine_connect_failed", "port":"%s", "error":"%s"}', machine.port, str(machine.error))
+        return built
+
+    def disconnect(self, port):
+        """ Close the connection to a machine and remove it from the fleet """
+        self.machines.pop(port).close()
+
+    def close(self):
+        """ Close every connection in the fleet """
+        for port in list(self.machines):
+            self.disconnect(port)
+
+    def status(self):
+        """
+        @return dict of {portname: status dict} for every machine in the
+            fleet, see FleetMachine.status.  Machines are queried
+            concurrently.
+        """
+        machines = list(self)
+        if not machines:
+            return {}
+        pool = multiprocessing.pool.ThreadPool(
+            min(len(machines), self.max_workers))
+        try:
+            statuses = pool.map(_machine_status, machines)
+        finally:
+            pool.close()
+            pool.join()
+        return dict((machine.port, status)
+                    for machine, status in zip(machines, statuses))
@@ -0,0 +1,319 @@
+""" A non-blocking writer to a data stream, driven by an asyncore event loop.
+
+Python 2 has no asyncio; asyncore is its standard library event loop.  Each
+connection to a machine is a dispatcher in the loop's map, so one thread
+running the loop can drive any number of machines, instead of one thread
+per machine blocking on its StreamWriter.
+
+Rather than waiting for the machine's reply, send_payload returns an
+AsyncResult straight away, which the loop fills in once the reply, or an
+error, has arrived.  Packets are sent stop-and-wait, like a StreamWriter
+with a window_size of 1, and retried the same way.
+"""
+from __future__ import absolute_import
+
+import asyncore
+import collections
+import logging
+import sys
+import time
+
+import makerbot_driver
+
+try:
+    _dispatcher = asyncore.file_dispatcher
+except AttributeError:
+    # Only posix systems can poll serial ports and ptys; elsewhere the
+    # stream has to be a socket
+    _dispatcher = asyncore.dispatcher
+
+
+class AsyncResult(object):
+    """ The eventual outcome of an asynchronous call: either a result or the
+    error it failed with
+    """
+
+    def __init__(self):
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def done(self):
+        """@returns True once the result or error has been set """
+        return self._done
+
+    def result(self):
+        """
+        @return The result of the call.  Raises the error the call failed
+        with, or a RuntimeError if the call hasn't finished yet.
+        """
+        if not self._done:
+            raise RuntimeError('The result is not ready yet')
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self):
+        """ @return The error the call failed with, or None if it succeeded """
+        if not self._done:
+            raise RuntimeError('The result is not ready yet')
+        return self._exception
+
+    def add_done_callback(self, callback):
+        """
+        Call callback(result) once the call has finished, or straight away if
+        it already has.
+        """
+        if self._done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def set_result(self, result):
+        self._finish(result, None)
+
+    def set_exception(self, exception):
+        self._finish(None, exception)
+
+    def _finish(self, result, exception):
+        if self._done:
+            raise RuntimeError('The result has already been set')
+        self._done = True
+        self._result = result
+        self._exception = exception
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class _Request(object):
+    """ A packet waiting to be sent, or waiting for its reply """
+
+    __slots__ = ['packet', 'result', 'retry_count', 'errors', 'deadline']
+
+    def __init__(self, packet):
+        self.packet = packet
+        self.result = AsyncResult()
+        self.retry_count = 0
+        self.errors = []
+        self.deadline = None
+
+
+class AsyncStreamWriter(_dispatcher):
+    """ Sends payloads to a machine at the end of a serial port, pty or
+    socket, without blocking.  The stream is polled by the asyncore loop
+    whose map the writer is added to, see poll and run_until_complete.
+    """
+
+    def __init__(self, file, map=None):
+        """ Initialize a new AsyncStreamWriter
+
+        @param file Stream to the machine: a serial port, an open file or a
+            socket, or its file descriptor
+        @param dict map asyncore map to add the writer to, by default the
+            global asyncore.socket_map
+        """
+        _dispatcher.__init__(self, file, map)
+        self.file = file
+        self._log = logging.getLogger(self.__class__.__name__)
+        self.external_stop = False
+        self.total_retries = 0
+        self.total_overflows = 0
+        # Requests waiting for the current one to finish
+        self._queue = collections.deque()
+        # Request whose reply is being waited for
+        self._current = None
+        self._send_buffer = bytearray()
+        self._receive_buffer = bytearray()
+        self._decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+
+    def send_payload(self, payload):
+        """
+        Queue a payload to be sent to the machine
+        @param bytearray payload Payload to send
+        @return AsyncResult holding the reply payload, including the response
+            code, once it has been received
+        """
+        request = _Request(makerbot_driver.Encoder.encode_payload(payload))
+        if self.external_stop:
+            request.result.set_exception(makerbot_driver.ExternalStopError())
+            return request.result
+        self._queue.append(request)
+        if self._current is None:
+            self._send_next()
+        return request.result
+
+    # The machine replies to action and query payloads alike
+    send_action_payload = send_payload
+    send_query_payload = send_payload
+
+    def pending(self):
+        """@returns the number of payloads sent or queued but not replied to """
+        return len(self._queue) + (self._current is not None)
+
+    def is_open(self):
+        return self.connected
+
+    def close(self):
+        _dispatcher.close(self)
+        if hasattr(self.file, 'close'):
+            self.file.close()
+        self._fail_all(IOError('The stream was closed'))
+
+    def set_external_stop(self, value=True):
+        self.external_stop = value
+        if value:
+            self._log.error('{"event":"external_stop"}')
+            self._fail_all(makerbot_driver.ExternalStopError())
+
+    def check_timeout(self, now):
+        """
+        Resend the current packet if its reply hasn't arrived within
+        makerbot_driver.timeout_length.  Called by poll.
+        @param float now Current time, from time.time()
+        """
+        request = self._current
+        if request is not None and now > request.deadline:
+            self._log.error('{"event":"machine_timeout"}')
+            error = makerbot_driver.TimeoutError(
+                len(self._receive_buffer), self._decoder.state)
+            self._decoder.reset()
+            self._retry(error)
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return bool(self._send_buffer)
+
+    def handle_write(self):
+        sent = self.send(bytes(self._send_buffer))
+        del self._send_buffer[:sent]
+
+    def handle_read(self):
+        data = self.recv(4096)
+        if data:
+            self._receive_buffer.extend(data)
+            self._process_replies()
+
+    def handle_close(self):
+        self.close()
+
+    def handle_error(self):
+        error = sys.exc_info()[1]
+        self._log.error('{"event":"unhandled_exception", "exception":"%s", "message":"%s"}', type(error), str(error))
+        self._fail_all(error)
+        self.close()
+
+    def _send_next(self):
+        if self._queue and not self.external_stop:
+            self._current = self._queue.popleft()
+            self._transmit()
+
+    def _transmit(self):
+        request = self._current
+        self._send_buffer.extend(request.packet)
+        request.deadline = time.time() + makerbot_driver.timeout_length
+
+    def _process_replies(self):
+        while self._receive_buffer:
+            if self._current is None:
+                self._log.debug('{"event":"unexpected_bytes", "count":%i}', len(self._receive_buffer))
+                del self._receive_buffer[:]
+                return
+            try:
+                self._decoder.parse_bytes(self._receive_buffer)
+            except makerbot_driver.PacketDecodeError as e:
+                self._retry(e)
+                continue
+            if self._decoder.state_code != self._decoder.PAYLOAD_READY:
+                return
+            payload = self._decoder.payload
+            self._decoder.reset()
+            self._handle_reply(payload)
+
+    def _handle_reply(self, payload):
+        try:
+            makerbot_driver.Encoder.check_response_code(payload[0])
+        except makerbot_driver.BufferOverflowError as e:
+            # As with a StreamWriter, the caller is expected to resend the
+            # payload once the machine has room for it
+            self._log.debug('{"event":"buffer_overflow"}')
+            self.total_overflows += 1
+            self._finish_current(exception=e)
+        except makerbot_driver.RetryableError as e:
+            self._retry(e)
+        except Exception as e:
+            self._finish_current(exception=e)
+        else:
+            self._finish_current(payload)
+
+    def _retry(self, error):
+        request = self._current
+        self._log.debug('{"event":"transmission_problem", "exception":"%s", "message":"%s", "retry_count"=%i}', type(error), str(error), request.retry_count)
+        self.total_retries += 1
+        request.retry_count += 1
+        request.errors.append(error.__class__.__name__)
+        if request.retry_count >= makerbot_driver.max_retry_count:
+            self._log.error('{"event":"transmission_error"}')
+            self._finish_current(
+                exception=makerbot_driver.TransmissionError(request.errors))
+        else:
+            self._transmit()
+
+    def _finish_current(self, payload=None, exception=None):
+        request, self._current = self._current, None
+        if exception is None:
+            request.result.set_result(payload)
+        else:
+            request.result.set_exception(exception)
+        if self._current is None:
+            self._send_next()
+
+    def _fail_all(self, exception):
+        requests = list(self._queue)
+        if self._current is not None:
+            requests.insert(0, self._current)
+        self._queue.clear()
+        self._current = None
+        for request in requests:
+            request.result.set_exception(exception)
+
+
+def poll(map=None, timeout=.05):
+    """
+    Run one iteration of the asyncore loop, then resend any packet whose
+    reply has timed out
+    @param dict map asyncore map to poll, by default asyncore.socket_map
+    @param float timeout Longest time to wait for a stream to be ready
+    """
+    if map is None:
+        map = asyncore.socket_map
+    asyncore.loop(timeout, map=map, count=1)
+    now = time.time()
+    for dispatcher in map.values():
+        check_timeout = getattr(dispatcher, 'check_timeout', None)
+        if check_timeout is not None:
+            check_timeout(now)
+
+
+def run_until_complete(results, map=None, timeout=.05):
+    """
+    Poll the asyncore loop until the given calls have finished
+    @param results AsyncResult, or a list of them, to wait for
+    @param dict map asyncore map to poll, by default asyncore.socket_map
+    @param float timeout Longest time to wait for a stream in each poll
+    @return The result, or list of results, of the calls.  The error of the
+        first call that failed is raised instead.
+    """
+    if map is None:
+        map = asyncore.socket_map
+    if isinstance(results, AsyncResult):
+        return run_until_complete([results], map, timeout)[0]
+    results = list(results)
+    while not all(result.done() for result in results):
+        if not map:
+            raise IOError('No streams are left to finish the calls')
+        poll(map, timeout)
+    return [result.result() for result in results]
@@ -31,8 +31,9 @@ class FileWriter(AbstractWriter):
         return not self.file.closed
 
     def check_binary_mode(self):
-        mode = str(self.file.mode)
-        if 'b' not in mode:
+        # In memory files, ie io.BytesIO, have no mode and only take bytes
+        mode = getattr(self.file, 'mode', None)
+        if mode is not None and 'b' not in str(mode):
             raise makerbot_driver.Writer.NonBinaryModeFileError
 
     def send_action_payload(self, payload):
@@ -42,3 +43,41 @@ class FileWriter(AbstractWriter):
         self.check_binary_mode()
         with self._condition:
             self.file.write(bytes(payload))
+
+
+class BufferedFileWriter(FileWriter):
+    """ A file writer that collects payloads in memory and writes them to
+    the file in large blocks, for exporting whole prints at once.  flush (or
+    close) must be called once the last payload has been sent.
+    """
+    def __init__(self, file, condition, buffer_size=1 << 20):
+        """ Initialize a new buffered file writer
+
+        @param string file File object to write to.
+        @param int buffer_size Number of bytes collected before writing
+        """
+        super(BufferedFileWriter, self).__init__(file, condition)
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    def close(self):
+        with self._condition:
+            if not self.file.closed:
+                self.flush()
+                self.file.close()
+
+    def flush(self):
+        """ Write all buffered payloads to the file """
+        with self._condition:
+            if self._buffer:
+                self.file.write(self._buffer)
+                del self._buffer[:]
+            self.file.flush()
+
+    def send_action_payload(self, payload):
+        if self.external_stop:
+            self._log.error('{"event":"external_stop"}')
+            raise makerbot_driver.ExternalStopError
+        self._buffer.extend(payload)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
@@ -0,0 +1,185 @@
+""" A StreamWriter that only sends action packets the machine has room for.
+
+The machine queues action commands in a command buffer of a few hundred
+bytes, and rejects a command with a BufferOverflowError when the buffer is
+full.  Rather than sending blindly and retrying on overflows, this writer
+keeps an estimate of the free space in the buffer: it is read from the
+machine with GET_AVAILABLE_BUFFER_SIZE, and every buffered command sent
+uses up the length of its payload.  A command is only sent once the
+estimate says it fits.  Otherwise the writer waits for as long as the
+buffer takes to drain enough, at the drain rate measured between polls,
+and polls again.
+
+Packets are always sent stop-and-wait.  In pipelined mode, the packets
+held back after an overflow have to be resent before the free space can be
+polled again, and a machine draining its buffer may accept some of them
+out of order, so the two modes don't mix.
+"""
+from __future__ import absolute_import
+
+import time
+
+from . import StreamWriter
+import makerbot_driver
+
+from makerbot_driver.Encoder.CommandCodec import host_query_codecs
+
+
+class FlowControlWriter(StreamWriter):
+    """ A StreamWriter that waits for room in the machine's command buffer
+    before sending an action packet.  BufferOverflowErrors are handled here,
+    rather than raised to the caller.
+    """
+
+    # Host commands that empty the command buffer
+    buffer_clearing_commands = frozenset([
+        makerbot_driver.host_query_command_dict['CLEAR_BUFFER'],
+        makerbot_driver.host_query_command_dict['ABORT_IMMEDIATELY'],
+        makerbot_driver.host_query_command_dict['RESET'],
+        makerbot_driver.host_query_command_dict['EXTENDED_STOP'],
+    ])
+
+    def __init__(self, file, condition,
+                 min_poll_interval=.005, max_poll_interval=.2):
+        """ Initialize a new FlowControlWriter
+
+        @param string file File object to interact with
+        @param float min_poll_interval Shortest wait before polling the free
+            space again
+        @param float max_poll_interval Longest wait before polling the free
+            space again
+        """
+        super(FlowControlWriter, self).__init__(file, condition)
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        # Estimated free bytes in the command buffer, None if unknown
+        self.free_space = None
+        # Measured bytes per second the machine empties its buffer at
+        self.drain_rate = None
+        self._poll_time = None
+        self._poll_free_space = None
+        self._bytes_since_poll = 0
+        # Polls in a row that found nothing drained, before a drain rate
+        # could be measured
+        self._idle_polls = 0
+        self.time_blocked = 0.0
+        self.time_sending = 0.0
+        self.buffer_polls = 0
+        self.bytes_sent = 0
+
+    def get_flow_control_stats(self):
+        """
+        @return dict of the time spent waiting for room in the buffer and
+            sending packets, in seconds, the number of free space polls,
+            overflows and bytes sent, and the measured drain rate
+        """
+        return {
+            'TimeBlocked': self.time_blocked,
+            'TimeSending': self.time_sending,
+            'BufferPolls': self.buffer_polls,
+            'Overflows': self.total_overflows,
+            'BytesSent': self.bytes_sent,
+            'DrainRate': self.drain_rate,
+        }
+
+    def send_query_payload(self, payload):
+        response = super(FlowControlWriter, self).send_query_payload(payload)
+        if _opcode(payload) in self.buffer_clearing_commands:
+            self._forget_free_space()
+        return response
+
+    def send_action_payload(self, payload):
+        opcode = _opcode(payload)
+        if opcode in self.buffer_clearing_commands:
+            super(FlowControlWriter, self).send_action_payload(payload)
+            self._forget_free_space()
+            return
+        if opcode < 128:
+            # Host queries sent as actions don't take up buffer space
+            super(FlowControlWriter, self).send_action_payload(payload)
+            return
+
+        size = len(payload)
+        while True:
+            self.wait_for_space(size)
+            start_time = time.time()
+            try:
+                super(FlowControlWriter, self).send_action_payload(payload)
+            except makerbot_driver.BufferOverflowError:
+                # The estimate was off
+                self.free_space = None
+                continue
+            finally:
+                self.time_sending += time.time() - start_time
+            self.free_space -= size
+            self._bytes_since_poll += size
+            self.bytes_sent += size
+            return
+
+    def _forget_free_space(self):
+        # The buffer was emptied, so the last poll says nothing about the
+        # drain rate any more
+        self.free_space = None
+        self._poll_free_space = None
+
+    def wait_for_space(self, size):
+        """
+        Block until the command buffer has room for size bytes
+        @param int size Length of the payload to send
+        """
+        start_time = time.time()
+        try:
+            if self.free_space is None:
+                self.poll_free_space()
+            while self.free_space < size:
+                self.check_external_stop()
+                with self._condition:
+                    self._condition.wait(self.poll_interval(size))
+                self.poll_free_space()
+        finally:
+            self.time_blocked += time.time() - start_time
+
+    def poll_interval(self, size):
+        """
+        @return Seconds to wait before the buffer should have drained
+            enough to fit size bytes
+        """
+        if self.drain_rate is None:
+            # Back off while the machine isn't draining its buffer at all
+            interval = self.min_poll_interval * (1 << min(self._idle_polls, 16))
+        elif self.drain_rate == 0:
+            interval = self.max_poll_interval
+        else:
+            interval = float(size - self.free_space) / self.drain_rate
+        return min(max(interval, self.min_poll_interval),
+                   self.max_poll_interval)
+
+    def poll_free_space(self):
+        """
+        Read the free space in the command buffer from the machine, and
+        update the drain rate from the space freed since the last poll
+        """
+        payload = host_query_codecs['GET_AVAILABLE_BUFFER_SIZE'].pack()
+        response = self.send_query_payload(payload)
+        [response_code, free_space] = host_query_codecs[
+            'GET_AVAILABLE_BUFFER_SIZE'].unpack_response(response)
+        now = time.time()
+        self.buffer_polls += 1
+        if self._poll_free_space is not None and now > self._poll_time:
+            drained = free_space - (self._poll_free_space - self._bytes_since_poll)
+            rate = max(drained, 0) / (now - self._poll_time)
+            if self.drain_rate is not None:
+                self.drain_rate = .5 * self.drain_rate + .5 * rate
+            elif drained > 0:
+                self.drain_rate = rate
+            else:
+                self._idle_polls += 1
+        self._poll_time = now
+        self._poll_free_space = free_space
+        self._bytes_since_poll = 0
+        self.free_space = free_space
+        return free_space
+
+
+def _opcode(payload):
+    return bytearray(payload[:1])[0]
@@ -0,0 +1,41 @@
+"""A writer that discards every payload sent to it.
+
+It is used to run gcode through a parser without building to a file or a
+machine, ie to find the state at some line of a print.  Like a FileWriter,
+it can't send Query commands.
+"""
+from __future__ import absolute_import
+import threading
+
+from . import AbstractWriter
+import makerbot_driver
+
+
+class NullWriter(AbstractWriter):
+    """ A writer that throws away action payloads
+    """
+    def __init__(self, condition=None):
+        """ Initialize a new null writer
+
+        @param condition Condition guarding the writer, a new one by default
+        """
+        if condition is None:
+            condition = threading.Condition()
+        super(NullWriter, self).__init__(None, condition)
+        self._open = True
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def is_open(self):
+        return self._open
+
+    def flush(self):
+        pass
+
+    def send_action_payload(self, payload):
+        if self.external_stop:
+            raise makerbot_driver.ExternalStopError
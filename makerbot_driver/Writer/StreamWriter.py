@@ -2,22 +2,36 @@
 """
 from __future__ import absolute_import
 
+import collections
 import time
 import logging
 
 from . import AbstractWriter
 import makerbot_driver
 
+from makerbot_driver.Encoder.CommandCodec import host_query_codecs
 
 class StreamWriter(AbstractWriter):
     """ Represents a writer to a data stream, usually a tty or USB connection
     to a bot at the end of a wire.
+
+    By default every packet is sent stop-and-wait: the writer blocks until
+    the machine has replied before the next packet goes out.  Passing a
+    window_size greater than 1 enables pipelined mode, in which up to
+    window_size action packets are kept in flight and their replies are
+    matched to them in the order they were sent.  Query packets always
+    wait for every in-flight action packet to be acknowledged first.
+
+    A pipelined packet can't be taken back once a later one is accepted, so
+    packets are only pipelined while the machine's command buffer is known
+    to have room for them.  Otherwise they are sent stop-and-wait.
     """
 
-    def __init__(self, file, condition):
+    def __init__(self, file, condition, window_size=1):
         """ Initialize a new StreamWriter object
 
         @param string file File object to interact with
+        @param int window_size Number of action packets allowed in flight
         """
         super(StreamWriter, self).__init__(file, condition)
         self._log = logging.getLogger(self.__class__.__name__)
@@ -25,14 +39,30 @@ class StreamWriter(AbstractWriter):
                        str(self.file))
         self.total_retries = 0
         self.total_overflows = 0
+        self.window_size = window_size
+        # Packets written to the stream whose replies have not been read yet
+        self._in_flight = collections.deque()
+        # Packets rejected with a buffer overflow, to be resent before
+        # anything else goes out
+        self._pending = collections.deque()
+        # Free bytes in the machine's command buffer not yet used by the
+        # pipelined packets, None if the buffer has to be polled first
+        self._window_space = None
+        # Bytes read from the stream that haven't been decoded yet
+        self._receive_buffer = bytearray()
 
     # TODO: test me
     def send_query_payload(self, payload):
+        self.drain()
         return self.send_command(payload)
 
     # TODO: test me
     def send_action_payload(self, payload):
-        self.send_command(payload)
+        if self.window_size > 1:
+            packet = makerbot_driver.Encoder.encode_payload(payload)
+            self.send_pipelined_packet(packet)
+        else:
+            self.send_command(payload)
 
     def close(self):
         with self._condition:
@@ -56,6 +86,51 @@ class StreamWriter(AbstractWriter):
         packet = makerbot_driver.Encoder.encode_payload(payload)
         return self.send_packet(packet)
 
+    def check_external_stop(self):
+        if self.external_stop:
+            self._log.error('{"event":"external_stop"}')
+            raise makerbot_driver.ExternalStopError
+
+    def read_response(self):
+        """
+        Read a single response packet from the stream.  Raises a TimeoutError
+        if the packet is not received within makerbot_driver.timeout_length.
+        Bytes read past the end of the packet are kept for the next call.
+        @return Response payload, including the response code
+        """
+        decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+        # Timeout if a response is not received within 1 second.
+        start_time = time.time()
+        while (decoder.state != 'PAYLOAD_READY'):
+            if not self._receive_buffer:
+                self._fill_receive_buffer(start_time, decoder)
+            decoder.parse_bytes(self._receive_buffer)
+        return decoder.payload
+
+    def _fill_receive_buffer(self, start_time, decoder):
+        data = ''
+        while data == '':
+            if (time.time() > start_time + makerbot_driver.timeout_length):
+                self._log.error('{"event":"machine_timeout"}')
+                raise makerbot_driver.TimeoutError(len(data), decoder.state)
+
+            # Take everything that has already arrived in one read, but never
+            # block waiting on bytes beyond the end of the current packet.
+            # pySerial streams handle blocking read. Be sure to set up a timeout when
+            # initializing them, or this could hang forever
+            size = max(self._bytes_waiting(), decoder.bytes_needed())
+            data = self.file.read(size)
+
+        self._receive_buffer.extend(data)
+
+    def _bytes_waiting(self):
+        """@returns the number of bytes that can be read without blocking, or
+        0 if the stream can't tell us """
+        try:
+            return self.file.inWaiting()
+        except AttributeError:
+            return 0
+
     def send_packet(self, packet):
         """
         Attempt to send a packet to the machine, retrying up to 5 times if an error
@@ -67,41 +142,19 @@ class StreamWriter(AbstractWriter):
         retry_count = 0
         received_errors = []
         while True:
-            if self.external_stop:
-                self._log.error('{"event":"external_stop"}')
-                raise makerbot_driver.ExternalStopError
-            decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+            self.check_external_stop()
             with self._condition:
                 self.file.write(packet)
                 self.file.flush()
 
-            # Timeout if a response is not received within 1 second.
-            start_time = time.time()
-
             try:
                 with self._condition:
-                    while (decoder.state != 'PAYLOAD_READY'):
-                        # Try to read a byte
-                        data = ''
-                        while data == '':
-                            if (time.time() > start_time + makerbot_driver.timeout_length):
-                                self._log.error('{"event":"machine_timeout"}')
-                                raise makerbot_driver.TimeoutError(len(data), decoder.state)
-
-                            # pySerial streams handle blocking read. Be sure to set up a timeout when
-                            # initializing them, or this could hang forever
-                            data = self.file.read(1)
-
-                        data = ord(data)
-                        decoder.parse_byte(data)
-
-                    makerbot_driver.Encoder.check_response_code(decoder.payload[0])
-                    if self.external_stop:
-                        self._log.error('{"event":"external_stop"}')
-                        raise makerbot_driver.ExternalStopError
+                    payload = self.read_response()
+                    makerbot_driver.Encoder.check_response_code(payload[0])
+                    self.check_external_stop()
 
                 # TODO: Should we chop the response code?
-                return decoder.payload
+                return payload
 
             except (makerbot_driver.BufferOverflowError) as e:
                 # Relative to the StreamWriter, BufferOverflowErrors aren't retryable.  But, they
@@ -132,3 +185,162 @@ class StreamWriter(AbstractWriter):
             if retry_count >= makerbot_driver.max_retry_count:
                 self._log.error('{"event":"transmission_error"}')
                 raise makerbot_driver.TransmissionError(received_errors)
+
+    def send_pipelined_packet(self, packet):
+        """
+        Send an action packet without waiting for its reply.  Replies are
+        read back only once window_size packets are in flight, oldest first.
+
+        A packet is only pipelined if the free space last read from the
+        machine's command buffer, less the packets pipelined since, has
+        room for it.  Otherwise the window is drained and the free space is
+        polled again.  A packet that still doesn't fit is sent
+        stop-and-wait, and like in stop-and-wait mode, a BufferOverflowError
+        is raised if the machine rejects it, for the caller to resend it
+        later.  Host commands sent as actions don't go in the buffer, and are
+        always sent stop-and-wait.
+
+        @param packet Packet to send to the machine
+        """
+        self.check_external_stop()
+        with self._condition:
+            self._resend_pending()
+            size = packet[1]
+            if packet[2] < 128:
+                self.drain()
+                # Some of these, ie CLEAR_BUFFER, empty the buffer
+                self._window_space = None
+                self.send_packet(packet)
+                return
+            if self._window_space is None or size > self._window_space:
+                self.drain()
+                self._window_space = self.poll_buffer_space()
+            if size > self._window_space:
+                self._window_space = None
+                self.send_packet(packet)
+                return
+            self._window_space -= size
+            self._write_in_flight(packet)
+            try:
+                while len(self._in_flight) >= self.window_size:
+                    self._receive_oldest()
+            except makerbot_driver.BufferOverflowError as e:
+                # The caller will resend this packet itself
+                if self._pending and self._pending[-1] is packet:
+                    self._pending.pop()
+                raise e
+
+    def poll_buffer_space(self):
+        """
+        @return Free bytes in the machine's command buffer
+        """
+        codec = host_query_codecs['GET_AVAILABLE_BUFFER_SIZE']
+        response = self.send_command(codec.pack())
+        return codec.unpack_response(response)[1]
+
+    def drain(self):
+        """
+        Block until every in-flight packet has been acknowledged.  Packets
+        held back by an earlier buffer overflow are resent first.  Raises a
+        BufferOverflowError if the machine still can't accept them, in
+        which case drain should be called again later.
+        """
+        with self._condition:
+            self._resend_pending()
+            while self._in_flight:
+                self._receive_oldest()
+
+    def _write_in_flight(self, packet):
+        self.file.write(packet)
+        self.file.flush()
+        self._in_flight.append(packet)
+
+    def _resend_pending(self):
+        # Resent one at a time, so that a packet rejected again can't be
+        # overtaken by the ones after it
+        while self._pending:
+            self.send_packet(self._pending[0])
+            self._pending.popleft()
+
+    def _receive_oldest(self):
+        """
+        Read the reply to the oldest in-flight packet.  On failure, the
+        replies to the packets sent after it are read as well, so that
+        every rejected packet can be resent in its original order.
+        """
+        retry_count = 0
+        received_errors = []
+        while self._in_flight:
+            try:
+                payload = self.read_response()
+                makerbot_driver.Encoder.check_response_code(payload[0])
+                self._in_flight.popleft()
+                self.check_external_stop()
+                return payload
+
+            except (makerbot_driver.BufferOverflowError) as e:
+                # The free space estimate was off, ie something else used
+                # the buffer
+                self._log.debug('{"event":"buffer_overflow", "in_flight":%i}', len(self._in_flight))
+                self.total_overflows += 1
+                self._window_space = None
+                rejected, errors = self._collect_rejected(e)
+                self._pending.extend(rejected)
+                raise e
+
+            except makerbot_driver.RetryableError as e:
+                # Malformed replies and timeouts are retried too, like in
+                # stop-and-wait mode
+                self._log.debug('{"event":"transmission_problem", "exception":"%s", "message":"%s", "retry_count"=%i}', type(e), e.__str__(), retry_count)
+                rejected, errors = self._collect_rejected(e)
+
+            except makerbot_driver.ExternalStopError as e:
+                raise e
+
+            except Exception as e:
+                # Other exceptions are propigated upwards.  The reply has been
+                # consumed, so the oldest packet leaves the window with it.
+                self._log.error('{"event":"unhandled_exception", "exception":"%s", "message":"%s", "retry_count"=%i}', type(e), e.__str__(), retry_count)
+                self._in_flight.popleft()
+                raise e
+
+            self.total_retries += 1
+            retry_count += 1
+            received_errors.extend(errors)
+            if retry_count >= makerbot_driver.max_retry_count:
+                self._log.error('{"event":"transmission_error"}')
+                raise makerbot_driver.TransmissionError(received_errors)
+
+            for packet in rejected:
+                self._write_in_flight(packet)
+
+    def _collect_rejected(self, error):
+        """
+        The oldest in-flight packet was rejected with error, or its reply
+        couldn't be read.  Reads the replies to every packet sent after it
+        and empties the window.
+
+        Resending is only safe if none of the later packets were accepted,
+        since the machine would otherwise execute them out of order.  In
+        that case a TransmissionError is raised.
+
+        @param error The error the oldest packet was rejected with
+        @return (rejected, errors): the rejected packets, in order, and the
+            names of the errors they were rejected with
+        """
+        rejected = [self._in_flight.popleft()]
+        errors = [error.__class__.__name__]
+        accepted_out_of_order = False
+        while self._in_flight:
+            packet = self._in_flight.popleft()
+            try:
+                payload = self.read_response()
+                makerbot_driver.Encoder.check_response_code(payload[0])
+                accepted_out_of_order = True
+            except (makerbot_driver.RetryableError, makerbot_driver.BufferOverflowError) as e:
+                rejected.append(packet)
+                errors.append(e.__class__.__name__)
+        if accepted_out_of_order:
+            self._log.error('{"event":"accepted_out_of_order", "errors":"%s"}', errors)
+            raise makerbot_driver.TransmissionError(errors)
+        return rejected, errors
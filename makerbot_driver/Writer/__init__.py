@@ -1,6 +1,9 @@
-__all__ = ['AbstractWriter', 'FileWriter', 'StreamWriter', 'errors']
+__all__ = ['AbstractWriter', 'AsyncStreamWriter', 'FileWriter', 'FlowControlWriter', 'NullWriter', 'StreamWriter', 'errors']
 
 from AbstractWriter import *
 from StreamWriter import *
 from FileWriter import *
+from FlowControlWriter import *
+from NullWriter import *
+from AsyncStreamWriter import *
 from errors import *
@@ -1,14 +1,16 @@
-__all__ = ['GcodeProcessors', 'Encoder', 'EEPROM', 'FileReader', 'Gcode', 'Writer', 'MachineFactory', 'MachineDetector', 's3g', 'profile', 'constants', 'errors', 'GcodeAssembler', 'Factory']
+__all__ = ['GcodeProcessors', 'Encoder', 'EEPROM', 'FileReader', 'Gcode', 'Writer', 'MachineFactory', 'MachineDetector', 'MachineFleet', 's3g', 'AsyncS3g', 'profile', 'constants', 'errors', 'GcodeAssembler', 'Factory']
 
 __version__ = '0.1.1'
 
 from constants import *
 from errors import *
 from s3g import *
+from AsyncS3g import *
 from profile import *
 from GcodeAssembler import *
 from MachineDetector import *
 from MachineFactory import *
+from MachineFleet import *
 from Factory import *
 import GcodeProcessors
 import Encoder
@@ -16,4 +18,5 @@ import EEPROM
 import FileReader
 import Firmware
 import Gcode
+from Gcode import compile_gcode
 import Writer
@@ -70,6 +70,7 @@ slave_query_command_dict = {
 slave_action_command_dict = {
     'INIT': 1,
     'SET_TOOLHEAD_TARGET_TEMP': 3,
+    'SET_MOTOR_1_SPEED_PWM': 4,
     'SET_MOTOR_1_SPEED_RPM': 6,
     'SET_MOTOR_1_DIRECTION': 8,
     'TOGGLE_MOTOR_1': 10,
@@ -243,3 +243,10 @@ class ExternalStopError(Exception):
     source wishes to force the StreamWriter to stop
     sending packets to a stream.
     """
+
+
+class UnknownMachineError(Exception):
+    """
+    An UnknownMachineError is thrown when the machine at a port doesn't
+    match any known profile.
+    """
@@ -9,6 +9,8 @@ import serial
 import makerbot_driver
 import uuid
 
+from makerbot_driver.Encoder.CommandCodec import host_query_codecs, host_action_codecs, slave_query_codecs, slave_action_codecs
+
 
 class s3g(object):
     """ Represents an interface to a s3g driven bot. Contains methods and functions to
@@ -65,6 +67,20 @@ class s3g(object):
                 self)
         return self._eeprom_reader
 
+    def take_eeprom_snapshot(self):
+        """
+        Read the whole eeprom in as few round trips as possible.  Until the
+        snapshot is cleared, eeprom values (ie get_name and
+        get_toolhead_count) are read from it instead of the machine.
+        @return bytearray image of the eeprom
+        """
+        return self.eeprom_reader.take_snapshot()
+
+    def clear_eeprom_snapshot(self):
+        """ Read eeprom values from the machine again """
+        if self._eeprom_reader is not None:
+            self._eeprom_reader.snapshot = None
+
     def close(self):
         """ If any ports are open for this s3g bot, it closes those ports """
         if self.writer:
@@ -86,15 +102,12 @@ class s3g(object):
         Get the firmware version number of the connected machine
         @return Version number
         """
-        payload = struct.pack(
-            '<BH',
-            makerbot_driver.host_query_command_dict['GET_VERSION'],
+        payload = host_query_codecs['GET_VERSION'].pack(
             makerbot_driver.s3g_version,
         )
 
         response = self.writer.send_query_payload(payload)
-        [response_code, version] = makerbot_driver.Encoder.unpack_response(
-            '<BH', response)
+        [response_code, version] = host_query_codecs['GET_VERSION'].unpack_response(response)
         # TODO: check response_code
         return version
 
@@ -126,8 +139,7 @@ class s3g(object):
         """
         @returns tuple of vid,pid. tuple from EEPROM (None,None) on error
         """
-        reader = self.create_reader()
-        data = reader.read_data('VID_PID_INFO')
+        data = self.eeprom_reader.read_data('VID_PID_INFO')
         return data[0], data[1]
 
     def get_vid_pid_iface(self):
@@ -157,9 +169,7 @@ class s3g(object):
         Get the firmware version number of the connected machine
         @return Version number
         """
-        payload = struct.pack(
-            '<BH',
-            makerbot_driver.host_query_command_dict['GET_ADVANCED_VERSION'],
+        payload = host_query_codecs['GET_ADVANCED_VERSION'].pack(
             makerbot_driver.s3g_version,
         )
 
@@ -169,7 +179,7 @@ class s3g(object):
          internal_version,
          software_variant,
          reserved_a,
-         reserved_b] = makerbot_driver.Encoder.unpack_response('<BHHBBH', response)
+         reserved_b] = host_query_codecs['GET_ADVANCED_VERSION'].unpack_response(response)
         # TODO: check response_code
 
         version_info = {
@@ -187,16 +197,13 @@ class s3g(object):
         Capture all subsequent commands up to the 'end capture' command to a file with the given filename on an SD card.
         @param str filename: The name of the file to write to on the SD card
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['CAPTURE_TO_FILE'],
-        )
+        payload = host_query_codecs['CAPTURE_TO_FILE'].pack()
         payload += filename
         payload += '\x00'
 
         response = self.writer.send_query_payload(payload)
 
-        [response_code, sd_response_code] = makerbot_driver.Encoder.unpack_response('<BB', response)
+        [response_code, sd_response_code] = host_query_codecs['CAPTURE_TO_FILE'].unpack_response(response)
         # TODO: check response_code
         if sd_response_code != makerbot_driver.sd_error_dict['SUCCESS']:
             raise makerbot_driver.SDCardError(sd_response_code)
@@ -206,15 +213,11 @@ class s3g(object):
         Send the end capture signal to the bot, so it stops capturing data and writes all commands out to a file on the SD card
         @return The number of bytes written to file
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['END_CAPTURE'],
-        )
+        payload = host_query_codecs['END_CAPTURE'].pack()
 
         response = self.writer.send_query_payload(payload)
 
-        [response_code, sdResponse] = makerbot_driver.Encoder.unpack_response(
-            '<BI', response)
+        [response_code, sdResponse] = host_query_codecs['END_CAPTURE'].unpack_response(response)
         # TODO: check response_code
         return sdResponse
 
@@ -222,10 +225,7 @@ class s3g(object):
         """
         reset the bot, unless the bot is waiting to tell us a build is cancelled.
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['RESET'],
-        )
+        payload = host_query_codecs['RESET'].pack()
 
         # TODO: mismatch here.
         self.writer.send_action_payload(payload)
@@ -234,15 +234,11 @@ class s3g(object):
         """
         Checks if the steppers are still executing a command
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['IS_FINISHED'],
-        )
+        payload = host_query_codecs['IS_FINISHED'].pack()
 
         response = self.writer.send_query_payload(payload)
 
-        [response_code, isFinished] = makerbot_driver.Encoder.unpack_response(
-            '<B?', response)
+        [response_code, isFinished] = host_query_codecs['IS_FINISHED'].unpack_response(response)
         # TODO: check response_code
         return isFinished
 
@@ -250,10 +246,7 @@ class s3g(object):
         """
         Clears the buffer of all commands
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['CLEAR_BUFFER'],
-        )
+        payload = host_query_codecs['CLEAR_BUFFER'].pack()
 
         # TODO: mismatch here.
         self.writer.send_action_payload(payload)
@@ -262,10 +255,7 @@ class s3g(object):
         """
         pause the machine
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['PAUSE'],
-        )
+        payload = host_query_codecs['PAUSE'].pack()
 
         # TODO: mismatch here.
         self.writer.send_action_payload(payload)
@@ -274,10 +264,7 @@ class s3g(object):
         """
         Get some statistics about the print currently running, or the last print if no print is active
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['GET_BUILD_STATS'],
-        )
+        payload = host_query_codecs['GET_BUILD_STATS'].pack()
 
         response = self.writer.send_query_payload(payload)
 
@@ -286,7 +273,7 @@ class s3g(object):
          build_hours,
          build_minutes,
          line_number,
-         reserved] = makerbot_driver.Encoder.unpack_response('<BBBBLL', response)
+         reserved] = host_query_codecs['GET_BUILD_STATS'].unpack_response(response)
         # TODO: check response_code
 
         info = {
@@ -303,10 +290,7 @@ class s3g(object):
         Get some communication statistics about traffic on the tool network from the Host.
         @return a dictionary of communication stats, keyed by stat name
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['GET_COMMUNICATION_STATS'],
-        )
+        payload = host_query_codecs['GET_COMMUNICATION_STATS'].pack()
 
         response = self.writer.send_query_payload(payload)
 
@@ -315,7 +299,7 @@ class s3g(object):
          packetsSent,
          nonResponsivePacketsSent,
          packetRetries,
-         noiseBytes] = makerbot_driver.Encoder.unpack_response('<BLLLLL', response)
+         noiseBytes] = host_query_codecs['GET_COMMUNICATION_STATS'].unpack_response(response)
         # TODO: check response_code
 
         info = {
@@ -334,15 +318,11 @@ class s3g(object):
         HEAT_SHUTDOWN : The heaters were shutdown because the bot was inactive for over 20 minutes
         @return: A python dictionary of various flags and whether they were set or not at reset
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['GET_MOTHERBOARD_STATUS'],
-        )
+        payload = host_query_codecs['GET_MOTHERBOARD_STATUS'].pack()
 
         response = self.writer.send_query_payload(payload)
 
-        [response_code, bitfield] = makerbot_driver.Encoder.unpack_response(
-            '<BB', response)
+        [response_code, bitfield] = host_query_codecs['GET_MOTHERBOARD_STATUS'].unpack_response(response)
         # TODO: check response_code
 
         bitfield = makerbot_driver.Encoder.decode_bitfield(bitfield)
@@ -371,15 +351,13 @@ class s3g(object):
         if clear_buffer:
             bitfield |= 0x02
 
-        payload = struct.pack(
-            '<Bb',
-            makerbot_driver.host_query_command_dict['EXTENDED_STOP'],
+        payload = host_query_codecs['EXTENDED_STOP'].pack(
             bitfield,
         )
 
         response = self.writer.send_query_payload(payload)
 
-        [response_code, extended_stop_response] = makerbot_driver.Encoder.unpack_response('<BB', response)
+        [response_code, extended_stop_response] = host_query_codecs['EXTENDED_STOP'].unpack_response(response)
         # TODO: check response_code
 
         if extended_stop_response != 0:
@@ -394,10 +372,7 @@ class s3g(object):
         @param int delay: Time in ms between packets to query the toolhead
         @param int timeout: Time to wait in seconds for the toolhead to heat up before moving on
         """
-        payload = struct.pack(
-            '<BBHH',
-            makerbot_driver.host_action_command_dict[
-                'WAIT_FOR_PLATFORM_READY'],
+        payload = host_action_codecs['WAIT_FOR_PLATFORM_READY'].pack(
             tool_index,
             delay,
             timeout
@@ -414,9 +389,7 @@ class s3g(object):
         @param int delay: Time in ms between packets to query the toolhead
         @param int timeout: Time to wait in seconds for the toolhead to heat up before moving on
         """
-        payload = struct.pack(
-            '<BBHH',
-            makerbot_driver.host_action_command_dict['WAIT_FOR_TOOL_READY'],
+        payload = host_action_codecs['WAIT_FOR_TOOL_READY'].pack(
             tool_index,
             delay,
             timeout
@@ -429,9 +402,7 @@ class s3g(object):
         Halts all motion for the specified amount of time
         @param int delay: delay time, in microseconds
         """
-        payload = struct.pack(
-            '<BI',
-            makerbot_driver.host_action_command_dict['DELAY'],
+        payload = host_action_codecs['DELAY'].pack(
             delay
         )
 
@@ -442,9 +413,7 @@ class s3g(object):
         Change to the specified toolhead
         @param int tool_index: toolhead index
         """
-        payload = struct.pack(
-            '<BB',
-            makerbot_driver.host_action_command_dict['CHANGE_TOOL'],
+        payload = host_action_codecs['CHANGE_TOOL'].pack(
             tool_index
         )
 
@@ -461,9 +430,7 @@ class s3g(object):
         if enable:
             axes_bitfield |= 0x80
 
-        payload = struct.pack(
-            '<BB',
-            makerbot_driver.host_action_command_dict['ENABLE_AXES'],
+        payload = host_action_codecs['ENABLE_AXES'].pack(
             axes_bitfield
         )
 
@@ -482,10 +449,7 @@ class s3g(object):
         if len(position) != s3g.EXTENDED_POINT_LENGTH:
             raise makerbot_driver.PointLengthError(len(position))
 
-        payload = struct.pack(
-            '<BiiiiiIB',
-            makerbot_driver.host_action_command_dict[
-                'QUEUE_EXTENDED_POINT_NEW'],
+        payload = host_action_codecs['QUEUE_EXTENDED_POINT_NEW'].pack(
             position[0], position[1], position[2], position[3], position[4],
             duration,
             makerbot_driver.Encoder.encode_axes(relative_axes)
@@ -498,13 +462,12 @@ class s3g(object):
         Write the current axes locations to the EEPROM as the home position
         @param list axes: Array of axis names ['x', 'y', ...] whose position should be saved
         """
-        payload = struct.pack(
-            '<BB',
-            makerbot_driver.host_action_command_dict['STORE_HOME_POSITIONS'],
+        payload = host_action_codecs['STORE_HOME_POSITIONS'].pack(
             makerbot_driver.Encoder.encode_axes(axes)
         )
 
         self.writer.send_action_payload(payload)
+        self.clear_eeprom_snapshot()
 
     def set_potentiometer_value(self, axis, value):
         """
@@ -519,9 +482,7 @@ class s3g(object):
         """
         max_value = 127
         value = min(value, max_value)
-        payload = struct.pack(
-            '<BBB',
-            makerbot_driver.host_action_command_dict['SET_POT_VALUE'],
+        payload = host_action_codecs['SET_POT_VALUE'].pack(
             axis,
             value,
         )
@@ -534,9 +495,7 @@ class s3g(object):
         @param int frequency: Frequency of the tone, in hz
         @param int duration: Duration of the tone, in ms
         """
-        payload = struct.pack(
-            '<BHHB',
-            makerbot_driver.host_action_command_dict['SET_BEEP'],
+        payload = host_action_codecs['SET_BEEP'].pack(
             frequency,
             duration,
             0x00
@@ -552,9 +511,7 @@ class s3g(object):
         @param int b: The b value (0-255) for the LEDs
         @param int blink: The blink rate (0-255) for the LEDs
         """
-        payload = struct.pack(
-            '<BBBBBB',
-            makerbot_driver.host_action_command_dict['SET_RGB_LED'],
+        payload = host_action_codecs['SET_RGB_LED'].pack(
             r,
             g,
             b,
@@ -569,9 +526,7 @@ class s3g(object):
         Recall and move to the home positions written to the EEPROM
         @param axes: Array of axis names ['x', 'y', ...] whose position should be saved
         """
-        payload = struct.pack(
-            '<BB',
-            makerbot_driver.host_action_command_dict['RECALL_HOME_POSITIONS'],
+        payload = host_action_codecs['RECALL_HOME_POSITIONS'].pack(
             makerbot_driver.Encoder.encode_axes(axes)
         )
 
@@ -581,10 +536,7 @@ class s3g(object):
         """
         Sends 'init' packet to machine to Initialize the machine to a default state
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['INIT']
-        )
+        payload = host_query_codecs['INIT'].pack()
 
         self.writer.send_action_payload(payload)
 
@@ -600,12 +552,16 @@ class s3g(object):
         if tool_index > makerbot_driver.max_tool_index or tool_index < 0:
             raise makerbot_driver.ToolIndexError(1)
 
-        payload = struct.pack(
-            '<%s' % self.tool_query_code,
-            makerbot_driver.host_query_command_dict['TOOL_QUERY'],
-            tool_index,
-            command,
-        )
+        codec = host_query_codecs['TOOL_QUERY']
+        if self.tool_query_code == codec.struct.format[1:]:
+            payload = codec.pack(tool_index, command)
+        else:
+            payload = struct.pack(
+                '<%s' % self.tool_query_code,
+                codec.opcode,
+                tool_index,
+                command,
+            )
 
         if tool_payload is not None:
             payload += tool_payload
@@ -626,9 +582,7 @@ class s3g(object):
         if length > makerbot_driver.maximum_payload_length - 1:
             raise makerbot_driver.EEPROMLengthError(length)
 
-        payload = struct.pack(
-            '<BHb',
-            makerbot_driver.host_query_command_dict['READ_FROM_EEPROM'],
+        payload = host_query_codecs['READ_FROM_EEPROM'].pack(
             offset,
             length
         )
@@ -643,14 +597,12 @@ class s3g(object):
         @param byte offset: EEPROM location to begin writing to
         @param int data: Data to write to the EEPROM
         """
-        code = '<Bhb'
+        codec = host_query_codecs['WRITE_TO_EEPROM']
         # Check the length of data against maximum_payload_length and the compulsory packet values
-        if len(data) > makerbot_driver.maximum_payload_length - struct.calcsize(code):
+        if len(data) > makerbot_driver.maximum_payload_length - codec.size:
             raise makerbot_driver.EEPROMLengthError(len(data))
 
-        payload = struct.pack(
-            code,
-            makerbot_driver.host_query_command_dict['WRITE_TO_EEPROM'],
+        payload = codec.pack(
             offset,
             len(data),
         )
@@ -662,20 +614,18 @@ class s3g(object):
         if response[1] != len(data):
             raise makerbot_driver.EEPROMMismatchError(response[1])
 
+        if self._eeprom_reader is not None:
+            self._eeprom_reader.update_snapshot(offset, data)
+
     def get_available_buffer_size(self):
         """
         Gets the available buffer size
         @return Available buffer size, in bytes
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict[
-                'GET_AVAILABLE_BUFFER_SIZE'],
-        )
+        payload = host_query_codecs['GET_AVAILABLE_BUFFER_SIZE'].pack()
 
         response = self.writer.send_query_payload(payload)
-        [response_code, buffer_size] = makerbot_driver.Encoder.unpack_response(
-            '<BI', response)
+        [response_code, buffer_size] = host_query_codecs['GET_AVAILABLE_BUFFER_SIZE'].unpack_response(response)
         # TODO: check response_code
 
         return buffer_size
@@ -685,10 +635,7 @@ class s3g(object):
         Stop the machine by disabling steppers, clearing the command buffers, and
         instructing the toolheads to shut down
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['ABORT_IMMEDIATELY']
-        )
+        payload = host_query_codecs['ABORT_IMMEDIATELY'].pack()
 
         resposne = self.writer.send_query_payload(payload)
 
@@ -697,17 +644,14 @@ class s3g(object):
         Instruct the machine to play back (build) a file from it's SD card.
         @param str filename: Name of the file to print. Should have been retrieved by
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['PLAYBACK_CAPTURE'],
-        )
+        payload = host_query_codecs['PLAYBACK_CAPTURE'].pack()
 
         payload += filename
         payload += '\x00'
 
         response = self.writer.send_query_payload(payload)
 
-        [response_code, sd_response_code] = makerbot_driver.Encoder.unpack_response('<BB', response)
+        [response_code, sd_response_code] = host_query_codecs['PLAYBACK_CAPTURE'].unpack_response(response)
         # TODO: check response_code
 
         if sd_response_code != makerbot_driver.sd_error_dict['SUCCESS']:
@@ -721,13 +665,11 @@ class s3g(object):
         """
         flag = 1 if reset else 0
 
-        payload = struct.pack(
-            '<Bb',
-            makerbot_driver.host_query_command_dict['GET_NEXT_FILENAME'],
+        payload = host_query_codecs['GET_NEXT_FILENAME'].pack(
             flag,
         )
         response = self.writer.send_query_payload(payload)
-        [response_code, sd_response_code, filename] = makerbot_driver.Encoder.unpack_response_with_string('<BB', response)
+        [response_code, sd_response_code, filename] = host_query_codecs['GET_NEXT_FILENAME'].unpack_response(response)
         # TODO: check response_code
 
         if sd_response_code != makerbot_driver.sd_error_dict['SUCCESS']:
@@ -740,13 +682,10 @@ class s3g(object):
         Get the build name of the file printing on the machine, if any.
         @param str filename: The filename of the current print
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['GET_BUILD_NAME']
-        )
+        payload = host_query_codecs['GET_BUILD_NAME'].pack()
 
         response = self.writer.send_query_payload(payload)
-        [response_code, filename] = makerbot_driver.Encoder.unpack_response_with_string('<B', response)
+        [response_code, filename] = host_query_codecs['GET_BUILD_NAME'].unpack_response(response)
         # TODO: check response_code
 
         return filename
@@ -756,16 +695,13 @@ class s3g(object):
         Gets the current machine position
         @return tuple position: containing the current 5D position (x,y,z,a,b) location and endstop states.
         """
-        payload = struct.pack(
-            '<B',
-            makerbot_driver.host_query_command_dict['GET_EXTENDED_POSITION'],
-        )
+        payload = host_query_codecs['GET_EXTENDED_POSITION'].pack()
 
         response = self.writer.send_query_payload(payload)
 
         [response_code,
          x, y, z, a, b,
-         endstop_states] = makerbot_driver.Encoder.unpack_response('<BiiiiiH', response)
+         endstop_states] = host_query_codecs['GET_EXTENDED_POSITION'].unpack_response(response)
         # TODO: check response_code
 
         return [x, y, z, a, b], endstop_states
@@ -778,9 +714,7 @@ class s3g(object):
         @param double rate: Movement rate, in steps/??
         @param double timeout: Amount of time in seconds to move before halting the command
         """
-        payload = struct.pack(
-            '<BBIH',
-            makerbot_driver.host_action_command_dict['FIND_AXES_MINIMUMS'],
+        payload = host_action_codecs['FIND_AXES_MINIMUMS'].pack(
             makerbot_driver.Encoder.encode_axes(axes),
             rate,
             timeout
@@ -796,9 +730,7 @@ class s3g(object):
         @param double rate: Movement rate, in steps/??
         @param double timeout: Amount of time to move in seconds before halting the command
         """
-        payload = struct.pack(
-            '<BBIH',
-            makerbot_driver.host_action_command_dict['FIND_AXES_MAXIMUMS'],
+        payload = host_action_codecs['FIND_AXES_MAXIMUMS'].pack(
             makerbot_driver.Encoder.encode_axes(axes),
             rate,
             timeout
@@ -816,9 +748,7 @@ class s3g(object):
         if tool_index > makerbot_driver.max_tool_index or tool_index < 0:
             raise makerbot_driver.ToolIndexError(tool_index)
 
-        payload = struct.pack(
-            '<BBBB',
-            makerbot_driver.host_action_command_dict['TOOL_ACTION_COMMAND'],
+        payload = host_action_codecs['TOOL_ACTION_COMMAND'].pack(
             tool_index, command, len(tool_payload)
         )
 
@@ -841,10 +771,7 @@ class s3g(object):
         if len(position) != s3g.EXTENDED_POINT_LENGTH:
             raise makerbot_driver.PointLengthError(len(position))
 
-        payload = struct.pack(
-            '<BiiiiiIBfh',
-        makerbot_driver.makerbot_driver.host_action_command_dict[
-            'QUEUE_EXTENDED_POINT_ACCELERATED'],
+        payload = host_action_codecs['QUEUE_EXTENDED_POINT_ACCELERATED'].pack(
         position[0], position[1], position[2], position[3], position[4],
         dda_rate,
         makerbot_driver.Encoder.encode_axes(relative_axes),
@@ -886,10 +813,7 @@ class s3g(object):
         if len(position) != s3g.EXTENDED_POINT_LENGTH:
             raise makerbot_driver.PointLengthError(len(position))
 
-        payload = struct.pack(
-            '<BiiiiiI',
-        makerbot_driver.host_action_command_dict[
-            'QUEUE_EXTENDED_POINT'],
+        payload = host_action_codecs['QUEUE_EXTENDED_POINT'].pack(
         position[0], position[1], position[2],
         position[3], position[4], dda_speed
         )
@@ -904,9 +828,7 @@ class s3g(object):
         if len(position) != s3g.EXTENDED_POINT_LENGTH:
             raise makerbot_driver.PointLengthError(len(position))
 
-        payload = struct.pack(
-            '<Biiiii',
-            makerbot_driver.host_action_command_dict['SET_EXTENDED_POSITION'],
+        payload = host_action_codecs['SET_EXTENDED_POSITION'].pack(
             position[0], position[1], position[2],
             position[3], position[4],
         )
@@ -945,9 +867,7 @@ class s3g(object):
         if clear_screen:
             optionsField |= 0x04
 
-        payload = struct.pack(
-            '<BBHB',
-            makerbot_driver.host_action_command_dict['WAIT_FOR_BUTTON'],
+        payload = host_action_codecs['WAIT_FOR_BUTTON'].pack(
             button,
             timeout,
             optionsField
@@ -959,22 +879,19 @@ class s3g(object):
         """
         Calls factory reset on the EEPROM.  Resets all values to their factory settings.  Also soft resets the board
         """
-        payload = struct.pack(
-            '<BB',
-            makerbot_driver.host_action_command_dict['RESET_TO_FACTORY'],
+        payload = host_action_codecs['RESET_TO_FACTORY'].pack(
             0x00
         )
 
         self.writer.send_action_payload(payload)
+        self.clear_eeprom_snapshot()
 
     def queue_song(self, song_id):
         """
         Play predefined sogns on the piezo buzzer
         @param int songId: The id of the song to play.
         """
-        payload = struct.pack(
-            '<BB',
-            makerbot_driver.host_action_command_dict['QUEUE_SONG'],
+        payload = host_action_codecs['QUEUE_SONG'].pack(
             song_id
         )
 
@@ -985,9 +902,7 @@ class s3g(object):
         Sets the percentage done for the current build.  This value is displayed on the interface board's screen.
         @param int percent: Percent of the build done (0-100)
         """
-        payload = struct.pack(
-            '<BBB',
-            makerbot_driver.host_action_command_dict['SET_BUILD_PERCENT'],
+        payload = host_action_codecs['SET_BUILD_PERCENT'].pack(
             percent,
             0x00
         )
@@ -1014,9 +929,7 @@ class s3g(object):
         if wait_for_button:
             bitField |= 0x04
 
-        payload = struct.pack(
-            '<BBBBB',
-            makerbot_driver.host_action_command_dict['DISPLAY_MESSAGE'],
+        payload = host_action_codecs['DISPLAY_MESSAGE'].pack(
             bitField, col, row, timeout,
         )
         payload += message
@@ -1035,11 +948,7 @@ class s3g(object):
         if len(build_name) > makerbot_driver.maximum_payload_length - other_info_in_packet:
             build_name = build_name[:makerbot_driver.maximum_payload_length -
                                     other_info_in_packet]
-        payload = struct.pack(
-            '<BI',
-            makerbot_driver.host_action_command_dict[
-                'BUILD_START_NOTIFICATION'], 0
-        )
+        payload = host_action_codecs['BUILD_START_NOTIFICATION'].pack(0)
 
         payload += build_name
         payload += '\x00'
@@ -1050,9 +959,7 @@ class s3g(object):
         """
         Notify the machine that a build has been stopped.
         """
-        payload = struct.pack(
-            '<BB',
-            makerbot_driver.host_action_command_dict['BUILD_END_NOTIFICATION'],
+        payload = host_action_codecs['BUILD_END_NOTIFICATION'].pack(
             0,
         )
 
@@ -1063,13 +970,12 @@ class s3g(object):
         Get the firmware version number of the specified toolhead
         @return double Version number
         """
-        payload = struct.pack(
-            '<H', makerbot_driver.s3g_version)
+        payload = slave_query_codecs['GET_VERSION'].pack_parameters(
+            makerbot_driver.s3g_version)
 
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_VERSION'], payload)
-        [response_code, version] = makerbot_driver.Encoder.unpack_response(
-            '<BH', response)
+            tool_index, slave_query_codecs['GET_VERSION'].opcode, payload)
+        [response_code, version] = slave_query_codecs['GET_VERSION'].unpack_response(response)
         # TODO: check response_code
 
         return version
@@ -1082,8 +988,8 @@ class s3g(object):
           and the platform's Error Term, Delta Term and Last Output
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_PID_STATE'])
-        [response_code, exError, exDelta, exLast, plError, plDelta, plLast] = makerbot_driver.Encoder.unpack_response('<Bhhhhhh', response)
+            tool_index, slave_query_codecs['GET_PID_STATE'].opcode)
+        [response_code, exError, exDelta, exLast, plError, plDelta, plLast] = slave_query_codecs['GET_PID_STATE'].unpack_response(response)
         # TODO: check response_code
         PIDVals = {
             "ExtruderError": exError,
@@ -1115,10 +1021,9 @@ class s3g(object):
          @return A dictionary containing status information specified above
        """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_TOOL_STATUS'])
+            tool_index, slave_query_codecs['GET_TOOL_STATUS'].opcode)
 
-        [resonse_code, bitfield] = makerbot_driver.Encoder.unpack_response(
-            '<BB', response)
+        [resonse_code, bitfield] = slave_query_codecs['GET_TOOL_STATUS'].unpack_response(response)
         # TODO: check response_code
 
         bitfield = makerbot_driver.Encoder.decode_bitfield(bitfield)
@@ -1140,13 +1045,11 @@ class s3g(object):
         @param int tool_index: The tool that will be set
         @param int theta: angle to set the servo to
         """
-        payload = struct.pack(
-            '<B',
+        payload = slave_action_codecs['SET_SERVO_1_POSITION'].pack_parameters(
             theta
         )
 
-        self.tool_action_command(tool_index, makerbot_driver.slave_action_command_dict[
-                                 'SET_SERVO_1_POSITION'], payload)
+        self.tool_action_command(tool_index, slave_action_codecs['SET_SERVO_1_POSITION'].opcode, payload)
 
     def toolhead_abort(self, tool_index):
         """
@@ -1154,7 +1057,7 @@ class s3g(object):
         @param int tool_index: the tool which is to be aborted
         """
         self.tool_action_command(
-            tool_index, makerbot_driver.slave_action_command_dict['ABORT'])
+            tool_index, slave_action_codecs['ABORT'].opcode)
 
     def toolhead_pause(self, tool_index):
         """
@@ -1163,7 +1066,7 @@ class s3g(object):
         @param int tool_index: The tool which is to be paused
         """
         self.tool_action_command(
-            tool_index, makerbot_driver.slave_action_command_dict['PAUSE'])
+            tool_index, slave_action_codecs['PAUSE'].opcode)
 
     def toggle_motor1(self, tool_index, toggle, direction):
         """
@@ -1178,13 +1081,12 @@ class s3g(object):
         if direction:
             bitfield |= 0x02
 
-        payload = struct.pack(
-            '<B',
+        payload = slave_action_codecs['TOGGLE_MOTOR_1'].pack_parameters(
             bitfield,
         )
 
         self.tool_action_command(
-            tool_index, makerbot_driver.slave_action_command_dict['TOGGLE_MOTOR_1'], payload)
+            tool_index, slave_action_codecs['TOGGLE_MOTOR_1'].opcode, payload)
 
     def set_motor1_speed_RPM(self, tool_index, duration):
         """
@@ -1192,13 +1094,11 @@ class s3g(object):
         @param int tool_index : The tool's motor that will be set
         @param int duration : Durtation of each rotation, in microseconds
         """
-        payload = struct.pack(
-            '<I',
+        payload = slave_action_codecs['SET_MOTOR_1_SPEED_RPM'].pack_parameters(
             duration
         )
 
-        self.tool_action_command(tool_index, makerbot_driver.slave_action_command_dict[
-                                 'SET_MOTOR_1_SPEED_RPM'], payload)
+        self.tool_action_command(tool_index, slave_action_codecs['SET_MOTOR_1_SPEED_RPM'].opcode, payload)
 
     def set_motor1_direction(self, tool_index, direction):
         """
@@ -1209,11 +1109,10 @@ class s3g(object):
         clockwise = 0
         if direction:
             clockwise = 1
-        payload = struct.pack(
-            '<B',
+        payload = slave_action_codecs['SET_MOTOR_1_DIRECTION'].pack_parameters(
             clockwise
         )
-        self.tool_action_command(tool_index, makerbot_driver.slave_action_command_dict['SET_MOTOR_1_DIRECTION'], payload)
+        self.tool_action_command(tool_index, slave_action_codecs['SET_MOTOR_1_DIRECTION'].opcode, payload)
 
     def get_motor1_speed(self, tool_index):
         """
@@ -1222,9 +1121,9 @@ class s3g(object):
         @return int Duration of each rotation, in miliseconds
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_MOTOR_1_SPEED_RPM'])
+            tool_index, slave_query_codecs['GET_MOTOR_1_SPEED_RPM'].opcode)
         [response_code,
-            speed] = makerbot_driver.Encoder.unpack_response('<BI', response)
+            speed] = slave_query_codecs['GET_MOTOR_1_SPEED_RPM'].unpack_response(response)
         # TODO: check response_code
         return speed
 
@@ -1235,9 +1134,8 @@ class s3g(object):
         @return int temperature: reported by the toolhead
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_TOOLHEAD_TEMP'])
-        [response_code, temperature] = makerbot_driver.Encoder.unpack_response(
-            '<BH', response)
+            tool_index, slave_query_codecs['GET_TOOLHEAD_TEMP'].opcode)
+        [response_code, temperature] = slave_query_codecs['GET_TOOLHEAD_TEMP'].unpack_response(response)
         # TODO: check response_code
 
         return temperature
@@ -1249,9 +1147,9 @@ class s3g(object):
         @return boolean isReady: True if tool is done heating, false otherwise
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['IS_TOOL_READY'])
+            tool_index, slave_query_codecs['IS_TOOL_READY'].opcode)
         [response_code,
-            ready] = makerbot_driver.Encoder.unpack_response('<BB', response)
+            ready] = slave_query_codecs['IS_TOOL_READY'].unpack_response(response)
         # TODO: check response_code
 
         isReady = False
@@ -1275,14 +1173,13 @@ class s3g(object):
         if length > makerbot_driver.maximum_payload_length - 1:
             raise makerbot_driver.EEPROMLengthError(length)
 
-        payload = struct.pack(
-            '<HB',
+        payload = slave_query_codecs['READ_FROM_EEPROM'].pack_parameters(
             offset,
             length
         )
 
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['READ_FROM_EEPROM'], payload)
+            tool_index, slave_query_codecs['READ_FROM_EEPROM'].opcode, payload)
 
         return response[1:]
 
@@ -1293,15 +1190,15 @@ class s3g(object):
         @param byte offset: EEPROM location to begin writing to
         @param list data: Data to write to the EEPROM
         """
-        code = '<HB'
-        packet_length = struct.calcsize('%s%s' % (code, self.tool_query_code))
+        codec = slave_query_codecs['WRITE_TO_EEPROM']
+        packet_length = codec.parameters.size + \
+            struct.calcsize('<%s' % self.tool_query_code)
         # Check the length of data against maximum_payload_length and the compulsory packet values
         # (Including Tool Packet values
         if len(data) > makerbot_driver.maximum_payload_length - packet_length:
             raise makerbot_driver.EEPROMLengthError(len(data))
 
-        payload = struct.pack(
-            code,
+        payload = codec.pack_parameters(
             offset,
             len(data),
         )
@@ -1309,7 +1206,7 @@ class s3g(object):
         payload += data
 
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['WRITE_TO_EEPROM'], payload)
+            tool_index, slave_query_codecs['WRITE_TO_EEPROM'].opcode, payload)
 
         if response[1] != len(data):
             raise makerbot_driver.EEPROMMismatchError(response[1])
@@ -1321,9 +1218,8 @@ class s3g(object):
         @return int temperature: reported by the toolhead
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_PLATFORM_TEMP'])
-        [response_code, temperature] = makerbot_driver.Encoder.unpack_response(
-            '<BH', response)
+            tool_index, slave_query_codecs['GET_PLATFORM_TEMP'].opcode)
+        [response_code, temperature] = slave_query_codecs['GET_PLATFORM_TEMP'].unpack_response(response)
         # TODO: check response_code
 
         return temperature
@@ -1335,9 +1231,8 @@ class s3g(object):
         @return int temperature: that the toolhead is attempting to achieve
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_TOOLHEAD_TARGET_TEMP'])
-        [response_code, temperature] = makerbot_driver.Encoder.unpack_response(
-            '<BH', response)
+            tool_index, slave_query_codecs['GET_TOOLHEAD_TARGET_TEMP'].opcode)
+        [response_code, temperature] = slave_query_codecs['GET_TOOLHEAD_TARGET_TEMP'].unpack_response(response)
         # TODO: check response_code
 
         return temperature
@@ -1349,9 +1244,8 @@ class s3g(object):
         @return int temperature: that the build platform is attempting to achieve
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['GET_PLATFORM_TARGET_TEMP'])
-        [response_code, temperature] = makerbot_driver.Encoder.unpack_response(
-            '<BH', response)
+            tool_index, slave_query_codecs['GET_PLATFORM_TARGET_TEMP'].opcode)
+        [response_code, temperature] = slave_query_codecs['GET_PLATFORM_TARGET_TEMP'].unpack_response(response)
         # TODO: check response_code
 
         return temperature
@@ -1363,9 +1257,9 @@ class s3g(object):
         @return boolean isReady: true if the platform is at target temperature, false otherwise
         """
         response = self.tool_query(
-            tool_index, makerbot_driver.slave_query_command_dict['IS_PLATFORM_READY'])
+            tool_index, slave_query_codecs['IS_PLATFORM_READY'].opcode)
         [response_code,
-            ready] = makerbot_driver.Encoder.unpack_response('<BB', response)
+            ready] = slave_query_codecs['IS_PLATFORM_READY'].unpack_response(response)
 
         # TODO: check response_code
         isReady = False
@@ -1390,7 +1284,7 @@ class s3g(object):
             payload = '\x00'
 
         self.tool_action_command(
-            tool_index, makerbot_driver.slave_action_command_dict['TOGGLE_FAN'], payload)
+            tool_index, slave_action_codecs['TOGGLE_FAN'].opcode, payload)
 
     def toggle_extra_output(self, tool_index, state):
         """
@@ -1404,8 +1298,7 @@ class s3g(object):
         else:
             payload = '\x00'
 
-        self.tool_action_command(tool_index, makerbot_driver.slave_action_command_dict[
-                                 'TOGGLE_EXTRA_OUTPUT'], payload)
+        self.tool_action_command(tool_index, slave_action_codecs['TOGGLE_EXTRA_OUTPUT'].opcode, payload)
 
     def toolhead_init(self, tool_index):
         """
@@ -1416,7 +1309,7 @@ class s3g(object):
         @param int tool_index: The tool to re-initialize
        """
         self.tool_action_command(tool_index,
-                                 makerbot_driver.slave_action_command_dict['INIT'])
+                                 slave_action_codecs['INIT'].opcode)
 
     def set_toolhead_temperature(self, tool_index, temperature):
         """
@@ -1424,9 +1317,9 @@ class s3g(object):
         @param int tool_index: Toolhead Index
         @param int Temperature: Temperature to heat up to in Celcius
         """
-        payload = struct.pack('<H', temperature)
+        payload = slave_action_codecs['SET_TOOLHEAD_TARGET_TEMP'].pack_parameters(temperature)
         self.tool_action_command(tool_index,
-                                 makerbot_driver.slave_action_command_dict['SET_TOOLHEAD_TARGET_TEMP'], payload)
+                                 slave_action_codecs['SET_TOOLHEAD_TARGET_TEMP'].opcode, payload)
 
     def set_platform_temperature(self, tool_index, temperature):
         """
@@ -1434,11 +1327,11 @@ class s3g(object):
         @param int tool_index: Platform Index
         @param int Temperature: Temperature to heat up to in Celcius
         """
-        payload = struct.pack('<H', temperature)
+        payload = slave_action_codecs['SET_PLATFORM_TEMP'].pack_parameters(temperature)
 
         self.tool_action_command(
             tool_index,
-            makerbot_driver.slave_action_command_dict['SET_PLATFORM_TEMP'], payload)
+            slave_action_codecs['SET_PLATFORM_TEMP'].opcode, payload)
 
     def toggle_ABP(self, tool_index, state):
         """
@@ -1448,11 +1341,10 @@ class s3g(object):
         enable = 0
         if state:
             enable = 1
-        payload = struct.pack(
-            '<B',
+        payload = slave_action_codecs['TOGGLE_ABP'].pack_parameters(
             enable
         )
-        self.tool_action_command(tool_index, makerbot_driver.slave_action_command_dict['TOGGLE_ABP'], payload)
+        self.tool_action_command(tool_index, slave_action_codecs['TOGGLE_ABP'].opcode, payload)
 
     def set_servo2_position(self, tool_index, theta):
         """
@@ -1460,11 +1352,10 @@ class s3g(object):
         @param int tool_index: The tool that will be set
         @param int theta: angle to set the servo to
         """
-        payload = struct.pack(
-            '<B',
+        payload = slave_action_codecs['SET_SERVO_2_POSITION'].pack_parameters(
             theta
         )
-        self.tool_action_command(tool_index, makerbot_driver.slave_action_command_dict['SET_SERVO_2_POSITION'], payload)
+        self.tool_action_command(tool_index, slave_action_codecs['SET_SERVO_2_POSITION'].opcode, payload)
 
     def x3g_version(self, high_bite, low_bite, checksum=0x0000, pid=0xB015):
         """
@@ -1477,9 +1368,7 @@ class s3g(object):
         @param int pid: PID for the bot you want to print to
         @param int checksum: Checksum for succeeding commands
         """
-        payload = struct.pack(
-        '<BBBBIHBBBBBBBBBBB',
-        makerbot_driver.host_action_command_dict['X3G_VERSION'],
+        payload = host_action_codecs['X3G_VERSION'].pack(
         high_bite,
         low_bite,
         0,
@@ -0,0 +1,174 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import asyncore
+import socket
+import struct
+import unittest
+
+import makerbot_driver
+
+
+class FakeFirmware(asyncore.dispatcher):
+    """
+    The machine's end of a socket pair, replying to each packet it receives
+    with the next of a list of reply payloads, or a plain SUCCESS.  A reply
+    of None is dropped, as if the machine never answered.
+    """
+
+    def __init__(self, sock, map, replies=()):
+        asyncore.dispatcher.__init__(self, sock, map)
+        self.replies = list(replies)
+        self.received = []
+        self._decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+        self._receive_buffer = bytearray()
+        self._send_buffer = bytearray()
+
+    def writable(self):
+        return bool(self._send_buffer)
+
+    def handle_write(self):
+        sent = self.send(bytes(self._send_buffer))
+        del self._send_buffer[:sent]
+
+    def handle_read(self):
+        self._receive_buffer.extend(self.recv(4096))
+        while self._receive_buffer:
+            self._decoder.parse_bytes(self._receive_buffer)
+            if self._decoder.state_code != self._decoder.PAYLOAD_READY:
+                break
+            self.received.append(self._decoder.payload)
+            self._decoder.reset()
+            if self.replies:
+                reply = self.replies.pop(0)
+            else:
+                reply = bytearray([makerbot_driver.response_code_dict['SUCCESS']])
+            if reply is not None:
+                self._send_buffer.extend(
+                    makerbot_driver.Encoder.encode_payload(reply))
+
+
+def success(data=''):
+    return bytearray([makerbot_driver.response_code_dict['SUCCESS']]) + data
+
+
+class AsyncS3gTests(unittest.TestCase):
+
+    def setUp(self):
+        self.map = {}
+
+    def tearDown(self):
+        for dispatcher in self.map.values():
+            dispatcher.close()
+
+    def connect(self, replies=()):
+        host, machine = socket.socketpair()
+        firmware = FakeFirmware(machine, self.map, replies)
+        writer = makerbot_driver.Writer.AsyncStreamWriter(host, self.map)
+        return makerbot_driver.AsyncS3g(writer), firmware
+
+    def run_until_complete(self, results):
+        return makerbot_driver.Writer.run_until_complete(
+            results, self.map, timeout=.01)
+
+    def test_query(self):
+        bot, firmware = self.connect([success(struct.pack('<H', 700))])
+        result = bot.get_version()
+        self.assertFalse(result.done())
+        self.assertEqual(700, self.run_until_complete(result))
+        expected = makerbot_driver.Encoder.host_query_codecs['GET_VERSION'].pack(
+            makerbot_driver.s3g_version)
+        self.assertEqual([bytearray(expected)], firmware.received)
+
+    def test_calls_are_sent_in_order(self):
+        bot, firmware = self.connect(
+            [success(), success(struct.pack('<H', 1)), success()])
+        results = [bot.queue_song(1), bot.get_version(), bot.queue_song(2)]
+        self.assertEqual(3, bot.writer.pending())
+        self.assertEqual([None, 1, None], self.run_until_complete(results))
+        self.assertEqual(3, len(firmware.received))
+        self.assertEqual(0, bot.writer.pending())
+
+    def test_many_machines_on_one_loop(self):
+        bots = [self.connect([success(struct.pack('<H', version))])[0]
+                for version in range(10)]
+        results = [bot.get_version() for bot in bots]
+        self.assertEqual(range(10), self.run_until_complete(results))
+
+    def test_eeprom_read(self):
+        bot, firmware = self.connect([success(bytearray([2]))])
+        self.assertEqual(2, self.run_until_complete(bot.get_toolhead_count()))
+        # The eeprom map is loaded once, then kept
+        reader = bot.s3g._eeprom_reader
+        self.assertNotEqual(None, reader)
+        firmware.replies.append(success(bytearray([1])))
+        self.assertEqual(1, self.run_until_complete(bot.get_toolhead_count()))
+        self.assertTrue(reader is bot.s3g._eeprom_reader)
+
+    def test_retry(self):
+        bot, firmware = self.connect([
+            bytearray([makerbot_driver.response_code_dict['CRC_MISMATCH']]),
+            success(struct.pack('<H', 5)),
+        ])
+        self.assertEqual(5, self.run_until_complete(bot.get_version()))
+        self.assertEqual(2, len(firmware.received))
+        self.assertEqual(firmware.received[0], firmware.received[1])
+        self.assertEqual(1, bot.writer.total_retries)
+
+    def test_transmission_error(self):
+        code = makerbot_driver.response_code_dict['GENERIC_PACKET_ERROR']
+        bot, firmware = self.connect(
+            [bytearray([code])] * makerbot_driver.max_retry_count)
+        result = bot.get_version()
+        self.assertRaises(makerbot_driver.TransmissionError,
+                          self.run_until_complete, result)
+        self.assertEqual(makerbot_driver.max_retry_count,
+                         len(firmware.received))
+
+    def test_timeout(self):
+        timeout_length = makerbot_driver.timeout_length
+        makerbot_driver.timeout_length = .01
+        try:
+            bot, firmware = self.connect([None, success(struct.pack('<H', 5))])
+            self.assertEqual(5, self.run_until_complete(bot.get_version()))
+            self.assertEqual(2, len(firmware.received))
+        finally:
+            makerbot_driver.timeout_length = timeout_length
+
+    def test_buffer_overflow(self):
+        code = makerbot_driver.response_code_dict['ACTION_BUFFER_OVERFLOW']
+        bot, firmware = self.connect([bytearray([code])])
+        first = bot.queue_song(1)
+        second = bot.queue_song(2)
+        self.assertRaises(makerbot_driver.BufferOverflowError,
+                          self.run_until_complete, first)
+        # The next call goes ahead once the overflow has been reported
+        self.assertEqual(None, self.run_until_complete(second))
+        self.assertEqual(1, bot.writer.total_overflows)
+
+    def test_external_stop(self):
+        bot, firmware = self.connect([None])
+        result = bot.get_version()
+        bot.writer.set_external_stop()
+        self.assertTrue(isinstance(result.exception(),
+                                   makerbot_driver.ExternalStopError))
+        self.assertRaises(makerbot_driver.ExternalStopError,
+                          bot.get_version().result)
+
+    def test_close_fails_pending_calls(self):
+        bot, firmware = self.connect([None])
+        result = bot.get_version()
+        bot.close()
+        self.assertFalse(bot.is_open())
+        self.assertTrue(isinstance(result.exception(), IOError))
+
+    def test_local_methods(self):
+        bot, firmware = self.connect()
+        self.assertRaises(AttributeError, getattr, bot, 'set_print_to_file_type')
+        self.assertRaises(AttributeError, getattr, bot, 'get_vid_pid')
+        self.assertRaises(AttributeError, getattr, bot, 'POINT_LENGTH')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import unittest
+import struct
+import StringIO
+
+import makerbot_driver
+
+codecs = sys.modules['makerbot_driver.Encoder.CommandCodec']
+
+
+class CommandCodecTests(unittest.TestCase):
+
+    def test_pack_includes_opcode(self):
+        codec = makerbot_driver.Encoder.CommandCodec('DELAY', 133, 'I')
+        self.assertEqual(struct.pack('<BI', 133, 1000), codec.pack(1000))
+        self.assertEqual(5, codec.size)
+
+    def test_pack_parameters_excludes_opcode(self):
+        codec = makerbot_driver.Encoder.CommandCodec(
+            'SET_PLATFORM_TEMP', 31, 'H')
+        self.assertEqual(struct.pack('<H', 110), codec.pack_parameters(110))
+
+    def test_string_is_not_part_of_struct(self):
+        codec = makerbot_driver.Encoder.CommandCodec(
+            'BUILD_START_NOTIFICATION', 153, 'Is')
+        self.assertTrue(codec.has_string)
+        self.assertEqual(struct.pack('<BI', 153, 0), codec.pack(0))
+
+    def test_unpack_parameters(self):
+        codec = makerbot_driver.Encoder.CommandCodec('SET_BEEP', 147, 'HHB')
+        data = codec.pack(440, 100, 1)
+        self.assertEqual((440, 100, 1), codec.unpack_parameters(data, 1))
+
+    def test_unpack_response(self):
+        codec = makerbot_driver.Encoder.CommandCodec('GET_VERSION', 0, 'H', 'BH')
+        response = bytearray(struct.pack('<BH', 0x81, 500))
+        self.assertEqual((0x81, 500), codec.unpack_response(response))
+
+    def test_unpack_response_wrong_length(self):
+        codec = makerbot_driver.Encoder.CommandCodec('GET_VERSION', 0, 'H', 'BH')
+        self.assertRaises(makerbot_driver.ProtocolError,
+                          codec.unpack_response, bytearray('\x81'))
+
+    def test_unpack_response_with_string(self):
+        codec = makerbot_driver.Encoder.CommandCodec('GET_BUILD_NAME', 20, '', 'Bs')
+        response = bytearray('\x81abc\x00')
+        self.assertEqual((0x81, bytearray('abc\x00')), codec.unpack_response(response))
+
+
+class CodecTableTests(unittest.TestCase):
+
+    def test_every_command_has_a_codec(self):
+        tables = [
+            (makerbot_driver.host_query_command_dict, codecs.host_query_codecs),
+            (makerbot_driver.host_action_command_dict, codecs.host_action_codecs),
+            (makerbot_driver.slave_query_command_dict, codecs.slave_query_codecs),
+            (makerbot_driver.slave_action_command_dict, codecs.slave_action_codecs),
+        ]
+        for command_dict, codec_dict in tables:
+            self.assertEqual(sorted(command_dict.keys()), sorted(codec_dict.keys()))
+            for name, opcode in command_dict.items():
+                self.assertEqual(opcode, codec_dict[name].opcode)
+
+    def test_file_reader_formats_match(self):
+        for opcode, codec in codecs.host_action_codecs_by_opcode.items():
+            self.assertEqual(list(codec.format),
+                             makerbot_driver.FileReader.hostFormats[opcode])
+
+    def test_round_trip_through_file_reader(self):
+        point = [1, -2, 3, -4, 5]
+        payloads = [
+            codecs.host_action_codecs['QUEUE_EXTENDED_POINT_ACCELERATED'].pack(
+                *(point + [1000, 0x18, 1.5, 640])),
+            codecs.host_action_codecs['BUILD_START_NOTIFICATION'].pack(0) + 'abc\x00',
+            codecs.host_action_codecs['TOOL_ACTION_COMMAND'].pack(0, 3, 2) +
+            codecs.slave_action_codecs['SET_TOOLHEAD_TARGET_TEMP'].pack_parameters(220),
+        ]
+        d = makerbot_driver.FileReader.FileReader()
+        d.file = StringIO.StringIO(''.join(payloads))
+        expected = [
+            [155] + point + [1000, 0x18, 1.5, 640],
+            [153, 0, 'abc'],
+            [136, 0, 3, 2, 220],
+        ]
+        self.assertEqual(expected, d.ReadFile())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import io
+import unittest
+import StringIO
+import tempfile
+import threading
+
+import makerbot_driver
+
+
+class NamedStringIO(StringIO.StringIO):
+    mode = 'wb'
+
+    def close(self):
+        pass
+
+
+def run_parser(parser, lines, print_to_file_type, profile):
+    output = NamedStringIO()
+    parser.state.profile = profile
+    parser.state.values['build_name'] = 'test'
+    parser.s3g = makerbot_driver.s3g()
+    parser.s3g.set_print_to_file_type(print_to_file_type)
+    parser.s3g.writer = makerbot_driver.Writer.FileWriter(
+        output, threading.Condition())
+    for line in lines:
+        parser.execute_line(line)
+    return output.getvalue()
+
+
+class CompileGcodeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.profile = makerbot_driver.Profile('ReplicatorDual')
+        self.lines = [
+            'G92 X0 Y0 Z0 A0 B0\n',
+            'M135 T0\n',
+            'G1 X10 Y10 F3000 (integer codes)\n',
+            'G1 X10.5 Y-3.25 Z0.27 F1500.0 ; float codes\n',
+            'g1 x11 y12\n',
+            'G1 X11 Y12\n',
+            'G1 E4.5\n',
+            'G1 X20 Y20 E5.0\n',
+            'G1 F6000\n',
+            'G1 A1.5 B2\n',
+            'M73 P50\n',
+            'G1 X#OFFSET Y0\n',
+            'M135 T1\n',
+            'G1 X0 Y0 E1\n',
+            'G01 X30 Y30 Z10 F9000\n',
+            '(a comment)\n',
+            '\n',
+            'G4 P100\n',
+            'M137\n',
+        ]
+        self.environment = {'OFFSET': 12.5}
+
+    def check_identical(self, lines, print_to_file_type):
+        parser = makerbot_driver.Gcode.GcodeParser()
+        parser.environment.update(self.environment)
+        expected = run_parser(parser, lines, print_to_file_type, self.profile)
+        output = NamedStringIO()
+        compiler = makerbot_driver.compile_gcode(
+            lines, output, self.profile, print_to_file_type,
+            self.environment, 'test')
+        self.assertEqual(expected, output.getvalue())
+        self.assertEqual(parser.line_number, compiler.line_number)
+        self.assertEqual(parser.state.position.ToList(),
+                         compiler.state.position.ToList())
+        self.assertEqual(parser.state.values, compiler.state.values)
+
+    def test_s3g_output_identical_to_parser(self):
+        self.check_identical(self.lines, 's3g')
+
+    def test_x3g_output_identical_to_parser(self):
+        self.check_identical(self.lines, 'x3g')
+
+    def test_sample_file_identical_to_parser(self):
+        sample = os.path.join(
+            os.path.abspath(os.path.dirname(__file__)),
+            '..',
+            'doc',
+            'gcode_samples',
+            'miracle_grue_single_extrusion_20_mm_box.gcode',
+        )
+        with open(sample) as f:
+            lines = self.lines[:2] + list(f)
+        self.check_identical(lines, 'x3g')
+
+    def test_profile_by_name(self):
+        output = NamedStringIO()
+        compiler = makerbot_driver.compile_gcode(
+            self.lines[:3], output, 'ReplicatorDual')
+        self.assertEqual(self.profile.values,
+                         compiler.state.profile.values)
+        self.assertTrue(len(output.getvalue()) > 0)
+
+    def test_same_errors_as_parser(self):
+        cases = [
+            (['G1 X10 Y10 F3000\n'],
+             makerbot_driver.Gcode.UnspecifiedAxisLocationError),
+            (['G92 X0 Y0 Z0 A0 B0\n', 'G1 X10 Y10\n'],
+             makerbot_driver.Gcode.NoFeedrateSpecifiedError),
+            (['G92 X0 Y0 Z0 A0 B0\n', 'G1 X10 X11 F100\n'],
+             makerbot_driver.Gcode.RepeatCodeError),
+            (['G92 X0 Y0 Z0 A0 B0\n', 'G1 X10 Q1 F100\n'],
+             makerbot_driver.Gcode.InvalidCodeError),
+            (['G92 X0 Y0 Z0 A0 B0\n', 'G1 X10 F-100\n'],
+             makerbot_driver.Gcode.InvalidFeedrateError),
+            (['G92 X0 Y0 Z0 A0 B0\n', 'G1 X10 E1 F100\n'],
+             makerbot_driver.Gcode.NoToolIndexError),
+        ]
+        for lines, error in cases:
+            self.assertRaises(error, makerbot_driver.compile_gcode,
+                              lines, NamedStringIO(), self.profile)
+
+    def test_writes_to_bytesio(self):
+        output = io.BytesIO()
+        makerbot_driver.compile_gcode(self.lines[:4], output, self.profile)
+        parser = makerbot_driver.Gcode.GcodeParser()
+        self.assertEqual(
+            run_parser(parser, self.lines[:4], 's3g', self.profile),
+            output.getvalue())
+
+    def test_writes_to_path(self):
+        with tempfile.NamedTemporaryFile(suffix='.s3g', delete=False) as f:
+            path = f.name
+        try:
+            makerbot_driver.compile_gcode(self.lines[:4], path, self.profile)
+            parser = makerbot_driver.Gcode.GcodeParser()
+            expected = run_parser(parser, self.lines[:4], 's3g', self.profile)
+            with open(path, 'rb') as f:
+                self.assertEqual(expected, f.read())
+        finally:
+            os.unlink(path)
+
+if __name__ == "__main__":
+    unittest.main()
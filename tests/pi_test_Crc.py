@@ -4,6 +4,8 @@ lib_path = os.path.abspath('./')
 sys.path.insert(0, lib_path)
 
 import unittest
+import mock
+
 import makerbot_driver
 
 
@@ -19,5 +21,56 @@ class CRCTests(unittest.TestCase):
         for case in cases:
             assert makerbot_driver.Encoder.CalculateCRC(case[0]) == case[1]
 
+    def test_accepts_strings(self):
+        self.assertEqual(
+            0xb4, makerbot_driver.Encoder.CalculateCRC('abcdefghijk'))
+
+    def test_continue_from_crc(self):
+        crc = makerbot_driver.Encoder.CalculateCRC(b'abcde')
+        self.assertEqual(0xb4, makerbot_driver.Encoder.CalculateCRC(
+            b'fghijk', crc))
+
+
+class Crc8Tests(unittest.TestCase):
+    def test_update(self):
+        crc = makerbot_driver.Encoder.Crc8()
+        self.assertEqual(0, crc.value)
+        crc.update(bytearray('abc'))
+        crc.update('defgh')
+        for byte in bytearray('ijk'):
+            crc.update_byte(byte)
+        self.assertEqual(0xb4, crc.value)
+
+    def test_reset(self):
+        crc = makerbot_driver.Encoder.Crc8()
+        crc.update('abc')
+        crc.reset()
+        self.assertEqual(0, crc.value)
+
+
+class CalculateCRCsTests(unittest.TestCase):
+    def setUp(self):
+        self.payloads = [
+            bytearray(b''),
+            bytearray(b'abcdefghijk'),
+            bytearray(b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0a\x0b\x0c\x0d\x0e\x0f'),
+            bytearray(b'\x00\x00\xff'),
+            bytearray(b'x'),
+        ]
+        self.expected = [makerbot_driver.Encoder.CalculateCRC(payload)
+                         for payload in self.payloads]
+
+    def test_batch(self):
+        self.assertEqual(
+            self.expected, makerbot_driver.Encoder.CalculateCRCs(self.payloads))
+
+    def test_batch_without_numpy(self):
+        with mock.patch.dict(sys.modules, {'numpy': None}):
+            self.assertEqual(self.expected,
+                             makerbot_driver.Encoder.CalculateCRCs(self.payloads))
+
+    def test_empty_batch(self):
+        self.assertEqual([], makerbot_driver.Encoder.CalculateCRCs([]))
+
 if __name__ == "__main__":
     unittest.main()
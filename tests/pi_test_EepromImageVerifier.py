@@ -0,0 +1,121 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import binascii
+import random
+import shutil
+import struct
+import tempfile
+import unittest
+
+import makerbot_driver
+
+
+def write_hex_file(path, image):
+    """ Writes an image as avrdude would dump it """
+    with open(path, 'w') as f:
+        for offset in range(0, len(image), 32):
+            chunk = image[offset:offset + 32]
+            f.write(':%02X%04X00%s00\n' % (
+                len(chunk), offset, binascii.hexlify(chunk).upper()))
+        f.write(':00000001FF\n')
+
+
+class TestEepromImageVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.verifier = makerbot_driver.EEPROM.EepromImageVerifier()
+        self.layout = self.verifier.layout
+        self.image = self.good_image()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def good_image(self):
+        """ An image whose constrained entries all hold their first allowed
+        value, and whose unmapped bytes are 0xFF
+        """
+        image = bytearray('\xff' * 0x400)
+        for entry in self.layout.value_entries():
+            if entry.constraints is None:
+                continue
+            offset = entry.offset
+            for char in entry.format:
+                if char == 's':
+                    image[offset:offset + entry.size] = '\x00' * entry.size
+                    offset += entry.size
+                    continue
+                value = 0 if entry.constraints[0] == 'a' else entry.constraints[1]
+                if entry.floating_point:
+                    packed = struct.pack('<BB', value, 0)
+                else:
+                    packed = struct.pack('<%s' % (char), value)
+                image[offset:offset + len(packed)] = packed
+                offset += len(packed)
+        return image
+
+    def test_parse_hex_image(self):
+        path = os.path.join(self.directory, 'dump.hex')
+        write_hex_file(path, str(self.image))
+        self.assertEqual(str(self.image),
+                         makerbot_driver.EEPROM.parse_hex_image(path))
+
+    def test_good_image(self):
+        self.assertEqual(
+            (True, {'mapped_entries': [], 'unmapped_entries': [], 'unmapped_runs': []}),
+            self.verifier.validate_image(str(self.image)))
+
+    def test_unmapped_runs(self):
+        self.image[0x3f0:0x3f3] = 'abc'
+        self.image[0x3fe] = 0
+        valid, bad_entries = self.verifier.validate_image(str(self.image))
+        self.assertFalse(valid)
+        self.assertEqual([[0x3f0, 3], [0x3fe, 1]], bad_entries['unmapped_runs'])
+        self.assertEqual([0x3f0, 0x3f1, 0x3f2, 0x3fe],
+                         bad_entries['unmapped_entries'])
+
+    def test_short_image(self):
+        self.assertRaises(ValueError, self.verifier.validate_image, '\xff' * 10)
+
+    def test_same_as_EepromVerifier(self):
+        random.seed(3)
+        for i in range(200):
+            offset = random.randrange(len(self.image))
+            self.image[offset] = random.randrange(256)
+        path = os.path.join(self.directory, 'dump.hex')
+        write_hex_file(path, str(self.image))
+
+        expected_valid, expected = makerbot_driver.EEPROM.EepromVerifier(
+            path).validate_eeprom()
+        valid, bad_entries = self.verifier.validate_hex_file(path)
+        self.assertFalse(valid)
+        self.assertEqual(expected_valid, valid)
+        self.assertTrue(len(expected['mapped_entries']) > 0)
+        self.assertEqual(expected['mapped_entries'], bad_entries['mapped_entries'])
+        self.assertEqual(sorted(expected['unmapped_entries']),
+                         bad_entries['unmapped_entries'])
+
+    def test_verify_eeprom_dumps(self):
+        write_hex_file(os.path.join(self.directory, 'a.hex'), str(self.image))
+        self.image[0x3f0] = 0
+        write_hex_file(os.path.join(self.directory, 'b.hex'), str(self.image))
+        with open(os.path.join(self.directory, 'c.hex'), 'w') as f:
+            f.write('not a hex file\n')
+        for processes in [1, 2]:
+            report = makerbot_driver.EEPROM.verify_eeprom_dumps(
+                self.directory, processes=processes)
+            self.assertEqual({'dumps': 3, 'valid': 1, 'invalid': 1, 'errors': 1},
+                             report['summary'])
+            dumps = report['dumps']
+            self.assertEqual(['a.hex', 'b.hex', 'c.hex'],
+                             [os.path.basename(dump['path']) for dump in dumps])
+            self.assertEqual([True, False, False],
+                             [dump['valid'] for dump in dumps])
+            self.assertEqual([[0x3f0, 1]], dumps[1]['unmapped_runs'])
+            self.assertTrue(dumps[2]['error'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import glob
+import json
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import makerbot_driver
+
+
+class TestEepromLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.eeprom_map = {
+            'a': {'offset': '0x0000', 'type': 'B', 'constraints': 'l,1,2'},
+            'b': {'offset': '0x0002', 'type': 'H', 'mult': '3'},
+            'c': {
+                'offset': '0x0010',
+                'sub_map': {
+                    'd': {'offset': '0x0004', 'type': 's', 'length': '8'},
+                    'e': {
+                        'offset': '0x0020',
+                        'sub_map': {
+                            'f': {'offset': '0x0001', 'type': 'h',
+                                  'floating_point': 'True'},
+                        }
+                    }
+                }
+            }
+        }
+        self.layout = makerbot_driver.EEPROM.EepromLayout(self.eeprom_map)
+
+    def test_entries(self):
+        self.assertEqual(6, len(self.layout))
+        entry = self.layout.get_entry('f', ['c', 'e'])
+        self.assertEqual(0x10 + 0x20 + 1, entry.offset)
+        self.assertEqual('h', entry.format)
+        self.assertEqual(2, entry.size)
+        self.assertTrue(entry.floating_point)
+        self.assertEqual(['c', 'sub_map', 'e', 'sub_map', 'f'], entry.context)
+        self.assertTrue(entry is self.layout[('c', 'e', 'f')])
+        self.assertEqual(('HHH', 6), (self.layout['b',].format,
+                                      self.layout['b',].size))
+        self.assertEqual(8, self.layout['c', 'd'].size)
+        self.assertEqual(['l', 1, 2], self.layout['a',].constraints)
+        self.assertEqual(None, self.layout['b',].constraints)
+        self.assertTrue(self.layout['c', 'e'].is_sub_map)
+        self.assertEqual(0x10 + 0x20 + 1 + 2, self.layout.extent)
+        self.assertRaises(KeyError, self.layout.get_entry, 'f', ['c'])
+
+    def test_value_entries(self):
+        self.assertEqual(
+            makerbot_driver.EEPROM.get_eeprom_map_contexts(self.eeprom_map),
+            [entry.context for entry in self.layout.value_entries()])
+
+    def test_shipped_maps(self):
+        map_dir = os.path.dirname(makerbot_driver.EEPROM.constants.__file__)
+        for path in glob.glob(os.path.join(map_dir, 'eeprom_map_*.json')):
+            with open(path) as f:
+                eeprom_map = json.load(f)['eeprom_map']
+            layout = makerbot_driver.EEPROM.EepromLayout(eeprom_map)
+            for entry in layout.value_entries():
+                self.assertEqual(
+                    makerbot_driver.EEPROM.get_offset_by_context(
+                        eeprom_map, entry.context),
+                    entry.offset)
+                self.assertEqual(
+                    makerbot_driver.EEPROM.get_dict_by_context(
+                        eeprom_map, entry.context),
+                    entry.entry)
+
+
+class TestLoadEepromMap(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'eeprom_map_test.json')
+        self.write_map('0x0004')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_map(self, offset):
+        with open(self.path, 'w') as f:
+            json.dump({'eeprom_map': {'a': {'offset': offset, 'type': 'B'}}}, f)
+        # Make sure the change is noticed on filesystems with coarse mtimes
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + int(offset, 16)))
+
+    def test_loaded_once(self):
+        eeprom_map, layout = makerbot_driver.EEPROM.load_eeprom_map(self.path)
+        self.assertEqual(4, layout.get_entry('a').offset)
+        self.assertTrue(layout is makerbot_driver.EEPROM.load_eeprom_map(self.path)[1])
+        self.assertTrue(layout['a',].entry is eeprom_map['eeprom_map']['a'])
+        self.write_map('0x0008')
+        eeprom_map, layout = makerbot_driver.EEPROM.load_eeprom_map(self.path)
+        self.assertEqual(8, layout.get_entry('a').offset)
+
+    def test_pickle_cache(self):
+        layout_module = sys.modules['makerbot_driver.EEPROM.EepromLayout']
+        cache = os.path.join(self.directory, 'cache')
+        os.mkdir(cache)
+        makerbot_driver.EEPROM.load_eeprom_map(self.path, cache)
+        self.assertEqual(1, len(os.listdir(cache)))
+        # Another process loads the map from the cache
+        layout_module._loaded_maps.clear()
+        with mock.patch.object(layout_module, '_compile_eeprom_map') as compile_mock:
+            eeprom_map, layout = makerbot_driver.EEPROM.load_eeprom_map(
+                self.path, cache)
+            self.assertEqual(0, compile_mock.call_count)
+        self.assertEqual(4, layout.get_entry('a').offset)
+        self.assertTrue(layout['a',].entry is eeprom_map['eeprom_map']['a'])
+        # A cache older than the map is replaced
+        layout_module._loaded_maps.clear()
+        self.write_map('0x0008')
+        eeprom_map, layout = makerbot_driver.EEPROM.load_eeprom_map(
+            self.path, cache)
+        self.assertEqual(8, layout.get_entry('a').offset)
+        self.assertEqual(1, len(os.listdir(cache)))
+
+    def test_missing_map(self):
+        self.assertRaises(makerbot_driver.EEPROM.MissingEepromMapError,
+                          makerbot_driver.EEPROM.load_eeprom_map,
+                          os.path.join(self.directory, 'missing.json'))
+
+    def test_readers_share_the_map(self):
+        reader = makerbot_driver.EEPROM.EepromReader(
+            'eeprom_map_test.json', self.directory)
+        writer = makerbot_driver.EEPROM.EepromWriter(
+            'eeprom_map_test.json', self.directory)
+        self.assertTrue(reader.eeprom_map is writer.eeprom_map)
+        self.assertTrue(reader.layout is writer.layout)
+        # Setting a map recompiles the layout
+        reader.eeprom_map = {'eeprom_map': {'b': {'offset': '0x0001', 'type': 'B'}}}
+        self.assertEqual(1, reader.get_dict_by_context('b')[1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -353,5 +353,100 @@ class TestEepromReader(unittest.TestCase):
             self.assertEqual(case[1], got_val)
 
 
+class TestEepromSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        # An eeprom image of the bytes 0..255, repeating
+        self.image = bytearray(i % 256 for i in range(4096))
+        self.s3g = makerbot_driver.s3g()
+        self.s3g.read_from_EEPROM = mock.Mock(side_effect=self.read_from_EEPROM)
+        self.reader = makerbot_driver.EEPROM.EepromReader.factory(self.s3g)
+        self.s3g._eeprom_reader = self.reader
+
+    def tearDown(self):
+        self.reader = None
+
+    def read_from_EEPROM(self, offset, length):
+        self.assertTrue(length < makerbot_driver.maximum_payload_length)
+        return self.image[offset:offset + length]
+
+    def test_map_extent(self):
+        input_map = {
+            'A': {'offset': '0x0000', 'type': 'B'},
+            'B': {'offset': '0x0010', 'type': 'H', 'mult': '3'},
+            'C': {'offset': '0x0004', 'length': '8'},
+            'D': {'offset': '0x0020', 'sub_map': {
+                'E': {'offset': '0x0002', 'type': 'i'},
+            }},
+        }
+        self.assertEqual(0x20 + 2 + 4, self.reader.map_extent(input_map))
+        del input_map['D']
+        self.assertEqual(0x10 + 6, self.reader.map_extent(input_map))
+
+    def test_take_snapshot_reads_in_chunks(self):
+        extent = self.reader.map_extent()
+        snapshot = self.reader.take_snapshot()
+        self.assertEqual(self.image[:extent], snapshot)
+        chunk_size = makerbot_driver.maximum_payload_length - 1
+        self.assertEqual((extent + chunk_size - 1) // chunk_size,
+                         self.s3g.read_from_EEPROM.call_count)
+
+    def test_read_entire_map_from_snapshot(self):
+        reader = makerbot_driver.EEPROM.EepromReader.factory(self.s3g)
+        expected = reader.read_entire_map(snapshot=False)
+        reads = self.s3g.read_from_EEPROM.call_count
+        self.s3g.read_from_EEPROM.reset_mock()
+        self.assertEqual(expected, self.reader.read_entire_map())
+        self.assertTrue(self.s3g.read_from_EEPROM.call_count < reads / 4)
+        # The snapshot was only for this read, so it isn't left to go stale
+        self.assertEqual(None, self.reader.snapshot)
+
+    def test_read_entire_map_keeps_own_snapshot(self):
+        snapshot = self.s3g.take_eeprom_snapshot()
+        self.s3g.read_from_EEPROM.reset_mock()
+        self.reader.read_entire_map()
+        self.assertEqual(0, self.s3g.read_from_EEPROM.call_count)
+        self.assertTrue(snapshot is self.reader.snapshot)
+
+    def test_values_served_from_snapshot(self):
+        self.s3g.take_eeprom_snapshot()
+        self.s3g.read_from_EEPROM.reset_mock()
+        the_dict, offset = self.reader.get_dict_by_context('TOOL_COUNT')
+        self.assertEqual(self.image[offset], self.s3g.get_toolhead_count())
+        self.s3g.get_name()
+        self.assertEqual(0, self.s3g.read_from_EEPROM.call_count)
+        # Reads past the snapshot still go to the machine
+        self.reader.read_bytes(len(self.reader.snapshot), 1)
+        self.assertEqual(1, self.s3g.read_from_EEPROM.call_count)
+
+    def test_update_snapshot(self):
+        self.reader.take_snapshot(10)
+        self.reader.update_snapshot(8, bytearray([1, 2, 3, 4]))
+        self.assertEqual(self.image[:8] + bytearray([1, 2]),
+                         self.reader.snapshot)
+        self.reader.update_snapshot(20, bytearray([1]))
+        self.assertEqual(10, len(self.reader.snapshot))
+
+    def test_write_to_EEPROM_updates_snapshot(self):
+        self.s3g.take_eeprom_snapshot()
+        self.s3g.writer = mock.Mock()
+        self.s3g.writer.send_query_payload.return_value = bytearray(
+            [makerbot_driver.response_code_dict['SUCCESS'], 4])
+        self.s3g.write_to_EEPROM(0x10, bytearray('abc\x00'))
+        self.assertEqual(bytearray('abc\x00'), self.reader.snapshot[0x10:0x14])
+
+    def test_clear_snapshot(self):
+        self.s3g.take_eeprom_snapshot()
+        self.s3g.writer = mock.Mock()
+        self.s3g.reset_to_factory()
+        self.assertEqual(None, self.reader.snapshot)
+        self.s3g.take_eeprom_snapshot()
+        self.s3g.store_home_positions(['x', 'y'])
+        self.assertEqual(None, self.reader.snapshot)
+        self.s3g.take_eeprom_snapshot()
+        self.s3g.clear_eeprom_snapshot()
+        self.assertEqual(None, self.reader.snapshot)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -74,6 +74,13 @@ class TestEepromRepairer(unittest.TestCase):
         self.er.repair_unmapped_region(unmapped)
         self.er.s3g.write_to_EEPROM.assert_called_once_with(expected_offset, expected_data)
 
+    def test_repair_unmapped_runs(self):
+        self.er.s3g = mock.Mock()
+        self.er.repair_unmapped_runs([[100, 2], [200, 1]])
+        self.assertEqual([mock.call.write_to_EEPROM(100, '\xff\xff'),
+                          mock.call.write_to_EEPROM(200, '\xff')],
+                         self.er.s3g.mock_calls)
+
     def test_bifurcate_date(self):
         cases = [
             [[1, 2, 3, 4, 5], [1, 2], [3, 4, 5]],
@@ -68,20 +68,37 @@ class TestEepromWriterUseTestEepromMap(unittest.TestCase):
 
     def test_flush_data(self):
         values = [
-            ['a', 1],
-            ['b', 2],
-            ['c', 3],
+            [0x30, 'c'],
+            [0x10, 'a'],
+            [0x20, 'b'],
         ]
         for value in values:
             self.writer.data_buffer.append(value)
         self.writer.flush_data()
         calls = self.write_to_eeprom_mock.mock_calls
         self.assertEqual(len(values), len(calls))
-        for call, value in zip(calls, values):
+        for call, value in zip(calls, sorted(values)):
             params = call[1]
             self.assertEqual(value[0], params[0])
             self.assertEqual(value[1], params[1])
 
+    def test_flush_data_coalesces_adjacent_writes(self):
+        self.writer.data_buffer.extend([[2, 'cd'], [0, 'ab'], [4, 'e']])
+        self.writer.flush_data()
+        self.assertEqual([mock.call(0, 'abcde')],
+                         self.write_to_eeprom_mock.mock_calls)
+
+    def test_flush_data_with_snapshot(self):
+        snapshot = bytearray('abcdefgh')
+        self.writer.data_buffer.extend([[0, 'abXd'], [4, 'eYgh']])
+        self.writer.flush_data(snapshot)
+        self.assertEqual([mock.call(2, 'XdeY')],
+                         self.write_to_eeprom_mock.mock_calls)
+        self.write_to_eeprom_mock.reset_mock()
+        self.writer.data_buffer = [[0, 'abcd']]
+        self.writer.flush_data(snapshot)
+        self.assertEqual([], self.write_to_eeprom_mock.mock_calls)
+
     def test_write_value_no_flush_toolhead(self):
         name = 'foobar'
         value = 252645135
@@ -380,8 +397,8 @@ class TestEepromWriter(unittest.TestCase):
 
     def test_flush_data_too_big(self):
         """
-        This is kinda a weird test, since the function actually
-        gets called three times, but the firt time it returns an error.
+        Data too long for one packet is split before it is sent, rather
+        than after the s3g rejects it.
         """
         data = range(makerbot_driver.maximum_payload_length)
         offset = 0
@@ -393,26 +410,43 @@ class TestEepromWriter(unittest.TestCase):
                 raise makerbot_driver.EEPROMLengthError(len(args[1]))
         the_func = mock.Mock(side_effect=mock_write_to_EEPROM)
         s3g_mock.write_to_EEPROM = the_func
-        s3g_mock.side_effect = mock_write_to_EEPROM
         self.writer.s3g = s3g_mock
-        a, b = self.writer._bifurcate_data(data)
-        expect_a_offset = offset
-        expect_b_offset = offset + len(a)
         self.writer.flush_data()
-        calls = the_func.mock_calls
-        self.assertEqual(len(calls), 3)
-        first_params = calls[0][1]
-        second_params = calls[1][1]
-        third_params = calls[2][1]
-        #check first params (this would have raised an error)
-        self.assertEqual(first_params[0], offset)
-        self.assertEqual(first_params[1], data)
-        #Check second params
-        self.assertEqual(second_params[0], expect_a_offset)
-        self.assertEqual(second_params[1], a)
-        #Chcek third params
-        self.assertEqual(third_params[0], expect_b_offset)
-        self.assertEqual(third_params[1], b)
+        max_length = makerbot_driver.maximum_payload_length - 4
+        self.assertEqual([
+            mock.call(offset, str(bytearray(data[:max_length]))),
+            mock.call(offset + max_length, str(bytearray(data[max_length:]))),
+        ], the_func.mock_calls)
+
+    def test_plan_writes_overlapping(self):
+        data_buffer = [[0, 'aaaa'], [2, 'bbbb'], [1, 'c']]
+        self.assertEqual([[0, 'acbbbb']],
+                         self.writer.plan_writes(data_buffer))
+
+    def test_plan_writes_splits_into_packets(self):
+        max_length = makerbot_driver.maximum_payload_length - 4
+        data_buffer = [[i, 'x'] for i in range(100)]
+        writes = self.writer.plan_writes(data_buffer)
+        self.assertEqual([0, max_length, 2 * max_length, 3 * max_length],
+                         [write[0] for write in writes])
+        self.assertEqual('x' * 100, ''.join(write[1] for write in writes))
+
+    def test_plan_writes_bridges_unchanged_gaps(self):
+        max_length = makerbot_driver.maximum_payload_length - 4
+        snapshot = bytearray('a' * 100)
+        # The gap fits in the packet being filled, so it is rewritten
+        self.assertEqual(
+            [[0, 'baab']],
+            self.writer.plan_writes([[0, 'b'], [3, 'b']], snapshot))
+        # Without a snapshot the gap isn't known
+        self.assertEqual(
+            [[0, 'b'], [3, 'b']],
+            self.writer.plan_writes([[0, 'b'], [3, 'b']]))
+        # Bridging here would need another packet
+        data_buffer = [[0, 'b' * max_length], [max_length + 2, 'b']]
+        self.assertEqual(
+            [[0, 'b' * max_length], [max_length + 2, 'b']],
+            self.writer.plan_writes(data_buffer, snapshot))
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,7 @@ import os
 import sys
 import unittest
 import re
+import tempfile
 
 sys.path.append(os.path.abspath('../../s3g'))
 import makerbot_driver
@@ -87,6 +88,56 @@ class TestEmptyLayerProcessor(unittest.TestCase):
                 self.assertEqual(match.group(), case[2])
 
 
+    def process_file(self, gcode_path):
+        output = tempfile.NamedTemporaryFile(delete=False)
+        output.close()
+        self.addCleanup(os.unlink, output.name)
+        self.assertTrue(self.p.process_gcode(gcode_path, outfile=output.name))
+        with open(output.name) as f:
+            return list(f)
+
+    def write_gcode(self, gcodes):
+        gcode_file = tempfile.NamedTemporaryFile(delete=False)
+        gcode_file.write(''.join(gcodes))
+        gcode_file.close()
+        self.addCleanup(os.unlink, gcode_file.name)
+        return gcode_file.name
+
+    def test_process_file_same_as_list(self):
+        for name in ['sf_empty_slice_input.gcode', 'mg_empty_slice_input.gcode']:
+            gcode_path = os.path.join(
+                os.path.abspath(os.path.dirname(__file__)), 'test_files', name)
+            with open(gcode_path) as f:
+                expected = ''.join(self.p.process_gcode(list(f)))
+            self.assertEqual(expected, ''.join(self.process_file(gcode_path)))
+
+    def test_SF_empty_layer(self):
+        gcodes = [
+            "(<layer> 0.27 )\n",
+            "G1 X1 Y1 Z0.27 F3000\n",
+            "G1 X2 Y1 Z0.27 F3000\n",
+            "(</layer>)\n",
+            "(<layer> 0.54 )\n",
+            "G1 X1 Y1 Z0.54 F3000\n",
+            "(</layer>)\n",
+            "M18\n",
+        ]
+        expected = gcodes[:4] + gcodes[7:]
+        self.assertEqual(expected, self.p.process_gcode(gcodes))
+        self.assertEqual(expected, self.process_file(self.write_gcode(gcodes)))
+
+    def test_unterminated_layer(self):
+        #layers without an end are kept rather than scanned to the end of the file
+        gcodes = [
+            "(<layer> 0.27 )\n",
+            "G1 X1 Y1 Z0.27 F3000\n",
+            "(<layer> 0.54 )\n",
+            "G1 X1 Y1 Z0.54 F3000\n",
+            "G1 X2 Y1 Z0.54 F3000\n",
+        ]
+        self.assertEqual(gcodes, self.p.process_gcode(gcodes))
+        self.assertEqual(gcodes, self.process_file(self.write_gcode(gcodes)))
+
     def test_process_file(self):
     #TODO update this to work with new formatting
         pass
@@ -80,6 +80,94 @@ class FileReaderTestsWithS3g(unittest.TestCase):
             self.assertEqual(readCmd, cmd)
 
 
+class IterPayloadsTests(unittest.TestCase):
+    def setUp(self):
+        self.r = makerbot_driver.s3g()
+        self.r.writer = makerbot_driver.Writer.FileWriter(
+            tempfile.TemporaryFile(), threading.Condition())
+        self.r.build_start_notification('build')
+        self.r.queue_extended_point_new([1, 2, 3, 4, 5], 42, [])
+        self.r.toggle_fan(1, True)
+        self.r.display_message(0, 0, 'hello', 10, False, False, False)
+        self.r.set_build_percent(50)
+        self.r.writer.file.seek(0)
+        self.data = self.r.writer.file.read()
+        self.r.writer.close()
+
+    def iter_payloads(self, data, buffer_size=1 << 20):
+        reader = makerbot_driver.FileReader.FileReader()
+        reader.file = io.BytesIO(data)
+        return list(reader.iter_payloads(buffer_size=buffer_size))
+
+    def read_file(self, data):
+        reader = makerbot_driver.FileReader.FileReader()
+        reader.file = io.BytesIO(data)
+        return reader.ReadFile()
+
+    def test_same_as_read_file(self):
+        expected = self.read_file(self.data)
+        self.assertEqual(5, len(expected))
+        self.assertEqual('build', expected[0][-1])
+        # Payloads split across buffers are decoded the same
+        for buffer_size in [1, 3, 1 << 20]:
+            self.assertEqual(expected, self.iter_payloads(self.data, buffer_size))
+
+    def test_lazy(self):
+        reader = makerbot_driver.FileReader.FileReader()
+        reader.file = io.BytesIO(self.data)
+        payloads = reader.iter_payloads(buffer_size=8)
+        self.assertEqual(0, reader.file.tell())
+        payloads.next()
+        self.assertTrue(reader.file.tell() < len(self.data))
+
+    def test_callback(self):
+        percents = []
+        reader = makerbot_driver.FileReader.FileReader()
+        reader.file = open(os.devnull, 'rb')
+        self.assertEqual([], list(reader.iter_payloads(percents.append)))
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(self.data)
+            f.flush()
+            reader.file = open(f.name, 'rb')
+            list(reader.iter_payloads(percents.append))
+        self.assertEqual(100, percents[-1])
+        self.assertEqual(sorted(set(percents)), percents)
+        self.assertEqual(len(self.data), reader.bytesread)
+
+    def test_errors(self):
+        cases = [
+            [self.data[:-1], makerbot_driver.FileReader.InsufficientDataError],
+            [self.data[:7], makerbot_driver.FileReader.InsufficientDataError],
+            [self.data + '\xff', makerbot_driver.FileReader.BadCommandError],
+            [self.data + chr(makerbot_driver.slave_action_command_dict['PAUSE']),
+             makerbot_driver.FileReader.BadHostCommandError],
+            [self.data + '\x88\x00\xfe\x00',
+             makerbot_driver.FileReader.BadSlaveCommandError],
+            ['\x95\x00\x00\x00\x00' + 'a' * (makerbot_driver.maximum_payload_length + 1),
+             makerbot_driver.FileReader.StringTooLongError],
+        ]
+        for data, error in cases:
+            self.assertRaises(error, self.read_file, data)
+            self.assertRaises(error, self.iter_payloads, data)
+            self.assertRaises(error, self.iter_payloads, data, 2)
+
+    def test_tool_action_formats(self):
+        # Temperatures are decoded signed, as they always have been
+        for name in ['SET_TOOLHEAD_TARGET_TEMP', 'SET_PLATFORM_TEMP']:
+            cmd = makerbot_driver.slave_action_command_dict[name]
+            data = '\x88\x00' + chr(cmd) + '\x02\xff\xff'
+            self.assertEqual([[0x88, 0, cmd, 2, -1]], self.read_file(data))
+            self.assertEqual([[0x88, 0, cmd, 2, -1]], self.iter_payloads(data))
+        # Tool actions s3g can send, but files never had
+        for name in ['SET_MOTOR_1_DIRECTION', 'SET_SERVO_2_POSITION', 'TOGGLE_ABP']:
+            cmd = makerbot_driver.slave_action_command_dict[name]
+            data = '\x88\x00' + chr(cmd) + '\x01\x01'
+            self.assertRaises(makerbot_driver.FileReader.BadSlaveCommandError,
+                              self.read_file, data)
+            self.assertRaises(makerbot_driver.FileReader.BadSlaveCommandError,
+                              self.iter_payloads, data)
+
+
 class MockTests(unittest.TestCase):
     def setUp(self):
         self.inputstream = io.BytesIO()
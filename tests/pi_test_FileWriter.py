@@ -8,6 +8,7 @@ import makerbot_driver
 import unittest
 import threading
 import tempfile
+import io
 
 
 class s3gFileWriterTests(unittest.TestCase):
@@ -67,5 +68,49 @@ class s3gFileWriterTests(unittest.TestCase):
         with self.assertRaises(makerbot_driver.Writer.NonBinaryModeFileError):
             self.w.check_binary_mode()
 
+    def test_check_binary_mode_no_mode(self):
+        self.w.file = io.BytesIO()
+        self.w.check_binary_mode()
+        self.w.send_action_payload('asdf')
+        self.assertEqual('asdf', self.w.file.getvalue())
+
+
+class BufferedFileWriterTests(unittest.TestCase):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(delete=True, suffix='.s3g') as f:
+            self.the_file = f.name
+        condition = threading.Condition()
+        self.w = makerbot_driver.Writer.BufferedFileWriter(
+            open(self.the_file, 'wb'), condition, buffer_size=8)
+
+    def tearDown(self):
+        self.w.close()
+        os.unlink(self.the_file)
+
+    def read_file(self):
+        with open(self.the_file, 'rb') as f:
+            return f.read()
+
+    def test_payloads_held_until_buffer_full(self):
+        self.w.send_action_payload('abcd')
+        self.assertEqual('', self.read_file())
+        self.w.send_action_payload('efgh')
+        self.assertEqual('abcdefgh', self.read_file())
+
+    def test_flush(self):
+        self.w.send_action_payload('abc')
+        self.w.flush()
+        self.assertEqual('abc', self.read_file())
+
+    def test_close_flushes(self):
+        self.w.send_action_payload('abc')
+        self.w.close()
+        self.assertEqual('abc', self.read_file())
+
+    def test_write_external_stop(self):
+        self.w.external_stop = True
+        self.assertRaises(makerbot_driver.ExternalStopError,
+                          self.w.send_action_payload, 'asdf')
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,158 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import struct
+import threading
+import unittest
+
+import makerbot_driver
+
+
+class FakeMachineStream(object):
+    """
+    A stream to a machine with a small command buffer, which executes
+    drain_per_poll bytes of it each time its free space is queried
+    """
+
+    def __init__(self, buffer_size=100, drain_per_poll=30):
+        self.buffer_size = buffer_size
+        self.drain_per_poll = drain_per_poll
+        self.buffered = 0
+        self.accepted = []
+        self.polls = 0
+        self.overflows = 0
+        self._decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+        self._output = bytearray()
+
+    def write(self, packet):
+        buffer = bytearray(packet)
+        self._decoder.parse_bytes(buffer)
+        payload = self._decoder.payload
+        self._decoder.reset()
+        self._output.extend(makerbot_driver.Encoder.encode_payload(
+            self.reply(payload)))
+
+    def reply(self, payload):
+        success = bytearray([makerbot_driver.response_code_dict['SUCCESS']])
+        opcode = payload[0]
+        if opcode == makerbot_driver.host_query_command_dict['GET_AVAILABLE_BUFFER_SIZE']:
+            self.polls += 1
+            self.buffered = max(self.buffered - self.drain_per_poll, 0)
+            return success + struct.pack('<I', self.buffer_size - self.buffered)
+        if opcode == makerbot_driver.host_query_command_dict['GET_VERSION']:
+            return success + struct.pack('<H', 700)
+        if opcode == makerbot_driver.host_query_command_dict['CLEAR_BUFFER']:
+            self.buffered = 0
+        elif opcode >= 128:
+            if self.buffered + len(payload) > self.buffer_size:
+                self.overflows += 1
+                return bytearray(
+                    [makerbot_driver.response_code_dict['ACTION_BUFFER_OVERFLOW']])
+            self.buffered += len(payload)
+        self.accepted.append(payload)
+        return success
+
+    def flush(self):
+        pass
+
+    def read(self, size):
+        data = self._output[:size]
+        del self._output[:size]
+        return str(data)
+
+    def inWaiting(self):
+        return len(self._output)
+
+
+class FlowControlWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = FakeMachineStream()
+        self.writer = makerbot_driver.Writer.FlowControlWriter(
+            self.stream, threading.Condition(),
+            min_poll_interval=.0001, max_poll_interval=.001)
+        self.s3g = makerbot_driver.s3g(self.writer)
+
+    def test_never_overflows(self):
+        for song in range(100):
+            self.s3g.queue_song(song)
+        self.assertEqual(0, self.stream.overflows)
+        self.assertEqual(0, self.writer.total_overflows)
+        self.assertEqual(100, len(self.stream.accepted))
+        self.assertEqual(range(100), [payload[1] for payload in self.stream.accepted])
+        # One poll per drain_per_poll bytes, not one per packet
+        self.assertTrue(self.stream.polls < 100)
+        self.assertEqual(self.stream.polls, self.writer.buffer_polls)
+
+    def test_free_space_estimate(self):
+        self.s3g.queue_song(1)
+        self.assertEqual(1, self.stream.polls)
+        self.assertEqual(100 - 2, self.writer.free_space)
+        self.s3g.queue_song(2)
+        self.assertEqual(1, self.stream.polls)
+        self.assertEqual(100 - 4, self.writer.free_space)
+
+    def test_host_queries_do_not_use_buffer(self):
+        self.s3g.queue_song(1)
+        self.s3g.get_version()
+        self.s3g.pause()
+        self.assertEqual(100 - 2, self.writer.free_space)
+        self.s3g.clear_buffer()
+        self.assertEqual(None, self.writer.free_space)
+        self.s3g.queue_song(2)
+        self.assertEqual(100 - 2, self.writer.free_space)
+
+    def test_overflow_is_handled(self):
+        self.s3g.queue_song(1)
+        # Something else filled the buffer behind the writer's back
+        self.stream.buffered = self.stream.buffer_size
+        self.s3g.queue_song(2)
+        self.assertEqual(1, self.stream.overflows)
+        self.assertEqual(1, self.writer.total_overflows)
+        self.assertEqual([1, 2], [payload[1] for payload in self.stream.accepted])
+
+    def test_no_pipelining(self):
+        self.assertRaises(TypeError, makerbot_driver.Writer.FlowControlWriter,
+                          self.stream, threading.Condition(), window_size=4)
+        self.assertEqual(1, self.writer.window_size)
+        for song in range(20):
+            # Something else keeps filling the buffer behind the writer's back
+            self.stream.buffered = self.stream.buffer_size
+            self.s3g.queue_song(song)
+        # The first packet goes out after a poll, which drains the buffer
+        self.assertEqual(19, self.stream.overflows)
+        self.assertEqual(19, self.writer.total_overflows)
+        self.assertEqual(range(20), [payload[1] for payload in self.stream.accepted])
+
+    def test_drain_rate_and_stats(self):
+        for song in range(100):
+            self.s3g.queue_song(song)
+        stats = self.writer.get_flow_control_stats()
+        self.assertEqual(set(['TimeBlocked', 'TimeSending', 'BufferPolls',
+                              'Overflows', 'BytesSent', 'DrainRate']),
+                         set(stats))
+        self.assertEqual(200, stats['BytesSent'])
+        self.assertEqual(0, stats['Overflows'])
+        self.assertTrue(stats['DrainRate'] > 0)
+        self.assertTrue(stats['TimeBlocked'] > 0)
+        self.assertTrue(stats['TimeSending'] > 0)
+
+    def test_poll_interval(self):
+        writer = makerbot_driver.Writer.FlowControlWriter(
+            self.stream, threading.Condition(),
+            min_poll_interval=.01, max_poll_interval=1)
+        writer.free_space = 10
+        self.assertEqual(.01, writer.poll_interval(50))
+        writer._idle_polls = 3
+        self.assertEqual(.08, writer.poll_interval(50))
+        writer.drain_rate = 100.0
+        self.assertEqual(.4, writer.poll_interval(50))
+        writer.drain_rate = 10.0
+        self.assertEqual(1, writer.poll_interval(50))
+        writer.drain_rate = 1000000.0
+        self.assertEqual(.01, writer.poll_interval(50))
+
+if __name__ == "__main__":
+    unittest.main()
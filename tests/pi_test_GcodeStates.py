@@ -199,6 +199,19 @@ class TestProfileInformationParsing(unittest.TestCase):
         ]
         self.assertEqual(expected_values, self.g.get_axes_values(key))
 
+    def test_get_axes_values_cached(self):
+        key = 'steps_per_mm'
+        values = self.g.get_axes_values(key)
+        values[0] = 0
+        self.g.profile.values['axes']['X'][key] = 1
+        self.assertEqual(94.139704, self.g.get_axes_values(key)[0])
+
+    def test_get_axes_values_profile_change(self):
+        key = 'steps_per_mm'
+        self.assertEqual(-96.275, self.g.get_axes_values(key)[4])
+        self.g.profile = makerbot_driver.Profile('ReplicatorSingle')
+        self.assertEqual(0, self.g.get_axes_values(key)[4])
+
 
 class MachineProfileWith4Axes(unittest.TestCase):
     def setUp(self):
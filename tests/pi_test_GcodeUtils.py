@@ -192,6 +192,57 @@ class ParseCommandTests(unittest.TestCase):
         for code in zip(expected_codes.values(), codes.values()):
             self.assertEquals(type(code[0]), type(code[1]))
 
+    def test_signed_values(self):
+        command = 'G1 X-1 Y+2 Z-0.5 A1e2 B-.5'
+        expected_codes = {'G': 1, 'X': -1, 'Y': 2, 'Z': -0.5, 'A': 100.0,
+                          'B': -0.5}
+
+        codes, flags = makerbot_driver.Gcode.parse_command(command)
+        self.assertEquals(expected_codes, codes)
+        for code in 'GXY':
+            self.assertEquals(int, type(codes[code]))
+        for code in 'ZAB':
+            self.assertEquals(float, type(codes[code]))
+
+    def test_sign_only_value(self):
+        for command in ['G-', 'G+', 'G1 X-']:
+            self.assertRaises(
+                ValueError, makerbot_driver.Gcode.parse_command, command)
+
+    def test_repeated_flag(self):
+        codes, flags = makerbot_driver.Gcode.parse_command('G161 X X')
+        self.assertEquals({'G': 161}, codes)
+        self.assertEquals(['X', 'X'], flags)
+
+    def test_unicode_command(self):
+        codes, flags = makerbot_driver.Gcode.parse_command(u'g1 x10 y1.5 Z')
+        self.assertEquals({'G': 1, 'X': 10, 'Y': 1.5}, codes)
+        self.assertEquals(['Z'], flags)
+
+    def test_invalid_code_value(self):
+        try:
+            makerbot_driver.Gcode.parse_command('G1 ~1')
+            self.fail()
+        except makerbot_driver.Gcode.InvalidCodeError as e:
+            self.assertEquals('~', e.values['InvalidCode'])
+
+
+class CodeMaskTests(unittest.TestCase):
+    def test_no_codes(self):
+        self.assertEquals(0, makerbot_driver.Gcode.code_mask(''))
+
+    def test_codes(self):
+        self.assertEquals(1 | 2 | 1 << 25,
+                          makerbot_driver.Gcode.code_mask('ABZ'))
+        self.assertEquals(makerbot_driver.Gcode.code_mask('XY'),
+                          makerbot_driver.Gcode.code_mask({'X': 1, 'Y': 2}))
+
+    def test_unknown_codes_share_a_bit(self):
+        self.assertEquals(makerbot_driver.Gcode.code_mask('a'),
+                          makerbot_driver.Gcode.code_mask('1'))
+        self.assertEquals(0, makerbot_driver.Gcode.code_mask('a') &
+                          makerbot_driver.Gcode.code_mask(string.ascii_uppercase))
+
 
 class CheckForExtraneousCodesTests(unittest.TestCase):
     def test_no_codes(self):
@@ -233,6 +284,23 @@ class CheckForExtraneousCodesTests(unittest.TestCase):
         makerbot_driver.Gcode.check_for_extraneous_codes(
             codes.keys(), allowed_codes)
 
+    def test_codes_dict(self):
+        codes = {'G': 1, 'X': 0, 'Y': 2}
+        makerbot_driver.Gcode.check_for_extraneous_codes(codes, 'XYZ')
+
+    def test_reports_all_invalid_codes(self):
+        try:
+            makerbot_driver.Gcode.check_for_extraneous_codes('GXQRY', 'XY')
+            self.fail()
+        except makerbot_driver.Gcode.InvalidCodeError as e:
+            self.assertEquals('QR', e.values['InvalidCodes'])
+
+    def test_non_letter_codes(self):
+        makerbot_driver.Gcode.check_for_extraneous_codes(['1'], '1')
+        self.assertRaises(makerbot_driver.Gcode.InvalidCodeError,
+                          makerbot_driver.Gcode.check_for_extraneous_codes,
+                          ['1'], '2')
+
 
 class ParseOutAxesTests(unittest.TestCase):
     def test_empty_set(self):
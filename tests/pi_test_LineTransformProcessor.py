@@ -5,6 +5,7 @@ sys.path.insert(0, lib_path)
 
 import unittest
 import mock
+import re
 
 import makerbot_driver
 
@@ -71,6 +72,76 @@ class TestLineTransformProcessor(unittest.TestCase):
         got_output = self.p.process_gcode(lines)
         self.assertEqual(got_output, expected_output)
 
+    def test_transform_code_first_match_wins(self):
+        def transform(name):
+            return lambda match: '%s %s' % (name, match.group(1))
+        self.p.code_map.update({
+            re.compile('G1 X(\\d+)'): transform('x'),
+            re.compile('G1 ([XY]\\d+)'): transform('xy'),
+            re.compile('(G)1'): transform('g'),
+            re.compile('M(\\d+)'): transform('m'),
+        })
+        lines = ['G1 X10', 'G1 Y10', 'G1 Z10', 'M73', 'G92 X0']
+        expected = []
+        for line in lines:
+            tcode = [line]
+            for key in self.p.code_map:
+                match = key.match(line)
+                if match is not None:
+                    tcode = [self.p.code_map[key](match)]
+                    break
+            expected.append(tcode)
+        self.assertTrue(self.p._code_map_regex is None)
+        self.assertEqual(expected,
+                         [self.p._transform_code(line) for line in lines])
+        self.assertFalse(self.p._code_map_regex is None)
+
+    def test_transform_code_code_map_changed(self):
+        self.p.code_map.update({"G1": lambda match: "G1_TRANSFORMED"})
+        self.assertEqual(["G2"], self.p._transform_code("G2"))
+        self.p.code_map.update({"G2": lambda match: "G2_TRANSFORMED"})
+        self.assertEqual(["G2_TRANSFORMED"], self.p._transform_code("G2"))
+
+    def test_transform_code_not_combined(self):
+        cases = [
+            # Numbered backreference
+            {"(G)\\1": lambda match: match.group(1)},
+            # Repeated group name
+            {"(?P<code>G)": lambda match: match.group('code'),
+             "(?P<code>M)": lambda match: match.group('code')},
+            # Inline flags
+            {"(?i)g": lambda match: 'G', "M": lambda match: 'M'},
+            # Differing flags
+            {re.compile("g", re.I): lambda match: 'G',
+             "M": lambda match: 'M'},
+        ]
+        for code_map in cases:
+            self.p.code_map = code_map
+            self.assertEqual(["G"], self.p._transform_code("GG"))
+            self.assertTrue(self.p._code_map_regex is None)
+            self.assertEqual(["X1"], self.p._transform_code("X1"))
+
+    def test_iter_process_gcode_is_lazy(self):
+        def _transform_g1(match):
+            return [match.string, match.string]
+        self.p.code_map.update({"G1": _transform_g1})
+        gcodes = makerbot_driver.GcodeProcessors.GcodeStream(
+            ["G0\n", "G1\n", "G2\n"], 9)
+        percents = []
+        output = self.p.iter_process_gcode(gcodes, percents.append)
+        self.assertEqual(0, gcodes.read)
+        self.assertEqual("G0\n", output.next())
+        self.assertEqual(3, gcodes.read)
+        self.assertEqual(["G1\n", "G1\n", "G2\n"], list(output))
+        self.assertEqual([33, 66, 100], percents)
+        self.assertEqual(100, output.percent())
+
+    def test_iter_process_gcode_external_stop(self):
+        output = self.p.iter_process_gcode(["G0\n", "G1\n"])
+        output.next()
+        self.p.set_external_stop()
+        self.assertRaises(makerbot_driver.ExternalStopError, list, output)
+
 
 if __name__ == "__main__":
     unittest.main()
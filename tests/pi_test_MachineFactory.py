@@ -1,7 +1,9 @@
 from __future__ import (absolute_import, print_function, unicode_literals)
 
 import os
+import shutil
 import sys
+import tempfile
 import threading
 import uuid
 lib_path = os.path.abspath('./')
@@ -366,5 +368,90 @@ class TestMachineInquisitor(unittest.TestCase):
         self.assertEqual(s3g, self.s3g_mock)
         self.assertEqual(expected_settings, got_settings)
 
+
+class TestMachineIdentityCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.directory, 'machines.json')
+        self.detector = makerbot_driver.MachineDetector()
+        self.detector.machines_recently_seen = {
+            '/dev/dummy_port': {'port': '/dev/dummy_port', 'VID': 0x23C1,
+                                'PID': 0xB404, 'iSerial': 'ABC123'},
+        }
+        self.s3g_mock = self.create_s3g_mock(700)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_s3g_mock(self, version):
+        s3g_mock = mock.Mock(makerbot_driver.s3g)
+        s3g_mock.get_vid_pid.return_value = 0x23C1, 0xB404
+        s3g_mock.get_version.return_value = version
+        s3g_mock.get_toolhead_count.return_value = 2
+        s3g_mock.get_advanced_version.return_value = {
+            'Version': version,
+            'InternalVersion': 0,
+            'SoftwareVariant': 1,
+            'ReservedA': 0,
+            'ReservedB': 0,
+        }
+        return s3g_mock
+
+    def build(self, s3g_mock):
+        factory = makerbot_driver.MachineFactory(
+            identity_cache=self.cache_path, detector=self.detector)
+        inquisitor = makerbot_driver.MachineInquisitor('/dev/dummy_port')
+        inquisitor.create_s3g = mock.Mock(return_value=s3g_mock)
+        factory.create_inquisitor = mock.Mock(return_value=inquisitor)
+        return factory.build_from_port('/dev/dummy_port')
+
+    def test_reconnect_uses_cache(self):
+        first = self.build(self.s3g_mock)
+        self.assertTrue(os.path.isfile(self.cache_path))
+        s3g_mock = self.create_s3g_mock(700)
+        second = self.build(s3g_mock)
+        self.assertEqual([mock.call.get_version(),
+                          mock.call.init_eeprom_reader(700),
+                          mock.call.set_print_to_file_type('x3g')],
+                         s3g_mock.mock_calls)
+        self.assertEqual(first.profile.values, second.profile.values)
+        self.assertTrue(second.s3g is s3g_mock)
+        self.assertTrue(second.gcodeparser is not None)
+
+    def test_new_firmware_is_queried(self):
+        self.build(self.s3g_mock)
+        s3g_mock = self.create_s3g_mock(701)
+        self.build(s3g_mock)
+        self.assertEqual(1, s3g_mock.get_version.call_count)
+        s3g_mock.get_toolhead_count.assert_called_once_with()
+        cache = makerbot_driver.MachineIdentityCache(self.cache_path)
+        self.assertEqual(701, cache.get('/dev/dummy_port', 'ABC123')['firmware_version'])
+
+    def test_other_machine_on_port_is_queried(self):
+        self.build(self.s3g_mock)
+        self.detector.machines_recently_seen['/dev/dummy_port']['iSerial'] = 'DEF456'
+        s3g_mock = self.create_s3g_mock(700)
+        self.build(s3g_mock)
+        s3g_mock.get_toolhead_count.assert_called_once_with()
+
+    def test_no_serial_number(self):
+        del self.detector.machines_recently_seen['/dev/dummy_port']['iSerial']
+        self.build(self.s3g_mock)
+        self.assertFalse(os.path.isfile(self.cache_path))
+
+    def test_cache_file(self):
+        cache = makerbot_driver.MachineIdentityCache(self.cache_path)
+        cache.put('/dev/a', 'ABC', 'ReplicatorDual', 700, {'tool_count': 2})
+        cache = makerbot_driver.MachineIdentityCache(self.cache_path)
+        entry = cache.get('/dev/a', 'ABC')
+        self.assertEqual(('ReplicatorDual', 700, {'tool_count': 2}),
+                         (entry['profile'], entry['firmware_version'], entry['settings']))
+        self.assertEqual(None, cache.get('/dev/a', 'DEF'))
+        cache.invalidate('/dev/a', 'ABC')
+        self.assertEqual({}, makerbot_driver.MachineIdentityCache(self.cache_path).entries)
+        with open(self.cache_path, 'w') as f:
+            f.write('not json')
+        self.assertEqual({}, makerbot_driver.MachineIdentityCache(self.cache_path).entries)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,132 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import time
+import unittest
+
+import mock
+
+import makerbot_driver
+
+
+class FakeFactory(object):
+    """ Builds a mock machine per port, taking delay seconds for each """
+
+    def __init__(self, delay=0, bad_ports=(), unknown_ports=()):
+        self.delay = delay
+        self.bad_ports = bad_ports
+        self.unknown_ports = unknown_ports
+        self.conditions = {}
+
+    def build_from_port(self, portname, leaveOpen=True, condition=None):
+        time.sleep(self.delay)
+        if portname in self.bad_ports:
+            raise makerbot_driver.TransmissionError(['TimeoutError'])
+        self.conditions[portname] = condition
+        machine = makerbot_driver.ReturnObject()
+        machine.s3g = mock.Mock()
+        machine.s3g.is_open.return_value = True
+        machine.s3g.get_motherboard_status.return_value = {'heat_shutdown': False}
+        machine.s3g.get_build_stats.return_value = {'BuildState': 0}
+        machine.gcodeparser = mock.Mock()
+        if portname in self.unknown_ports:
+            machine.profile = None
+        else:
+            machine.profile = makerbot_driver.Profile('ReplicatorDual')
+        return machine
+
+
+class MachineFleetTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ports = ['/dev/ttyACM%i' % (i) for i in range(10)]
+        self.detector = mock.Mock()
+        self.detector.get_available_machines.return_value = dict(
+            (port, {'port': port, 'VID': 0x23C1, 'PID': 0xB015})
+            for port in self.ports)
+
+    def test_connect_is_concurrent(self):
+        fleet = makerbot_driver.MachineFleet(
+            FakeFactory(delay=.2), self.detector)
+        start_time = time.time()
+        machines = fleet.connect()
+        self.assertTrue(time.time() - start_time < 1)
+        self.assertEqual(self.ports, [machine.port for machine in machines])
+        self.assertEqual(self.ports, [machine.port for machine in fleet])
+        self.assertEqual(10, len(fleet))
+        self.assertEqual({'port': self.ports[3], 'VID': 0x23C1, 'PID': 0xB015},
+                         fleet[self.ports[3]].port_data)
+
+    def test_each_machine_has_its_own_condition(self):
+        factory = FakeFactory()
+        fleet = makerbot_driver.MachineFleet(factory, self.detector)
+        fleet.connect()
+        conditions = factory.conditions.values()
+        self.assertEqual(10, len(set(id(condition) for condition in conditions)))
+        self.assertTrue(fleet[self.ports[0]].condition is
+                        factory.conditions[self.ports[0]])
+
+    def test_failed_machines_are_left_out(self):
+        factory = FakeFactory(bad_ports=[self.ports[1]],
+                              unknown_ports=[self.ports[2]])
+        fleet = makerbot_driver.MachineFleet(factory, self.detector)
+        machines = fleet.connect()
+        self.assertEqual(10, len(machines))
+        self.assertTrue(isinstance(machines[1].error,
+                                   makerbot_driver.TransmissionError))
+        self.assertTrue(isinstance(machines[2].error,
+                                   makerbot_driver.UnknownMachineError))
+        self.assertEqual(None, machines[2].s3g)
+        self.assertEqual(8, len(fleet))
+        # Failed ports are tried again by the next connect
+        self.assertEqual(set(self.ports[1:3]), set(fleet.discover()))
+
+    def test_connect_ports(self):
+        fleet = makerbot_driver.MachineFleet(FakeFactory(), self.detector)
+        fleet.connect(self.ports[:2])
+        self.assertEqual(self.ports[:2], sorted(fleet.machines))
+        self.assertEqual(None, fleet[self.ports[0]].port_data)
+        self.assertEqual(8, len(fleet.connect()))
+        self.assertEqual(10, len(fleet))
+        self.assertEqual([], fleet.connect())
+
+    def test_status(self):
+        fleet = makerbot_driver.MachineFleet(FakeFactory(), self.detector)
+        fleet.connect()
+        fleet[self.ports[4]].s3g.get_build_stats.side_effect = \
+            makerbot_driver.TransmissionError(['TimeoutError'])
+        status = fleet.status()
+        self.assertEqual(set(self.ports), set(status))
+        self.assertEqual({
+            'port': self.ports[0],
+            'connected': True,
+            'profile': 'The Replicator Dual',
+            'error': None,
+            'motherboard_status': {'heat_shutdown': False},
+            'build_stats': {'BuildState': 0},
+        }, status[self.ports[0]])
+        self.assertEqual("['TimeoutError']", status[self.ports[4]]['error'])
+
+    def test_execute_line_waits_for_room(self):
+        fleet = makerbot_driver.MachineFleet(FakeFactory(), self.detector)
+        fleet.connect(self.ports[:1])
+        machine = fleet[self.ports[0]]
+        machine.gcodeparser.execute_line.side_effect = [
+            makerbot_driver.BufferOverflowError(), None]
+        machine.execute_line('G1 X1\n', delay=.01)
+        self.assertEqual([mock.call('G1 X1\n')] * 2,
+                         machine.gcodeparser.execute_line.call_args_list)
+
+    def test_close(self):
+        fleet = makerbot_driver.MachineFleet(FakeFactory(), self.detector)
+        fleet.connect()
+        s3gs = [machine.s3g for machine in fleet]
+        fleet.close()
+        self.assertEqual(0, len(fleet))
+        for s3g in s3gs:
+            s3g.close.assert_called_once_with()
+
+if __name__ == "__main__":
+    unittest.main()
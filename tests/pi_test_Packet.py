@@ -195,5 +195,100 @@ class PacketStreamDecoderTests(unittest.TestCase):
         assert(self.s.state == 'PAYLOAD_READY')
         assert(self.s.payload == payload)
 
+    def test_parse_bytes_stops_at_end_of_packet(self):
+        payload = bytearray('abcde')
+        buffer = makerbot_driver.Encoder.encode_payload(payload)
+        buffer.extend('xyz')
+        self.s.parse_bytes(buffer)
+        self.assertEqual('PAYLOAD_READY', self.s.state)
+        self.assertEqual(payload, self.s.payload)
+        self.assertEqual(bytearray('xyz'), buffer)
+
+    def test_parse_bytes_partial_packet(self):
+        packet = makerbot_driver.Encoder.encode_payload('abcde')
+        buffer = packet[:4]
+        self.s.parse_bytes(buffer)
+        self.assertEqual('WAIT_FOR_DATA', self.s.state)
+        self.assertEqual(0, len(buffer))
+        self.assertEqual(4, self.s.bytes_needed())
+        buffer = packet[4:]
+        self.s.parse_bytes(buffer)
+        self.assertEqual('PAYLOAD_READY', self.s.state)
+        self.assertEqual(0, self.s.bytes_needed())
+
+    def test_parse_bytes_consumes_bad_byte(self):
+        buffer = bytearray('a')
+        buffer.extend(makerbot_driver.Encoder.encode_payload('abcde'))
+        self.assertRaises(
+            makerbot_driver.PacketHeaderError, self.s.parse_bytes, buffer)
+        self.assertEqual(
+            makerbot_driver.Encoder.encode_payload('abcde'), buffer)
+
+    def test_bytes_needed(self):
+        self.assertEqual(3, self.s.bytes_needed())
+        self.s.parse_byte(makerbot_driver.header)
+        self.assertEqual(2, self.s.bytes_needed())
+        self.s.parse_byte(2)
+        self.assertEqual(3, self.s.bytes_needed())
+        self.s.parse_byte(0)
+        self.s.parse_byte(0)
+        self.assertEqual(1, self.s.bytes_needed())
+
+    def test_state_codes(self):
+        self.assertEqual(self.s.WAIT_FOR_HEADER, self.s.state_code)
+        self.s.parse_byte(makerbot_driver.header)
+        self.assertEqual(self.s.WAIT_FOR_LENGTH, self.s.state_code)
+
+    def test_reset_after_bad_byte(self):
+        self.s.parse_byte(makerbot_driver.header)
+        self.assertRaises(
+            makerbot_driver.PacketLengthFieldError, self.s.parse_byte,
+            makerbot_driver.maximum_payload_length + 1)
+        self.assertEqual('WAIT_FOR_HEADER', self.s.state)
+
+    def test_feed_back_to_back_packets(self):
+        payloads = ['abcde', 'f', '', 'ghijklmnop']
+        buffer = bytearray()
+        for payload in payloads:
+            buffer.extend(makerbot_driver.Encoder.encode_payload(payload))
+        decoded = list(self.s.feed(buffer))
+        self.assertEqual(payloads, [view.tobytes() for view in decoded])
+        self.assertEqual(len(buffer), self.s.position)
+        self.assertEqual('WAIT_FOR_HEADER', self.s.state)
+
+    def test_feed_returns_views_into_buffer(self):
+        buffer = makerbot_driver.Encoder.encode_payload('abcde')
+        [view] = list(self.s.feed(buffer))
+        self.assertTrue(isinstance(view, memoryview))
+        buffer[2] = ord('z')
+        self.assertEqual('zbcde', view.tobytes())
+
+    def test_feed_packet_split_across_buffers(self):
+        buffer = makerbot_driver.Encoder.encode_payload('abcde')
+        buffer.extend(makerbot_driver.Encoder.encode_payload('fgh'))
+        for split in range(1, len(buffer)):
+            decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+            decoded = list(decoder.feed(buffer[:split]))
+            decoded.extend(decoder.feed(buffer[split:]))
+            self.assertEqual(
+                ['abcde', 'fgh'], [view.tobytes() for view in decoded])
+
+    def test_feed_resumes_after_bad_packet(self):
+        buffer = makerbot_driver.Encoder.encode_payload('abcde')
+        buffer[-1] ^= 0xFF
+        buffer.extend(makerbot_driver.Encoder.encode_payload('fgh'))
+        decoded = self.s.feed(buffer)
+        self.assertRaises(makerbot_driver.PacketCRCError, list, decoded)
+        self.assertEqual(8, self.s.position)
+        decoded = list(self.s.feed(buffer[self.s.position:]))
+        self.assertEqual(['fgh'], [view.tobytes() for view in decoded])
+
+    def test_feed_bad_header(self):
+        buffer = bytearray('a')
+        buffer.extend(makerbot_driver.Encoder.encode_payload('abcde'))
+        decoded = self.s.feed(buffer)
+        self.assertRaises(makerbot_driver.PacketHeaderError, list, decoded)
+        self.assertEqual(1, self.s.position)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import unittest
+import StringIO
+
+import makerbot_driver
+
+
+class NamedStringIO(StringIO.StringIO):
+    mode = 'wb'
+
+    def close(self):
+        pass
+
+
+def layered_gcode(layers, moves_per_layer):
+    lines = ['G92 X0 Y0 Z0 A0 B0\n', 'M135 T0\n', 'G1 F3000\n']
+    for layer in range(layers):
+        lines.append('G1 Z%.2f F1200\n' % (0.2 * (layer + 1)))
+        lines.append('M73 P%i\n' % (layer * 100 / layers))
+        for move in range(moves_per_layer):
+            lines.append('G1 X%i Y%.1f A%.3f F%i\n' % (
+                move % 20, layer + move * 0.5, 0.1 * move, 1500 + layer * 100))
+    lines.append('M137\n')
+    return lines
+
+
+class GcodeCheckpointTests(unittest.TestCase):
+
+    def test_restore(self):
+        parser = makerbot_driver.Gcode.GcodeParser()
+        parser.state.position.SetPoint({'X': 1, 'Y': 2, 'Z': 3})
+        parser.state.values['feedrate'] = 100
+        parser.state.percentage = 10
+        parser.line_number = 42
+        checkpoint = makerbot_driver.Gcode.GcodeCheckpoint(parser)
+
+        restored = makerbot_driver.Gcode.GcodeParser()
+        checkpoint.restore(restored)
+        self.assertEqual([1, 2, 3, None, None],
+                         restored.state.position.ToList())
+        self.assertEqual({'feedrate': 100}, restored.state.values)
+        self.assertEqual(10, restored.state.percentage)
+        self.assertEqual(42, restored.line_number)
+
+        # The checkpoint holds a copy, not the parser's own state
+        parser.state.values['feedrate'] = 200
+        restored.state.values['feedrate'] = 300
+        self.assertEqual({'feedrate': 100}, checkpoint.values)
+
+
+class CompileGcodeParallelTests(unittest.TestCase):
+
+    def setUp(self):
+        self.profile = makerbot_driver.Profile('ReplicatorDual')
+        self.lines = layered_gcode(10, 15)
+
+    def test_find_checkpoints_at_layer_starts(self):
+        checkpoints, compiler = makerbot_driver.Gcode.find_checkpoints(
+            self.lines, self.profile, chunk_size=20)
+        indexes = [index for index, checkpoint in checkpoints]
+        self.assertEqual(0, indexes[0])
+        self.assertTrue(len(indexes) > 2)
+        for previous, index in zip(indexes, indexes[1:]):
+            self.assertTrue(index - previous >= 20)
+            # Each checkpoint follows the first move of a layer
+            self.assertTrue(self.lines[index - 1].startswith('G1 Z'))
+        self.assertEqual(len(self.lines) + 1, compiler.line_number)
+
+    def check_identical(self, print_to_file_type):
+        expected = NamedStringIO()
+        serial = makerbot_driver.compile_gcode(
+            self.lines, expected, self.profile, print_to_file_type)
+        output = NamedStringIO()
+        parallel = makerbot_driver.Gcode.compile_gcode_parallel(
+            self.lines, output, self.profile, print_to_file_type,
+            processes=2, chunk_size=20)
+        self.assertEqual(expected.getvalue(), output.getvalue())
+        self.assertEqual(serial.line_number, parallel.line_number)
+        self.assertEqual(serial.state.position.ToList(),
+                         parallel.state.position.ToList())
+        self.assertEqual(serial.state.values, parallel.state.values)
+
+    def test_s3g_output_identical_to_serial(self):
+        self.check_identical('s3g')
+
+    def test_x3g_output_identical_to_serial(self):
+        self.check_identical('x3g')
+
+    def test_compile_gcode_processes(self):
+        expected = NamedStringIO()
+        makerbot_driver.compile_gcode(self.lines, expected, self.profile)
+        output = NamedStringIO()
+        makerbot_driver.compile_gcode(self.lines, output, self.profile,
+                                      processes=2)
+        self.assertEqual(expected.getvalue(), output.getvalue())
+
+    def test_error_in_chunk(self):
+        lines = self.lines[:-1] + ['G1 X10 F-100\n']
+        self.assertRaises(makerbot_driver.Gcode.InvalidFeedrateError,
+                          makerbot_driver.Gcode.compile_gcode_parallel,
+                          lines, NamedStringIO(), self.profile,
+                          processes=2, chunk_size=20)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@ sys.path.insert(0, lib_path)
 
 import unittest
 import io
+import pickle
 
 import makerbot_driver
 
@@ -66,5 +67,42 @@ class TestPoint(unittest.TestCase):
         copy_point.X = 50
         self.assertNotEqual(point.ToList(), copy_point.ToList())
 
+    def test_known_axes(self):
+        p = makerbot_driver.Gcode.Point()
+        self.assertEqual(0, p.known)
+        p.X = 1
+        p.SetPoint({'A': 2})
+        self.assertEqual(1 | 1 << 3, p.known)
+        p.SetPoint({'Y': 0, 'Z': 0, 'B': 0})
+        self.assertEqual(makerbot_driver.Gcode.Point.all_known, p.known)
+        setattr(p, 'Y', None)
+        self.assertEqual(makerbot_driver.Gcode.Point.all_known & ~2, p.known)
+        self.assertEqual(p.known, p.copy().known)
+
+    def test_set_list(self):
+        p = makerbot_driver.Gcode.Point()
+        p.SetList([1, None, 3.5, 4, 5])
+        self.assertEqual([1, None, 3.5, 4, 5], p.ToList())
+        self.assertEqual(makerbot_driver.Gcode.Point.all_known & ~2, p.known)
+
+    def test_difference(self):
+        p = makerbot_driver.Gcode.Point()
+        p.SetList([1, 2, 3, 4, 5])
+        other = makerbot_driver.Gcode.Point()
+        other.SetList([5, 4, 3, 2, 1.5])
+        self.assertEqual([-4, -2, 0, 2, 3.5], p.Difference(other))
+
+    def test_pickle(self):
+        p = makerbot_driver.Gcode.Point()
+        p.SetPoint({'X': 1, 'Z': 2.5})
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            unpickled = pickle.loads(pickle.dumps(p, protocol))
+            self.assertEqual(p.ToList(), unpickled.ToList())
+            self.assertEqual(p.known, unpickled.known)
+
+    def test_no_other_attributes(self):
+        p = makerbot_driver.Gcode.Point()
+        self.assertRaises(AttributeError, setattr, p, 'Q', 1)
+
 if __name__ == '__main__':
     unittest.main()
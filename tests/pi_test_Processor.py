@@ -3,7 +3,11 @@ import sys
 lib_path = os.path.abspath('./')
 sys.path.insert(0, lib_path)
 
+import re
 import unittest
+import tempfile
+import mock
+import makerbot_driver
 import makerbot_driver.GcodeProcessors.Processor as Processor
 
 
@@ -18,5 +22,132 @@ class TestProcessor(unittest.TestCase):
             result = Processor.remove_variables(case[0])
             self.assertEqual(case[1], result)
 
+
+class TestGcodeStream(unittest.TestCase):
+
+    def test_percent_by_bytes(self):
+        stream = makerbot_driver.GcodeProcessors.GcodeStream(
+            ['G1\n', 'G92 X0\n'], 10)
+        self.assertEqual(0, stream.percent())
+        self.assertEqual('G1\n', stream.next())
+        self.assertEqual(30, stream.percent())
+        self.assertEqual(['G92 X0\n'], list(stream))
+        self.assertEqual(100, stream.percent())
+
+    def test_percent_by_lines(self):
+        stream = makerbot_driver.GcodeProcessors.GcodeStream.from_list(
+            ['G1\n', 'G92 X0\n', 'M73 P1\n', 'M18\n'])
+        stream.next()
+        self.assertEqual(25, stream.percent())
+
+    def test_unknown_size(self):
+        stream = makerbot_driver.GcodeProcessors.GcodeStream.wrap(
+            iter(['G1\n']))
+        self.assertEqual(None, stream.percent())
+        self.assertEqual(['G1\n'], list(stream))
+
+    def test_empty(self):
+        stream = makerbot_driver.GcodeProcessors.GcodeStream.from_list([])
+        self.assertEqual([], list(stream))
+        self.assertEqual(0, stream.percent())
+
+    def test_from_file(self):
+        with tempfile.TemporaryFile() as f:
+            f.write('G1 X1\nG1 X2\n')
+            f.seek(0)
+            stream = makerbot_driver.GcodeProcessors.GcodeStream.wrap(f)
+            self.assertEqual(12, stream.size)
+            stream.next()
+            self.assertEqual(50, stream.percent())
+
+    def test_from_path_closes_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write('G1 X1\nG1 X2\n')
+        self.addCleanup(os.remove, f.name)
+        real_open = open
+        opened = []
+
+        def open_mock(*args):
+            opened.append(real_open(*args))
+            return opened[-1]
+        module = sys.modules['makerbot_driver.GcodeProcessors.Processor']
+        with mock.patch.object(module, 'open', open_mock, create=True):
+            stream = makerbot_driver.GcodeProcessors.GcodeStream.from_file(f.name)
+            self.assertEqual(12, stream.size)
+            self.assertEqual(['G1 X1\n', 'G1 X2\n'], list(stream))
+            self.assertEqual(100, stream.percent())
+            self.assertTrue(opened[0].closed)
+            # A stream that isn't read to the end is closed with close
+            stream = makerbot_driver.GcodeProcessors.GcodeStream.from_file(f.name)
+            stream.next()
+            self.assertFalse(opened[1].closed)
+            stream.close()
+            self.assertTrue(opened[1].closed)
+
+    def test_derive_reports_source_progress(self):
+        stream = makerbot_driver.GcodeProcessors.GcodeStream.from_list(
+            ['G1\n', 'G1\n'])
+        doubled = stream.derive(line for code in stream for line in [code] * 2)
+        derived = doubled.derive(doubled)
+        self.assertTrue(stream is derived.progress_source())
+        derived.next()
+        self.assertEqual(50, derived.percent())
+        self.assertEqual(3, len(list(derived)))
+        self.assertEqual(100, derived.percent())
+
+    def test_wrap_stream(self):
+        stream = makerbot_driver.GcodeProcessors.GcodeStream.from_list([])
+        self.assertTrue(
+            stream is makerbot_driver.GcodeProcessors.GcodeStream.wrap(stream))
+
+
+class TestMappedGcodeFile(unittest.TestCase):
+
+    def mapped(self, contents):
+        f = tempfile.NamedTemporaryFile(delete=False)
+        f.write(contents)
+        f.close()
+        self.addCleanup(os.unlink, f.name)
+        return makerbot_driver.GcodeProcessors.MappedGcodeFile(f.name)
+
+    def test_index_lines(self):
+        index_lines = makerbot_driver.GcodeProcessors.index_lines
+        self.assertEqual([0, 3, 4], list(index_lines('G1\n\nM18')))
+        self.assertEqual([0, 3], list(index_lines('G1\nM18\n')))
+        self.assertEqual([], list(index_lines('')))
+
+    def test_lines(self):
+        with self.mapped('G1 X1\n(Slice 1)\nG1 X2') as gcode_file:
+            self.assertEqual(3, len(gcode_file))
+            self.assertEqual('(Slice 1)\n', gcode_file[1])
+            self.assertEqual('G1 X2', gcode_file[2])
+            self.assertEqual('(Slice 1)\nG1 X2', gcode_file.read_lines(1, 3))
+            self.assertEqual('', gcode_file.read_lines(2, 2))
+
+    def test_empty_file(self):
+        with self.mapped('') as gcode_file:
+            self.assertEqual(0, len(gcode_file))
+            self.assertEqual(0, gcode_file.find_line(re.compile('^G1'), 0))
+
+    def test_find_line(self):
+        pattern = re.compile('^\(Slice')
+        with self.mapped('(Slice 0)\nG1 (Slice)\nG1\n(Slice 1)\n') as gcode_file:
+            self.assertEqual(0, gcode_file.find_line(pattern, 0))
+            self.assertEqual(3, gcode_file.find_line(pattern, 1))
+            self.assertEqual(4, gcode_file.find_line(pattern, 4))
+
+
+class TestProcessorIterProcessGcode(unittest.TestCase):
+
+    def test_default_reads_all_lines(self):
+        class ReverseProcessor(Processor):
+            def process_gcode(self, gcodes, callback=None):
+                return gcodes[::-1]
+        percents = []
+        output = ReverseProcessor().iter_process_gcode(
+            ['G1\n', 'G92\n'], percents.append)
+        self.assertEqual(['G92\n', 'G1\n'], list(output))
+        self.assertEqual([100], percents)
+
 if __name__ == "__main__":
     unittest.main()
@@ -31,5 +31,34 @@ class TestProgressProcessor(unittest.TestCase):
         got_output = self.p.process_gcode(the_input)
         self.assertEqual(expected_output, got_output)
 
+    def test_iter_process_gcode_by_bytes(self):
+        the_input = ["G1 X50 Y50\n", "G1 X0\n", "G1 X0 Y0 B50\n"]
+        size = sum(len(line) for line in the_input)
+        stream = makerbot_driver.GcodeProcessors.GcodeStream(
+            iter(the_input), size)
+        percents = []
+        got_output = list(self.p.iter_process_gcode(stream, percents.append))
+        expected_output = [
+            "G1 X50 Y50\n", "M73 P36 (progress (36%))\n",
+            "G1 X0\n", "M73 P56 (progress (56%))\n",
+            "G1 X0 Y0 B50\n", "M73 P100 (progress (100%))\n",
+        ]
+        self.assertEqual(expected_output, got_output)
+        self.assertEqual([36, 56, 100], percents)
+
+    def test_iter_process_gcode_reaches_100(self):
+        # Input read after the last line, ie by a processor removing it,
+        # still counts
+        stream = makerbot_driver.GcodeProcessors.GcodeStream.from_list(
+            ["G1 X0\n", "(removed)\n"])
+        lines = stream.derive(line for line in stream if line[0] != '(')
+        got_output = list(self.p.iter_process_gcode(lines))
+        self.assertEqual(["G1 X0\n", "M73 P50 (progress (50%))\n",
+                          "M73 P100 (progress (100%))\n"], got_output)
+
+    def test_iter_process_gcode_unknown_size(self):
+        self.assertRaises(ValueError, self.p.iter_process_gcode,
+                          iter(["G1 X0\n"]))
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,6 +6,7 @@ import os
 import sys
 import unittest
 import re
+import tempfile
 
 sys.path.append(os.path.abspath('../../s3g'))
 import makerbot_driver
@@ -123,6 +124,64 @@ class TestRep2XDualstrusionProcessor(unittest.TestCase):
             else:
                 self.assertEqual(match.group(), case[2])
 
+    def process_file(self, gcodes):
+        gcode_file = tempfile.NamedTemporaryFile(delete=False)
+        gcode_file.write(''.join(gcodes))
+        gcode_file.close()
+        self.addCleanup(os.unlink, gcode_file.name)
+        output_path = gcode_file.name + '.out'
+        self.assertTrue(self.p.process_gcode(
+            gcode_file.name, output_path, profile='Replicator2X'))
+        self.addCleanup(os.unlink, output_path)
+        with open(output_path) as f:
+            return list(f)
+
+    def test_process_file_MG(self):
+        gcodes = [
+            "(Slice 0, 1 Extruder)\n",
+            "M135 T0\n",
+            "G1 F1200.000 A1.000 (squirt)\n",
+            "G1 X1 Y1 Z0.3 F2400 A32.000\n",
+            "G1 F2400.000 A31.000 (snort)\n",
+            "\n",
+            "(Slice 1, 1 Extruder)\n",
+            "M135 T1\n",
+            "G1 F12000.000 B100.000 (squirt)\n",
+            "G1 X1 Y1 Z0.6 F2400 B12.000\n",
+        ]
+        expected = gcodes[:]
+        #lines shorter than the ones they replace are padded
+        expected[4] = "G1 F1200.000 A11.000 (snort)\n"
+        expected[8] = "G1 F6000.000 B95.000 (squirt)  \n"
+        self.assertEqual(expected, self.process_file(gcodes))
+
+        #a snort before the look-behind window is left alone
+        self.p.max_snort_lookbehind = 2
+        expected[4] = gcodes[4]
+        self.assertEqual(expected, self.process_file(gcodes))
+
+    def test_overwritable_gcode_file(self):
+        gcode_file = tempfile.NamedTemporaryFile(delete=False)
+        gcode_file.write('G1 X1\nG1 X2\nG1 X3\nG1 X4\n')
+        gcode_file.close()
+        self.addCleanup(os.unlink, gcode_file.name)
+        with makerbot_driver.GcodeProcessors.MappedGcodeFile(gcode_file.name) as mapped:
+            output = tempfile.TemporaryFile()
+            gcodes = makerbot_driver.GcodeProcessors.OverwritableGcodeFile(
+                mapped, output, flush_size=1)
+            #a longer line carries on over the next one, like a write to the file would
+            gcodes.overwrite_line(1, 'G1 X20\n')
+            self.assertEqual('G1 X20\n', gcodes[1])
+            self.assertEqual('\n', gcodes[2])
+            self.assertEqual(2, gcodes.find_line(re.compile('^\n'), 0))
+            self.assertEqual(3, gcodes.find_line(re.compile('^G1 X4'), 0))
+            gcodes.flush_before(2)
+            self.assertRaises(IndexError, gcodes.overwrite_line, 1, 'G1\n')
+            gcodes.overwrite_line(3, 'G1 X40\n')
+            gcodes.flush()
+            output.seek(0)
+            self.assertEqual('G1 X1\nG1 X20\n1 X3\nG1 X40\n', output.read())
+
     def test_process_file(self):
     #TODO update this to work with new changes/formatting
         pass
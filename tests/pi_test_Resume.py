@@ -0,0 +1,169 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import unittest
+import StringIO
+import tempfile
+import threading
+
+import makerbot_driver
+
+
+class NamedStringIO(StringIO.StringIO):
+    mode = 'wb'
+
+    def close(self):
+        pass
+
+
+def dual_gcode(layers, moves_per_layer):
+    lines = ['M104 S220 T0\n', 'M104 S230 T1\n', 'M109 S110 T0\n',
+             'G92 X0 Y0 Z0 A0 B0\n', 'M135 T0\n', 'M126 T0\n', 'G1 F3000\n']
+    for layer in range(layers):
+        tool = layer % 2
+        lines.append('M135 T%i\n' % (tool))
+        lines.append('G1 Z%.2f F1200\n' % (0.2 * (layer + 1)))
+        lines.append('M73 P%i\n' % (layer * 100 / layers))
+        for move in range(moves_per_layer):
+            lines.append('G1 X%i Y%.1f E%.3f F%i\n' % (
+                move % 20, layer + move * 0.5, 0.1 * move + layer,
+                1500 + layer * 100))
+    lines.append('M104 S0 T1\n')
+    lines.append('M137\n')
+    return lines
+
+
+def create_parser(profile, output):
+    parser = makerbot_driver.Gcode.GcodeParser()
+    parser.state.profile = profile
+    parser.s3g = makerbot_driver.s3g()
+    parser.s3g.writer = makerbot_driver.Writer.FileWriter(
+        output, threading.Condition())
+    return parser
+
+
+class FindResumePointTests(unittest.TestCase):
+
+    def setUp(self):
+        self.profile = makerbot_driver.Profile('ReplicatorDual')
+        self.lines = dual_gcode(6, 10)
+
+    def test_state_at_line(self):
+        line_number = 40
+        resume_point = makerbot_driver.Gcode.find_resume_point(
+            self.lines, self.profile, line_number=line_number)
+
+        parser = create_parser(self.profile, NamedStringIO())
+        for line in self.lines[:line_number - 1]:
+            parser.execute_line(line)
+        self.assertEqual(line_number, resume_point.line_number)
+        self.assertEqual(parser.state.position.ToList(),
+                         resume_point.position)
+        self.assertEqual(parser.state.values, resume_point.values)
+        self.assertEqual(parser.state.percentage, resume_point.percentage)
+        self.assertEqual(sum(len(line) for line in self.lines[:39]),
+                         resume_point.offset)
+        self.assertEqual({0: 220, 1: 230}, resume_point.toolhead_temperatures)
+        self.assertEqual({0: 110}, resume_point.platform_temperatures)
+        self.assertEqual({0: True}, resume_point.extra_outputs)
+
+    def test_offset_resumes_at_line_start(self):
+        offset = sum(len(line) for line in self.lines[:30])
+        for resume_offset in (offset, offset + 1, offset + len(self.lines[30]) - 1):
+            resume_point = makerbot_driver.Gcode.find_resume_point(
+                self.lines, self.profile, offset=resume_offset)
+            self.assertEqual(31, resume_point.line_number)
+            self.assertEqual(offset, resume_point.offset)
+
+    def test_line_and_offset_agree_on_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.gcode', delete=False) as f:
+            f.writelines(self.lines)
+        try:
+            by_line = makerbot_driver.Gcode.find_resume_point(
+                f.name, self.profile, line_number=50)
+            by_offset = makerbot_driver.Gcode.find_resume_point(
+                f.name, self.profile, offset=by_line.offset)
+            self.assertEqual(by_line.line_number, by_offset.line_number)
+            self.assertEqual(by_line.position, by_offset.position)
+            self.assertEqual(by_line.values, by_offset.values)
+            self.assertEqual(self.lines[49:],
+                             list(by_line.remaining_lines(f.name)))
+        finally:
+            os.unlink(f.name)
+
+    def test_needs_line_number_or_offset(self):
+        self.assertRaises(ValueError, makerbot_driver.Gcode.find_resume_point,
+                          self.lines, self.profile)
+        self.assertRaises(ValueError, makerbot_driver.Gcode.find_resume_point,
+                          self.lines, self.profile, 1, 0)
+
+    def test_past_end_of_file(self):
+        resume_point = makerbot_driver.Gcode.find_resume_point(
+            self.lines, self.profile, line_number=len(self.lines) + 10)
+        self.assertEqual(len(self.lines) + 1, resume_point.line_number)
+        self.assertEqual([], list(resume_point.remaining_lines(self.lines)))
+
+    def test_preamble(self):
+        resume_point = makerbot_driver.Gcode.find_resume_point(
+            self.lines, self.profile, line_number=40)
+        x, y, z, a, b = resume_point.position
+        expected = [
+            'M109 S110 T0\n',
+            'M104 S220 T0\n',
+            'M104 S230 T1\n',
+            'M134 T0\n',
+            'M133 T0\n',
+            'M133 T1\n',
+            'M135 T0\n',
+            'M126 T0\n',
+            'G92 A%r B%r\n' % (a, b),
+            'G1 Z%r F1000\n' % (z + 5.0),
+            'G1 X%r Y%r F3000\n' % (x, y),
+            'G1 Z%r F1000\n' % (z),
+            'G1 F%r\n' % (resume_point.values['feedrate']),
+        ]
+        self.assertEqual(expected, resume_point.preamble())
+
+    def test_preamble_skips_unknown_axes(self):
+        resume_point = makerbot_driver.Gcode.find_resume_point(
+            ['M104 S0 T0\n', 'G92 X1 Y2 Z3 A0 B0\n', 'M132 A B\n'],
+            self.profile, line_number=4)
+        self.assertEqual(['M104 S0 T0\n', 'G1 Z8.0 F1000\n',
+                          'G1 X1 Y2 F3000\n', 'G1 Z3 F1000\n'],
+                         resume_point.preamble())
+
+    def test_resume_gcode_continues_print(self):
+        expected = NamedStringIO()
+        full = create_parser(self.profile, expected)
+        for line in self.lines:
+            full.execute_line(line)
+        line_number = 40
+        head = NamedStringIO()
+        parser = create_parser(self.profile, head)
+        for line in self.lines[:line_number - 1]:
+            parser.execute_line(line)
+
+        resume_point = makerbot_driver.Gcode.find_resume_point(
+            self.lines, self.profile, line_number=line_number)
+        output = NamedStringIO()
+        parser = create_parser(self.profile, output)
+        parser.execute_line('G92 X0 Y0 Z0 A0 B0\n')
+        preamble_length = len(resume_point.preamble())
+        gcode = resume_point.resume_gcode(parser, self.lines)
+        for index, line in enumerate(gcode):
+            if index == preamble_length:
+                # The state was restored, what comes next is the print
+                self.assertEqual(line_number, parser.line_number)
+                start = len(output.getvalue())
+            parser.execute_line(line)
+        self.assertEqual(full.state.position.ToList(),
+                         parser.state.position.ToList())
+        self.assertEqual(full.state.values, parser.state.values)
+        self.assertEqual(full.line_number, parser.line_number)
+        self.assertEqual(expected.getvalue()[len(head.getvalue()):],
+                         output.getvalue()[start:])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import sys
+lib_path = os.path.abspath('./')
+sys.path.insert(0, lib_path)
+
+import unittest
+import shutil
+import tempfile
+import threading
+
+import makerbot_driver
+
+
+class S3gIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.s3g')
+        r = makerbot_driver.s3g()
+        r.writer = makerbot_driver.Writer.FileWriter(
+            open(self.path, 'wb'), threading.Condition())
+        r.find_axes_minimums(['x', 'y', 'z'], 500, 60)
+        r.set_extended_position([0, 0, 0, 0, 0])
+        for percent in range(10):
+            r.set_build_percent(percent * 10)
+            for i in range(3):
+                r.queue_extended_point_new([percent, i, 1, 2, 3], 100, ['a'])
+            r.toggle_fan(0, percent % 2)
+        r.queue_extended_point_classic([7, 8, 9, 10, 11], 100)
+        r.display_message(0, 0, 'done', 10, False, False, False)
+        r.writer.close()
+
+        reader = makerbot_driver.FileReader.FileReader()
+        reader.file = open(self.path, 'rb')
+        self.payloads = list(reader.iter_payloads())
+        reader.file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reader(self):
+        reader = makerbot_driver.FileReader.FileReader()
+        reader.file = open(self.path, 'rb')
+        self.addCleanup(reader.file.close)
+        return reader
+
+    def test_update_position(self):
+        position = [None] * 5
+        update_position = makerbot_driver.FileReader.update_position
+        update_position(position, self.payloads[1])
+        self.assertEqual([0, 0, 0, 0, 0], position)
+        # A is relative
+        update_position(position, self.payloads[3])
+        update_position(position, self.payloads[4])
+        self.assertEqual([0, 1, 1, 4, 3], position)
+        # Found axes aren't known any more
+        update_position(position, self.payloads[0])
+        self.assertEqual([None, None, None, 4, 3], position)
+        update_position(position, self.payloads[3])
+        self.assertEqual([0, 0, 1, 6, 3], position)
+
+    def test_build(self):
+        index = makerbot_driver.FileReader.S3gIndex.build(self.path, 4)
+        self.assertEqual(len(self.payloads), index.command_count)
+        self.assertEqual(range(0, len(self.payloads), 4), list(index.commands))
+        self.assertEqual([None] * 5, index.positions[0])
+        self.assertEqual(0, index.offsets[0])
+        self.assertEqual(range(0, 100, 10), index.percents)
+        self.assertEqual(os.path.getsize(self.path), index.size)
+
+    def test_seek(self):
+        index = makerbot_driver.FileReader.S3gIndex.build(self.path, 4)
+        for command_index in range(len(self.payloads) + 1):
+            position, payloads = index.seek(self.reader(), command_index)
+            self.assertEqual(self.payloads[command_index:], list(payloads))
+            expected = [None] * 5
+            for payload in self.payloads[:command_index]:
+                makerbot_driver.FileReader.update_position(expected, payload)
+            self.assertEqual(expected, position)
+        self.assertRaises(IndexError, index.seek, self.reader(),
+                          len(self.payloads) + 1)
+
+    def test_seek_percent(self):
+        index = makerbot_driver.FileReader.S3gIndex.build(self.path, 4)
+        command_index, position, payloads = index.seek_percent(self.reader(), 45)
+        self.assertEqual(self.payloads[command_index:], list(payloads))
+        self.assertEqual([150, 50, 0], self.payloads[command_index])
+        self.assertEqual([4, 2, 1, 30, 3], position)
+        self.assertEqual(len(self.payloads), index.command_at_percent(101))
+
+    def test_for_file(self):
+        S3gIndex = makerbot_driver.FileReader.S3gIndex
+        index = S3gIndex.for_file(self.path, 4)
+        sidecar_path = S3gIndex.sidecar_path(self.path)
+        self.assertTrue(os.path.exists(sidecar_path))
+        loaded = S3gIndex.for_file(self.path)
+        self.assertEqual(4, loaded.interval)
+        for name in ['command_count', 'commands', 'offsets', 'positions',
+                     'percents', 'percent_commands', 'percent_offsets']:
+            self.assertEqual(getattr(index, name), getattr(loaded, name))
+
+        # A changed file is indexed again
+        with open(self.path, 'ab') as f:
+            f.write('\x96\x64\x00')
+        rebuilt = S3gIndex.for_file(self.path)
+        self.assertEqual(index.command_count + 1, rebuilt.command_count)
+        self.assertEqual(100, rebuilt.percents[-1])
+
+    def test_empty_file(self):
+        S3gIndex = makerbot_driver.FileReader.S3gIndex
+        open(self.path, 'wb').close()
+        index = S3gIndex.for_file(self.path)
+        self.assertEqual(0, index.command_count)
+        self.assertEqual((0, 0, [None] * 5), index.checkpoint(0))
+        position, payloads = index.seek(self.reader(), 0)
+        self.assertEqual([None] * 5, position)
+        self.assertEqual([], list(payloads))
+        command_index, position, payloads = index.seek_percent(self.reader(), 50)
+        self.assertEqual(0, command_index)
+        self.assertEqual([], list(payloads))
+        self.assertEqual(list(index.commands),
+                         list(S3gIndex.for_file(self.path).commands))
+
+if __name__ == "__main__":
+    unittest.main()
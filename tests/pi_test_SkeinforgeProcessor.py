@@ -50,7 +50,7 @@ class Skeinforge50ProcessorTests(unittest.TestCase):
         ]
         expected_output = [
             '(<version> 12.03.14 </version)\n',
-            'M73 P50 (progress (50%))\n',
+            'M73 P12 (progress (12%))\n',
             'G92 X0 Y0 Z0 A0 B0\n',
             'M73 P100 (progress (100%))\n',
         ]
@@ -71,17 +71,55 @@ class Skeinforge50ProcessorTests(unittest.TestCase):
         ]
         expected_output = [
             "G92 A0\n",
-            "M73 P25 (progress (25%))\n",
+            "M73 P22 (progress (22%))\n",
             "G92 B0\n",
-            "M73 P50 (progress (50%))\n",
+            "M73 P33 (progress (33%))\n",
             "G92 A0\n",
-            "M73 P75 (progress (75%))\n",
+            "M73 P66 (progress (66%))\n",
             "G92 B0\n",
             "M73 P100 (progress (100%))\n",
         ]
         got_output = self.sp.process_gcode(gcodes)
         self.assertEqual(expected_output, got_output)
 
+    def test_iter_process_gcode(self):
+        gcodes = [
+            "G90\n",
+            "G92 A0\n",
+            "G92 B0\n",
+            "M101\n",
+            "G21\n",
+            "G92 A0\n",
+            "M108\n",
+            "G92 B0\n",
+            "M105 S100\n",
+        ]
+        expected_output = [
+            "G92 A0\n",
+            "M73 P19 (progress (19%))\n",
+            "G92 B0\n",
+            "M73 P32 (progress (32%))\n",
+            "G92 A0\n",
+            "M73 P60 (progress (60%))\n",
+            "G92 B0\n",
+            "M73 P100 (progress (100%))\n",
+        ]
+        percents = []
+        with tempfile.TemporaryFile() as f:
+            f.write(''.join(gcodes))
+            f.seek(0)
+            stream = makerbot_driver.GcodeProcessors.GcodeStream.from_file(f)
+            got_output = list(self.sp.iter_process_gcode(
+                stream, percents.append))
+        self.assertEqual(expected_output, got_output)
+        self.assertEqual([7, 19, 32, 41, 48, 60, 69, 82, 100], percents)
+
+    def test_iter_process_gcode_no_progress(self):
+        gcodes = ["G90\n", "G92 A0\n", "M101\n"]
+        self.sp.do_progress = False
+        got_output = list(self.sp.iter_process_gcode(iter(gcodes)))
+        self.assertEqual(["G92 A0\n"], got_output)
+
 
 class TestSkeinforgeVersioner(unittest.TestCase):
 
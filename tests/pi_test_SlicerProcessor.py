@@ -32,7 +32,7 @@ class SlicerProcessor(unittest.TestCase):
         ]
         expected_output = [
             '; generated by Slic3r 0.9.3 on YYYY-MM-DD at HH:MM:SS\n',
-            'M73 P50 (progress (50%))\n',
+            'M73 P11 (progress (11%))\n',
             'G1 X0 Y0 Z0 A0 B0\n',
             'M73 P100 (progress (100%))\n'
         ]
@@ -269,6 +269,337 @@ class StreamWriterTests(unittest.TestCase):
             makerbot_driver.ExternalStopError, self.w.send_command, 'asdf')
 
 
+class StreamWriterPipelinedTests(unittest.TestCase):
+
+    def setUp(self):
+        self.outputstream = io.BytesIO(
+        )  # Stream that we will send responses on
+        self.inputstream = io.BytesIO(
+        )  # Stream that we will receive commands on
+
+        file = io.BufferedRWPair(self.outputstream, self.inputstream)
+        condition = threading.Condition()
+        self.w = makerbot_driver.Writer.StreamWriter(
+            file, condition, window_size=3)
+        self.poll = makerbot_driver.Encoder.host_query_codecs[
+            'GET_AVAILABLE_BUFFER_SIZE'].pack()
+
+    def tearDown(self):
+        self.w = None
+
+    def write_responses(self, *responses):
+        """
+        @param responses Response code names, or ints of free buffer space
+            to answer a GET_AVAILABLE_BUFFER_SIZE with
+        """
+        for response in responses:
+            response_payload = bytearray()
+            if isinstance(response, int):
+                response_payload.append(makerbot_driver.response_code_dict['SUCCESS'])
+                response_payload.extend(struct.pack('<I', response))
+            else:
+                response_payload.append(makerbot_driver.response_code_dict[response])
+            self.outputstream.write(
+                makerbot_driver.Encoder.encode_payload(response_payload))
+        self.outputstream.seek(0)
+
+    def expected_packets(self, *payloads):
+        packets = bytearray()
+        for payload in payloads:
+            packets.extend(makerbot_driver.Encoder.encode_payload(payload))
+        return packets
+
+    def test_packets_sent_without_waiting(self):
+        self.write_responses(100, 'SUCCESS', 'SUCCESS', 'SUCCESS')
+        self.w.send_action_payload('\x97a')
+        self.w.send_action_payload('\x97b')
+        self.assertEqual(2, len(self.w._in_flight))
+        self.w.send_action_payload('\x97c')
+        self.assertEqual(2, len(self.w._in_flight))
+        self.assertEqual(100 - 6, self.w._window_space)
+        self.assertEqual(
+            self.expected_packets(self.poll, '\x97a', '\x97b', '\x97c'),
+            self.inputstream.getvalue())
+
+    def test_drain(self):
+        self.write_responses(100, 'SUCCESS', 'SUCCESS')
+        self.w.send_action_payload('\x97a')
+        self.w.send_action_payload('\x97b')
+        self.w.drain()
+        self.assertEqual(0, len(self.w._in_flight))
+
+    def test_query_drains_window(self):
+        self.write_responses(100, 'SUCCESS', 'SUCCESS')
+        self.w.send_action_payload('\x97a')
+        self.assertEqual(
+            bytearray([makerbot_driver.response_code_dict['SUCCESS']]),
+            self.w.send_query_payload('q'))
+        self.assertEqual(0, len(self.w._in_flight))
+        self.assertEqual(
+            self.expected_packets(self.poll, '\x97a', 'q'),
+            self.inputstream.getvalue())
+
+    def test_host_action_sent_stop_and_wait(self):
+        self.write_responses(100, 'SUCCESS', 'SUCCESS')
+        self.w.send_action_payload('\x97a')
+        self.w.send_action_payload('a')
+        self.assertEqual(0, len(self.w._in_flight))
+        self.assertEqual(None, self.w._window_space)
+        self.assertEqual(
+            self.expected_packets(self.poll, '\x97a', 'a'),
+            self.inputstream.getvalue())
+
+    def test_waits_for_buffer_space(self):
+        self.write_responses(5, 'SUCCESS', 'SUCCESS', 100, 'SUCCESS')
+        for payload in ['\x97a', '\x97b', '\x97c']:
+            self.w.send_action_payload(payload)
+        self.w.drain()
+        # c didn't fit, so a and b were acknowledged and the buffer polled
+        # again before c was sent
+        self.assertEqual(
+            self.expected_packets(self.poll, '\x97a', '\x97b', self.poll, '\x97c'),
+            self.inputstream.getvalue())
+        self.assertEqual(0, self.w.total_overflows)
+
+    def test_no_buffer_space(self):
+        self.write_responses(1, 'ACTION_BUFFER_OVERFLOW')
+        self.assertRaises(makerbot_driver.BufferOverflowError,
+                          self.w.send_action_payload, '\x97a')
+        self.assertEqual(1, self.w.total_overflows)
+        self.assertEqual(None, self.w._window_space)
+        self.assertEqual(0, len(self.w._in_flight))
+
+    def test_retryable_error_resends_in_order(self):
+        self.write_responses(
+            100, 'CRC_MISMATCH', 'CRC_MISMATCH', 'CRC_MISMATCH',
+            'SUCCESS', 'SUCCESS', 'SUCCESS')
+        for payload in ['\x97a', '\x97b', '\x97c']:
+            self.w.send_action_payload(payload)
+        self.w.drain()
+        self.assertEqual(1, self.w.total_retries)
+        self.assertEqual(
+            self.expected_packets(self.poll, '\x97a', '\x97b', '\x97c',
+                                  '\x97a', '\x97b', '\x97c'),
+            self.inputstream.getvalue())
+
+    def test_retryable_error_accepted_out_of_order(self):
+        self.write_responses(100, 'CRC_MISMATCH', 'SUCCESS', 'SUCCESS')
+        self.w.send_action_payload('\x97a')
+        self.w.send_action_payload('\x97b')
+        self.assertRaises(
+            makerbot_driver.TransmissionError, self.w.send_action_payload, '\x97c')
+
+    def test_bad_replies_resent(self):
+        self.write_responses(100)
+        bad_reply = makerbot_driver.Encoder.encode_payload(
+            bytearray([makerbot_driver.response_code_dict['SUCCESS']]))
+        bad_reply[-1] ^= 0xff
+        self.outputstream.seek(0, io.SEEK_END)
+        self.outputstream.write(str(bad_reply * 2))
+        for response in ['SUCCESS', 'SUCCESS']:
+            self.outputstream.write(makerbot_driver.Encoder.encode_payload(
+                bytearray([makerbot_driver.response_code_dict[response]])))
+        self.outputstream.seek(0)
+        self.w.send_action_payload('\x97a')
+        self.w.send_action_payload('\x97b')
+        self.w.drain()
+        self.assertEqual(1, self.w.total_retries)
+        self.assertEqual(
+            self.expected_packets(self.poll, '\x97a', '\x97b', '\x97a', '\x97b'),
+            self.inputstream.getvalue())
+
+    def test_too_many_retries(self):
+        self.write_responses(*[100] + ['GENERIC_PACKET_ERROR'] *
+                             makerbot_driver.max_retry_count)
+        self.w.send_action_payload('\x97a')
+        self.assertRaises(makerbot_driver.TransmissionError, self.w.drain)
+
+    def test_timeout_with_packets_in_flight(self):
+        self.write_responses(100)
+        timeout_length = makerbot_driver.timeout_length
+        makerbot_driver.timeout_length = .001
+        try:
+            self.w.send_action_payload('\x97a')
+            self.w.send_action_payload('\x97b')
+            self.assertRaises(makerbot_driver.TransmissionError, self.w.drain)
+        finally:
+            makerbot_driver.timeout_length = timeout_length
+        self.assertEqual(0, len(self.w._in_flight))
+        # Timeouts were retried, like in stop-and-wait mode
+        self.assertEqual(makerbot_driver.max_retry_count, self.w.total_retries)
+
+    def test_buffer_overflow_holds_back_packets(self):
+        self.write_responses(
+            100, 'ACTION_BUFFER_OVERFLOW', 'ACTION_BUFFER_OVERFLOW',
+            'ACTION_BUFFER_OVERFLOW', 'SUCCESS', 'SUCCESS', 100, 'SUCCESS')
+        self.w.send_action_payload('\x97a')
+        self.w.send_action_payload('\x97b')
+        self.assertRaises(makerbot_driver.BufferOverflowError,
+                          self.w.send_action_payload, '\x97c')
+        self.assertEqual(1, self.w.total_overflows)
+        self.assertEqual(['\x97a', '\x97b'], [str(p[2:-1]) for p in self.w._pending])
+        self.assertEqual(None, self.w._window_space)
+        # The caller resends the packet that raised.  The held back packets
+        # go first, one at a time.
+        self.w.send_action_payload('\x97c')
+        self.w.drain()
+        self.assertEqual(
+            self.expected_packets(self.poll, '\x97a', '\x97b', '\x97c',
+                                  '\x97a', '\x97b', self.poll, '\x97c'),
+            self.inputstream.getvalue())
+
+    def test_draining_machine(self):
+        # Packets written into the machine's full buffer without waiting
+        # for replies are rejected, and the ones after them accepted
+        machine = DrainingMachineStream(drain_per_packet=3)
+        machine.buffered = machine.buffer_size
+        for song in range(3):
+            machine.write(makerbot_driver.Encoder.encode_payload(
+                makerbot_driver.Encoder.host_action_codecs['QUEUE_SONG'].pack(song)))
+        self.assertEqual(1, machine.overflows)
+        self.assertEqual([1, 2], [payload[1] for payload in machine.accepted])
+
+        machine = DrainingMachineStream(drain_per_packet=3)
+        writer = makerbot_driver.Writer.StreamWriter(
+            machine, threading.Condition(), window_size=4)
+        s3g = makerbot_driver.s3g(writer)
+        # Something else already filled the buffer
+        machine.buffered = machine.buffer_size
+        for song in range(200):
+            while True:
+                try:
+                    s3g.queue_song(song)
+                    break
+                except makerbot_driver.BufferOverflowError:
+                    pass
+        writer.drain()
+        self.assertEqual(range(200), [payload[1] for payload in machine.accepted])
+        self.assertEqual(0, machine.overflows)
+        self.assertTrue(machine.max_in_flight > 1)
+
+    def test_external_stop(self):
+        self.w.set_external_stop(True)
+        self.assertRaises(
+            makerbot_driver.ExternalStopError, self.w.send_action_payload, '\x97a')
+
+
+class DrainingMachineStream(object):
+    """
+    A stream to a machine with a small command buffer, which executes
+    drain_per_packet bytes of it after each packet it is sent.  Pipelining
+    into its full buffer gets some packets rejected and the next ones
+    accepted.
+    """
+
+    def __init__(self, buffer_size=20, drain_per_packet=1):
+        self.buffer_size = buffer_size
+        self.drain_per_packet = drain_per_packet
+        self.buffered = 0
+        self.accepted = []
+        self.overflows = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._decoder = makerbot_driver.Encoder.PacketStreamDecoder()
+        self._output = bytearray()
+
+    def write(self, packet):
+        for payload in self._decoder.feed(bytearray(packet)):
+            self._output.extend(makerbot_driver.Encoder.encode_payload(
+                self.reply(bytearray(payload))))
+            self.buffered = max(self.buffered - self.drain_per_packet, 0)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def reply(self, payload):
+        success = bytearray([makerbot_driver.response_code_dict['SUCCESS']])
+        if payload[0] == makerbot_driver.host_query_command_dict['GET_AVAILABLE_BUFFER_SIZE']:
+            return success + struct.pack('<I', self.buffer_size - self.buffered)
+        if payload[0] >= 128:
+            if self.buffered + len(payload) > self.buffer_size:
+                self.overflows += 1
+                return bytearray(
+                    [makerbot_driver.response_code_dict['ACTION_BUFFER_OVERFLOW']])
+            self.buffered += len(payload)
+        self.accepted.append(payload)
+        return success
+
+    def flush(self):
+        pass
+
+    def read(self, size):
+        data = self._output[:size]
+        del self._output[:size]
+        self.in_flight = 0
+        return str(data)
+
+    def inWaiting(self):
+        return len(self._output)
+
+
+class CountingStream(object):
+    """ A stream that reports how many bytes are waiting and counts reads """
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+        self.written = io.BytesIO()
+        self.read_calls = 0
+
+    def write(self, data):
+        self.written.write(data)
+
+    def flush(self):
+        pass
+
+    def inWaiting(self):
+        return len(self.data.getvalue()) - self.data.tell()
+
+    def read(self, size=1):
+        self.read_calls += 1
+        return self.data.read(size)
+
+
+class StreamWriterBulkReadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.response_payload = bytearray()
+        self.response_payload.append(
+            makerbot_driver.response_code_dict['SUCCESS'])
+        self.response_payload.extend('12345')
+        self.response = makerbot_driver.Encoder.encode_payload(
+            self.response_payload)
+
+    def test_reads_waiting_bytes_at_once(self):
+        stream = CountingStream(str(self.response))
+        w = makerbot_driver.Writer.StreamWriter(stream, threading.Condition())
+        self.assertEqual(self.response_payload, w.send_command('abcde'))
+        self.assertEqual(1, stream.read_calls)
+
+    def test_keeps_leftover_bytes(self):
+        stream = CountingStream(str(self.response + self.response))
+        w = makerbot_driver.Writer.StreamWriter(stream, threading.Condition())
+        self.assertEqual(self.response_payload, w.send_command('abcde'))
+        self.assertEqual(self.response_payload, w.send_command('abcde'))
+        self.assertEqual(1, stream.read_calls)
+
+    def test_retries_after_bad_bytes(self):
+        stream = CountingStream('aa' + str(self.response))
+        w = makerbot_driver.Writer.StreamWriter(stream, threading.Condition())
+        self.assertEqual(self.response_payload, w.send_command('abcde'))
+        self.assertEqual(2, w.total_retries)
+        self.assertEqual(
+            str(makerbot_driver.Encoder.encode_payload('abcde')) * 3,
+            stream.written.getvalue())
+
+    def test_reads_no_further_than_packet_without_waiting_count(self):
+        # BufferedRWPair can't say how many bytes are waiting
+        outputstream = io.BytesIO(str(self.response + self.response))
+        inputstream = io.BytesIO()
+        file = io.BufferedRWPair(outputstream, inputstream)
+        w = makerbot_driver.Writer.StreamWriter(file, threading.Condition())
+        self.assertEqual(self.response_payload, w.send_command('abcde'))
+        self.assertEqual(0, len(w._receive_buffer))
+
+
 class TestUnderlyingFile(unittest.TestCase):
     """ test StreamWriter calls underlying file open/close """
 
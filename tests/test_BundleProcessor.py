@@ -10,56 +10,61 @@ import mock
 import makerbot_driver
 
 
-class TestBundleProcessorCallbackAssignment(unittest.TestCase):
+class TestBundleProcessorSinglePass(unittest.TestCase):
 
     def setUp(self):
         self.bp = makerbot_driver.GcodeProcessors.BundleProcessor()
-        self.bp._super_process_gcode = mock.Mock(return_value=[])
+        self.bp.code_map = {
+            "G21": lambda match: [],
+            "G90": lambda match: "G90 (kept)\n",
+        }
         self.bp.progress_processor.process_gcode = mock.Mock()
+        self.gcodes = ["G21\n", "G90\n", "G1 X1\n", "G21\n"]
+        self.percents = []
 
     def tearDown(self):
         self.bp = None
 
     def test_not_do_progress_no_callback(self):
         self.bp.do_progress = False
-        callback = None
-        gcodes = []
-        self.bp.process_gcode(gcodes, callback)
-        self.bp._super_process_gcode.assert_called_once_with([], None)
+        output = self.bp.process_gcode(self.gcodes)
+        self.assertEqual(["G90 (kept)\n", "G1 X1\n"], output)
         self.assertEqual(
             len(self.bp.progress_processor.process_gcode.mock_calls), 0)
 
     def test_not_do_progress_callback(self):
         self.bp.do_progress = False
+        output = self.bp.process_gcode(self.gcodes, self.percents.append)
+        self.assertEqual(["G90 (kept)\n", "G1 X1\n"], output)
+        self.assertEqual([25, 50, 75, 100], self.percents)
 
-        def callback(percent):
-            pass
-        gcodes = []
-        self.bp.process_gcode(gcodes, callback)
-        self.bp._super_process_gcode.assert_called_once_with([], callback)
+    def test_do_progress_no_callback(self):
+        output = self.bp.process_gcode(self.gcodes)
+        self.assertEqual([
+            "G90 (kept)\n",
+            "M73 P50 (progress (50%))\n",
+            "G1 X1\n",
+            "M73 P100 (progress (100%))\n",
+        ], output)
         self.assertEqual(
             len(self.bp.progress_processor.process_gcode.mock_calls), 0)
 
-    def test_do_progress_no_callback(self):
-        self.bp.do_progress = True
-        callback = None
-        gcodes = []
-        self.bp.process_gcode(gcodes, callback)
-        self.bp._super_process_gcode.assert_called_once_with([], callback)
-        self.bp.progress_processor.process_gcode.assert_called_once_with(
-            [], None)
-
     def test_do_progress_callback(self):
-        self.bp.do_progress = True
+        self.bp.process_gcode(self.gcodes, self.percents.append)
+        self.assertEqual([25, 50, 75, 100], self.percents)
 
-        def callback(percent):
-            pass
-        gcodes = []
-        self.bp.process_gcode(gcodes, callback)
-        self.bp._super_process_gcode.assert_called_once_with(
-            [], self.bp.new_callback)
-        self.bp.progress_processor.process_gcode.assert_called_once_with(
-            [], self.bp.progress_callback)
+    def test_do_progress_unknown_size(self):
+        self.assertRaises(ValueError, self.bp.iter_process_gcode,
+                          iter(self.gcodes))
+        self.bp.do_progress = False
+        output = self.bp.iter_process_gcode(iter(self.gcodes),
+                                            self.percents.append)
+        self.assertEqual(["G90 (kept)\n", "G1 X1\n"], list(output))
+        self.assertEqual([], self.percents)
+
+    def test_empty(self):
+        self.assertEqual([], self.bp.process_gcode([], self.percents.append))
+        self.assertEqual([], self.percents)
 
 
 class TestBundleProcessorCallbacks(unittest.TestCase):
@@ -109,10 +114,10 @@ class TestBundleProcessorCallbacks(unittest.TestCase):
         self.bp.process_gcode(lines, callback=test_callback)
         self.done_process = True
         t.join()
-        discrete_percents = set(self.percents)
+        # Percents are sampled in order, so they should never go down
         cur_percent = -1
-        for percent in discrete_percents:
-            self.assertTrue(percent > cur_percent)
+        for percent in self.percents:
+            self.assertTrue(percent >= cur_percent)
             cur_percent = percent
 
     def test_callbacks_dont_do_progress(self):
@@ -139,10 +144,10 @@ class TestBundleProcessorCallbacks(unittest.TestCase):
         self.bp.process_gcode(lines, callback=test_callback)
         self.done_process = True
         t.join()
-        discrete_percents = set(self.percents)
+        # Percents are sampled in order, so they should never go down
         cur_percent = -1
-        for percent in discrete_percents:
-            self.assertTrue(percent > cur_percent)
+        for percent in self.percents:
+            self.assertTrue(percent >= cur_percent)
             cur_percent = percent
 
     def set_external_stop(self):
@@ -159,7 +164,8 @@ class TestBundleProcessorCallbacks(unittest.TestCase):
             'skeinforge_dual_extrusion_hilbert_cube.gcode',
         )
         with open(path_to_gcode) as f:
-            lines = list(f)
+            # Long enough to still be processing when the stop is set
+            lines = list(f) * 10
         self.bp.processors = [
             makerbot_driver.GcodeProcessors.RpmProcessor(),
             makerbot_driver.GcodeProcessors.SingletonTProcessor(),